@@ -1,52 +1,64 @@
 import urllib3
 import boto3
-from botocore.exceptions import NoCredentialsError
+from botocore.exceptions import ClientError, NoCredentialsError
 import geopandas as gpd
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyogrio
+import hashlib
+import json
 import os
-import glob
+import shutil
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 s3 = boto3.client('s3')
 
-def get_all_files_from_s3(bucket_name, folder_name):
-    
-    # List all objects in the specified S3 folder
-    response = s3.list_objects_v2(Bucket=bucket_name, Prefix=f'{folder_name}/')
-    
-    # Check if the folder is empty
-    if 'Contents' not in response:
-        return {
-            'statusCode': 404,
-            'body': 'No files found in the specified S3 folder'
-        }
-    
-    # Iterate over all files and download them
-    for obj in response['Contents']:
-        key = obj['Key']
-
-        if (key != folder_name + '/'):
-            # Download each file to the Lambda's /tmp directory
-            print(key)
-            download_path = os.path.join('/tmp', key.split('/')[-1])
-            s3.download_file(bucket_name, key, download_path)
-            
-            # Do something with the downloaded file (if needed)
-            print(f"Downloaded {key} to {download_path}")
-    
-    print("Done")
+BUCKET_NAME = "krm-validatie-data-prod"
+LAYER_NAME = "krm_actuele_dataset"
+# Key of the merged dataset that is ingested by the WPS
+PUBLISH_KEY = "geopackages_history/krm_actuele_dataset_new.gpkg"
+# Per source folder a master GeoPackage and a manifest of bundle -> ETag are kept here
+HISTORY_PREFIX = "geopackages_history"
+# Rows of a bundle are identified by its databundelcode, stored as monprog.naam
+BUNDLE_KEY_COLUMN = 'monprog.naam'
+WORK_DIR = '/tmp'
 
+COMMON_CRS = 'EPSG:4258'
+COLUMNS_TO_DROP = ['parameter', 'record_id', 'locatiecode', 'locatie.code', 'cleaned_lokaalid', 'cleaned_meetwaarde_lokaalid', 'recordnr_monster', 'uitvalreden', 'informatie']
+# Features per Arrow batch while merging; bounds peak memory of the merge
+MERGE_BATCH_SIZE = 50000
+# Concurrent downloads of bundle GeoPackages
+DOWNLOAD_WORKERS = 8
+# Hive-partitioned GeoParquet copy of the merged dataset, per source folder, with one
+# file per partition. Partitioning by year as well gives many small files; by default
+# the year is a column (jaar) that readers filter on with the row group statistics
+GEOPARQUET_PREFIX = "geoparquet"
+GEOPARQUET_PARTITION_BY_YEAR = False
+GEOPARQUET_FILE_NAME = "part-0.parquet"
+# Rows per row group; the rows of a batch are sorted along a Hilbert curve first, so
+# the bbox statistics of a row group cover a small extent
+GEOPARQUET_ROW_GROUP_SIZE = 2000
+GEOPARQUET_MISSING_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+# Folder of the bundle GeoPackages written by the validation, and the maximum
+# number of notifications drain_queue publishes in one go
+NOTIFICATION_DEFAULT_FOLDER = "geopackages"
+NOTIFICATION_BATCH_MAX = 100
 
-def upload_file_to_s3(file_name, bucket_name, s3_file_key):
+def upload_file_to_s3(file_name, bucket_name, s3_file_key, extra_args=None):
     """
     Uploads a local file to an S3 bucket.
 
     :param file_name: Path to the local file
     :param bucket_name: Name of the S3 bucket
     :param s3_file_key: S3 object key (name of the file in S3)
+    :param extra_args: Optional. ExtraArgs for the upload (e.g. Metadata)
     :return: True if file was uploaded, else False
     """
     try:
-        s3.upload_file(file_name, bucket_name, s3_file_key)
+        s3.upload_file(file_name, bucket_name, s3_file_key, ExtraArgs=extra_args)
         print(f"File {file_name} successfully uploaded to {bucket_name}/{s3_file_key}")
         return True
     except FileNotFoundError:
@@ -59,42 +71,724 @@ def upload_file_to_s3(file_name, bucket_name, s3_file_key):
         print(f"An error occurred: {str(e)}")
         return False
 
-def merge_geopackages(gpkg_files, output_gpkg, layer_name="krm_actuele_dataset"):
-    # Initialize an empty GeoDataFrame
-    gdf_list = []
-    common_crs = 'EPSG:4258'
-    # Loop through each geopackage file and read them
+def merge_geopackages(gpkg_files, output_gpkg, layer_name=LAYER_NAME, batch_size=MERGE_BATCH_SIZE, append=False, geoparquet=None):
+    """
+    Merge bundle GeoPackages into a single layer without holding them all in memory.
+
+    Every source layer is read in Arrow batches; each batch is re-projected, gets
+    lower-case column names and the publication drop list applied, and is then
+    appended to the output layer. Peak memory is bounded by one batch instead of
+    the full national dataset.
+
+    ``gpkg_files`` may be any iterable, e.g. a generator that yields files while
+    they are being downloaded. Fields that only appear in later files are added to
+    the output layer when they are first seen, so the result has the union of all
+    fields in order of first appearance (the layout ``pd.concat`` would produce).
+
+    :param gpkg_files: Paths of the bundle GeoPackages to merge
+    :param output_gpkg: Path of the merged GeoPackage
+    :param layer_name: Name of the output layer
+    :param batch_size: Number of features per Arrow batch
+    :param append: Append to the existing output layer instead of overwriting the file
+    :param geoparquet: Optional. GeoParquetDataset that receives the same batches
+    :return: Dict of source file -> bundle keys (monprog.naam) it contributed
+    """
+    if append:
+        schema = layer_schema(output_gpkg, layer_name)
+    else:
+        # Ensure the output folder exists and start from an empty file
+        os.makedirs(os.path.dirname(output_gpkg), exist_ok=True)
+        if os.path.exists(output_gpkg):
+            os.remove(output_gpkg)
+        schema = None
+
+    written = 0
+    bundle_keys = {}
     for gpkg_file in gpkg_files:
         print(gpkg_file)
-        gdf = gpd.read_file(gpkg_file)
-        # Check the CRS of the current GeoDataFrame
-        if gdf.crs != common_crs:
-            # Transform the CRS to the common CRS
-            gdf = gdf.to_crs(common_crs)
+        keys = set()
+        for gdf in read_geopackage_batches(gpkg_file, batch_size):
+            gdf = gdf.drop(columns=COLUMNS_TO_DROP, errors='ignore')
+            if schema is None:
+                # The first write creates the layer and its fields
+                schema = {c: gdf[c].dtype for c in gdf.columns if c != gdf.geometry.name}
+            else:
+                new_fields = {
+                    c: gdf[c].dtype for c in gdf.columns
+                    if c not in schema and c != gdf.geometry.name
+                }
+                if new_fields:
+                    add_fields(output_gpkg, new_fields, layer_name)
+                    schema.update(new_fields)
+                gdf = align_to_schema(gdf, schema)
+
+            pyogrio.write_dataframe(
+                gdf, output_gpkg, layer=layer_name, driver="GPKG", append=append or written > 0
+            )
+            if geoparquet is not None:
+                geoparquet.write(gdf)
+            written += len(gdf)
+            if BUNDLE_KEY_COLUMN in gdf.columns:
+                keys.update(gdf[BUNDLE_KEY_COLUMN].dropna().unique())
+        bundle_keys[gpkg_file] = sorted(keys)
+
+    if schema is None:
+        raise ValueError("No GeoPackages to merge")
+
+    print(f"Merged {len(bundle_keys)} GeoPackages ({written} features) into {output_gpkg}")
+    return bundle_keys
+
+
+def layer_schema(gpkg_file, layer_name=LAYER_NAME):
+    """Fields of an existing layer as an ordered mapping of name to numpy dtype."""
+    info = pyogrio.read_info(gpkg_file, layer=layer_name)
+    return {name: np.dtype(dtype) for name, dtype in zip(info['fields'], info['dtypes'])}
+
+
+def add_fields(gpkg_file, fields, layer_name=LAYER_NAME):
+    """Add fields (name -> dtype) to an existing GeoPackage layer."""
+    with sqlite3.connect(gpkg_file) as conn:
+        for name, dtype in fields.items():
+            conn.execute(f'ALTER TABLE "{layer_name}" ADD COLUMN "{name}" {_sql_type(dtype)}')
+    conn.close()
+
+
+def _sql_type(dtype):
+    """GeoPackage column type for a pandas dtype."""
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        return 'TEXT'
+    kind = np.dtype(dtype).kind
+    if kind == 'b':
+        return 'BOOLEAN'
+    if kind in 'iu':
+        return 'INTEGER'
+    if kind == 'f':
+        return 'REAL'
+    if kind == 'M':
+        return 'DATETIME'
+    return 'TEXT'
+
+
+def read_geopackage_batches(gpkg_file, batch_size=MERGE_BATCH_SIZE, where=None):
+    """
+    Yield the features of a GeoPackage as GeoDataFrames of at most ``batch_size`` rows.
+
+    Batches are re-projected to the common CRS and have lower-case column names.
+
+    :param where: Optional. SQL filter on the features
+    """
+    with pyogrio.open_arrow(gpkg_file, batch_size=batch_size, where=where, use_pyarrow=True) as (meta, reader):
+        geometry_name = meta['geometry_name'] or 'wkb_geometry'
+        for batch in reader:
+            df = batch.to_pandas()
+            geometry = gpd.GeoSeries.from_wkb(df.pop(geometry_name).values, index=df.index, crs=meta['crs'])
+            gdf = gpd.GeoDataFrame(df, geometry=geometry)
+
+            # Check the CRS of the current batch
+            if gdf.crs != COMMON_CRS:
+                # Transform the CRS to the common CRS
+                gdf = gdf.to_crs(COMMON_CRS)
+
+            gdf.columns = [col.lower() for col in gdf.columns]
+            yield gdf
+
+
+def align_to_schema(gdf, schema):
+    """Drop unpublished columns and add missing ones so every batch has the merged layout."""
+    gdf = gdf.drop(columns=COLUMNS_TO_DROP, errors='ignore')
+    for name, dtype in schema.items():
+        if name not in gdf.columns:
+            gdf[name] = _empty_column(dtype, gdf.index)
+    return gdf[list(schema) + [gdf.geometry.name]]
+
+
+def _empty_column(dtype, index):
+    """
+    All-missing column that keeps the field type of the merged layer: NaN (NaT) for
+    numbers and dates, None for text and other objects.
+    """
+    # A scalar None would be broadcast as NaN into an object column
+    missing = pd.Series([None] * len(index), index=index, dtype=object)
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        return missing
+    dtype = np.dtype(dtype)
+    if dtype.kind in 'iub':
+        # Integer and boolean fields cannot hold missing values
+        dtype = np.dtype('float64')
+    if dtype.kind in 'fMm':
+        return pd.Series(np.nan, index=index, dtype=dtype)
+    return missing
+
+
+class GeoParquetDataset:
+    """
+    Hive-partitioned GeoParquet copy of the merged dataset, written batch by batch.
+
+    Rows are partitioned by ``krmcriterium`` (and optionally by the year of
+    ``begindatum``) into one file per partition,
+    ``krmcriterium=<c>[/jaar=<y>]/part-0.parquet``; without the year partition the
+    year is the ``jaar`` column. Each batch is sorted along a Hilbert curve and
+    written in row groups with column statistics, and a ``bbox`` covering column is
+    added (GeoParquet 1.1), so readers can prune on partitions, predicates and
+    extent. A publication rewrites the partitions it touched from the master
+    GeoPackage (see export_geoparquet).
+    """
+
+    def __init__(self, root_dir, partition_by_year=GEOPARQUET_PARTITION_BY_YEAR):
+        self.root_dir = root_dir
+        self.partition_by_year = partition_by_year
+        self.files = []
+        self.consistent = True
+        self._columns = None
+        self._writers = {}
+
+    def write(self, gdf):
+        """Append a batch to the files of its partitions."""
+        begindatum = gdf['begindatum'] if 'begindatum' in gdf.columns else pd.Series(None, index=gdf.index)
+        years = pd.to_datetime(begindatum, errors='coerce', format='mixed').dt.year.astype('Int32')
+        order = np.argsort(self._hilbert_distance(gdf.geometry), kind='stable')
+        gdf, years = gdf.iloc[order], years.iloc[order]
+        table = self._to_arrow(gdf, None if self.partition_by_year else years)
+        if self._columns is None:
+            self._columns = table.schema.names
+        elif table.schema.names != self._columns:
+            # Files written earlier lack the new fields
+            self.consistent = False
+
+        for path, rows in self._file_rows(gdf, years).items():
+            writer = self._writers.get(path)
+            if writer is None:
+                writer = self._open(path, table.schema)
+            part = table.take(pa.array(rows))
+            writer.write_table(
+                part.select(writer.schema.names).cast(writer.schema), row_group_size=GEOPARQUET_ROW_GROUP_SIZE
+            )
+
+    def close(self):
+        """Close all files; returns their paths relative to the root."""
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+        return self.files
+
+    def _open(self, relative_path, schema):
+        path = os.path.join(self.root_dir, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        writer = pq.ParquetWriter(path, schema, compression='zstd', write_statistics=True)
+        self._writers[relative_path] = writer
+        self.files.append(relative_path)
+        return writer
+
+    @staticmethod
+    def _hilbert_distance(geometry):
+        """Hilbert distance of the geometries in their total extent; 0 for missing or empty ones."""
+        present = ~(geometry.isna() | geometry.is_empty).to_numpy()
+        distance = np.zeros(len(geometry), dtype=np.int64)
+        if present.any():
+            distance[present] = geometry[present].hilbert_distance()
+        return distance
+
+    def _file_rows(self, gdf, years):
+        """Row positions per output file."""
+        criterium = gdf['krmcriterium'] if 'krmcriterium' in gdf.columns else pd.Series(None, index=gdf.index)
+        path = criterium.map(geoparquet_partition, na_action='ignore').fillna(geoparquet_partition(None))
+        if self.partition_by_year:
+            path = path + '/jaar=' + years.astype(str).replace('<NA>', GEOPARQUET_MISSING_PARTITION)
+        path = path + '/' + GEOPARQUET_FILE_NAME
+        return path.reset_index(drop=True).groupby(path.values).indices
+
+    @staticmethod
+    def _to_arrow(gdf, years=None):
+        """
+        Arrow table with WKB geometry, a bbox covering column and GeoParquet metadata,
+        and the years as the jaar column when given.
+        """
+        geometry_name = gdf.geometry.name
+        bounds = gdf.geometry.bounds
+        # krmcriterium is stored in the partition path
+        df = pd.DataFrame(gdf.drop(columns=[geometry_name, 'krmcriterium'], errors='ignore'))
+        if years is not None:
+            df['jaar'] = years.values
+        df['geometry'] = gdf.geometry.to_wkb().values
+        df['bbox'] = [
+            {'xmin': xmin, 'ymin': ymin, 'xmax': xmax, 'ymax': ymax}
+            for xmin, ymin, xmax, ymax in bounds.itertuples(index=False)
+        ]
+        table = pa.Table.from_pandas(df, preserve_index=False)
+
+        # All-missing columns have no type yet; they are text fields in the GeoPackage
+        fields = [
+            pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field
+            for field in table.schema
+        ]
+        metadata = {
+            'version': '1.1.0',
+            'primary_column': 'geometry',
+            'columns': {
+                'geometry': {
+                    'encoding': 'WKB',
+                    'geometry_types': [],
+                    'crs': gdf.crs.to_json_dict() if gdf.crs is not None else None,
+                    'covering': {
+                        'bbox': {
+                            'xmin': ['bbox', 'xmin'],
+                            'ymin': ['bbox', 'ymin'],
+                            'xmax': ['bbox', 'xmax'],
+                            'ymax': ['bbox', 'ymax'],
+                        }
+                    },
+                }
+            },
+        }
+        schema = pa.schema(fields, metadata={b'geo': json.dumps(metadata).encode('utf-8')})
+        return table.cast(schema)
+
+
+def geoparquet_layout():
+    """Layout of the GeoParquet copy, recorded in the manifest."""
+    return {'files': 'partition', 'partition_by_year': GEOPARQUET_PARTITION_BY_YEAR}
+
+
+def geoparquet_partition(criterium):
+    """Top-level GeoParquet partition (folder) of the rows of a krmcriterium, None for rows without one."""
+    return f'krmcriterium={GEOPARQUET_MISSING_PARTITION if criterium is None else criterium}'
+
+
+def export_geoparquet(gpkg_file, root_dir, batch_size=MERGE_BATCH_SIZE, criteria=None):
+    """
+    Write the GeoParquet dataset of a merged GeoPackage; returns the file paths.
+
+    :param criteria: Optional. Write only the partitions of these krmcriterium
+        values (None for the rows without one); all partitions when omitted
+    """
+    geoparquet = GeoParquetDataset(root_dir)
+    if criteria is not None and not criteria:
+        return geoparquet.close()
+    for gdf in read_geopackage_batches(gpkg_file, batch_size, where=_criteria_filter(criteria)):
+        geoparquet.write(gdf)
+    return geoparquet.close()
+
+
+def _criteria_filter(criteria):
+    """SQL filter on the rows of the krmcriterium values; None without criteria."""
+    if criteria is None:
+        return None
+    values = sorted(c for c in criteria if c is not None)
+    conditions = []
+    if values:
+        literals = ','.join("'" + str(value).replace("'", "''") + "'" for value in values)
+        conditions.append(f'"krmcriterium" IN ({literals})')
+    if None in criteria:
+        conditions.append('"krmcriterium" IS NULL')
+    return ' OR '.join(conditions)
+
+
+def sync_geoparquet(bucket_name, root_dir, files, prefix, partitions=None):
+    """
+    Upload written GeoParquet files and remove the files they replace.
+
+    :param files: Paths relative to ``root_dir`` that were written
+    :param prefix: S3 prefix of the dataset
+    :param partitions: Top-level partitions (see geoparquet_partition) that were
+        rewritten, whose other files are removed; None removes every file that was
+        not written (complete dataset)
+    """
+    for relative_path in files:
+        upload_file_to_s3(os.path.join(root_dir, relative_path), bucket_name, f'{prefix}/{relative_path}')
+
+    written = {f'{prefix}/{relative_path}' for relative_path in files}
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=f'{prefix}/'):
+        for obj in page.get('Contents', []):
+            key = obj['Key']
+            if key in written:
+                continue
+            if partitions is None or key[len(prefix) + 1:].split('/', 1)[0] in partitions:
+                s3.delete_object(Bucket=bucket_name, Key=key)
+
+
+def list_geopackages(bucket_name, folder_name):
+    """
+    List the bundle GeoPackages in an S3 folder.
+
+    :return: Dict of S3 key -> listing entry (with 'ETag' and 'Size')
+    """
+    paginator = s3.get_paginator('list_objects_v2')
+    objects = {}
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=f'{folder_name}/'):
+        for obj in page.get('Contents', []):
+            if obj['Key'].endswith('.gpkg'):
+                objects[obj['Key']] = obj
+    return objects
+
+
+def local_geopackage_path(key, target_dir):
+    """Local path a bundle GeoPackage is downloaded to."""
+    return os.path.join(target_dir, key.split('/')[-1])
+
+
+def download_geopackages(bucket_name, objects, target_dir, max_workers=DOWNLOAD_WORKERS):
+    """
+    Download bundle GeoPackages concurrently, yielding local paths as they complete.
+
+    Files whose local copy already matches the listed ETag and size (e.g. in a warm
+    Lambda) are not downloaded again. Because paths are yielded in completion order,
+    a consumer such as ``merge_geopackages`` overlaps merging with downloading.
+    When a download fails (or the consumer stops), the queued downloads are
+    cancelled and the error is raised once the running ones have finished.
+
+    :param objects: Listing entries (as returned by ``list_geopackages``) to fetch
+    :param max_workers: Maximum number of concurrent downloads
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_download_geopackage, bucket_name, obj, target_dir)
+            for obj in objects
+        ]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def _download_geopackage(bucket_name, obj, target_dir):
+    """Download a single object unless its local copy is current."""
+    download_path = local_geopackage_path(obj['Key'], target_dir)
+    etag_path = f'{download_path}.etag'
+
+    if os.path.exists(download_path) and os.path.getsize(download_path) == obj['Size']:
+        if os.path.exists(etag_path):
+            with open(etag_path) as f:
+                if f.read() == obj['ETag']:
+                    print(f"Using cached {download_path} for {obj['Key']}")
+                    return download_path
+
+    s3.download_file(bucket_name, obj['Key'], download_path)
+    with open(etag_path, 'w') as f:
+        f.write(obj['ETag'])
+    print(f"Downloaded {obj['Key']} to {download_path}")
+    return download_path
+
+
+def load_manifest(bucket_name, manifest_key):
+    """Load the publication manifest, or None if there is none yet."""
+    try:
+        response = s3.get_object(Bucket=bucket_name, Key=manifest_key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return None
+        raise
+    return json.loads(response['Body'].read())
+
+
+def manifest_revision(bundles):
+    """Revision of a set of bundles: a hash over the sorted bundle keys and their ETags."""
+    digest = hashlib.sha256()
+    for key in sorted(bundles):
+        digest.update(f"{key}={bundles[key]['etag']}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def delete_bundle_rows(gpkg_file, bundle_keys, layer_name=LAYER_NAME):
+    """
+    Delete all rows of the given bundles from a GeoPackage layer.
+
+    The GeoPackage triggers keep the spatial index and feature count in sync.
+
+    :return: Number of deleted rows
+    """
+    if not bundle_keys:
+        return 0
+    placeholders = ','.join('?' * len(bundle_keys))
+    with sqlite3.connect(gpkg_file) as conn:
+        cursor = conn.execute(
+            f'DELETE FROM "{layer_name}" WHERE "{BUNDLE_KEY_COLUMN}" IN ({placeholders})',
+            list(bundle_keys),
+        )
+        deleted = cursor.rowcount
+    conn.close()
+    return deleted
+
+
+def bundle_criteria(gpkg_file, bundle_keys, layer_name=LAYER_NAME):
+    """krmcriterium values (None for rows without one) of the rows of the given bundles."""
+    if not bundle_keys:
+        return set()
+    if 'krmcriterium' not in layer_schema(gpkg_file, layer_name):
+        return {None}
+    placeholders = ','.join('?' * len(bundle_keys))
+    with sqlite3.connect(gpkg_file) as conn:
+        rows = conn.execute(
+            f'SELECT DISTINCT "krmcriterium" FROM "{layer_name}" WHERE "{BUNDLE_KEY_COLUMN}" IN ({placeholders})',
+            list(bundle_keys),
+        ).fetchall()
+    conn.close()
+    return {criterium for criterium, in rows}
+
+
+def publish_incremental(bucket_name, subfolder, work_dir=WORK_DIR):
+    """
+    Bring the merged dataset of ``subfolder`` up to date and publish it if it changed.
+
+    A master GeoPackage and a manifest of bundle -> source ETag are kept per source
+    folder. Only bundles that were added, changed or removed since the last run are
+    patched: their rows are deleted from the master (keyed on monprog.naam) and the
+    new versions are appended. Without a manifest or master the master is rebuilt
+    from every bundle.
+
+    The GeoParquet copy under ``geoparquet/<folder>/`` is written by the merge pass
+    of a rebuild. A patch rewrites the partitions (krmcriterium) that had or got
+    rows of the patched bundle keys from the master, so the copy always has the
+    rows of the master, also when bundles share a bundle key.
+
+    :return: Dict describing the publication (revision, changed, bundles patched)
+    """
+    master_key = f'{HISTORY_PREFIX}/{subfolder}/{LAYER_NAME}.gpkg'
+    manifest_key = f'{HISTORY_PREFIX}/{subfolder}/manifest.json'
+    master_path = os.path.join(work_dir, f'{LAYER_NAME}_{subfolder}.gpkg')
+    bundle_dir = os.path.join(work_dir, subfolder)
+    geoparquet_prefix = f'{GEOPARQUET_PREFIX}/{subfolder}'
+    geoparquet_dir = os.path.join(work_dir, f'{GEOPARQUET_PREFIX}_{subfolder}')
+    shutil.rmtree(geoparquet_dir, ignore_errors=True)
+    geoparquet = GeoParquetDataset(geoparquet_dir)
+
+    current = list_geopackages(bucket_name, subfolder)
+    if not current:
+        raise ValueError(f"No GeoPackages found in {bucket_name}/{subfolder}")
+    etags = {key: obj['ETag'] for key, obj in current.items()}
+    paths = {key: local_geopackage_path(key, bundle_dir) for key in current}
+
+    manifest = load_manifest(bucket_name, manifest_key)
+    bundles = dict(manifest['bundles']) if manifest else {}
+
+    changed = sorted(k for k, etag in etags.items() if bundles.get(k, {}).get('etag') != etag)
+    removed = sorted(k for k in bundles if k not in current)
+    # Manifests of another (or without a) GeoParquet layout require a rebuild to create it
+    rebuild = manifest is None or manifest.get('geoparquet') != geoparquet_layout()
+
+    if not rebuild and (changed or removed):
+        try:
+            s3.download_file(bucket_name, master_key, master_path)
+        except ClientError:
+            print(f"Master {master_key} not found, rebuilding")
+            rebuild = True
+
+    if rebuild:
+        print(f"Rebuilding {master_key} from {len(current)} GeoPackages")
+        changed, removed = sorted(current), []
+        merged = merge_geopackages(
+            download_geopackages(bucket_name, current.values(), bundle_dir),
+            master_path,
+            geoparquet=geoparquet,
+        )
+        bundles = {}
+    elif changed or removed:
+        # Rows are deleted per bundle key, so unchanged bundles sharing a key with a
+        # changed or removed bundle have to be inserted again as well
+        stale_keys = {k for key in changed + removed for k in bundles.get(key, {}).get('keys', [])}
+        reinsert = sorted(set(changed) | {
+            key for key, entry in bundles.items()
+            if key not in removed and stale_keys.intersection(entry['keys'])
+        })
+
+        fields = layer_schema(master_path)
+        # GeoParquet partitions with rows of the patched bundle keys, before and after
+        touched = bundle_criteria(master_path, stale_keys)
+        deleted = delete_bundle_rows(master_path, stale_keys)
+        print(f"Deleted {deleted} rows of {sorted(stale_keys)}")
+        merged = merge_geopackages(
+            download_geopackages(bucket_name, [current[key] for key in reinsert], bundle_dir),
+            master_path,
+            append=True,
+        ) if reinsert else {}
+        touched |= bundle_criteria(master_path, {k for keys in merged.values() for k in keys})
+        if layer_schema(master_path) != fields:
+            # Unchanged GeoParquet files lack the new fields
+            geoparquet.consistent = False
+
+        for key in removed:
+            bundles.pop(key)
+    else:
+        print(f"No changes in {bucket_name}/{subfolder}")
+        merged = {}
+
+    for key, path in paths.items():
+        if path in merged:
+            bundles[key] = {'etag': etags[key], 'keys': merged[path]}
+
+    revision = manifest_revision(bundles)
+    if changed or removed:
+        geoparquet_files = geoparquet.close()
+        partitions = None
+        if not geoparquet.consistent:
+            # Fields were added during this run: rewrite the complete dataset from the
+            # master so that every file has the same schema
+            print("Fields changed, rewriting GeoParquet dataset from master")
+            shutil.rmtree(geoparquet_dir, ignore_errors=True)
+            geoparquet_files = export_geoparquet(master_path, geoparquet_dir)
+        elif not rebuild:
+            print(f"Rewriting GeoParquet partitions of {sorted(touched, key=str)} from master")
+            geoparquet_files = export_geoparquet(master_path, geoparquet_dir, criteria=touched)
+            partitions = {geoparquet_partition(criterium) for criterium in touched}
+
+        # Data first: a manifest never describes rows the master does not have
+        upload_file_to_s3(master_path, bucket_name, master_key)
+        sync_geoparquet(bucket_name, geoparquet_dir, geoparquet_files, geoparquet_prefix, partitions)
+        s3.put_object(
+            Bucket=bucket_name,
+            Key=manifest_key,
+            Body=json.dumps({'revision': revision, 'geoparquet': geoparquet_layout(), 'bundles': bundles}, indent=1),
+        )
 
-        gdf.columns = [col.lower() for col in gdf.columns]
+    # Publish when the published dataset is not this revision of this folder
+    published = is_published(bucket_name, subfolder, revision)
+    if not published:
+        s3.copy(
+            {'Bucket': bucket_name, 'Key': master_key},
+            bucket_name,
+            PUBLISH_KEY,
+            ExtraArgs={
+                'Metadata': {'subfolder': subfolder, 'revision': revision},
+                'MetadataDirective': 'REPLACE',
+            },
+        )
+        print(f"Published revision {revision} of {subfolder} to {PUBLISH_KEY}")
 
-        gdf_list.append(gdf)
+    return {
+        'revision': revision,
+        'changed': not published,
+        'patched': changed,
+        'removed': removed,
+        'rebuilt': rebuild,
+    }
 
-    # Concatenate all GeoDataFrames into one
-    merged_gdf = pd.concat(gdf_list, ignore_index=True)
-    columns_to_drop = ['parameter', 'record_id', 'locatiecode', 'locatie.code', 'cleaned_lokaalid', 'cleaned_meetwaarde_lokaalid', 'recordnr_monster', 'uitvalreden', 'informatie']
-    merged_gdf = merged_gdf.drop(columns=columns_to_drop, errors='ignore')
-   
-    # Ensure the output folder exists
-    os.makedirs(os.path.dirname(output_gpkg), exist_ok=True)
 
-    # Save the merged GeoDataFrame to a new GeoPackage file
-    merged_gdf.to_file(output_gpkg, layer=layer_name, driver="GPKG")
+def is_published(bucket_name, subfolder, revision):
+    """Check whether the published dataset already is ``revision`` of ``subfolder``."""
+    try:
+        metadata = s3.head_object(Bucket=bucket_name, Key=PUBLISH_KEY)['Metadata']
+    except ClientError:
+        return False
+    return metadata.get('subfolder') == subfolder and metadata.get('revision') == revision
+
+
+def parse_notification(body):
+    """
+    Bundle notification in an SQS message body, as sent by the validation:
+    {"bucket", "bundle", "gpkg_key", "etag", "rows", "criteria", "job_id"}. Bodies
+    without one (older messages) stand for a change in the default folder.
+    """
+    try:
+        notification = json.loads(body)
+    except ValueError:
+        notification = None
+    if not isinstance(notification, dict) or 'gpkg_key' not in notification:
+        return {'gpkg_key': f'{NOTIFICATION_DEFAULT_FOLDER}/'}
+    return notification
+
+
+def is_notification_for(bucket_name, notification):
+    """
+    Whether a notification is about a GeoPackage in bucket_name. Notifications
+    without a bucket (older messages) are taken to be about it.
+    """
+    return notification.get('bucket', bucket_name) == bucket_name
+
+
+def notifications_until_other_bucket(bucket_name, notifications):
+    """
+    Number of notifications at the start of a batch that are about bucket_name. The
+    FIFO queue delivers the notifications in order, so none is published past the
+    first one about another bucket.
+    """
+    for i, notification in enumerate(notifications):
+        if not is_notification_for(bucket_name, notification):
+            return i
+    return len(notifications)
+
+
+def notification_folder(notification):
+    """Source folder of the GeoPackage of a notification."""
+    return notification['gpkg_key'].rsplit('/', 1)[0]
+
+
+def notification_folders(notifications):
+    """Source folders of the GeoPackages in a batch of notifications, in queue order."""
+    return list(dict.fromkeys(notification_folder(notification) for notification in notifications))
 
-    print(f"Merged {len(gpkg_files)} GeoPackages into {output_gpkg}")
+
+def publish_notifications(bucket_name, notifications, work_dir=WORK_DIR):
+    """
+    Publish a batch of bundle notifications: one incremental publication per source
+    folder, however many bundles of the folder changed.
+
+    :return: Dict of folder -> publication (see publish_incremental)
+    """
+    print(f"Publishing {len(notifications)} bundle notifications")
+    return {
+        folder: publish_incremental(bucket_name, folder, work_dir)
+        for folder in notification_folders(notifications)
+    }
+
+
+def drain_queue(queue_url, bucket_name=BUCKET_NAME, max_messages=NOTIFICATION_BATCH_MAX,
+                wait_seconds=1, visibility_timeout=900, work_dir=WORK_DIR):
+    """
+    Receive the waiting notifications (up to ``max_messages``) from the queue and
+    publish them in one go (see publish_notifications). The messages are deleted
+    only after the publication succeeded; otherwise they return to the queue after
+    ``visibility_timeout``. A notification about another bucket, and the ones after
+    it, are not published and not deleted either.
+
+    Works against any SQS endpoint, e.g. LocalStack with AWS_ENDPOINT_URL.
+
+    :return: Dict of folder -> publication; empty when no messages were waiting
+    """
+    sqs = boto3.client('sqs')
+    messages = []
+    while len(messages) < max_messages:
+        response = sqs.receive_message(
+            QueueUrl=queue_url,
+            MaxNumberOfMessages=min(10, max_messages - len(messages)),
+            WaitTimeSeconds=wait_seconds,
+            VisibilityTimeout=visibility_timeout,
+        )
+        if not response.get('Messages'):
+            break
+        messages.extend(response['Messages'])
+    notifications = [parse_notification(message['Body']) for message in messages]
+    count = notifications_until_other_bucket(bucket_name, notifications)
+    messages = messages[:count]
+    if not messages:
+        return {}
+
+    publications = publish_notifications(bucket_name, notifications[:count], work_dir)
+    for start in range(0, len(messages), 10):
+        sqs.delete_message_batch(QueueUrl=queue_url, Entries=[
+            {'Id': str(i), 'ReceiptHandle': message['ReceiptHandle']}
+            for i, message in enumerate(messages[start:start + 10])
+        ])
+    return publications
 
 
 def lambda_handler(event, context):
 
-    bucket_name = "krm-validatie-data-prod"
-    # TODO get latest file in bucket
+    bucket_name = BUCKET_NAME
     subfolder = "geopackages"
+    # Bundle notifications of the validation when the SQS queue triggered this run
+    records = [record for record in event.get('Records', []) if record.get('eventSource') == 'aws:sqs']
+    notifications = [parse_notification(record['body']) for record in records]
+    # Notifications are published in queue order up to the first one that fails: one
+    # about the bucket of another environment, or one whose publication raises. That
+    # one and the ones after it are reported as failed, so the queue keeps them (and
+    # moves them to the dead-letter queue when they keep failing)
+    published_count = notifications_until_other_bucket(bucket_name, notifications)
+    if published_count < len(records):
+        print(f"Not publishing notifications from the first about another bucket than {bucket_name}")
     
     try:
         publish_to_test = True
@@ -112,41 +806,59 @@ def lambda_handler(event, context):
                     subfolder = "geopackages_productie"
                     break            
 
-        # Grab historic package
-        # s3.download_file(bucket_name, historic_key, local_key)
-        print("download")
-        # Grab new packages
-        get_all_files_from_s3(bucket_name, subfolder)
-        print("downloaded")
-        # Get all .gpkg files from /tmp directory
-        geopackage_files = glob.glob("/tmp/*.gpkg")
-        #geopackage_files = glob.glob("*.gpkg")
-        print(geopackage_files)
-
-        # Specify the output GeoPackage file
-        output_geopackage = "/tmp/merged_output.gpkg"
-        #output_geopackage = "merged_output.gpkg"
-
-        # Merge all GeoPackages
-        merge_geopackages(geopackage_files, output_geopackage)
-        
-        upload_file_to_s3('/tmp/merged_output.gpkg', 'krm-validatie-data-prod', 'geopackages_history/krm_actuele_dataset_new.gpkg')
-        #upload_file_to_s3('merged_output.gpkg', 'krm-validatie-data-prod', 'geopackages_history/krm_actuele_dataset_new.gpkg')
-
-        # Publish new package
-        publish_bucket = "krm-validatie-data-prod"
-        publish_key = "geopackages_history/krm_actuele_dataset_new.gpkg"
-
-        url =f'https://marineprojects.openearth.nl/wps?request=Execute&service=WPS&identifier=wps_mp_dataingestion&version=2.0.0&DataInputs=s3_inputs={{"bucketname":"{publish_bucket}","key":"{publish_key}","test":"{publish_to_test}"}}'
-        # Send an HTTP GET request to the URL
-        print(url)
-        http = urllib3.PoolManager()
-        response = http.request('GET', url)
-
-        print(response.status)
+        # Bundle folders to publish: those of the notifications in an SQS batch, which
+        # are published once for the whole batch, in the order of their first notification
+        subfolders = notification_folders(notifications[:published_count]) if records else [subfolder]
+
+        published = False
+        for subfolder in subfolders:
+            try:
+                # Patch the merged dataset with the bundles that changed since the last run
+                publication = publish_incremental(bucket_name, subfolder)
+                print(publication)
+            except Exception as e:
+                if not records:
+                    raise
+                print(f"Publication of {subfolder} failed: {e}")
+                # The folders of the notifications before the first one of this folder
+                # have been published
+                published_count = [notification_folder(n) for n in notifications].index(subfolder)
+                break
+
+            if not publication['changed']:
+                continue
+            published = True
+
+            # Publish new package
+            publish_bucket = bucket_name
+            publish_key = PUBLISH_KEY
+
+            url =f'https://marineprojects.openearth.nl/wps?request=Execute&service=WPS&identifier=wps_mp_dataingestion&version=2.0.0&DataInputs=s3_inputs={{"bucketname":"{publish_bucket}","key":"{publish_key}","test":"{publish_to_test}"}}'
+            # Send an HTTP GET request to the URL
+            print(url)
+            http = urllib3.PoolManager()
+            response = http.request('GET', url)
+
+            print(response.status)
+
+        failures = [{'itemIdentifier': record['messageId']} for record in records[published_count:]]
+        if not published:
+            return {
+                'statusCode': 200,
+                'message': 'Published dataset is up to date',
+                'batchItemFailures': failures
+            }
+        return {
+            'statusCode': 200,
+            'message': 'Published dataset',
+            'batchItemFailures': failures
+        }
 
     except Exception as e:
         print(str(e))
+        if records:
+            # Failing the invocation returns the batch to the queue for a retry
+            raise
         return {
             'statusCode': 500,
             'message': str(e)
@@ -0,0 +1,161 @@
+"""
+Checkpoints of a data bundle validation that does not fit in one Lambda invocation.
+
+Between the pipeline stages, and between the steps and record chunks of the
+validation, the handler checks the remaining invocation time. When less than
+config.checkpoint_reserve_ms is left it saves the intermediate state (prepared
+GeoDataFrame, rule assignment, partial report) to
+
+    s3://<bucket_name><checkpoint_prefix><package_name>/state.json
+
+and invokes the Lambda again with {"action": "resume", "checkpoint_key": ...}. The
+checkpoint is deleted when the resumed validation has finished.
+
+The state is plain data: JSON, with every data frame in it stored as a Parquet
+object next to state.json (frame-<n>.parquet). Nothing is unpickled, and only keys
+under the checkpoint prefix are read, so a resume event cannot make the function
+load an arbitrary object of the bucket.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+from typing import Any, Optional
+
+import boto3
+
+from .report import ValidationResult, ValidationSection
+
+CHECKPOINT_VERSION = 3
+
+STATE_FILE = 'state.json'
+
+
+class Budget:
+    """Remaining time of a Lambda invocation, minus a reserve for checkpointing."""
+
+    def __init__(self, context: Any, reserve_ms: int):
+        self.context = context
+        self.reserve_ms = reserve_ms
+
+    def remaining_ms(self) -> Optional[int]:
+        """Milliseconds left in the invocation; None without a Lambda context."""
+        if self.context is None or not hasattr(self.context, 'get_remaining_time_in_millis'):
+            return None
+        return self.context.get_remaining_time_in_millis()
+
+    def exhausted(self) -> bool:
+        """Whether only the reserve is left; never without a Lambda context."""
+        remaining = self.remaining_ms()
+        return remaining is not None and remaining <= self.reserve_ms
+
+
+def checkpoint_key(prefix: str, package_name: str) -> str:
+    """S3 key of the checkpoint of a data bundle."""
+    return f"{prefix}{package_name}/{STATE_FILE}"
+
+
+def save_checkpoint(bucket_name: str, key: str, state: dict) -> None:
+    """Write state to S3: the JSON at key, its data frames as Parquet next to it."""
+    s3 = boto3.client('s3')
+    folder = key[:-len(STATE_FILE)]
+    frames: list = []
+    body = json.dumps({**_encode(state, frames), 'version': CHECKPOINT_VERSION}).encode('utf-8')
+
+    size = len(body)
+    for number, frame in enumerate(frames):
+        buffer = io.BytesIO()
+        frame.to_parquet(buffer)
+        size += buffer.tell()
+        s3.put_object(Bucket=bucket_name, Key=f"{folder}frame-{number}.parquet", Body=buffer.getvalue())
+    # The state last, so a checkpoint with a state has all its frames
+    s3.put_object(Bucket=bucket_name, Key=key, Body=body, ContentType='application/json')
+    print(f"Checkpoint of {size} bytes saved to {bucket_name}/{key}")
+
+
+def load_checkpoint(bucket_name: str, prefix: str, key: str) -> dict:
+    """
+    Read a checkpoint written by save_checkpoint.
+
+    Raises:
+        ValueError: key is not a checkpoint under prefix, or of another version
+    """
+    if not prefix or not key.startswith(prefix) or not key.endswith(f"/{STATE_FILE}"):
+        raise ValueError(f"{key} is not a checkpoint under {prefix}")
+    s3 = boto3.client('s3')
+    folder = key[:-len(STATE_FILE)]
+
+    def read_frame(number: int, geometry: bool, lists: list[str]):
+        import geopandas as gpd
+        import pandas as pd
+
+        body = s3.get_object(Bucket=bucket_name, Key=f"{folder}frame-{number}.parquet")['Body'].read()
+        frame = (gpd.read_parquet if geometry else pd.read_parquet)(io.BytesIO(body))
+        for column in lists:
+            frame[column] = frame[column].map(lambda value: None if value is None else list(value))
+        return frame
+
+    body = s3.get_object(Bucket=bucket_name, Key=key)['Body'].read()
+    state = json.loads(body, object_hook=lambda value: _decode(value, read_frame))
+    if state.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(
+            f"Checkpoint {key} has version {state.get('version')}, expected {CHECKPOINT_VERSION}"
+        )
+    return state
+
+
+def delete_checkpoint(bucket_name: str, key: str) -> None:
+    """Delete the state and the frames of a checkpoint."""
+    s3 = boto3.client('s3')
+    folder = key[:-len(STATE_FILE)]
+    for page in s3.get_paginator('list_objects_v2').paginate(Bucket=bucket_name, Prefix=folder):
+        for item in page.get('Contents', []):
+            s3.delete_object(Bucket=bucket_name, Key=item['Key'])
+
+
+def _encode(value: Any, frames: list) -> Any:
+    """JSON value of a state value; data frames are appended to frames and referenced by number."""
+    import geopandas as gpd
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(value, dict):
+        if not all(isinstance(name, str) for name in value):
+            raise TypeError(f"Checkpoint state has a dict with keys other than strings: {list(value)[:3]}")
+        return {name: _encode(item, frames) for name, item in value.items()}
+    if isinstance(value, list):
+        return [_encode(item, frames) for item in value]
+    if isinstance(value, tuple):
+        return {'__tuple__': [_encode(item, frames) for item in value]}
+    if isinstance(value, (set, frozenset)):
+        return {'__set__': sorted(_encode(item, frames) for item in value)}
+    if isinstance(value, ValidationResult):
+        fields = (value.databundelcode, value.record_id, value.uitvalreden, value.informatie)
+        return {'__result__': [value.section.value, *(_encode(item, frames) for item in fields)]}
+    if isinstance(value, pd.DataFrame):
+        frames.append(value)
+        lists = [
+            column for column in value.columns
+            if value[column].dtype == object and value[column].map(lambda item: isinstance(item, list)).any()
+        ]
+        return {'__frame__': len(frames) - 1, 'geometry': isinstance(value, gpd.GeoDataFrame), 'lists': lists}
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    raise TypeError(f"Checkpoint state cannot contain {type(value).__name__}")
+
+
+def _decode(value: dict, read_frame) -> Any:
+    """State value of a JSON object written by _encode."""
+    if '__tuple__' in value:
+        return tuple(value['__tuple__'])
+    if '__set__' in value:
+        return set(value['__set__'])
+    if '__result__' in value:
+        section, *fields = value['__result__']
+        return ValidationResult(ValidationSection(section), *fields)
+    if '__frame__' in value:
+        return read_frame(value['__frame__'], value['geometry'], value['lists'])
+    return value
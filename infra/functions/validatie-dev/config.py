@@ -4,6 +4,8 @@ import os
 from dataclasses import dataclass, field
 from pathlib import Path
 
+QUICK_CHECK_MODES = ("off", "gate", "always")
+
 
 @dataclass
 class ValidationConfig:
@@ -22,14 +24,142 @@ class ValidationConfig:
         or os.environ.get("AWS_EXECUTION_ENV") is None
     )
 
-    sqs_queue_url: str = "https://sqs.eu-west-1.amazonaws.com/637423531264/publishToTest.fifo"
+    # Queue of the publication notifications; one per environment, set by Terraform
+    sqs_queue_url: str = field(
+        default_factory=lambda: os.environ.get("KRM_SQS_QUEUE_URL")
+        or "https://sqs.eu-west-1.amazonaws.com/637423531264/krm-publicatie-dev.fifo"
+    )
     
     # GitHub base URL for reference data
     github_base_url: str = "https://raw.githubusercontent.com/openearth/krmvalidatie/refs/heads/main/data"
     
+    # Local copy of the reference data (the repository's data/ folder); used instead
+    # of GitHub when set, e.g. for offline runs and benchmarks
+    reference_data_dir: Path | None = field(
+        default_factory=lambda: Path(os.environ["KRM_REFERENCE_DATA_DIR"])
+        if os.environ.get("KRM_REFERENCE_DATA_DIR") else None
+    )
+
+    # Compiled reference data artifact (see reference_artifact.py), baked into the
+    # container image; used when it was compiled from the configured source
+    reference_artifact_dir: Path | None = field(
+        default_factory=lambda: Path(os.environ["KRM_REFERENCE_ARTIFACT"])
+        if os.environ.get("KRM_REFERENCE_ARTIFACT") else None
+    )
+    
+    # Content hash of the reference data the deployment validates against, set when
+    # the image is built; an artifact compiled from GitHub is only used with this hash
+    reference_data_hash: str | None = field(
+        default_factory=lambda: os.environ.get("KRM_REFERENCE_DATA_HASH") or None
+    )
+    
     # Validation thresholds
     max_location_distance_m: float = 100.0
     
+    # Metric CRS for location distances
+    distance_crs: str = "EPSG:32631"
+    
+    # Sharded validation: worker processes (0 or 1 disables it) and the bundle size
+    # from which it is used
+    shard_workers: int = field(
+        default_factory=lambda: int(os.environ.get("KRM_SHARD_WORKERS", "0"))
+    )
+    shard_min_rows: int = field(
+        default_factory=lambda: int(os.environ.get("KRM_SHARD_MIN_ROWS", "100000"))
+    )
+    
+    # Streamed validation of long (time-series) bundles in begindatum windows of a
+    # pandas period alias, e.g. "M" or "Y" (empty disables it), from the bundle size
+    # stream_min_rows on. The CSV is read in chunks of stream_chunk_rows records and
+    # spilled to disk by window (SpilledBundle, StreamingKRMValidator)
+    stream_window: str = field(
+        default_factory=lambda: os.environ.get("KRM_STREAM_WINDOW", "")
+    )
+    stream_min_rows: int = field(
+        default_factory=lambda: int(os.environ.get("KRM_STREAM_MIN_ROWS", "500000"))
+    )
+    stream_chunk_rows: int = field(
+        default_factory=lambda: int(os.environ.get("KRM_STREAM_CHUNK_ROWS", "100000"))
+    )
+    
+    # Tier 0 quick check (KRMValidator.quick_check) before the full validation:
+    # "gate" runs the full validation only when the quick check passes (or the bundle
+    # has an akkoord file), "always" always runs it, "off" skips the quick check.
+    # quick_check_rows limits the quick check to the first records (0: whole file).
+    quick_check: str = field(
+        default_factory=lambda: os.environ.get("KRM_QUICK_CHECK", "gate")
+    )
+    quick_check_rows: int = field(
+        default_factory=lambda: int(os.environ.get("KRM_QUICK_CHECK_ROWS", "0"))
+    )
+    
+    # Detail rows per failure group (section, uitvalreden, informatie pattern) in the
+    # CSV report; the rest is collapsed into a summary row (0: no cap). All failures
+    # are in the Parquet sidecar of the report.
+    report_max_rows_per_group: int = field(
+        default_factory=lambda: int(os.environ.get("KRM_REPORT_MAX_ROWS", "100"))
+    )
+    
+    # Queue worker (worker.py): SQS queue with bundle jobs and the number of bundles
+    # validated at the same time
+    worker_queue_url: str = field(
+        default_factory=lambda: os.environ.get("KRM_WORKER_QUEUE_URL", "")
+    )
+    worker_concurrency: int = field(
+        default_factory=lambda: int(os.environ.get("KRM_WORKER_CONCURRENCY", "2"))
+    )
+    # Seconds the worker holds publication notifications to send them in one batch
+    publish_max_delay_s: float = field(
+        default_factory=lambda: float(os.environ.get("KRM_PUBLISH_MAX_DELAY_S", "5"))
+    )
+    
+    # Validation API (api.py): bundles validated at the same time and upload size limit
+    api_concurrency: int = field(
+        default_factory=lambda: int(os.environ.get("KRM_API_CONCURRENCY", "2"))
+    )
+    api_max_upload_mb: int = field(
+        default_factory=lambda: int(os.environ.get("KRM_API_MAX_UPLOAD_MB", "512"))
+    )
+    
+    # Idempotent processing of S3 events (idempotency.py): lease prefix in
+    # bucket_name, lease duration, how long a duplicate waits for the running job
+    # and how long a completed job is remembered. In Lambda a lease runs until the
+    # end of the invocation plus idempotency_lease_margin_s; idempotency_lease_s
+    # (the Lambda timeout plus the margin) caps it and is the lease of a worker job.
+    # Leases are renewed while the job runs.
+    idempotency: bool = field(
+        default_factory=lambda: os.environ.get("KRM_IDEMPOTENCY", "true").lower() == "true"
+    )
+    idempotency_prefix: str = "work/leases/"
+    idempotency_lease_s: int = 960
+    idempotency_lease_margin_s: int = 60
+    idempotency_wait_s: int = 60
+    idempotency_retention_s: int = field(
+        default_factory=lambda: int(os.environ.get("KRM_IDEMPOTENCY_RETENTION_S", "86400"))
+    )
+    
+    # Store the code columns of a bundle as categoricals (DataBundleProcessor.categorize_codes)
+    categorical_codes: bool = field(
+        default_factory=lambda: os.environ.get("KRM_CATEGORICAL_CODES", "true").lower() == "true"
+    )
+    
+    # Records per chunk of the record loops (rule determination, column values);
+    # validation can stop and checkpoint between chunks
+    record_chunk_rows: int = 20000
+    
+    # Checkpoint/resume when a bundle does not fit in one Lambda invocation: the work
+    # prefix in bucket_name, the time kept free to write the checkpoint and the
+    # maximum number of follow-up invocations
+    checkpoint_prefix: str = "work/checkpoints/"
+    checkpoint_reserve_ms: int = 120000
+    max_resumes: int = 10
+    
+    def __post_init__(self):
+        if self.quick_check not in QUICK_CHECK_MODES:
+            raise ValueError(
+                f"quick_check must be one of {', '.join(QUICK_CHECK_MODES)}, not {self.quick_check!r}"
+            )
+    
     @property
     def temp_folder(self) -> Path:
         """Get temporary folder based on environment."""
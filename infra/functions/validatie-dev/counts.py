@@ -0,0 +1,218 @@
+"""Count aggregation shared by the count check and the count report."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from config import ValidationConfig
+    from reference_data import ReferenceDataLoader
+
+
+COUNT_TABLE_COLUMNS = [
+    'validatieregel',
+    'record_id',
+    'locatiecode',
+    'aantaldat',
+    'limiet',
+    'aantalval',
+    'uitvalreden',
+]
+
+# Count groups: validatieregel, databundelcode, data location, rule location
+GROUP_COLUMNS = ["validatieregel", "databundelcode_x", "locatiecode_y", "locatiecode_x"]
+
+# Position of the first row of a group: rule record, exploded validation rule, data record
+ORDER_COLUMNS = ['_rule_order', '_regel_order', '_record_order']
+
+GROUP_COUNT_COLUMNS = [*GROUP_COLUMNS, 'aantaldat', 'record_id', 'aantal', 'limiet', 'soort', *ORDER_COLUMNS]
+
+
+class CountAggregator:
+    """
+    Counts records (monsters or tijdwaarden) per location and validation rule.
+
+    The resulting count table is the single source for both the COUNT_CHECK
+    entries of the validation report and the 'validatielijst_per_locatie_met_aantal'
+    report.
+    """
+
+    def __init__(self, config: "ValidationConfig", ref_data: "ReferenceDataLoader"):
+        self.config = config
+        self.ref_data = ref_data
+
+    def aggregate(
+        self,
+        gdf: pd.DataFrame,
+        rules: pd.DataFrame,
+        package_name: str
+    ) -> pd.DataFrame:
+        """
+        Build the count table.
+
+        Args:
+            gdf: GeoDataFrame with the data
+            rules: DataFrame with determined rules per record
+            package_name: Name of the data bundle
+
+        Returns:
+            DataFrame with COUNT_TABLE_COLUMNS, one row per
+            (validatieregel, databundelcode, data location, rule location) group
+            in group order. 'uitvalreden' is empty when the count is within the limit.
+        """
+        return self.count_table(self.group_counts(gdf, rules, package_name))
+
+    def group_counts(
+        self,
+        gdf: pd.DataFrame,
+        rules: pd.DataFrame,
+        package_name: str
+    ) -> pd.DataFrame:
+        """
+        Size and first row of each count group of (part of) the data.
+
+        The group counts of disjoint parts of a bundle, e.g. time windows, give
+        those of the whole bundle with combine(). The index labels of gdf and rules
+        are then the record positions in the whole bundle; they decide which part
+        holds the first row of a group.
+
+        Returns:
+            DataFrame with GROUP_COUNT_COLUMNS, one row per group in group order
+        """
+        clean_name = package_name.replace('+', ' ')
+        validatie_regels = self.ref_data.get_validation_rules_exploded(clean_name)
+
+        if validatie_regels.empty or rules.empty:
+            return pd.DataFrame(columns=GROUP_COUNT_COLUMNS)
+
+        # Prepare data
+        df = gdf.copy()
+        df['cleaned_lokaalid'] = df['monster.lokaalid'].str.replace('NL80_', '')
+        df['cleaned_meetwaarde_lokaalid'] = df['meetwaarde.lokaalid'].str.replace('NL80_', '')
+        df['locatiecode'] = df['meetobject.lokaalid'].str.replace('NL80_', '')
+        df['recordnr_monster'] = df['cleaned_meetwaarde_lokaalid'].rank(method='dense').astype(int)
+        df['_record_order'] = df.index
+
+        # Filter to rules with valid validatieregel
+        filtered_rules = rules.dropna(subset=['validatieregel']).assign(_rule_order=lambda r: r.index)
+
+        if filtered_rules.empty:
+            return pd.DataFrame(columns=GROUP_COUNT_COLUMNS)
+
+        # Merge rules with validation rules to get count expectations
+        merged = filtered_rules.merge(
+            validatie_regels.assign(_regel_order=np.arange(len(validatie_regels))),
+            left_on='validatieregel',
+            right_index=True,
+            how='inner'
+        )
+
+        # Determine grouping column based on validation rule setting
+        group_by_col = self.group_by_column(validatie_regels)
+
+        # Merge with original data
+        merged_with_df = merged.merge(
+            df,
+            left_on='record_id',
+            right_on=group_by_col
+        )
+
+        if merged_with_df.empty:
+            return pd.DataFrame(columns=GROUP_COUNT_COLUMNS)
+
+        # Group and count: size per group plus the first row of each group. The
+        # first row is taken positionally, agg('first') would skip missing values.
+        grouped = merged_with_df.groupby(GROUP_COLUMNS)
+        group_nr = grouped.ngroup().to_numpy()
+        first_pos = np.flatnonzero((grouped.cumcount().to_numpy() == 0) & (group_nr >= 0))
+        first = merged_with_df.iloc[first_pos[np.argsort(group_nr[first_pos], kind='stable')]]
+
+        if first.empty:
+            return pd.DataFrame(columns=GROUP_COUNT_COLUMNS)
+
+        if 'record_id_x' in first.columns:
+            record_id = first['record_id_x'].to_numpy()
+        elif 'record_id' in first.columns:
+            record_id = first['record_id'].to_numpy()
+        else:
+            record_id = ''
+
+        # Determine record type
+        if 'recordnr_monster' in first.columns:
+            soort = np.where(first['recordnr_monster'].to_numpy() == 0, "tijdwaarden", "monsters")
+        else:
+            soort = np.full(len(first), "tijdwaarden")
+
+        return pd.DataFrame({
+            **{column: first[column].to_numpy() for column in GROUP_COLUMNS},
+            'aantaldat': grouped.size().to_numpy(),
+            'record_id': record_id,
+            'aantal': first['aantal'].to_numpy(),
+            'limiet': first['limiet'].to_numpy(),
+            'soort': soort,
+            **{column: first[column].to_numpy() for column in ORDER_COLUMNS},
+        })
+
+    @staticmethod
+    def group_by_column(validatie_regels: pd.DataFrame) -> str:
+        """Cleaned id column of the data that a count group counts: meetwaarden or monsters."""
+        group_by_setting = str(validatie_regels.iloc[0].get("group_by", "")).strip()
+        if group_by_setting == 'monster.lokaalid':
+            return 'cleaned_lokaalid'
+        return 'cleaned_meetwaarde_lokaalid'
+
+    @staticmethod
+    def combine(*group_counts: pd.DataFrame) -> pd.DataFrame:
+        """Group counts of disjoint parts of the data combined into those of the whole."""
+        parts = [groups for groups in group_counts if not groups.empty]
+        if not parts:
+            return pd.DataFrame(columns=GROUP_COUNT_COLUMNS)
+        if len(parts) == 1:
+            return parts[0]
+
+        groups = pd.concat(parts, ignore_index=True).sort_values(
+            [*GROUP_COLUMNS, *ORDER_COLUMNS], kind='stable'
+        )
+        sizes = groups.groupby(GROUP_COLUMNS)['aantaldat'].sum()
+        combined = groups.drop_duplicates(GROUP_COLUMNS).reset_index(drop=True)
+        combined['aantaldat'] = sizes.to_numpy()
+        return combined
+
+    @staticmethod
+    def count_table(groups: pd.DataFrame) -> pd.DataFrame:
+        """Count table of the group counts of the whole bundle, with the limit checks."""
+        if groups.empty:
+            return pd.DataFrame(columns=COUNT_TABLE_COLUMNS)
+
+        aantal_dat = groups['aantaldat'].to_numpy()
+        aantal_val = groups['aantal'].to_numpy()
+        limiet = groups['limiet'].to_numpy()
+        soort = groups['soort'].to_numpy().astype(str)
+
+        # Check count against limit
+        uitvalreden = np.select(
+            [
+                (limiet == "<=") & (aantal_dat > aantal_val),
+                (limiet == ">=") & (aantal_dat < aantal_val),
+                (limiet == "=") & (aantal_dat != aantal_val),
+            ],
+            [
+                np.char.add(np.char.add("aantal ", soort), " groter dan verwacht"),
+                np.char.add(np.char.add("aantal ", soort), " kleiner dan verwacht"),
+                np.char.add(np.char.add("aantal ", soort), " ongelijk aan verwachting"),
+            ],
+            default=""
+        )
+
+        return pd.DataFrame({
+            'validatieregel': groups['validatieregel'].astype(int).to_numpy(),
+            'record_id': groups['record_id'].to_numpy(),
+            'locatiecode': groups['locatiecode_y'].to_numpy(),
+            'aantaldat': aantal_dat,
+            'limiet': limiet,
+            'aantalval': aantal_val,
+            'uitvalreden': uitvalreden,
+        })
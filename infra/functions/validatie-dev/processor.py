@@ -3,17 +3,19 @@
 from __future__ import annotations
 
 import io
+import tempfile
 import zipfile
-from typing import TYPE_CHECKING
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Iterator, Optional, Union
 from urllib.parse import unquote_plus
 
 import boto3
-import geopandas as gpd
 import pandas as pd
-from shapely import wkt
 
 if TYPE_CHECKING:
+    import geopandas as gpd
     from config import ValidationConfig
+    from streaming import SpilledBundle
 
 
 class DataBundleProcessor:
@@ -26,6 +28,9 @@ class DataBundleProcessor:
         'einddiepte.m': 'einddiepte_m',
     }
     
+    # Text columns with at most this share of distinct values are stored as categoricals
+    CATEGORICAL_MAX_RATIO = 0.5
+    
     def __init__(self, config: "ValidationConfig"):
         self.config = config
         self.s3 = boto3.client('s3')
@@ -33,7 +38,8 @@ class DataBundleProcessor:
     def extract_from_s3(
         self, 
         bucket_name: str, 
-        zip_file_key: str
+        zip_file_key: str,
+        nrows: Optional[int] = None
     ) -> tuple[pd.DataFrame, bool]:
         """
         Extract CSV from ZIP file in S3.
@@ -41,6 +47,7 @@ class DataBundleProcessor:
         Args:
             bucket_name: S3 bucket name
             zip_file_key: Key/path to the ZIP file in S3
+            nrows: Read only the first nrows records (e.g. for a quick check)
             
         Returns:
             Tuple of (DataFrame with CSV content, has_akkoord_file boolean)
@@ -48,16 +55,57 @@ class DataBundleProcessor:
         Raises:
             ValueError: If no CSV file found in ZIP
         """
+        with tempfile.TemporaryFile() as zip_file:
+            self.download_zip(bucket_name, zip_file_key, zip_file)
+            return self.read_zip(zip_file, nrows)
+    
+    def download_zip(self, bucket_name: str, zip_file_key: str, zip_file: IO[bytes]) -> None:
+        """
+        Download a bundle ZIP from S3 into a file, to read it more than once with
+        read_zip and read_zip_chunks without holding it in memory.
+        
+        Args:
+            bucket_name: S3 bucket name
+            zip_file_key: Key/path to the ZIP file in S3, as in the S3 event
+            zip_file: Binary file to write the ZIP to, e.g. a tempfile.TemporaryFile
+        """
         decoded_key = unquote_plus(zip_file_key)
+        self.s3.download_fileobj(bucket_name, decoded_key, zip_file)
+    
+    def read_bundle(self, path: Path, nrows: Optional[int] = None) -> tuple[pd.DataFrame, bool]:
+        """
+        Read a local data bundle: a ZIP like the uploads, or a bare CSV.
         
-        # Download ZIP from S3
-        zip_obj = self.s3.get_object(Bucket=bucket_name, Key=decoded_key)
-        zip_data = zip_obj['Body'].read()
+        Returns:
+            Tuple of (DataFrame with CSV content, has_akkoord_file boolean); a bare
+            CSV has no akkoord file
+        """
+        path = Path(path)
+        if path.suffix.lower() == '.zip':
+            with open(path, 'rb') as f:
+                return self.read_zip(f, nrows)
+        
+        with open(path, 'rb') as f:
+            csv_content = self.read_csv(f, nrows, self.config.categorical_codes)
+        if csv_content.empty:
+            raise ValueError(f"No CSV content found in {path}")
+        return csv_content, False
+    
+    def read_zip(
+        self,
+        zip_file: Union[IO[bytes], Path],
+        nrows: Optional[int] = None
+    ) -> tuple[pd.DataFrame, bool]:
+        """
+        Read the first CSV, and whether there is an akkoord.txt, from a bundle ZIP.
         
+        Raises:
+            ValueError: If no CSV file found in ZIP
+        """
         csv_content = None
         has_akkoord = False
         
-        with zipfile.ZipFile(io.BytesIO(zip_data)) as z:
+        with zipfile.ZipFile(zip_file) as z:
             file_list = z.namelist()
             
             # Check for akkoord.txt
@@ -67,10 +115,7 @@ class DataBundleProcessor:
             for file_name in file_list:
                 if file_name.endswith('.csv'):
                     with z.open(file_name) as csvfile:
-                        # Use cp1252 encoding (Windows Western European)
-                        with io.TextIOWrapper(csvfile, encoding='cp1252') as textfile:
-                            csv_content = pd.read_csv(textfile, delimiter=';')
-                            csv_content.columns = csv_content.columns.str.lower().str.strip()
+                        csv_content = self.read_csv(csvfile, nrows, self.config.categorical_codes)
                     break
         
         if csv_content is None or csv_content.empty:
@@ -78,6 +123,75 @@ class DataBundleProcessor:
         
         return csv_content, has_akkoord
     
+    @staticmethod
+    def has_akkoord(zip_file: Union[IO[bytes], Path]) -> bool:
+        """Whether a bundle ZIP has an akkoord.txt."""
+        with zipfile.ZipFile(zip_file) as z:
+            return "akkoord.txt" in z.namelist()
+    
+    def read_zip_chunks(
+        self,
+        zip_file: Union[IO[bytes], Path],
+        dtype: Optional[dict[str, type]] = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Read the first CSV of a bundle ZIP like read_zip, in chunks of
+        config.stream_chunk_rows records, without categorical codes.
+        
+        Args:
+            zip_file: Bundle ZIP
+            dtype: Column types, as for pandas.read_csv
+        """
+        with zipfile.ZipFile(zip_file) as z:
+            file_name = next((name for name in z.namelist() if name.endswith('.csv')), None)
+            if file_name is None:
+                return
+            with z.open(file_name) as csvfile, io.TextIOWrapper(csvfile, encoding='cp1252') as textfile:
+                for chunk in pd.read_csv(
+                    textfile, delimiter=';', dtype=dtype, chunksize=self.config.stream_chunk_rows, low_memory=False
+                ):
+                    chunk.columns = chunk.columns.str.lower().str.strip()
+                    yield chunk
+    
+    def spill_zip(self, zip_file: Union[IO[bytes], Path], min_rows: int = 0) -> Optional["SpilledBundle"]:
+        """
+        Read a bundle ZIP in chunks (read_zip_chunks) and spill it to disk by
+        begindatum window of config.stream_window, for a StreamingKRMValidator.
+        
+        Returns:
+            The spilled bundle, normalized when read (normalize); None for a bundle
+            with fewer than min_rows records, or without records
+        """
+        from .streaming import SpilledBundle
+        
+        return SpilledBundle.from_chunks(
+            lambda dtype: self.read_zip_chunks(zip_file, dtype),
+            self.config.stream_window,
+            self.normalize,
+            min_rows
+        )
+    
+    @classmethod
+    def read_csv(
+        cls,
+        csvfile: IO[bytes],
+        nrows: Optional[int] = None,
+        categorical_codes: bool = False
+    ) -> pd.DataFrame:
+        """
+        Read bundle CSV content: cp1252, ";"-separated, with lower case column names.
+        
+        With categorical_codes the code columns are stored as categoricals
+        (categorize_codes), so the object columns are only held while parsing.
+        """
+        # Use cp1252 encoding (Windows Western European)
+        with io.TextIOWrapper(csvfile, encoding='cp1252') as textfile:
+            csv_content = pd.read_csv(textfile, delimiter=';', nrows=nrows)
+        csv_content.columns = csv_content.columns.str.lower().str.strip()
+        if categorical_codes:
+            csv_content = cls.categorize_codes(csv_content)
+        return csv_content
+    
     def to_geodataframe(self, df: pd.DataFrame) -> gpd.GeoDataFrame:
         """
         Convert DataFrame to GeoDataFrame with proper geometry.
@@ -88,13 +202,14 @@ class DataBundleProcessor:
         Returns:
             GeoDataFrame with point geometry in EPSG:4258
         """
-        df = df.copy()
-        
-        # Normalize column name variations
-        df = self._normalize_column_names(df)
+        # Imported here so a bundle that fails extraction never loads the geo stack
+        import geopandas as gpd
+        from shapely import wkt
+
+        df = self.normalize(df)
         
         # Create WKT geometry column
-        df['geom'] = df.apply(
+        df['geom'] = df[['geometriepunt.x', 'geometriepunt.y']].apply(
             lambda row: f"POINT({row['geometriepunt.x']} {row['geometriepunt.y']})",
             axis=1
         )
@@ -106,6 +221,50 @@ class DataBundleProcessor:
         
         return gdf
     
+    def normalize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Copy of the CSV content with the columns of to_geodataframe(), without geometry.
+        
+        The streamed validation (StreamingKRMValidator) works on this frame, per
+        window of a spilled bundle (spill_zip); the geometry is only needed for the
+        export.
+        """
+        # Normalize column name variations; code columns not yet converted while
+        # reading become categoricals here
+        df = self._normalize_column_names(df)
+        if self.config.categorical_codes:
+            df = self.categorize_codes(df)
+        df.columns = df.columns.str.lower()
+        return df
+    
+    @classmethod
+    def categorize_codes(cls, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Store the code columns of a bundle as categoricals.
+        
+        Text columns whose number of distinct values is at most CATEGORICAL_MAX_RATIO
+        of the records (codes, location and sample ids) are converted; record ids and
+        other mostly unique text stay object columns, for which a categorical would
+        not save memory. Categories are sorted, so sorting and grouping give the same
+        order as on the text, and missing values stay NaN. String methods such as
+        .str.replace('NL80_', '') then run once per category instead of per record.
+        
+        Args:
+            df: DataFrame with the CSV content, converted in place
+            
+        Returns:
+            The same DataFrame
+        """
+        max_categories = len(df) * cls.CATEGORICAL_MAX_RATIO
+        for column in df.columns:
+            values = df[column]
+            if values.dtype != object or pd.api.types.infer_dtype(values, skipna=True) != 'string':
+                continue
+            codes, categories = pd.factorize(values, sort=True)
+            if len(categories) <= max_categories:
+                df[column] = pd.Categorical.from_codes(codes, categories=categories)
+        return df
+    
     def _normalize_column_names(self, df: pd.DataFrame) -> pd.DataFrame:
         """Normalize column name variations to standard names."""
         df = df.copy()
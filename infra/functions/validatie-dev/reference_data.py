@@ -1,13 +1,20 @@
-"""Reference data loading and caching from GitHub."""
+"""Reference data loading and caching from a compiled artifact, GitHub or a local copy."""
 
 from __future__ import annotations
 
+from pathlib import Path
 from typing import TYPE_CHECKING, Optional
 
 import geopandas as gpd
 import pandas as pd
 
 from .github_functions import get_data_from_github, get_shape_data_from_github
+from .reference_artifact import (
+    ReferenceArtifact,
+    read_location_shapefiles,
+    read_reference_csv,
+    source_hash,
+)
 
 if TYPE_CHECKING:
     from config import ValidationConfig
@@ -17,7 +24,10 @@ class ReferenceDataLoader:
     """
     Loads and caches reference data from GitHub.
     
-    Data is loaded lazily on first access and cached for subsequent uses.
+    Data is loaded lazily on first access and cached for subsequent uses. When
+    config.reference_data_dir is set, the files are read from that directory instead.
+    A compiled artifact (config.reference_artifact_dir) is preferred over both when
+    its content hash matches the configured source.
     """
     
     def __init__(self, config: "ValidationConfig"):
@@ -29,14 +39,16 @@ class ReferenceDataLoader:
         self._group: Optional[pd.DataFrame] = None
         self._column_definition: Optional[pd.DataFrame] = None
         self._location_gdf: Optional[gpd.GeoDataFrame] = None
+        self._projected_location_gdf: Optional[gpd.GeoDataFrame] = None
+        self._location_identifiers: Optional[frozenset[str]] = None
+        self._artifact: Optional[ReferenceArtifact] = None
+        self._artifact_checked = False
     
     @property
     def validatielijst(self) -> pd.DataFrame:
         """Get validation rules list."""
         if self._validatielijst is None:
-            loaded = get_data_from_github(
-                f"{self._base_url}/validatielijst.csv"
-            )
+            loaded = self._load_csv("validatielijst.csv")
             self._validatielijst = self._normalize_validatielijst_columns(loaded)
         return self._validatielijst
     
@@ -44,16 +56,14 @@ class ReferenceDataLoader:
     def group(self) -> pd.DataFrame:
         """Get group definitions."""
         if self._group is None:
-            self._group = get_data_from_github(f"{self._base_url}/groep.csv")
+            self._group = self._load_csv("groep.csv")
         return self._group
     
     @property
     def column_definition(self) -> pd.DataFrame:
         """Get column definitions."""
         if self._column_definition is None:
-            self._column_definition = get_data_from_github(
-                f"{self._base_url}/kolomdefinitie.csv"
-            )
+            self._column_definition = self._load_csv("kolomdefinitie.csv")
         return self._column_definition
     
     @property
@@ -64,12 +74,81 @@ class ReferenceDataLoader:
         return self._location_gdf
     
     @property
-    def location_identifiers(self) -> set[str]:
-        """Get set of valid location identifiers (MPNIDENT)."""
-        return set(self.location_gdf['MPNIDENT'].values)
+    def projected_location_gdf(self) -> gpd.GeoDataFrame:
+        """Get the locations in config.distance_crs, for distance calculations."""
+        if self._projected_location_gdf is None:
+            artifact = self.artifact
+            if artifact is not None and artifact.manifest["projected_crs"] == self.config.distance_crs:
+                self._projected_location_gdf = artifact.locations(projected=True)
+            else:
+                self._projected_location_gdf = self.location_gdf.to_crs(self.config.distance_crs)
+        return self._projected_location_gdf
+    
+    @property
+    def artifact(self) -> ReferenceArtifact | None:
+        """The compiled reference data artifact, if configured and matching the source."""
+        if not self._artifact_checked:
+            self._artifact = self._open_artifact()
+            self._artifact_checked = True
+        return self._artifact
+    
+    def _open_artifact(self) -> ReferenceArtifact | None:
+        """
+        Open the configured artifact when it was compiled from the configured source.
+        
+        With a local reference_data_dir the artifact must have the hash of that
+        directory. Otherwise it must be compiled from github_base_url and have the
+        pinned reference_data_hash (KRM_REFERENCE_DATA_HASH, set when the image is
+        built); an artifact without a pin is not used, as nothing tells whether it
+        is the version the deployment validates against.
+        """
+        artifact = ReferenceArtifact.open(self.config.reference_artifact_dir)
+        if artifact is None:
+            return None
+        
+        if self.config.reference_data_dir is not None:
+            expected = source_hash(Path(self.config.reference_data_dir))
+        elif artifact.manifest.get("source") != self._base_url:
+            print(f"Reference artifact is compiled from {artifact.manifest.get('source')}, "
+                  f"not {self._base_url}; loading from source")
+            return None
+        elif self.config.reference_data_hash is None:
+            print("Reference artifact is not pinned by KRM_REFERENCE_DATA_HASH; loading from source")
+            return None
+        else:
+            expected = self.config.reference_data_hash
+        
+        if artifact.source_hash != expected:
+            print(f"Reference artifact hash {artifact.source_hash[:12]} does not match "
+                  f"{expected[:12]}; loading from source")
+            return None
+        return artifact
+    
+    @property
+    def location_identifiers(self) -> frozenset[str]:
+        """Get set of valid location identifiers (MPNIDENT), built once."""
+        if self._location_identifiers is None:
+            self._location_identifiers = frozenset(self.location_gdf['MPNIDENT'])
+        return self._location_identifiers
+    
+    def _load_csv(self, filename: str) -> pd.DataFrame | None:
+        """Load a reference CSV from the artifact, the local reference data directory or GitHub."""
+        if self.artifact is not None:
+            return self.artifact.table(Path(filename).stem)
+        
+        local_dir = self.config.reference_data_dir
+        if local_dir is None:
+            return get_data_from_github(f"{self._base_url}/{filename}")
+        return read_reference_csv(Path(local_dir) / filename)
     
     def _load_location_shapefiles(self) -> gpd.GeoDataFrame:
         """Load and combine point and polygon location shapefiles."""
+        if self.artifact is not None:
+            return self.artifact.locations()
+        
+        if self.config.reference_data_dir is not None:
+            return read_location_shapefiles(Path(self.config.reference_data_dir) / 'KRM_locatiedetails')
+        
         local_folder = str(self.config.temp_folder)
         base_url = f"{self._base_url}/KRM_locatiedetails"
         
@@ -85,13 +164,7 @@ class ReferenceDataLoader:
                     local_folder
                 )
         
-        # Load shapefiles
-        gdf_points = gpd.read_file(self.config.temp_folder / 'KRM2_P.shp')
-        gdf_polygons = gpd.read_file(self.config.temp_folder / 'KRM2_V.shp')
-        
-        # Combine into single GeoDataFrame
-        combined = pd.concat([gdf_points, gdf_polygons], ignore_index=True)
-        return gpd.GeoDataFrame(combined, geometry='geometry')
+        return read_location_shapefiles(self.config.temp_folder)
     
     def get_validation_rules(self, package_name: str) -> pd.DataFrame:
         """
@@ -150,12 +223,25 @@ class ReferenceDataLoader:
         rules = self.get_validation_rules(package_name)
         return self.group[self.group['groep'].isin(rules['groep'])].copy()
     
+    def preload(self) -> None:
+        """Load all reference data now, e.g. before a long-running worker takes jobs."""
+        self.validatielijst
+        self.group
+        self.column_definition
+        self.location_gdf
+        self.projected_location_gdf
+        self.location_identifiers
+    
     def clear_cache(self) -> None:
         """Clear all cached data (useful for testing or memory management)."""
         self._validatielijst = None
         self._group = None
         self._column_definition = None
         self._location_gdf = None
+        self._projected_location_gdf = None
+        self._location_identifiers = None
+        self._artifact = None
+        self._artifact_checked = False
 
     @staticmethod
     def _normalize_validatielijst_columns(df: pd.DataFrame | None) -> pd.DataFrame:
@@ -3,15 +3,32 @@
 from __future__ import annotations
 
 import csv
+import re
 from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 if TYPE_CHECKING:
     import pandas as pd
 
 
+CSV_HEADERS = ["Section", "Databundelcode", "Record ID", "Uitvalreden", "Informatie"]
+
+# Record ids shown in the summary row of a collapsed failure group
+SUMMARY_EXAMPLES = 3
+
+# Record specific values in informatie: quoted values and numbers/dates
+_QUOTED_VALUE = re.compile(r"'[^']*'|\"[^\"]*\"")
+_NUMBER = re.compile(r"\d+(?:[-.:/]\d+)*")
+
+
+def informatie_pattern(informatie: str) -> str:
+    """Informatie with its record specific values masked, e.g. 'Namespace "..." ongelijk aan "..."'."""
+    pattern = _QUOTED_VALUE.sub(lambda m: f"{m.group()[0]}...{m.group()[0]}", str(informatie))
+    return _NUMBER.sub("#", pattern)
+
+
 class ValidationSection(Enum):
     """Validation check categories."""
     
@@ -106,21 +123,72 @@ class ValidationReport:
             counts[result.section] = counts.get(result.section, 0) + 1
         return counts
     
-    def to_csv(self, filepath: Path) -> None:
-        """Export report to CSV file."""
-        headers = ["Section", "Databundelcode", "Record ID", "Uitvalreden", "Informatie"]
+    def to_csv(self, filepath: Path, max_rows_per_group: Optional[int] = None) -> None:
+        """
+        Export report to CSV file.
         
+        With max_rows_per_group, see summarized_rows(); the full detail can be
+        exported with to_parquet().
+        """
+        rows = (
+            self.summarized_rows(max_rows_per_group) if max_rows_per_group
+            else (self._row(result) for result in self.results)
+        )
         with open(filepath, 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
-            writer.writerow(headers)
-            for result in self.results:
-                writer.writerow([
-                    result.section.value,
-                    result.databundelcode,
-                    result.record_id,
-                    result.uitvalreden,
-                    result.informatie,
-                ])
+            writer.writerow(CSV_HEADERS)
+            writer.writerows(rows)
+    
+    def summarized_rows(self, max_rows_per_group: int) -> list[list[str]]:
+        """
+        Report rows with at most max_rows_per_group rows per failure group.
+        
+        A group is a (section, databundelcode, uitvalreden, informatie pattern), see
+        informatie_pattern(). The detail rows keep their order; the remaining failures
+        of each capped group are collapsed into a summary row at the end, with the
+        number of failures in the Informatie and example record ids in the Record ID.
+        """
+        rows = []
+        collapsed: dict[tuple, list[str]] = {}
+        kept: dict[tuple, int] = {}
+        for result in self.results:
+            key = (
+                result.section, result.databundelcode, result.uitvalreden,
+                informatie_pattern(result.informatie)
+            )
+            if kept.get(key, 0) < max_rows_per_group:
+                kept[key] = kept.get(key, 0) + 1
+                rows.append(self._row(result))
+            else:
+                collapsed.setdefault(key, []).append(result.record_id)
+        
+        for (section, databundelcode, uitvalreden, pattern), record_ids in collapsed.items():
+            rows.append([
+                section.value,
+                databundelcode,
+                ' '.join(record_ids[:SUMMARY_EXAMPLES]),
+                uitvalreden,
+                f"nog {len(record_ids)} records met: {pattern}",
+            ])
+        return rows
+    
+    @staticmethod
+    def _row(result: ValidationResult) -> list[str]:
+        return [
+            result.section.value,
+            result.databundelcode,
+            result.record_id,
+            result.uitvalreden,
+            result.informatie,
+        ]
+    
+    def to_parquet(self, filepath: Path) -> None:
+        """Export all failures, in the to_dataframe() columns, to a zstd compressed Parquet file."""
+        import pandas as pd
+        
+        columns = ['section', 'databundelcode', 'record_id', 'uitvalreden', 'informatie']
+        df = self.to_dataframe() if self.results else pd.DataFrame(columns=columns)
+        df.astype(str).to_parquet(filepath, index=False, compression='zstd')
     
     def to_dataframe(self) -> "pd.DataFrame":
         """Convert report to pandas DataFrame."""
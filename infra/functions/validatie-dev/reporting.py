@@ -8,6 +8,8 @@ from typing import TYPE_CHECKING, Any
 
 import pandas as pd
 
+from .counts import CountAggregator
+
 if TYPE_CHECKING:
     from config import ValidationConfig
     from reference_data import ReferenceDataLoader
@@ -27,110 +29,60 @@ class CountReportGenerator:
     
     def generate(
         self,
-        gdf: pd.DataFrame,
+        gdf: pd.DataFrame | None,
         rules: pd.DataFrame,
-        package_name: str
+        package_name: str,
+        count_table: pd.DataFrame | None = None
     ) -> pd.DataFrame:
         """
         Generate count report DataFrame.
         
         Args:
-            gdf: GeoDataFrame with the data
+            gdf: GeoDataFrame with the data (only used without count_table)
             rules: DataFrame with determined rules per record
             package_name: Name of the data bundle
+            count_table: Count table from CountAggregator, e.g. the one the
+                validator already built for the count check (built when omitted)
             
         Returns:
             DataFrame with count statistics per location/rule combination
         """
         clean_name = package_name.replace('+', ' ')
-        validatie_regels = self.ref_data.get_validation_rules_exploded(clean_name)
-        
-        if validatie_regels.empty or rules.empty:
-            return pd.DataFrame()
         
-        # Prepare data
-        df = gdf.copy()
-        df['cleaned_lokaalid'] = df['monster.lokaalid'].str.replace('NL80_', '')
-        df['cleaned_meetwaarde_lokaalid'] = df['meetwaarde.lokaalid'].str.replace('NL80_', '')
-        df['locatiecode'] = df['meetobject.lokaalid'].str.replace('NL80_', '')
-        df['recordnr_monster'] = df['cleaned_meetwaarde_lokaalid'].rank(method='dense').astype(int)
+        if count_table is None:
+            count_table = CountAggregator(self.config, self.ref_data).aggregate(
+                gdf, rules, package_name
+            )
         
-        # Filter rules with valid validatieregel
-        filtered_rules = rules.dropna(subset=['validatieregel'])
-        
-        if filtered_rules.empty:
+        if count_table.empty:
             return pd.DataFrame()
         
-        # Merge rules with validation rules
-        merged = filtered_rules.merge(
-            validatie_regels,
-            left_on='validatieregel',
-            right_index=True,
-            how='inner'
-        )
-        
-        # Determine grouping column
-        group_by_col = 'cleaned_meetwaarde_lokaalid'
-        if not validatie_regels.empty:
-            group_by_setting = str(validatie_regels.iloc[0].get("group_by", "")).strip()
-            if group_by_setting == 'monster.lokaalid':
-                group_by_col = 'cleaned_lokaalid'
-        
-        # Merge with original data
-        merged_with_df = merged.merge(
-            df,
-            left_on='record_id',
-            right_on=group_by_col
-        )
-        
-        if merged_with_df.empty:
-            return pd.DataFrame()
-        
-        # Group and aggregate
-        grouped = merged_with_df.groupby([
-            "validatieregel",
-            "databundelcode_x",
-            "locatiecode_y",
-            "locatiecode_x"
-        ])
-        
-        results = []
-        for group_key, group_df in grouped:
-            aantal_dat = len(group_df)
-            aantal_val = group_df['aantal'].iloc[0]
-            limiet = group_df['limiet'].iloc[0]
-            record_id = group_df.get('record_id_x', group_df.get('record_id', pd.Series(['']))).iloc[0]
-            
-            # Get validation rule details
-            validatieregel_id = int(group_df['validatieregel'].iloc[0])
-            matching_rules = validatie_regels[validatie_regels.index == validatieregel_id]
-            validatieregel_dict = self._merge_rule_records(matching_rules)
-            
-            # Determine record type and uitvalreden
-            recordnr_monster = group_df.get('recordnr_monster', pd.Series([0])).iloc[0]
-            soort = "tijdwaarden" if recordnr_monster == 0 else "monsters"
-            
-            uitvalreden = ""
-            if limiet == "<=" and aantal_dat > aantal_val:
-                uitvalreden = f"aantal {soort} groter dan verwacht"
-            elif limiet == ">=" and aantal_dat < aantal_val:
-                uitvalreden = f"aantal {soort} kleiner dan verwacht"
-            elif limiet == "=" and aantal_dat != aantal_val:
-                uitvalreden = f"aantal {soort} ongelijk aan verwachting"
-            
-            results.append({
-                'databundelcode': clean_name,
-                'record_id': record_id,
-                'locatiecode_aantal': group_df['locatiecode_y'].iloc[0],
-                'aantaldat': aantal_dat,
-                'limiet': limiet,
-                'aantalval': aantal_val,
-                'uitvalreden': uitvalreden,
-                'recordnrs': '',
-                'validatieregel': str(validatieregel_dict)
-            })
-        
-        return pd.DataFrame(results)
+        # Validation rule details, merged once per rule id
+        validatie_regels = self.ref_data.get_validation_rules_exploded(clean_name)
+        rule_ids = count_table['validatieregel']
+        rule_texts = self._rule_texts(validatie_regels, rule_ids.unique())
+        
+        return pd.DataFrame({
+            'databundelcode': clean_name,
+            'record_id': count_table['record_id'].to_numpy(),
+            'locatiecode_aantal': count_table['locatiecode'].to_numpy(),
+            'aantaldat': count_table['aantaldat'].to_numpy(),
+            'limiet': count_table['limiet'].to_numpy(),
+            'aantalval': count_table['aantalval'].to_numpy(),
+            'uitvalreden': count_table['uitvalreden'].to_numpy(),
+            'recordnrs': '',
+            'validatieregel': rule_ids.map(rule_texts).to_numpy()
+        })
+    
+    @classmethod
+    def _rule_texts(cls, validatie_regels: pd.DataFrame, rule_ids) -> dict[int, str]:
+        """Merged rule record, as text, for each of the given rule ids."""
+        wanted = validatie_regels[validatie_regels.index.isin(rule_ids)]
+        texts = {
+            rule_id: str(cls._merge_rule_records(matching_rules))
+            for rule_id, matching_rules in wanted.groupby(level=0, sort=False)
+        }
+        return {rule_id: texts.get(rule_id, str({})) for rule_id in rule_ids}
     
     @staticmethod
     def _merge_rule_records(matching_rules: pd.DataFrame) -> dict[str, Any]:
@@ -189,9 +141,10 @@ class CountReportGenerator:
 def generate_count_report(
     config: "ValidationConfig",
     ref_data: "ReferenceDataLoader",
-    gdf: pd.DataFrame,
+    gdf: pd.DataFrame | None,
     rules: pd.DataFrame,
-    package_name: str
+    package_name: str,
+    count_table: pd.DataFrame | None = None
 ) -> tuple[pd.DataFrame, Path]:
     """
     Convenience function to generate and save count report.
@@ -199,14 +152,15 @@ def generate_count_report(
     Args:
         config: Validation configuration
         ref_data: Reference data loader
-        gdf: GeoDataFrame with data
+        gdf: GeoDataFrame with data (only used without count_table)
         rules: Determined rules DataFrame
         package_name: Package name
+        count_table: Count table from CountAggregator (built when omitted)
         
     Returns:
         Tuple of (report DataFrame, saved file path)
     """
     generator = CountReportGenerator(config, ref_data)
-    report_df = generator.generate(gdf, rules, package_name)
+    report_df = generator.generate(gdf, rules, package_name, count_table)
     filepath = generator.save(report_df, package_name)
     return report_df, filepath
@@ -0,0 +1,703 @@
+"""Streamed validation of long (time-series) data bundles in begindatum windows."""
+
+from __future__ import annotations
+
+import shutil
+import tempfile
+import weakref
+from collections import defaultdict
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .counts import GROUP_COUNT_COLUMNS, CountAggregator
+from .report import ValidationReport, ValidationResult, ValidationSection
+from .validator import KRMValidator
+
+if TYPE_CHECKING:
+    from config import ValidationConfig
+    from reference_data import ReferenceDataLoader
+
+# Period ordinal of the records without a valid begindatum, after all periods
+NO_PERIOD = np.iinfo(np.int64).max
+
+
+def period_ordinals(begindatum: pd.Series, freq: str) -> np.ndarray:
+    """
+    Ordinal of the begindatum period of each record.
+
+    Args:
+        begindatum: Begin date of each record, as in the CSV
+        freq: pandas period alias of a window, e.g. 'M' (month) or 'Y' (year)
+
+    Returns:
+        Period ordinals; NO_PERIOD for records without a valid date, and for all
+        records when the dates have mixed time zones (they do not parse to one
+        date column)
+    """
+    dates = KRMValidator._parse_dates(begindatum, errors='coerce')
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        return np.full(len(begindatum), NO_PERIOD)
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+
+    ordinals = dates.dt.to_period(freq).array.asi8
+    return np.where(dates.isna().to_numpy(), NO_PERIOD, ordinals)
+
+
+def time_windows(begindatum: pd.Series, freq: str) -> list[np.ndarray]:
+    """
+    Split records into windows of begindatum periods.
+
+    Args:
+        begindatum: Begin date of each record, as in the CSV
+        freq: pandas period alias of a window, e.g. 'M' (month) or 'Y' (year)
+
+    Returns:
+        Ascending record positions per non-empty window, in time order; records
+        without a valid date form the last window
+    """
+    if not len(begindatum):
+        return []
+    ordinals = period_ordinals(begindatum, freq)
+    order = np.argsort(ordinals, kind='stable')
+    return np.split(order, np.flatnonzero(np.diff(ordinals[order])) + 1)
+
+
+def away_keys(keys: pd.DataFrame, lookups: pd.DataFrame) -> pd.DataFrame:
+    """
+    Keys looked up in a window that have records in another window.
+
+    Args:
+        keys: Key and window of the records (columns key, window)
+        lookups: Keys looked up in a window (columns key, window)
+
+    Returns:
+        The distinct lookups (key, window) whose key has a record outside window;
+        a key without records is not away
+    """
+    span = keys.groupby('key', dropna=False, sort=False)['window'].agg(['min', 'max'])
+    found = lookups.drop_duplicates().merge(span, left_on='key', right_index=True)
+    away = (found['min'] != found['window']) | (found['max'] != found['window'])
+    return found.loc[away, ['key', 'window']]
+
+
+class FrameSpill:
+    """
+    Frames appended to Parquet files in a folder and read back as one frame.
+
+    Missing values of text columns come back as NaN and list values as lists, as
+    they were appended.
+    """
+
+    def __init__(self, folder: Path):
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self._parts = 0
+        self._lists: set[str] = set()
+
+    def __len__(self) -> int:
+        return self._parts
+
+    def append(self, frame: Optional[pd.DataFrame]) -> None:
+        """Add a frame; an empty one (or None) is skipped."""
+        if frame is None or frame.empty:
+            return
+        self._lists.update(
+            column for column in frame.columns
+            if frame[column].dtype == object and frame[column].map(lambda value: isinstance(value, list)).any()
+        )
+        frame.to_parquet(self.folder / f'{self._parts:06d}.parquet')
+        self._parts += 1
+
+    def read(self, columns: Optional[list[str]] = None) -> Optional[pd.DataFrame]:
+        """The appended frames (or their columns) concatenated in order; None without any."""
+        if not self._parts:
+            return None
+        frame = pd.concat(
+            [pd.read_parquet(self.folder / f'{part:06d}.parquet', columns=columns) for part in range(self._parts)]
+        )
+        for column in frame.columns:
+            if column in self._lists:
+                frame[column] = frame[column].map(lambda value: list(value) if isinstance(value, np.ndarray) else value)
+            if frame[column].dtype == object:
+                frame[column] = frame[column].where(frame[column].notna(), np.nan)
+        return frame
+
+
+class SpilledBundle:
+    """
+    CSV content of a bundle, spilled to Parquet files on disk by begindatum window.
+
+    The CSV is read in chunks (from_chunks); every chunk is split into its
+    begindatum windows (period_ordinals), and each part is written to disk, so only
+    one chunk is held in memory. A window (window()) is read back from the parts
+    of all chunks, a chunk (chunk()) from its parts of all windows.
+
+    pandas infers the types of a chunk from its own values. The parts are read
+    back with the types of the whole bundle: integers with floats as floats, a
+    column with missing values in some chunks only as in the whole CSV. A column
+    that is numeric in one chunk and text in another is read again as text, as
+    pandas reads the whole CSV without low_memory.
+
+    The files are removed when the bundle is garbage collected.
+    """
+
+    def __init__(self, freq: str, normalize: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None):
+        """
+        Args:
+            freq: pandas period alias of a window, e.g. 'M' (month) or 'Y' (year)
+            normalize: Applied to the records read by window() and records_of(),
+                e.g. DataBundleProcessor.normalize
+        """
+        self.freq = freq
+        self.normalize = normalize
+        self.folder = Path(tempfile.mkdtemp(prefix='krm-bundle-'))
+        weakref.finalize(self, shutil.rmtree, self.folder, ignore_errors=True)
+
+        self.rows = 0
+        self.columns: Optional[pd.Index] = None
+        self.dtypes: dict[str, np.dtype] = {}
+        # Columns with only missing values so far, and numeric in one chunk and text in another
+        self._empty: set[str] = set()
+        self.mixed: set[str] = set()
+        # Part files per window ordinal and per chunk
+        self._windows: dict[int, list[Path]] = defaultdict(list)
+        self._chunks: list[list[Path]] = []
+
+    @classmethod
+    def from_chunks(
+        cls,
+        read_chunks: Callable[[dict[str, type]], Iterable[pd.DataFrame]],
+        freq: str,
+        normalize: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+        min_rows: int = 0
+    ) -> Optional[SpilledBundle]:
+        """
+        Spill the CSV chunks of read_chunks.
+
+        Args:
+            read_chunks: Function of the dtype argument of pandas.read_csv to the
+                chunks of the CSV, e.g. DataBundleProcessor.read_zip_chunks
+            freq: See __init__
+            normalize: See __init__
+            min_rows: Only spill a CSV of this many records or more; the chunks up
+                to min_rows are held in memory until then
+
+        Returns:
+            The spilled bundle; None for a CSV with fewer than min_rows records or
+            without records
+        """
+        chunks = iter(read_chunks({}))
+        head, rows = [], 0
+        for chunk in chunks:
+            head.append(chunk)
+            rows += len(chunk)
+            if rows >= min_rows:
+                break
+        if not rows or rows < min_rows:
+            return None
+
+        bundle = cls(freq, normalize)
+        while head:
+            bundle.append(head.pop(0))
+        for chunk in chunks:
+            bundle.append(chunk)
+        if not bundle.mixed:
+            return bundle
+
+        # Read the mixed columns as text, which pandas makes of them in the whole CSV
+        text = {column: str for column in bundle.mixed}
+        bundle = cls(freq, normalize)
+        for chunk in read_chunks(text):
+            bundle.append(chunk)
+        return bundle
+
+    def __len__(self) -> int:
+        return self.rows
+
+    @property
+    def window_count(self) -> int:
+        return len(self._windows)
+
+    @property
+    def chunk_count(self) -> int:
+        return len(self._chunks)
+
+    def append(self, chunk: pd.DataFrame) -> None:
+        """Spill the next chunk of the CSV."""
+        if self.columns is None:
+            self.columns = chunk.columns
+        elif not chunk.columns.equals(self.columns):
+            raise ValueError("CSV chunk with other columns than the first chunk")
+        chunk.index = pd.RangeIndex(self.rows, self.rows + len(chunk))
+        self._add_dtypes(chunk)
+
+        ordinals = period_ordinals(chunk['begindatum'], self.freq) if self.freq else np.zeros(len(chunk), dtype=np.int64)
+        order = np.argsort(ordinals, kind='stable')
+        parts = []
+        for positions in np.split(order, np.flatnonzero(np.diff(ordinals[order])) + 1):
+            ordinal = int(ordinals[positions[0]])
+            path = self.folder / f'{len(self._chunks):06d}-{len(parts):04d}.parquet'
+            chunk.iloc[positions].to_parquet(path)
+            self._windows[ordinal].append(path)
+            parts.append(path)
+        self._chunks.append(parts)
+        self.rows += len(chunk)
+
+    def window(self, number: int, columns: Optional[list[str]] = None, raw: bool = False) -> pd.DataFrame:
+        """
+        Records of a window, labelled with their positions in the CSV.
+
+        Args:
+            number: Window in time order; records without a valid date are in the last
+            columns: Read only these columns (implies raw)
+            raw: Return the CSV content, without normalize
+        """
+        paths = self._windows[sorted(self._windows)[number]]
+        frame = self._read(paths, columns)
+        return frame if raw or columns is not None else self._normalized(frame)
+
+    def chunk(self, number: int) -> pd.DataFrame:
+        """CSV content of a chunk, in CSV order."""
+        return self._read(self._chunks[number]).sort_index()
+
+    def iter_chunks(self) -> Iterator[pd.DataFrame]:
+        """CSV content chunk by chunk, in CSV order."""
+        for number in range(self.chunk_count):
+            yield self.chunk(number)
+
+    def head(self, rows: int = 5) -> pd.DataFrame:
+        """CSV content of the first records."""
+        return self.chunk(0).head(rows)
+
+    def records_of(self, column: str, record_ids: pd.Series) -> pd.DataFrame:
+        """Records whose id in column (without NL80_) is one of record_ids, labelled with their positions."""
+        found = []
+        for number in range(self.window_count):
+            ids = self.window(number, [column])[column]
+            matches = ids.index[ids.str.replace('NL80_', '').isin(record_ids).to_numpy()]
+            if len(matches):
+                found.append(self.window(number, raw=True).loc[matches])
+        records = pd.concat(found).sort_index() if found else self.head(0)
+        return self._normalized(records)
+
+    def _add_dtypes(self, chunk: pd.DataFrame) -> None:
+        """Combine the column types of a chunk with those of the chunks before."""
+        for column in chunk.columns:
+            dtype, empty = chunk[column].dtype, bool(chunk[column].isna().all())
+            if column not in self.dtypes:
+                self.dtypes[column] = dtype
+                if empty:
+                    self._empty.add(column)
+                continue
+            known, known_empty = self.dtypes[column], column in self._empty
+            if not empty:
+                self._empty.discard(column)
+            if known == dtype:
+                continue
+
+            numeric = [
+                pd.api.types.is_numeric_dtype(value) and not pd.api.types.is_bool_dtype(value)
+                for value in (known, dtype)
+            ]
+            if all(numeric):
+                self.dtypes[column] = np.result_type(known, dtype)
+            elif known_empty or empty:
+                # Missing values make an integer column float and a boolean one object
+                other, other_numeric = (dtype, numeric[1]) if known_empty else (known, numeric[0])
+                self.dtypes[column] = np.result_type(other, np.float64) if other_numeric else np.dtype(object)
+            else:
+                self.mixed.add(column)
+
+    def _read(self, paths: list[Path], columns: Optional[list[str]] = None) -> pd.DataFrame:
+        """Parts read back with the types of the whole bundle."""
+        frame = pd.concat([pd.read_parquet(path, columns=columns) for path in paths])
+        for column in frame.columns:
+            if frame[column].dtype == object:
+                frame[column] = frame[column].where(frame[column].notna(), np.nan)
+            if frame[column].dtype != self.dtypes[column]:
+                frame[column] = frame[column].astype(self.dtypes[column])
+        return frame
+
+    def _normalized(self, frame: pd.DataFrame) -> pd.DataFrame:
+        return self.normalize(frame) if self.normalize is not None else frame
+
+
+class FrameWindows:
+    """Windows (time_windows) of a bundle frame in memory, read like a SpilledBundle."""
+
+    def __init__(self, df: pd.DataFrame, freq: str):
+        self.df = df
+        self.windows = time_windows(df['begindatum'], freq) if freq else [np.arange(len(df))]
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    @property
+    def window_count(self) -> int:
+        return len(self.windows)
+
+    def window(self, number: int, columns: Optional[list[str]] = None, raw: bool = False) -> pd.DataFrame:
+        positions = self.windows[number]
+        frame = self.df.iloc[positions] if columns is None else self.df[columns].iloc[positions]
+        frame.index = positions
+        return frame
+
+    def records_of(self, column: str, record_ids: pd.Series) -> pd.DataFrame:
+        positions = np.flatnonzero(self.df[column].str.replace('NL80_', '').isin(record_ids).to_numpy())
+        records = self.df.iloc[positions]
+        records.index = positions
+        return records
+
+
+class StreamingKRMValidator(KRMValidator):
+    """
+    KRMValidator that validates a bundle window by window of begindatum periods.
+
+    A batch run holds the whole bundle, several working copies of it (rule
+    determination, geo control, counts, ...) and a rule record per record. This
+    validator takes the bundle as a SpilledBundle, spilled to disk by begindatum
+    window, and runs the rule determination and the record checks (RECORD_STEPS) on
+    the records of one window at a time. What it keeps for the whole bundle is
+    compact, or spilled to Parquet files (FrameSpill):
+
+    - counts: CountAggregator.group_counts per window, combined per count group
+    - failures of the record checks, spilled per window and put in the order of a
+      batch run when their step finishes
+    - verzamelingen: the records of the monsters that have records in windows still
+      to come, spilled; a monster is checked when its last window is done
+    - parameters and rule check: the rule records with a partial or without a rule,
+      spilled
+
+    Before the first window, the record ids and monsters with records in more than
+    one window are determined from their key columns (_away_keys). Rule records of
+    those keys are spilled as well and joined at the end, against their records only
+    (SpilledBundle.records_of). The failures are put in the order of a batch run, so
+    the report and count table equal those of KRMValidator; self.rules is not kept.
+
+    Peak memory is that of one window, the keys with records in more than one window
+    and the report with its failures; it does not grow with the number of windows.
+    A bundle frame (e.g. of DataBundleProcessor.normalize) is validated in its
+    windows (time_windows) the same way, with the frame itself in memory.
+
+    Validation can stop between windows and between the final steps. The bundle is
+    validated without geometry.
+    """
+
+    # Steps that check every record on its own, per window
+    RECORD_STEPS = ('geo_control', 'mandatory_columns', 'column_values', 'fixed_values', 'other', 'date_range')
+
+    # Accumulators in memory and spilled to disk, saved by checkpoint_state()
+    STREAM_STATE = ('_windows_done', '_group_counts', '_held_monsters')
+    SPILLED_STATE = (
+        '_verzamelingen', '_incomplete', '_no_rule', '_partial_rules', '_deferred_counts', '_deferred_verzamelingen',
+    )
+
+    # Columns of the spilled failures of the record steps
+    FINDING_COLUMNS = ['call', 'label', 'section', 'databundelcode', 'record_id', 'uitvalreden', 'informatie']
+
+    def __init__(
+        self,
+        config: "ValidationConfig",
+        ref_data: "ReferenceDataLoader",
+        window: Optional[str] = None
+    ):
+        super().__init__(config, ref_data)
+        self.window = config.stream_window if window is None else window
+        self._folder = Path(tempfile.mkdtemp(prefix='krm-stream-'))
+        weakref.finalize(self, shutil.rmtree, self._folder, ignore_errors=True)
+
+        self._windows_done = 0
+        # Failures of the record steps (FINDING_COLUMNS)
+        self._found = {step: FrameSpill(self._folder / step) for step in self.RECORD_STEPS}
+        self._group_counts = pd.DataFrame(columns=GROUP_COUNT_COLUMNS)
+        # Verzameling records of open monsters, monsters with deferred records and
+        # the incomplete verzamelingen of checked monsters
+        self._verzamelingen = FrameSpill(self._folder / 'verzamelingen')
+        self._held_monsters: set[str] = set()
+        self._incomplete = FrameSpill(self._folder / 'incomplete')
+        # Rule records without a rule and with a partial match
+        self._no_rule = FrameSpill(self._folder / 'no_rule')
+        self._partial_rules = FrameSpill(self._folder / 'partial_rules')
+        # Rule records joined at the end
+        self._deferred_counts = FrameSpill(self._folder / 'deferred_counts')
+        self._deferred_verzamelingen = FrameSpill(self._folder / 'deferred_verzamelingen')
+
+        # Report calls of a captured record check
+        self._tags: Optional[list[tuple]] = None
+        self._calls = 0
+
+    def quick_check(self, df: Union[pd.DataFrame, SpilledBundle], package_name: str) -> ValidationReport:
+        """
+        KRMValidator.quick_check; a SpilledBundle is checked window by window, with
+        the failures in the order of a check of the whole CSV content.
+        """
+        if not isinstance(df, SpilledBundle):
+            return super().quick_check(df, package_name)
+
+        clean_name = package_name.replace('+', ' ')
+        checks = {
+            'mandatory_columns': self._check_mandatory_columns,
+            'fixed_values': self._check_fixed_values,
+            'other': self._check_other,
+        }
+        found: dict[str, list[tuple]] = {step: [] for step in self.QUICK_CHECK_STEPS}
+        for number in range(df.window_count):
+            window = df.window(number, raw=True)
+            for step in self.QUICK_CHECK_STEPS:
+                found[step].extend(self._capture(lambda: checks[step](window, clean_name)))
+
+        report = ValidationReport()
+        for step in self.QUICK_CHECK_STEPS:
+            report.results.extend(result for _, _, result in sorted(found[step], key=lambda finding: finding[:2]))
+        return report
+
+    def iter_steps(
+        self,
+        gdf: Union[pd.DataFrame, SpilledBundle],
+        package_name: str,
+        should_stop: Optional[Callable[[], bool]] = None
+    ) -> Iterator[str]:
+        clean_name = package_name.replace('+', ' ')
+        bundle = gdf if isinstance(gdf, SpilledBundle) else FrameWindows(gdf, self.window)
+
+        if self._windows_done < bundle.window_count:
+            away = self._away_keys(bundle, clean_name)
+        while self._windows_done < bundle.window_count:
+            if should_stop is not None and should_stop():
+                return
+            self._validate_window(bundle.window(self._windows_done), clean_name, away)
+            self._windows_done += 1
+
+        for step in self.VALIDATION_STEPS[self.completed_steps:]:
+            if should_stop is not None and should_stop():
+                return
+            self._finish_step(step, bundle, clean_name)
+            self.completed_steps += 1
+            yield step
+
+    def checkpoint_state(self) -> dict:
+        return {
+            **super().checkpoint_state(),
+            'stream': {name: getattr(self, name) for name in self.STREAM_STATE},
+            'spilled': {
+                **{name: getattr(self, name).read() for name in self.SPILLED_STATE},
+                'found': {step: spill.read() for step, spill in self._found.items()},
+            },
+        }
+
+    def restore_state(self, state: dict) -> None:
+        super().restore_state(state)
+        for name, value in state['stream'].items():
+            setattr(self, name, value)
+        spilled = state['spilled']
+        for name in self.SPILLED_STATE:
+            getattr(self, name).append(spilled[name])
+        for step, frame in spilled['found'].items():
+            self._found[step].append(frame)
+
+    def _away_keys(self, bundle: Union[SpilledBundle, FrameWindows], package_name: str) -> dict[str, pd.DataFrame]:
+        """
+        Record ids, monsters and count keys of each window that have records in
+        another window (away_keys).
+
+        The count keys are the record ids, or the monsters looked up by record id
+        when the counts are per monster. The keys of the windows are spilled in hash
+        partitions of about config.stream_chunk_rows records, and reduced one
+        partition at a time.
+        """
+        validatie_regels = self.ref_data.get_validation_rules_exploded(package_name)
+        by_monster = (
+            not validatie_regels.empty and CountAggregator.group_by_column(validatie_regels) == 'cleaned_lokaalid'
+        )
+        names = ('record_id', 'monster', 'count') if by_monster else ('record_id', 'monster')
+        partitions = max(1, -(-len(bundle) // self.config.stream_chunk_rows))
+        folder = self._folder / 'keys'
+        spills = {name: [FrameSpill(folder / f'{name}-{number}') for number in range(partitions)] for name in names}
+
+        for window in range(bundle.window_count):
+            df = bundle.window(window, ['meetwaarde.lokaalid', 'monster.lokaalid'])
+            keys = {
+                'record_id': df['meetwaarde.lokaalid'].str.replace('NL80_', ''),
+                'monster': df['monster.lokaalid'].astype(str).str.replace('NL80_', ''),
+            }
+            if by_monster:
+                keys['count'] = df['monster.lokaalid'].str.replace('NL80_', '')
+            for name, key in keys.items():
+                pairs = pd.DataFrame({'key': key.to_numpy(), 'window': window}).drop_duplicates()
+                partition = pd.util.hash_array(pairs['key'].to_numpy(dtype=object)) % partitions
+                for number, part in pairs.groupby(partition):
+                    spills[name][number].append(part)
+
+        away: dict[str, list[pd.DataFrame]] = {name: [] for name in names}
+        for number in range(partitions):
+            pairs = {name: spills[name][number].read() for name in names}
+            if pairs['record_id'] is None:
+                continue
+            away['record_id'].append(away_keys(pairs['record_id'], pairs['record_id']))
+            away['monster'].append(away_keys(pairs['monster'], pairs['monster']))
+            if by_monster and pairs['count'] is not None:
+                away['count'].append(away_keys(pairs['count'], pairs['record_id']))
+        shutil.rmtree(folder)
+
+        away = {
+            name: pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['key', 'window'])
+            for name, frames in away.items()
+        }
+        away.setdefault('count', away['record_id'])
+        return away
+
+    def _validate_window(self, window: pd.DataFrame, package_name: str, away: dict[str, pd.DataFrame]) -> None:
+        """Run the steps on the records of a window and add them to the accumulators."""
+        window_nr = self._windows_done
+
+        rules = self._determine_rules(self._with_parameters(window), package_name)
+        checks = {
+            'geo_control': lambda: self._check_geo_control(window, package_name),
+            'mandatory_columns': lambda: self._check_mandatory_columns(window, package_name),
+            'column_values': lambda: self._check_column_values(window, package_name),
+            'fixed_values': lambda: self._check_fixed_values(window, package_name),
+            'other': lambda: self._check_other(window, package_name),
+            'date_range': lambda: self._check_date_range(window, package_name),
+        }
+        for step in self.RECORD_STEPS:
+            self._found[step].append(self._findings(self._capture(checks[step])))
+
+        if rules.empty:
+            return
+        rules.index = window.index
+        self._no_rule.append(rules[rules['validatieregel'].isna()])
+        self._partial_rules.append(rules[rules['uitvalreden'].isin([1, 2, 3])])
+
+        # Counts of the keys with all their records in this window
+        counted = rules.dropna(subset=['validatieregel'])
+        local = self._in_window(away['count'], counted['record_id'], window_nr)
+        self._group_counts = CountAggregator.combine(
+            self._group_counts,
+            CountAggregator(self.config, self.ref_data).group_counts(window, counted[local], package_name)
+        )
+        self._deferred_counts.append(counted[~local])
+
+        # Verzamelingen: records of ids with records in other windows are joined at
+        # the end, and their monsters are checked then
+        local = self._in_window(away['record_id'], counted['record_id'], window_nr)
+        deferred = counted[~local]
+        self._held_monsters.update(deferred['monster_identificatie'].astype(str).str.replace('NL80_', ''))
+        self._deferred_verzamelingen.append(deferred)
+
+        reported = self._verzameling_records(window, package_name, counted[local])
+        if reported is None:
+            return
+        closed = (
+            self._in_window(away['monster'], reported['monster'], window_nr)
+            & ~reported['monster'].isin(self._held_monsters).to_numpy()
+        )
+        if closed.any():
+            self._incomplete.append(self._incomplete_verzamelingen(reported[closed]))
+        self._verzamelingen.append(reported[~closed])
+
+    def _finish_step(self, step: str, bundle: Union[SpilledBundle, FrameWindows], package_name: str) -> None:
+        """Add the failures of a step to the report, after the joins deferred to the end."""
+        if step in self.RECORD_STEPS:
+            found = self._found[step].read()
+            if found is not None:
+                found = found.sort_values(['call', 'label'], kind='stable').drop(columns=['call', 'label'])
+                self.report.results.extend(
+                    ValidationResult(ValidationSection(section), *fields)
+                    for section, *fields in found.itertuples(index=False)
+                )
+
+        elif step == 'counts':
+            deferred = self._sorted(self._deferred_counts)
+            if deferred is not None:
+                aggregator = CountAggregator(self.config, self.ref_data)
+                group_by_col = aggregator.group_by_column(self.ref_data.get_validation_rules_exploded(package_name))
+                column = 'monster.lokaalid' if group_by_col == 'cleaned_lokaalid' else 'meetwaarde.lokaalid'
+                records = bundle.records_of(column, deferred['record_id'])
+                self._group_counts = aggregator.combine(
+                    self._group_counts, aggregator.group_counts(records, deferred, package_name)
+                )
+            self.count_table = CountAggregator.count_table(self._group_counts)
+            self._report_counts(package_name)
+
+        elif step == 'parameters':
+            partial = self._sorted(self._partial_rules)
+            if partial is not None:
+                records = bundle.records_of('meetwaarde.lokaalid', partial['record_id'])
+                self._check_parameters(self._with_parameters(records), package_name, partial)
+
+        elif step == 'parameter_aggregates':
+            reported = [self._verzamelingen.read()]
+            deferred = self._sorted(self._deferred_verzamelingen)
+            if deferred is not None:
+                records = bundle.records_of('meetwaarde.lokaalid', deferred['record_id'])
+                reported.append(self._verzameling_records(records, package_name, deferred))
+            reported = [frame for frame in reported if frame is not None]
+
+            incomplete = [self._incomplete.read()]
+            if reported:
+                incomplete.append(self._incomplete_verzamelingen(pd.concat(reported, ignore_index=True)))
+            incomplete = [frame for frame in incomplete if frame is not None and not frame.empty]
+            if incomplete:
+                self._report_verzamelingen(
+                    package_name,
+                    pd.concat(incomplete, ignore_index=True).sort_values(['monster', 'groep'], kind='stable')
+                )
+
+        elif step == 'rule_check':
+            no_rule = self._sorted(self._no_rule)
+            if no_rule is not None:
+                self._check_rules(no_rule)
+
+    def _capture(self, check: Callable[[], object]) -> list[tuple]:
+        """Run a record check and return its failures, tagged with report call and record position."""
+        report, self.report = self.report, ValidationReport()
+        self._tags, self._calls = [], 0
+        try:
+            check()
+            if len(self._tags) != len(self.report.results):
+                raise RuntimeError("A record check reported failures without their records")
+            return [(*tag, result) for tag, result in zip(self._tags, self.report.results)]
+        finally:
+            self.report, self._tags = report, None
+
+    def _report_records(
+        self,
+        section: ValidationSection,
+        package_name: str,
+        record_ids: pd.Series,
+        uitvalreden: str,
+        informatie: Union[str, Iterable[str]]
+    ) -> None:
+        added = len(self.report.results)
+        super()._report_records(section, package_name, record_ids, uitvalreden, informatie)
+        if self._tags is not None:
+            added = len(self.report.results) - added
+            self._tags.extend((self._calls, label) for label in record_ids.index[:added])
+            self._calls += 1
+
+    @classmethod
+    def _findings(cls, found: list[tuple]) -> pd.DataFrame:
+        """Frame (FINDING_COLUMNS) of the failures of _capture(), to spill."""
+        return pd.DataFrame(
+            [
+                (call, label, result.section.value, result.databundelcode, result.record_id,
+                 result.uitvalreden, result.informatie)
+                for call, label, result in found
+            ],
+            columns=cls.FINDING_COLUMNS
+        )
+
+    @staticmethod
+    def _in_window(away: pd.DataFrame, keys: pd.Series, window: int) -> np.ndarray:
+        """Whether all records of each key are in window; also for keys without other records."""
+        return ~keys.isin(away.loc[away['window'] == window, 'key']).to_numpy()
+
+    @staticmethod
+    def _sorted(spill: FrameSpill) -> Optional[pd.DataFrame]:
+        """Spilled rule records of the windows in record order; None without any."""
+        frame = spill.read()
+        return frame.sort_index(kind='stable') if frame is not None else None
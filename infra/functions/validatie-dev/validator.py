@@ -2,13 +2,17 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Optional
+from itertools import repeat
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional, Union
 
 import geopandas as gpd
 import numpy as np
 import pandas as pd
+import shapely
 from shapely.geometry import Point
 
+from .completeness import missing_parameters, required_parameters
+from .counts import CountAggregator
 from .report import ValidationReport, ValidationSection
 
 if TYPE_CHECKING:
@@ -21,53 +25,203 @@ class KRMValidator:
     Main validator class for KRM data bundles.
     
     Performs all validation checks and collects results into a ValidationReport.
+    
+    Validation runs as a sequence of steps (VALIDATION_STEPS); the record loops of
+    the slow steps run in chunks of config.record_chunk_rows records. A validation
+    can be stopped between steps and chunks and continued later, also by another
+    validator restored from checkpoint_state().
     """
     
+    VALIDATION_STEPS = (
+        'rules',
+        'geo_control',
+        'mandatory_columns',
+        'column_values',
+        'counts',
+        'parameters',
+        'parameter_aggregates',
+        'fixed_values',
+        'rule_check',
+        'other',
+        'date_range',
+    )
+    
+    # Tier 0: the checks that need no rule matching, locations or geometry
+    QUICK_CHECK_STEPS = ('mandatory_columns', 'fixed_values', 'other')
+    
     # Valid values for fixed-value checks
     ALLOWED_KWALITEITSOORDEEL = {'00', '03', '04', '25', '99', 0, 3, 4, 25, 99}
     ALLOWED_REFERENTIEHORIZONTAAL = {'EPSG:4258', 'EPSG4258'}
     
+    # Columns of the column value check: (data column, rule column, display name)
+    COLUMN_VALUE_CHECKS = [
+        ('grootheid.code', 'grootheid_code', 'Grootheid.code'),
+        ('typering.code', 'typering_code', 'Typering.code'),
+        ('eenheid.code', 'eenheid_code', 'Eenheid.code'),
+        ('hoedanigheid.code', 'hoedanigheid_code', 'Hoedanigheid.code'),
+        ('waardebewerkingsmethode.code', 'waardebewerkingsmethode_code', 'Waardebewerkingsmethode'),
+        ('monstercompartiment.code', 'monstercompartiment_code', 'Compartimentcode'),
+        ('bemonsteringsapparaat.omschrijving', 'bemonsteringsapparaat_omschrijving', 'Veldapparaatomschrijving'),
+        ('organisme.naam', 'organisme_naam', 'Organismenaam'),
+    ]
+    
     def __init__(self, config: "ValidationConfig", ref_data: "ReferenceDataLoader"):
         self.config = config
         self.ref_data = ref_data
         self.report = ValidationReport()
+        
+        # Intermediate results of the last validate() call, reused for reporting
+        self.rules: Optional[pd.DataFrame] = None
+        self.count_table: Optional[pd.DataFrame] = None
+        
+        # Progress: number of finished steps and the finished chunks of a record loop
+        self.completed_steps = 0
+        self._partial: dict[str, tuple[int, list]] = {}
+    
+    @property
+    def complete(self) -> bool:
+        """Whether all validation steps have run."""
+        return self.completed_steps == len(self.VALIDATION_STEPS)
     
-    def validate(self, gdf: gpd.GeoDataFrame, package_name: str) -> ValidationReport:
+    def validate(
+        self,
+        gdf: gpd.GeoDataFrame,
+        package_name: str,
+        should_stop: Optional[Callable[[], bool]] = None
+    ) -> ValidationReport:
         """
         Run all validation checks on the data bundle.
         
         Args:
             gdf: GeoDataFrame containing the data to validate
             package_name: Name of the data bundle
+            should_stop: Optional callable checked before every step and chunk; when
+                it returns True validation stops, leaving complete False. Calling
+                validate() again continues where it stopped.
             
         Returns:
             ValidationReport containing all failures found
         """
+        for _ in self.iter_steps(gdf, package_name, should_stop):
+            pass
+        return self.report
+    
+    def iter_steps(
+        self,
+        gdf: gpd.GeoDataFrame,
+        package_name: str,
+        should_stop: Optional[Callable[[], bool]] = None
+    ) -> Iterator[str]:
+        """
+        Run the validation like validate(), yielding the name of every finished step.
+        
+        The failures of a step are in self.report when its name is yielded, so they
+        can be passed on while the next steps run.
+        """
         clean_name = package_name.replace('+', ' ')
         
-        # Determine validation rules for each record
-        rules = self._determine_rules(gdf, clean_name)
-        
-        # Run all validation checks
-        self._check_geo_control(gdf, clean_name)
-        self._check_mandatory_columns(gdf, clean_name)
-        self._check_column_values(gdf, clean_name)
-        self._check_counts(gdf, clean_name, rules)
-        self._check_parameters(gdf, clean_name, rules)
-        self._check_parameter_aggregates(gdf, clean_name, rules)
-        self._check_fixed_values(gdf, clean_name)
-        self._check_rules(rules)
-        self._check_other(gdf, clean_name)
-        self._check_date_range(gdf, clean_name)
+        # Derive the parameter columns once for all checks that use them
+        prepared = self._with_parameters(gdf)
+        
+        steps = {
+            # Determine validation rules for each record
+            'rules': lambda: self._determine_rules(prepared, clean_name, should_stop),
+            # Run all validation checks
+            'geo_control': lambda: self._check_geo_control(gdf, clean_name),
+            'mandatory_columns': lambda: self._check_mandatory_columns(gdf, clean_name),
+            'column_values': lambda: self._check_column_values(gdf, clean_name, should_stop),
+            'counts': lambda: self._check_counts(gdf, clean_name, self.rules),
+            'parameters': lambda: self._check_parameters(prepared, clean_name, self.rules),
+            'parameter_aggregates': lambda: self._check_parameter_aggregates(prepared, clean_name, self.rules),
+            'fixed_values': lambda: self._check_fixed_values(gdf, clean_name),
+            'rule_check': lambda: self._check_rules(self.rules),
+            'other': lambda: self._check_other(gdf, clean_name),
+            'date_range': lambda: self._check_date_range(gdf, clean_name),
+        }
+        
+        for step in self.VALIDATION_STEPS[self.completed_steps:]:
+            if should_stop is not None and should_stop():
+                break
+            result = steps[step]()
+            if step == 'rules':
+                if result is None:
+                    break
+                self.rules = result
+            elif result is False:
+                break
+            self.completed_steps += 1
+            yield step
+    
+    def quick_check(self, df: pd.DataFrame, package_name: str) -> ValidationReport:
+        """
+        Run the tier 0 checks (QUICK_CHECK_STEPS) on the plain CSV content.
         
-        return self.report
+        The checks are vectorized column comparisons and take seconds, also on the
+        first chunk of a bundle. Their failures are returned in a separate report;
+        the report of validate() is left untouched.
+        """
+        clean_name = package_name.replace('+', ' ')
+        report, self.report = self.report, ValidationReport()
+        try:
+            self._check_mandatory_columns(df, clean_name)
+            self._check_fixed_values(df, clean_name)
+            self._check_other(df, clean_name)
+            return self.report
+        finally:
+            self.report = report
+    
+    def checkpoint_state(self) -> dict:
+        """Progress and intermediate results, to continue validation in another validator."""
+        return {
+            'completed_steps': self.completed_steps,
+            'partial': self._partial,
+            'rules': self.rules,
+            'count_table': self.count_table,
+            'results': self.report.results,
+        }
+    
+    def restore_state(self, state: dict) -> None:
+        """Continue from a checkpoint_state() of a validator of the same bundle."""
+        self.completed_steps = state['completed_steps']
+        self._partial = state['partial']
+        self.rules = state['rules']
+        self.count_table = state['count_table']
+        self.report = ValidationReport(results=list(state['results']))
+    
+    def _in_chunks(
+        self,
+        name: str,
+        df: pd.DataFrame,
+        func: Callable[[pd.DataFrame], list],
+        should_stop: Optional[Callable[[], bool]]
+    ) -> Optional[list]:
+        """
+        Run func over consecutive chunks of df and concatenate the results.
+        
+        Finished chunks are kept, so after an interruption (should_stop returned True,
+        and None is returned) the next call continues with the next chunk.
+        """
+        done, results = self._partial.pop(name, (0, []))
+        chunk_rows = self.config.record_chunk_rows
+        while done < len(df):
+            if should_stop is not None and should_stop():
+                self._partial[name] = (done, results)
+                return None
+            results.extend(func(df.iloc[done:done + chunk_rows]))
+            done = min(done + chunk_rows, len(df))
+        return results
     
     # -------------------------------------------------------------------------
     # Rule Determination
     # -------------------------------------------------------------------------
     
-    def _determine_rules(self, gdf: gpd.GeoDataFrame, package_name: str) -> pd.DataFrame:
-        """Determine which validation rule applies to each record."""
+    def _determine_rules(
+        self,
+        gdf: gpd.GeoDataFrame,
+        package_name: str,
+        should_stop: Optional[Callable[[], bool]] = None
+    ) -> Optional[pd.DataFrame]:
+        """Determine which validation rule applies to each record; None when interrupted."""
         validatieregels = self.ref_data.get_validation_rules_exploded(package_name)
         group = self.ref_data.get_groups_for_rules(package_name)
         
@@ -79,15 +233,31 @@ class KRMValidator:
             ])
         
         # Prepare data
-        df = gdf.copy()
-        df['parameter'] = df.apply(self._get_parameter_value, axis=1)
+        df = self._with_parameters(gdf)
+        df['group_parameter'] = self._group_parameter_key(df)
         df['record_id'] = df['meetwaarde.lokaalid'].str.replace('NL80_', '')
         df['locatiecode'] = df['meetobject.lokaalid'].str.replace('NL80_', '')
+        group = group.assign(parameter_key=group['parameter'].str.casefold())
         
+        records = self._in_chunks(
+            'rules', df,
+            lambda chunk: self._rule_records(chunk, package_name, validatieregels, group),
+            should_stop
+        )
+        return None if records is None else pd.DataFrame(records)
+    
+    def _rule_records(
+        self,
+        df: pd.DataFrame,
+        package_name: str,
+        validatieregels: pd.DataFrame,
+        group: pd.DataFrame
+    ) -> list[dict]:
+        """Rule determination result of each record of the prepared data, in order."""
         results = []
         for _, row in df.iterrows():
             matched_rules = self._find_matching_rules(row, validatieregels, group)
-            found_group = group[group['parameter'].str.lower() == row['parameter']]
+            found_group = group[group['parameter_key'] == row['group_parameter']]
             
             results.append({
                 'databundelcode': package_name,
@@ -99,7 +269,7 @@ class KRMValidator:
                 'monster_identificatie': row['monster.lokaalid']
             })
         
-        return pd.DataFrame(results)
+        return results
     
     def _find_matching_rules(
         self,
@@ -109,7 +279,7 @@ class KRMValidator:
     ) -> list[int]:
         """Find all validation rules that match a data row."""
         matched = []
-        found_group = group[group['parameter'].str.lower() == row['parameter']]
+        found_group = group[group['parameter_key'] == row['group_parameter']]
         begindatum = pd.to_datetime(row.get('begindatum'), errors='coerce', format='mixed')
         
         for idx, rule in validatieregels.iterrows():
@@ -152,7 +322,7 @@ class KRMValidator:
             return False
         
         # Group check
-        if not (len(found_group) >= 1 or pd.isna(row['parameter'])):
+        if not (len(found_group) >= 1 or pd.isna(row['group_parameter'])):
             return False
         
         # Date range check
@@ -176,7 +346,7 @@ class KRMValidator:
     
     def _check_geo_control(self, gdf: gpd.GeoDataFrame, package_name: str) -> None:
         """Check geographic validity of locations."""
-        location_gdf = self.ref_data.location_gdf
+        location_gdf = self.ref_data.projected_location_gdf
         valid_locations = self.ref_data.location_identifiers
         
         # Prepare data
@@ -190,14 +360,11 @@ class KRMValidator:
         
         # Check for unknown locations
         unknown_mask = ~gdf_array['cleaned_id'].isin(valid_locations)
-        for _, row in gdf_array[unknown_mask].iterrows():
-            self.report.add(
-                section=ValidationSection.GEO_CONTROL,
-                databundelcode=package_name,
-                record_id=row['meetwaarde.lokaalid'],
-                uitvalreden='onbekende locatie',
-                informatie=f"onbekende locatie: {row['locatiecode']}"
-            )
+        self._report_records(
+            ValidationSection.GEO_CONTROL, package_name, gdf_array.loc[unknown_mask, 'meetwaarde.lokaalid'],
+            'onbekende locatie',
+            (f"onbekende locatie: {locatiecode}" for locatiecode in gdf_array.loc[unknown_mask, 'locatiecode'])
+        )
         
         # Check distances for known locations
         self._check_location_distances(gdf_array, location_gdf, package_name)
@@ -209,11 +376,14 @@ class KRMValidator:
         package_name: str
     ) -> None:
         """Check if data points are within threshold distance of reference locations."""
-        # Project to UTM for accurate distance calculation
-        gdf_proj = location_gdf.to_crs("EPSG:32631")
-        gdf_array_proj = gdf_array.to_crs("EPSG:32631")
-        
-        merged = gdf_array_proj.merge(
+        # Project to UTM for accurate distance calculation; the reference locations
+        # usually come pre-projected from the reference data loader
+        distance_crs = self.config.distance_crs
+        gdf_proj = location_gdf if location_gdf.crs == distance_crs else location_gdf.to_crs(distance_crs)
+        gdf_array_proj = gdf_array.to_crs(distance_crs)
+        
+        # The merge drops the index; keep the record labels for the report
+        merged = gdf_array_proj.assign(record_label=gdf_array_proj.index).merge(
             gdf_proj[['MPNIDENT', 'geometry']],
             left_on='cleaned_id',
             right_on='MPNIDENT',
@@ -222,16 +392,17 @@ class KRMValidator:
         
         max_distance = self.config.max_location_distance_m
         
-        for _, row in merged.iterrows():
-            distance = row['geometry_array'].distance(row['geometry_shapefile'])
-            if distance > max_distance:
-                self.report.add(
-                    section=ValidationSection.GEO_CONTROL,
-                    databundelcode=package_name,
-                    record_id=row['meetwaarde.lokaalid'],
-                    uitvalreden='locatie verder dan 100 meter',
-                    informatie=f"afstand van locatie: {row['locatiecode']}: {int(distance)}m"
-                )
+        distance = shapely.distance(
+            merged['geometry_array'].to_numpy(), merged['geometry_shapefile'].to_numpy()
+        )
+        too_far = merged[distance > max_distance]
+        self._report_records(
+            ValidationSection.GEO_CONTROL, package_name,
+            too_far['meetwaarde.lokaalid'].set_axis(too_far['record_label']),
+            'locatie verder dan 100 meter',
+            (f"afstand van locatie: {locatiecode}: {int(d)}m"
+             for locatiecode, d in zip(too_far['locatiecode'], distance[distance > max_distance]))
+        )
     
     def _check_mandatory_columns(self, gdf: gpd.GeoDataFrame, package_name: str) -> None:
         """Check that mandatory columns are not empty."""
@@ -243,57 +414,70 @@ class KRMValidator:
                 continue
             
             missing_mask = gdf[col].isna()
-            for _, row in gdf[missing_mask].iterrows():
-                self.report.add(
-                    section=ValidationSection.COLUMN_CHECK,
-                    databundelcode=package_name,
-                    record_id=row['meetwaarde.lokaalid'],
-                    uitvalreden='verplichte kolom is leeg',
-                    informatie=f"geen waarde in bestand voor: {col}"
-                )
+            self._report_records(
+                ValidationSection.COLUMN_CHECK, package_name, gdf.loc[missing_mask, 'meetwaarde.lokaalid'],
+                'verplichte kolom is leeg', f"geen waarde in bestand voor: {col}"
+            )
     
-    def _check_column_values(self, gdf: gpd.GeoDataFrame, package_name: str) -> None:
-        """Check that column values match validation rules."""
-        rules = self.ref_data.get_validation_rules(package_name)
+    def _check_column_values(
+        self,
+        gdf: gpd.GeoDataFrame,
+        package_name: str,
+        should_stop: Optional[Callable[[], bool]] = None
+    ) -> bool:
+        """Check that column values match validation rules; False when interrupted."""
+        rules = self._column_value_rules(package_name)
         if rules.empty:
-            return
+            return True
         
         df = gdf.copy()
         df['locatiecode'] = df['meetobject.lokaalid'].str.replace('NL80_', '')
         
-        # Columns to validate
-        check_columns = [
-            ('grootheid.code', 'grootheid_code', 'Grootheid.code'),
-            ('typering.code', 'typering_code', 'Typering.code'),
-            ('eenheid.code', 'eenheid_code', 'Eenheid.code'),
-            ('hoedanigheid.code', 'hoedanigheid_code', 'Hoedanigheid.code'),
-            ('waardebewerkingsmethode.code', 'waardebewerkingsmethode_code', 'Waardebewerkingsmethode'),
-            ('monstercompartiment.code', 'monstercompartiment_code', 'Compartimentcode'),
-            ('bemonsteringsapparaat.omschrijving', 'bemonsteringsapparaat_omschrijving', 'Veldapparaatomschrijving'),
-            ('organisme.naam', 'organisme_naam', 'Organismenaam'),
-        ]
+        findings = self._in_chunks(
+            'column_values', df, lambda chunk: self._column_value_findings(chunk, rules), should_stop
+        )
+        if findings is None:
+            return False
         
-        # Ensure rule columns are strings
-        for _, rule_col, _ in check_columns:
+        labels, record_ids, informatie = zip(*findings) if findings else ((), (), ())
+        self._report_records(
+            ValidationSection.COLUMN_VALUE, package_name,
+            pd.Series(record_ids, index=pd.Index(labels), dtype=object), 'ongeldige code', informatie
+        )
+        return True
+    
+    def _column_value_rules(self, package_name: str) -> pd.DataFrame:
+        """Validation rules of the bundle with the checked rule columns as strings."""
+        rules = self.ref_data.get_validation_rules(package_name)
+        for _, rule_col, _ in self.COLUMN_VALUE_CHECKS:
             if rule_col in rules.columns:
                 rules[rule_col] = rules[rule_col].astype(str)
+        return rules
+    
+    def _column_value_findings(self, df: pd.DataFrame, rules: pd.DataFrame) -> list[tuple]:
+        """
+        Records with a column value that no validation rule allows.
         
+        Returns:
+            (index label, record id, informatie) per failing record, in record order;
+            at most one finding per record
+        """
+        check_columns = self.COLUMN_VALUE_CHECKS
         total_rules = len(rules)
+        findings = []
         
-        for _, row in df.iterrows():
+        for label, row in df.iterrows():
             mismatch_counts = self._count_mismatches(row, rules, check_columns)
             
             # Find column that fails all rules
             for data_col, rule_col, display_name in check_columns:
                 if mismatch_counts.get(data_col, 0) == total_rules:
                     valid_values = ','.join(rules[rule_col].unique())
-                    self.report.add(
-                        section=ValidationSection.COLUMN_VALUE,
-                        databundelcode=package_name,
-                        record_id=row['meetwaarde.lokaalid'],
-                        uitvalreden='ongeldige code',
-                        informatie=f"{display_name} '{row[data_col]}' niet in: {{{valid_values}}}"
-                    )
+                    findings.append((
+                        label,
+                        row['meetwaarde.lokaalid'],
+                        f"{display_name} '{row[data_col]}' niet in: {{{valid_values}}}"
+                    ))
                     break
             else:
                 # Check location code separately
@@ -303,13 +487,13 @@ class KRMValidator:
                 )
                 if loc_mismatches == total_rules:
                     valid_locs = ','.join(rules['locatiecode'].astype(str).unique())
-                    self.report.add(
-                        section=ValidationSection.COLUMN_VALUE,
-                        databundelcode=package_name,
-                        record_id=row['meetwaarde.lokaalid'],
-                        uitvalreden='ongeldige code',
-                        informatie=f"Locatiecode '{row['locatiecode']}' niet in: {{{valid_locs}}}"
-                    )
+                    findings.append((
+                        label,
+                        row['meetwaarde.lokaalid'],
+                        f"Locatiecode '{row['locatiecode']}' niet in: {{{valid_locs}}}"
+                    ))
+        
+        return findings
     
     def _check_counts(
         self,
@@ -321,87 +505,25 @@ class KRMValidator:
         Check record counts against expected values.
         
         Validates that the number of records (monsters or tijdwaarden) matches
-        the expected count defined in validation rules.
+        the expected count defined in validation rules. The count table is kept
+        in self.count_table for the count report.
         """
-        validatie_regels = self.ref_data.get_validation_rules_exploded(package_name)
-        group = self.ref_data.get_groups_for_rules(package_name)
-        
-        if validatie_regels.empty or rules.empty:
-            return
-        
-        # Prepare data
-        df = gdf.copy()
-        df['cleaned_lokaalid'] = df['monster.lokaalid'].str.replace('NL80_', '')
-        df['cleaned_meetwaarde_lokaalid'] = df['meetwaarde.lokaalid'].str.replace('NL80_', '')
-        df['locatiecode'] = df['meetobject.lokaalid'].str.replace('NL80_', '')
-        df['recordnr_monster'] = df['cleaned_meetwaarde_lokaalid'].rank(method='dense').astype(int)
-        
-        # Filter to rules with valid validatieregel
-        filtered_rules = rules.dropna(subset=['validatieregel'])
-        
-        if filtered_rules.empty:
-            return
-        
-        # Merge rules with validation rules to get count expectations
-        merged = filtered_rules.merge(
-            validatie_regels,
-            left_on='validatieregel',
-            right_index=True,
-            how='inner'
-        )
-        
-        # Determine grouping column based on validation rule setting
-        group_by_col = 'cleaned_meetwaarde_lokaalid'
-        if not validatie_regels.empty:
-            group_by_setting = str(validatie_regels.iloc[0].get("group_by", "")).strip()
-            if group_by_setting == 'monster.lokaalid':
-                group_by_col = 'cleaned_lokaalid'
-        
-        # Merge with original data
-        merged_with_df = merged.merge(
-            df,
-            left_on='record_id',
-            right_on=group_by_col
+        self.count_table = CountAggregator(self.config, self.ref_data).aggregate(
+            gdf, rules, package_name
         )
-        
-        if merged_with_df.empty:
-            return
-        
-        # Group and count
-        grouped = merged_with_df.groupby([
-            "validatieregel",
-            "databundelcode_x",
-            "locatiecode_y",
-            "locatiecode_x"
-        ])
-        
-        for group_key, group_df in grouped:
-            aantal_dat = len(group_df)
-            aantal_val = group_df['aantal'].iloc[0]
-            limiet = group_df['limiet'].iloc[0]
-            record_id = group_df['record_id_x'].iloc[0] if 'record_id_x' in group_df.columns else group_df['record_id'].iloc[0]
-            
-            # Determine record type
-            recordnr_monster = group_df['recordnr_monster'].iloc[0] if 'recordnr_monster' in group_df.columns else 0
-            soort = "tijdwaarden" if recordnr_monster == 0 else "monsters"
-            
-            # Check count against limit
-            uitvalreden = ""
-            if limiet == "<=" and aantal_dat > aantal_val:
-                uitvalreden = f"aantal {soort} groter dan verwacht"
-            elif limiet == ">=" and aantal_dat < aantal_val:
-                uitvalreden = f"aantal {soort} kleiner dan verwacht"
-            elif limiet == "=" and aantal_dat != aantal_val:
-                uitvalreden = f"aantal {soort} ongelijk aan verwachting"
-            
-            if uitvalreden:
-                self.report.add(
-                    section=ValidationSection.COUNT_CHECK,
-                    databundelcode=package_name,
-                    record_id=record_id,
-                    uitvalreden=uitvalreden,
-                    informatie=f"aantal datarecords: {aantal_dat}. aantal verwacht: {limiet} {aantal_val}"
-                )
+        self._report_counts(package_name)
+    
+    def _report_counts(self, package_name: str) -> None:
+        """Add the count failures of self.count_table to the report."""
+        failures = self.count_table[self.count_table['uitvalreden'] != ""]
+        for row in failures.itertuples(index=False):
+            self.report.add(
+                section=ValidationSection.COUNT_CHECK,
+                databundelcode=package_name,
+                record_id=row.record_id,
+                uitvalreden=row.uitvalreden,
+                informatie=f"aantal datarecords: {row.aantaldat}. aantal verwacht: {row.limiet} {row.aantalval}"
+            )
     
     def _check_parameters(
         self,
@@ -422,19 +544,11 @@ class KRMValidator:
             return
         
         # Prepare data
-        df = gdf.copy()
+        df = self._with_parameters(gdf)
         df['cleaned_lokaalid'] = df['monster.lokaalid'].str.replace('NL80_', '')
         df['cleaned_meetwaarde_lokaalid'] = df['meetwaarde.lokaalid'].str.replace('NL80_', '')
         df['locatiecode'] = df['meetobject.lokaalid'].str.replace('NL80_', '')
         
-        # Build parameter column
-        df['parameter'] = df.apply(
-            lambda row: row['biotaxon.naam'] if pd.notna(row['biotaxon.naam']) and pd.isna(row['parameter.code'])
-            else (row['parameter.code'] if pd.notna(row['parameter.code']) and pd.isna(row['biotaxon.naam'])
-                  else f"{row['parameter.code']} / {row['biotaxon.naam']}"),
-            axis=1
-        )
-        
         # Explode validation rules by location code
         validatie_regels = validatie_regels.dropna(subset=["locatiecode"])
         validatie_regels["locatiecode"] = validatie_regels["locatiecode"].str.split(";")
@@ -475,22 +589,19 @@ class KRMValidator:
         # Add lowercase group column
         merged_with_regels['val_groep'] = merged_with_regels['groep'].str.lower()
         
-        # Filter out rows where parameter is "nan / nan" and val_groep is empty
-        filtered_df = merged_with_regels[
-            ~((merged_with_regels['parameter'] == "nan / nan") & 
-              (merged_with_regels['val_groep'].isna()))
-        ]
+        # Records without parameter code and taxon have nothing to check
+        filtered_df = merged_with_regels[merged_with_regels['parameter_key'].notna()]
         
         # Check if parameters exist in the group list
-        group_params_lower = set(group['parameter'].str.lower().dropna())
+        group_params = set(group['parameter'].str.casefold().dropna())
         
         for _, row in filtered_df.iterrows():
-            param = str(row['parameter']).lower() if pd.notna(row['parameter']) else ''
+            param = row['parameter_key']
             val_groep = row['val_groep'] if pd.notna(row['val_groep']) else ''
             
             # Check if parameter exists in any group
-            if param and param != 'nan' and param != 'nan / nan':
-                if param not in group_params_lower:
+            if param:
+                if param not in group_params:
                     record_id = row.get('record_id_x', row.get('record_id', ''))
                     self.report.add(
                         section=ValidationSection.PARAMETER_CHECK,
@@ -509,135 +620,120 @@ class KRMValidator:
         """
         Check parameter aggregates (verzamelingen).
         
-        Validates that when a parameter belongs to a collection (verzameling),
-        all required parameters from that collection are present.
+        Validates that when a monster belongs to a collection (verzameling), all
+        required parameters from that collection's group are present. One failure is
+        reported per incomplete monster and group, listing the missing parameters.
+        """
+        reported = self._verzameling_records(gdf, package_name, rules)
+        if reported is not None:
+            self._report_verzamelingen(package_name, self._incomplete_verzamelingen(reported))
+    
+    def _verzameling_records(
+        self,
+        gdf: gpd.GeoDataFrame,
+        package_name: str,
+        rules: pd.DataFrame
+    ) -> Optional[pd.DataFrame]:
+        """
+        Records with a determined rule, with their monster, groep, betreftverzameling
+        and parameter_key; None when there are none.
         """
         validatie_regels = self.ref_data.get_validation_rules(package_name)
-        group = self.ref_data.group.copy()
         
-        if validatie_regels.empty or rules.empty:
-            return
-        
-        # Prepare data
-        df = gdf.copy()
-        df['parameter'] = df.apply(
-            lambda row: row['biotaxon.naam'] if pd.notna(row['biotaxon.naam']) and pd.isna(row['parameter.code'])
-            else (row['parameter.code'] if pd.notna(row['parameter.code']) and pd.isna(row['biotaxon.naam'])
-                  else f"{row['parameter.code']} / {row['biotaxon.naam']}"),
-            axis=1
-        )
+        if validatie_regels.empty or rules.empty or 'monster_identificatie' not in rules.columns:
+            return None
         
         # Adjust validation rules index
         validatie_regels.index = validatie_regels.index + 2
         
-        # Filter rules with valid validatieregel
-        filtered_rules = rules.dropna(subset=['validatieregel'])
-        
-        if filtered_rules.empty:
-            return
-        
-        # Merge rules with validation rules
+        # Records with a determined rule and no errors, with the group of their rule
+        filtered_rules = rules[rules['validatieregel'].notna() & (rules['uitvalreden'] == 0)]
         merged = filtered_rules.merge(
-            validatie_regels,
+            validatie_regels[['groep']],
             left_on='validatieregel',
             right_index=True,
             how='inner'
         )
         
         if merged.empty:
-            return
-        
-        # Merge with group data
-        merged_with_group = merged.merge(
-            group,
-            how='left',
-            left_on='groep',
-            right_on='groep'
-        )
+            return None
         
-        # Filter for verzameling records with no errors
-        verzamelingen = merged_with_group[
-            (merged_with_group['betreftverzameling'] == 1) &
-            (merged_with_group['uitvalreden'] == 0)
-        ]
-        
-        if verzamelingen.empty:
-            return
-        
-        # Group by groep and parameter
-        verzamelingen = verzamelingen.assign(
-            group_lower=verzamelingen['groep'].str.lower(),
-            parameter_lower=verzamelingen['parameter_y'].str.lower() if 'parameter_y' in verzamelingen.columns 
-                           else verzamelingen['parameter'].str.lower()
+        # Add the parameter key of each record
+        df = self._with_parameters(gdf)
+        df['record_id'] = df['meetwaarde.lokaalid'].str.replace('NL80_', '')
+        reported = merged[['record_id', 'monster_identificatie', 'groep', 'betreftverzameling']].merge(
+            df[['record_id', 'parameter_key']].drop_duplicates('record_id'),
+            on='record_id'
         )
+        reported['monster'] = reported['monster_identificatie'].astype(str).str.replace('NL80_', '')
+        return reported
+    
+    def _incomplete_verzamelingen(self, reported: pd.DataFrame) -> pd.DataFrame:
+        """
+        Monsters and groups of a verzameling with missing parameters.
         
-        grouped = verzamelingen.groupby(['groep', 'parameter_lower']).agg({
-            'record_id': 'min',
-            'databundelcode_x': 'min'
-        }).reset_index()
-        
-        # Get all parameters in groups (lowercase for comparison)
-        group_params = set(group['parameter'].str.lower().dropna())
-        
-        # Find missing parameters
-        for _, row in grouped.iterrows():
-            param = row['parameter_lower']
-            if pd.notna(param) and param not in group_params:
-                self.report.add(
-                    section=ValidationSection.PARAMETER_AGGREGATE,
-                    databundelcode=package_name,
-                    record_id=row['record_id'],
-                    uitvalreden='ontbrekende parameter',
-                    informatie=f'parameter "{param}" uit groep "{row["groep"]}" niet gevonden'
-                )
+        Returns:
+            DataFrame with monster, groep, missing and the first record_id, ordered
+            by monster and groep
+        """
+        # Only monsters with a record in a verzameling are checked
+        in_verzameling = reported.groupby(['monster', 'groep'])['betreftverzameling'].transform('max') == 1
+        reported = reported[in_verzameling]
+        
+        if reported.empty:
+            return pd.DataFrame(columns=['monster', 'groep', 'missing', 'record_id'])
+        
+        missing = missing_parameters(reported, required_parameters(self.ref_data.group))
+        first_record = reported.groupby(['monster', 'groep'])['record_id'].min()
+        return missing.assign(record_id=first_record.reindex(
+            pd.MultiIndex.from_frame(missing[['monster', 'groep']])
+        ).to_numpy())
+    
+    def _report_verzamelingen(self, package_name: str, incomplete: pd.DataFrame) -> None:
+        """Add a failure per incomplete monster and group of _incomplete_verzamelingen()."""
+        for row in incomplete.itertuples(index=False):
+            names = ', '.join(f'"{name}"' for name in row.missing)
+            self.report.add(
+                section=ValidationSection.PARAMETER_AGGREGATE,
+                databundelcode=package_name,
+                record_id=row.record_id,
+                uitvalreden='ontbrekende parameter',
+                informatie=f'parameter(s) {names} uit groep "{row.groep}" niet gevonden in monster "{row.monster}"'
+            )
     
     def _check_fixed_values(self, gdf: gpd.GeoDataFrame, package_name: str) -> None:
         """Check fixed value constraints."""
-        df = gdf.copy()
+        record_ids = gdf['meetwaarde.lokaalid']
         
         # Kwaliteitsoordeel check
-        invalid_mask = ~df['kwaliteitsoordeel.code'].isin(self.ALLOWED_KWALITEITSOORDEEL)
-        for _, row in df[invalid_mask].iterrows():
-            self.report.add(
-                section=ValidationSection.VALUE_CHECK,
-                databundelcode=package_name,
-                record_id=row['meetwaarde.lokaalid'],
-                uitvalreden='vaste waarde ongeldig',
-                informatie=f'Kwaliteitsoordeel "{row["kwaliteitsoordeel.code"]}" niet in (00,03,04,25,99)'
-            )
+        invalid_mask = ~gdf['kwaliteitsoordeel.code'].isin(self.ALLOWED_KWALITEITSOORDEEL)
+        self._report_records(
+            ValidationSection.VALUE_CHECK, package_name, record_ids[invalid_mask], 'vaste waarde ongeldig',
+            (f'Kwaliteitsoordeel "{code}" niet in (00,03,04,25,99)'
+             for code in gdf.loc[invalid_mask, 'kwaliteitsoordeel.code'])
+        )
         
         # Namespace check
-        invalid_mask = df['namespace'] != 'NL80'
-        for _, row in df[invalid_mask].iterrows():
-            self.report.add(
-                section=ValidationSection.VALUE_CHECK,
-                databundelcode=package_name,
-                record_id=row['meetwaarde.lokaalid'],
-                uitvalreden='vaste waarde ongeldig',
-                informatie=f'Namespace "{row["namespace"]}" ongelijk aan "NL80"'
-            )
+        invalid_mask = gdf['namespace'] != 'NL80'
+        self._report_records(
+            ValidationSection.VALUE_CHECK, package_name, record_ids[invalid_mask], 'vaste waarde ongeldig',
+            (f'Namespace "{namespace}" ongelijk aan "NL80"' for namespace in gdf.loc[invalid_mask, 'namespace'])
+        )
         
         # Reference horizontal check
-        invalid_mask = ~df['referentiehorizontaal.code'].isin(self.ALLOWED_REFERENTIEHORIZONTAAL)
-        for _, row in df[invalid_mask].iterrows():
-            self.report.add(
-                section=ValidationSection.VALUE_CHECK,
-                databundelcode=package_name,
-                record_id=row['meetwaarde.lokaalid'],
-                uitvalreden='vaste waarde ongeldig',
-                informatie=f'Referentiehorizontaal.code "{row["referentiehorizontaal.code"]}" ongelijk aan "EPSG:4258"'
-            )
+        invalid_mask = ~gdf['referentiehorizontaal.code'].isin(self.ALLOWED_REFERENTIEHORIZONTAAL)
+        self._report_records(
+            ValidationSection.VALUE_CHECK, package_name, record_ids[invalid_mask], 'vaste waarde ongeldig',
+            (f'Referentiehorizontaal.code "{code}" ongelijk aan "EPSG:4258"'
+             for code in gdf.loc[invalid_mask, 'referentiehorizontaal.code'])
+        )
         
         # Analysecompartiment should be empty
-        invalid_mask = df['analysecompartiment.code'].notna()
-        for _, row in df[invalid_mask].iterrows():
-            self.report.add(
-                section=ValidationSection.VALUE_CHECK,
-                databundelcode=package_name,
-                record_id=row['meetwaarde.lokaalid'],
-                uitvalreden='vaste waarde ongeldig',
-                informatie='analysecompartiment_code is niet leeg'
-            )
+        invalid_mask = gdf['analysecompartiment.code'].notna()
+        self._report_records(
+            ValidationSection.VALUE_CHECK, package_name, record_ids[invalid_mask], 'vaste waarde ongeldig',
+            'analysecompartiment_code is niet leeg'
+        )
     
     def _check_rules(self, rules: pd.DataFrame) -> None:
         """Check that all records have a matching validation rule."""
@@ -654,29 +750,21 @@ class KRMValidator:
     
     def _check_other(self, gdf: gpd.GeoDataFrame, package_name: str) -> None:
         """Run miscellaneous validation checks."""
-        df = gdf.copy()
+        record_ids = gdf['meetwaarde.lokaalid']
         
         # Both numeric and alphanumeric values missing
-        missing_mask = df['numeriekewaarde'].isna() & df['alfanumeriekewaarde'].isna()
-        for _, row in df[missing_mask].iterrows():
-            self.report.add(
-                section=ValidationSection.OTHER_CHECK,
-                databundelcode=package_name,
-                record_id=row['meetwaarde.lokaalid'],
-                uitvalreden='waarde ontbreekt',
-                informatie='numerieke EN alfanumerieke waarde zijn leeg'
-            )
+        missing_mask = gdf['numeriekewaarde'].isna() & gdf['alfanumeriekewaarde'].isna()
+        self._report_records(
+            ValidationSection.OTHER_CHECK, package_name, record_ids[missing_mask], 'waarde ontbreekt',
+            'numerieke EN alfanumerieke waarde zijn leeg'
+        )
         
         # Invalid limit symbols
-        invalid_mask = df['limietsymbool'].notna() & ~df['limietsymbool'].isin(['<', '>'])
-        for _, row in df[invalid_mask].iterrows():
-            self.report.add(
-                section=ValidationSection.OTHER_CHECK,
-                databundelcode=package_name,
-                record_id=row['meetwaarde.lokaalid'],
-                uitvalreden='limietsymbool ongeldig',
-                informatie='limietsymbool dient leeg te zijn of < of >'
-            )
+        invalid_mask = gdf['limietsymbool'].notna() & ~gdf['limietsymbool'].isin(['<', '>'])
+        self._report_records(
+            ValidationSection.OTHER_CHECK, package_name, record_ids[invalid_mask], 'limietsymbool ongeldig',
+            'limietsymbool dient leeg te zijn of < of >'
+        )
     
     def _check_date_range(self, gdf: gpd.GeoDataFrame, package_name: str) -> None:
         """Check that dates fall within valid range."""
@@ -688,33 +776,116 @@ class KRMValidator:
         max_end = pd.to_datetime(rules['einddatum'], dayfirst=True).max()
         
         df = gdf.copy()
-        df['begindatum'] = pd.to_datetime(df['begindatum'], format='mixed')
+        df['begindatum'] = self._parse_dates(df['begindatum'])
         
         out_of_range = ~df['begindatum'].between(min_start, max_end)
-        for _, row in df[out_of_range].iterrows():
-            self.report.add(
-                section=ValidationSection.DATE_RANGE,
-                databundelcode=package_name,
-                record_id=row['meetwaarde.lokaalid'],
-                uitvalreden='datum valt buiten bereik',
-                informatie=(
-                    f"{row['begindatum'].strftime('%d-%m-%Y')} valt buiten datumbereik "
-                    f"validatieregels ({min_start.strftime('%d-%m-%Y')} tm {max_end.strftime('%d-%m-%Y')})"
-                )
-            )
+        self._report_records(
+            ValidationSection.DATE_RANGE, package_name, df.loc[out_of_range, 'meetwaarde.lokaalid'],
+            'datum valt buiten bereik',
+            (f"{begindatum.strftime('%d-%m-%Y')} valt buiten datumbereik "
+             f"validatieregels ({min_start.strftime('%d-%m-%Y')} tm {max_end.strftime('%d-%m-%Y')})"
+             for begindatum in df.loc[out_of_range, 'begindatum'])
+        )
     
     # -------------------------------------------------------------------------
     # Helper Methods
     # -------------------------------------------------------------------------
     
+    def _report_records(
+        self,
+        section: ValidationSection,
+        package_name: str,
+        record_ids: pd.Series,
+        uitvalreden: str,
+        informatie: Union[str, Iterable[str]]
+    ) -> None:
+        """
+        Add a failure per record; informatie is one text for all or one per record.
+        
+        The record checks report all their failures through here, with record_ids
+        indexed by the labels of the failing records.
+        """
+        if isinstance(informatie, str):
+            informatie = repeat(informatie)
+        for record_id, info in zip(record_ids, informatie):
+            self.report.add(
+                section=section,
+                databundelcode=package_name,
+                record_id=record_id,
+                uitvalreden=uitvalreden,
+                informatie=info
+            )
+    
     @staticmethod
-    def _get_parameter_value(row: pd.Series) -> Optional[str]:
-        """Extract parameter value from row."""
-        if pd.notna(row['biotaxon.naam']) and pd.isna(row['parameter.code']):
-            return str(row['biotaxon.naam']).lower()
-        elif pd.notna(row['parameter.code']) and pd.isna(row['biotaxon.naam']):
-            return str(row['parameter.code']).lower()
-        return np.nan
+    def _parameter_columns(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Derive the parameter of each record.
+        
+        'parameter' is the display value: the taxon or the parameter code when only
+        one of them is set, "code / taxon" when both are set and missing when neither
+        is. 'parameter_key' is its case-folded variant for comparisons with the group
+        list. Both are categorical.
+        """
+        code = df['parameter.code']
+        taxon = df['biotaxon.naam']
+        has_code = code.notna().to_numpy()
+        has_taxon = taxon.notna().to_numpy()
+        code_text = code.astype(str).to_numpy(dtype=object)
+        taxon_text = taxon.astype(str).to_numpy(dtype=object)
+        
+        display = pd.Series(
+            np.select(
+                [has_taxon & ~has_code, has_code & ~has_taxon, has_code & has_taxon],
+                [taxon_text, code_text, code_text + " / " + taxon_text],
+                default=None
+            ),
+            index=df.index,
+            dtype='category'
+        )
+        return pd.DataFrame({
+            'parameter': display,
+            'parameter_key': display.str.casefold().astype('category'),
+        })
+    
+    @classmethod
+    def _with_parameters(cls, gdf: pd.DataFrame) -> pd.DataFrame:
+        """Copy of the data with the parameter columns, derived only if not present yet."""
+        if 'parameter_key' in gdf.columns:
+            return gdf.copy()
+        df = gdf.copy()
+        df[['parameter', 'parameter_key']] = cls._parameter_columns(df)
+        return df
+    
+    @staticmethod
+    def _parse_dates(values: pd.Series, errors: str = 'raise') -> pd.Series:
+        """Parse a date column; a categorical one (see categorize_codes) once per category."""
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            return pd.to_datetime(values, format='mixed', errors=errors)
+        dates = pd.to_datetime(values.cat.categories, format='mixed', errors=errors)
+        return pd.Series(
+            dates.take(values.cat.codes.to_numpy(), allow_fill=True, fill_value=pd.NaT),
+            index=values.index,
+            name=values.name
+        )
+    
+    @staticmethod
+    def _group_parameter_key(df: pd.DataFrame) -> pd.Series:
+        """
+        Parameter key to look up in the group list during rule determination.
+        
+        Only set when exactly one of parameter code and taxon is set; a code/taxon
+        combination (e.g. a substance measured in a species) is matched on the rule
+        columns instead.
+        """
+        single = df['parameter.code'].isna().to_numpy() ^ df['biotaxon.naam'].isna().to_numpy()
+        return df['parameter_key'].where(single)
+    
+    @classmethod
+    def _get_parameter_value(cls, row: pd.Series) -> Optional[str]:
+        """Group-list parameter key of a single record."""
+        df = cls._with_parameters(row.to_frame().T)
+        key = cls._group_parameter_key(df).iloc[0]
+        return np.nan if pd.isna(key) else key
     
     @staticmethod
     def _values_match(data_value, rule_value) -> bool:
@@ -0,0 +1,268 @@
+"""
+Long-running queue worker for backfills and reprocessing.
+
+Polls an SQS queue (or a local stand-in such as LocalStack or ElasticMQ) for data
+bundle jobs and runs process_data_bundle for each, without Lambda cold starts: the
+worker processes load the reference data (tables, location frames) once and keep
+it, with their clients, for all jobs. A message is either an S3 event notification,
+as S3 sends it to a queue, or a job of its own:
+
+    {"bucket": "krm-validatie-data-dev", "key": "input/<bundle>.zip"}
+
+At most `concurrency` bundles are validated at the same time. A message is deleted
+only after all outputs of its bundles have been uploaded and their publication
+notifications sent; the visibility of in-flight messages is extended while they
+run. A failed job is not deleted, so it is retried after the visibility timeout (or
+moved to the queue's dead-letter queue).
+
+The publication notifications of bundles that finish close together are sent in
+one send_message_batch call: they are held for at most
+config.publish_max_delay_s, or until SQS_BATCH_SIZE of them are waiting.
+
+Run with:
+
+    python -m krm_validator.worker --queue-url http://localhost:4566/000000000000/krm-validatie-jobs
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, Optional
+from urllib.parse import unquote_plus
+
+import boto3
+
+from .config import ValidationConfig
+from .s3_functions import SQS_BATCH_SIZE, publish_batch_to_sqs
+
+if TYPE_CHECKING:
+    from .reference_data import ReferenceDataLoader
+
+
+def parse_jobs(body: str) -> list[tuple[str, str]]:
+    """
+    (bucket, key) of the bundles in a message body; empty for messages without a
+    job, such as the s3:TestEvent S3 sends when the notification is configured.
+    """
+    message = json.loads(body)
+    if 'Records' in message:
+        return [
+            (record['s3']['bucket']['name'], unquote_plus(record['s3']['object']['key']))
+            for record in message['Records']
+            if record.get('eventName', 'ObjectCreated').startswith('ObjectCreated')
+        ]
+    if 'bucket' in message and 'key' in message:
+        return [(message['bucket'], message['key'])]
+    return []
+
+
+# Reference data of a worker, loaded once by _init_worker
+_worker_ref_data: Optional["ReferenceDataLoader"] = None
+
+
+def _init_worker(config: ValidationConfig) -> None:
+    from .reference_data import ReferenceDataLoader
+
+    global _worker_ref_data
+    _worker_ref_data = ReferenceDataLoader(config)
+    _worker_ref_data.preload()
+
+
+def run_jobs(
+    config: ValidationConfig,
+    jobs: list[tuple[str, str]]
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """
+    Process the bundles of one message with the worker's reference data.
+
+    Returns:
+        The processing results and the publication notifications, which are left
+        to the worker to send in batches
+    """
+    from .handler import process_data_bundle
+
+    notifications: list[dict[str, Any]] = []
+    results = [
+        process_data_bundle(config, bucket_name, key, ref_data=_worker_ref_data, notify=notifications.append)
+        for bucket_name, key in jobs
+    ]
+    return results, notifications
+
+
+class QueueWorker:
+    """
+    Pulls bundle jobs from an SQS queue and validates them with bounded concurrency.
+
+    With a concurrency above 1 the bundles are validated in worker processes (the
+    validation is CPU bound); with 1 in a single worker thread.
+    """
+
+    def __init__(
+        self,
+        config: ValidationConfig,
+        queue_url: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        wait_seconds: int = 20,
+        visibility_timeout: int = 900,
+    ):
+        self.config = config
+        self.queue_url = queue_url or config.worker_queue_url
+        if not self.queue_url:
+            raise ValueError("No queue URL; pass one or set KRM_WORKER_QUEUE_URL")
+        self.concurrency = max(1, config.worker_concurrency if concurrency is None else concurrency)
+        self.wait_seconds = wait_seconds
+        self.visibility_timeout = visibility_timeout
+        self.sqs = boto3.client('sqs')
+        self.stop_event = threading.Event()
+        self.processed = 0
+        self.failed = 0
+        # Processed messages whose notifications are waiting to be sent, and since when
+        self.unpublished: list[tuple[dict[str, Any], list[dict[str, Any]]]] = []
+        self.unpublished_since = 0.0
+
+    def _executor(self) -> Executor:
+        if self.concurrency > 1:
+            return ProcessPoolExecutor(
+                max_workers=self.concurrency, initializer=_init_worker, initargs=(self.config,)
+            )
+        return ThreadPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(self.config,))
+
+    def run(self, max_messages: Optional[int] = None, idle_exit: bool = False) -> None:
+        """
+        Process messages until stop() is called, max_messages messages are done or,
+        with idle_exit, the queue is empty. Running jobs are finished before returning.
+        """
+        in_flight: dict[Future, dict[str, Any]] = {}
+        extended_at: dict[str, float] = {}
+        received = 0
+
+        with self._executor() as executor:
+            while True:
+                stopping = self.stop_event.is_set() or (max_messages is not None and received >= max_messages)
+                free = self.concurrency - len(in_flight)
+                if not stopping and free > 0:
+                    if max_messages is not None:
+                        free = min(free, max_messages - received)
+                    busy = in_flight or self.unpublished
+                    messages = self._receive(free, wait_seconds=1 if busy else self.wait_seconds)
+                    received += len(messages)
+                    for message in messages:
+                        jobs = parse_jobs(message['Body'])
+                        if not jobs:
+                            self._delete(message)
+                            continue
+                        in_flight[executor.submit(run_jobs, self.config, jobs)] = message
+                        extended_at[message['ReceiptHandle']] = time.monotonic()
+                    if not messages and not in_flight and idle_exit:
+                        stopping = True
+
+                if not in_flight:
+                    # When stopping, messages whose notifications could not be sent
+                    # are left for a retry
+                    self._publish(force=stopping)
+                    if stopping:
+                        return
+                else:
+                    done, _ = wait(in_flight, timeout=1, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._finish(future, in_flight.pop(future))
+                    self._publish()
+
+                # Running jobs and processed messages waiting for their notifications
+                held = [*in_flight.values(), *(message for message, _ in self.unpublished)]
+                handles = {message['ReceiptHandle'] for message in held}
+                for handle in set(extended_at) - handles:
+                    del extended_at[handle]
+                self._extend_visibility(held, extended_at)
+
+    def stop(self) -> None:
+        """Stop taking new messages; the running jobs are finished."""
+        self.stop_event.set()
+
+    def _receive(self, max_messages: int, wait_seconds: int) -> list[dict[str, Any]]:
+        response = self.sqs.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=min(max_messages, 10),
+            WaitTimeSeconds=wait_seconds,
+            VisibilityTimeout=self.visibility_timeout,
+        )
+        return response.get('Messages', [])
+
+    def _finish(self, future: Future, message: dict[str, Any]) -> None:
+        """Acknowledge a message whose bundles were processed and uploaded, or hold it for _publish."""
+        try:
+            results, notifications = future.result()
+        except Exception as e:
+            self.failed += 1
+            print(f"Job {message['MessageId']} failed, leaving it for a retry: {e}")
+            return
+        self.processed += 1
+        print(f"Job {message['MessageId']} done: {results}")
+        if not notifications:
+            self._delete(message)
+            return
+        if not self.unpublished:
+            self.unpublished_since = time.monotonic()
+        self.unpublished.append((message, notifications))
+
+    def _publish(self, force: bool = False) -> None:
+        """
+        Send the waiting notifications in batches and acknowledge their messages, once
+        a batch is full or the oldest has waited config.publish_max_delay_s. When
+        sending fails the messages are kept and sending is retried later.
+        """
+        notifications = [notification for _, batch in self.unpublished for notification in batch]
+        due = time.monotonic() - self.unpublished_since >= self.config.publish_max_delay_s
+        if not notifications or not (force or due or len(notifications) >= SQS_BATCH_SIZE):
+            return
+        try:
+            publish_batch_to_sqs(self.config.sqs_queue_url, notifications)
+        except Exception as e:
+            print(f"Sending {len(notifications)} notifications failed, retrying later: {e}")
+            self.unpublished_since = time.monotonic()
+            return
+        for message, _ in self.unpublished:
+            self._delete(message)
+        self.unpublished = []
+
+    def _delete(self, message: dict[str, Any]) -> None:
+        self.sqs.delete_message(QueueUrl=self.queue_url, ReceiptHandle=message['ReceiptHandle'])
+
+    def _extend_visibility(self, messages, extended_at: dict[str, float]) -> None:
+        """Keep running jobs invisible to other consumers: extend halfway the timeout."""
+        now = time.monotonic()
+        for message in messages:
+            handle = message['ReceiptHandle']
+            if now - extended_at[handle] >= self.visibility_timeout / 2:
+                self.sqs.change_message_visibility(
+                    QueueUrl=self.queue_url, ReceiptHandle=handle, VisibilityTimeout=self.visibility_timeout
+                )
+                extended_at[handle] = now
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    config = ValidationConfig.from_environment()
+    parser = argparse.ArgumentParser(description="Validate data bundles from an SQS queue.")
+    parser.add_argument("--queue-url", default=config.worker_queue_url,
+                        help="SQS queue URL (default: KRM_WORKER_QUEUE_URL)")
+    parser.add_argument("--concurrency", type=int, default=config.worker_concurrency,
+                        help="Bundles validated at the same time (default: %(default)s)")
+    parser.add_argument("--max-messages", type=int, default=None, help="Stop after this many messages")
+    parser.add_argument("--idle-exit", action="store_true", help="Stop when the queue is empty")
+    args = parser.parse_args(argv)
+
+    worker = QueueWorker(config, args.queue_url, args.concurrency)
+    print(f"Worker polling {worker.queue_url} with concurrency {worker.concurrency}")
+    try:
+        worker.run(max_messages=args.max_messages, idle_exit=args.idle_exit)
+    except KeyboardInterrupt:
+        pass
+    print(f"Worker stopped: {worker.processed} jobs done, {worker.failed} failed")
+
+
+if __name__ == "__main__":
+    main()
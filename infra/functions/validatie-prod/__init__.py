@@ -2,41 +2,65 @@
 KRM Data Bundle Validation System
 
 Validates Dutch marine data bundles according to KRM (Kaderrichtlijn Mariene Strategie) criteria.
+
+The public names below are imported on first access (PEP 562), so importing the
+package, e.g. to reach krm_validator.handler in the Lambda, does not load pandas,
+geopandas or shapely up front.
 """
 
-from .config import ValidationConfig
-from .report import ValidationReport, ValidationResult, ValidationSection
-from .reference_data import ReferenceDataLoader
-from .processor import DataBundleProcessor
-from .validator import KRMValidator
-from .exporter import GeoPackageExporter, set_criteria
-from .reporting import CountReportGenerator, generate_count_report
-from .handler import lambda_handler
-from .s3_functions import upload_file_to_s3, delete_file_from_s3, publish_to_sqs
-from .github_functions import get_data_from_github, get_shape_data_from_github
-
-__all__ = [
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .config import ValidationConfig
+    from .report import ValidationReport, ValidationResult, ValidationSection
+    from .reference_data import ReferenceDataLoader
+    from .processor import DataBundleProcessor
+    from .validator import KRMValidator
+    from .exporter import GeoPackageExporter, set_criteria
+    from .reporting import CountReportGenerator, generate_count_report
+    from .handler import lambda_handler
+    from .s3_functions import upload_file_to_s3, delete_file_from_s3, publish_to_sqs
+    from .github_functions import get_data_from_github, get_shape_data_from_github
+
+# Public name -> submodule that defines it
+_EXPORTS = {
     # Core classes
-    "ValidationConfig",
-    "ValidationReport",
-    "ValidationResult",
-    "ValidationSection",
-    "ReferenceDataLoader",
-    "DataBundleProcessor",
-    "KRMValidator",
-    "GeoPackageExporter",
+    "ValidationConfig": ".config",
+    "ValidationReport": ".report",
+    "ValidationResult": ".report",
+    "ValidationSection": ".report",
+    "ReferenceDataLoader": ".reference_data",
+    "DataBundleProcessor": ".processor",
+    "KRMValidator": ".validator",
+    "GeoPackageExporter": ".exporter",
     # Functions
-    "set_criteria",
-    "CountReportGenerator",
-    "generate_count_report",
-    "lambda_handler",
+    "set_criteria": ".exporter",
+    "CountReportGenerator": ".reporting",
+    "generate_count_report": ".reporting",
+    "lambda_handler": ".handler",
     # Utilities
-    "upload_file_to_s3",
-    "delete_file_from_s3",
-    "publish_to_sqs",
-    "get_data_from_github",
-    "get_shape_data_from_github",
-]
+    "upload_file_to_s3": ".s3_functions",
+    "delete_file_from_s3": ".s3_functions",
+    "publish_to_sqs": ".s3_functions",
+    "get_data_from_github": ".github_functions",
+    "get_shape_data_from_github": ".github_functions",
+}
+
+__all__ = list(_EXPORTS)
 
 __version__ = "2.0.0"
 
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *_EXPORTS])
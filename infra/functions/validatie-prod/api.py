@@ -0,0 +1,232 @@
+"""
+Local HTTP validation API that streams results while the validation runs.
+
+    POST /validate?name=<bundle>&format=ndjson|sse    body: the ZIP or CSV bundle
+    POST /validate?format=ndjson|sse                  multipart form, file field "bundle"
+    GET  /health
+
+The response streams events, as NDJSON lines (default) or server-sent events:
+
+    {"event": "started", "bundle": ..., "rows": ...}
+    {"event": "results", "step": "fixed_values", "section": "Vaste waarden controle", "entries": [...]}
+    {"event": "quick_check", "valid": false, "failures": 12}
+    ...
+    {"event": "done", "bundle_valid": false, "validation_failures": ..., "failures_by_section": {...}}
+
+The quick check (tier 0) results come first; with quick_check "gate" a bundle that
+fails it (without akkoord file) ends there, as in the Lambda. The other steps
+follow as each finishes. Nothing is uploaded: the API is for interactive
+pre-checks. The reference data is loaded once at start-up and shared by all
+requests; at most config.api_concurrency bundles are validated at the same time.
+
+aiohttp is an optional dependency (pip install krm-validator[api]). Run with:
+
+    python -m krm_validator.api --port 8080
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import json
+import zipfile
+from itertools import groupby
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+
+from .config import ValidationConfig
+
+try:
+    from aiohttp import web
+except ImportError:  # optional dependency
+    web = None
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from .reference_data import ReferenceDataLoader
+    from .report import ValidationReport, ValidationResult
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'sse': 'text/event-stream',
+}
+
+# Report entries per results event
+EVENT_ENTRIES = 1000
+
+
+def _result_events(step: str, results: list["ValidationResult"]) -> Iterator[dict[str, Any]]:
+    """Results events of a step: its failures per section, in report order."""
+    for section, section_results in groupby(results, key=lambda result: result.section):
+        entries = [
+            {
+                'record_id': result.record_id,
+                'uitvalreden': result.uitvalreden,
+                'informatie': result.informatie,
+            }
+            for result in section_results
+        ]
+        for start in range(0, len(entries), EVENT_ENTRIES):
+            yield {
+                'event': 'results',
+                'step': step,
+                'section': section.value,
+                'entries': entries[start:start + EVENT_ENTRIES],
+            }
+
+
+def _done_event(report: "ValidationReport", **extra: Any) -> dict[str, Any]:
+    return {
+        'event': 'done',
+        'bundle_valid': report.is_valid,
+        'validation_failures': report.failure_count,
+        'failures_by_section': {
+            section.value: count
+            for section, count in report.failures_by_section().items()
+        },
+        **extra,
+    }
+
+
+def validation_events(
+    config: ValidationConfig,
+    ref_data: "ReferenceDataLoader",
+    csv_content: "pd.DataFrame",
+    package_name: str,
+    has_akkoord: bool = False
+) -> Iterator[dict[str, Any]]:
+    """
+    Validate a bundle, yielding events as results become available.
+
+    Runs the quick check first, then (unless it gates the bundle out) the
+    validation steps of KRMValidator, with the failures of each step as soon as it
+    has finished.
+    """
+    from .processor import DataBundleProcessor
+    from .validator import KRMValidator
+
+    yield {'event': 'started', 'bundle': package_name.replace('+', ' '), 'rows': len(csv_content)}
+
+    validator = KRMValidator(config, ref_data)
+    if config.quick_check != 'off':
+        quick = validator.quick_check(csv_content, package_name)
+        yield from _result_events('quick_check', quick.results)
+        yield {'event': 'quick_check', 'valid': quick.is_valid, 'failures': quick.failure_count}
+        if not quick.is_valid and config.quick_check == 'gate' and not has_akkoord:
+            yield _done_event(quick, quick_check_only=True)
+            return
+
+    gdf = DataBundleProcessor(config).to_geodataframe(csv_content)
+    reported = 0
+    for step in validator.iter_steps(gdf, package_name):
+        yield from _result_events(step, validator.report.results[reported:])
+        reported = validator.report.failure_count
+    yield _done_event(validator.report)
+
+
+def encode_event(event: dict[str, Any], fmt: str) -> bytes:
+    """An event as an NDJSON line or a server-sent event."""
+    data = json.dumps(event, default=str)
+    if fmt == 'sse':
+        return f"event: {event['event']}\ndata: {data}\n\n".encode()
+    return f"{data}\n".encode()
+
+
+def read_bundle_bytes(config: ValidationConfig, body: bytes) -> tuple["pd.DataFrame", bool]:
+    """CSV content and akkoord flag of an uploaded ZIP or CSV bundle."""
+    from .processor import DataBundleProcessor
+
+    processor = DataBundleProcessor(config)
+    if zipfile.is_zipfile(io.BytesIO(body)):
+        return processor.read_zip(io.BytesIO(body))
+    csv_content = processor.read_csv(io.BytesIO(body), categorical_codes=config.categorical_codes)
+    if csv_content.empty:
+        raise ValueError("No CSV content found in upload")
+    return csv_content, False
+
+
+async def _read_upload(request: "web.Request") -> tuple[str, bytes]:
+    """Package name and content of the uploaded bundle."""
+    if request.content_type == 'multipart/form-data':
+        reader = await request.multipart()
+        async for part in reader:
+            if part.name == 'bundle' and part.filename:
+                name = request.query.get('name') or Path(part.filename).stem
+                return name, await part.read()
+        raise web.HTTPBadRequest(text="No file field 'bundle' in the form")
+
+    if 'name' not in request.query:
+        raise web.HTTPBadRequest(text="Pass the bundle name as ?name=<bundle>")
+    return request.query['name'], await request.read()
+
+
+async def handle_validate(request: "web.Request") -> "web.StreamResponse":
+    app = request.app
+    fmt = request.query.get('format', 'ndjson')
+    if fmt not in CONTENT_TYPES:
+        raise web.HTTPBadRequest(text=f"format must be one of {', '.join(CONTENT_TYPES)}")
+    package_name, body = await _read_upload(request)
+
+    async with app['semaphore']:
+        try:
+            csv_content, has_akkoord = await asyncio.to_thread(read_bundle_bytes, app['config'], body)
+        except (ValueError, zipfile.BadZipFile, UnicodeDecodeError) as e:
+            raise web.HTTPBadRequest(text=f"Unreadable bundle: {e}")
+
+        response = web.StreamResponse(headers={'Content-Type': CONTENT_TYPES[fmt]})
+        await response.prepare(request)
+        events = validation_events(app['config'], app['ref_data'], csv_content, package_name, has_akkoord)
+        try:
+            # The validation is CPU bound; every step runs in a thread
+            while (event := await asyncio.to_thread(next, events, None)) is not None:
+                await response.write(encode_event(event, fmt))
+        except Exception as e:
+            await response.write(encode_event({'event': 'error', 'message': str(e)}, fmt))
+        finally:
+            events.close()
+        await response.write_eof()
+        return response
+
+
+async def handle_health(request: "web.Request") -> "web.Response":
+    return web.json_response({'status': 'ok'})
+
+
+async def _preload_reference_data(app: "web.Application") -> None:
+    await asyncio.to_thread(app['ref_data'].preload)
+
+
+def create_app(
+    config: Optional[ValidationConfig] = None,
+    ref_data: Optional["ReferenceDataLoader"] = None
+) -> "web.Application":
+    """The API application, sharing one ReferenceDataLoader between requests."""
+    if web is None:
+        raise ImportError("The validation API needs aiohttp: pip install krm-validator[api]")
+    from .reference_data import ReferenceDataLoader
+
+    config = config or ValidationConfig.from_environment()
+    app = web.Application(client_max_size=config.api_max_upload_mb * 1024 ** 2)
+    app['config'] = config
+    app['ref_data'] = ref_data or ReferenceDataLoader(config)
+    app['semaphore'] = asyncio.Semaphore(config.api_concurrency)
+    app.on_startup.append(_preload_reference_data)
+    app.router.add_post('/validate', handle_validate)
+    app.router.add_get('/health', handle_health)
+    return app
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Local HTTP validation API with streamed results.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args(argv)
+
+    app = create_app()
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
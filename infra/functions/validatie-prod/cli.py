@@ -0,0 +1,242 @@
+"""
+Offline command-line validation of local data bundles.
+
+Validates ZIP (as uploaded) or CSV bundles without S3 or GitHub and writes the same
+reports as the Lambda to a local folder: <bundle>.csv (and its .parquet sidecar)
+and validatielijst_per_locatie_met_aantal_<bundle>.csv. Bundles are validated in
+parallel on a process pool.
+
+The reference data comes from an offline snapshot. Download it once with
+
+    krm-validate snapshot
+
+which stores the reference files from GitHub and a compiled artifact (see
+reference_artifact.py) in ~/.cache/krm-validator, then validate with
+
+    krm-validate validate deliveries/ extra_bundle.zip --out reports/ --jobs 4
+
+--reference points at another artifact or at a folder with the reference files,
+such as the repository's data/ folder.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional
+
+from .config import ValidationConfig
+from .reference_artifact import MANIFEST, SHAPEFILE_EXTENSIONS, SHAPEFILES, TABLES, ReferenceArtifact
+
+if TYPE_CHECKING:
+    from .reference_data import ReferenceDataLoader
+
+BUNDLE_SUFFIXES = ('.zip', '.csv')
+
+
+def default_snapshot_dir() -> Path:
+    """Snapshot folder under the user cache: $XDG_CACHE_HOME or ~/.cache."""
+    cache = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache) / "krm-validator"
+
+
+def download_snapshot(config: ValidationConfig, snapshot_dir: Path) -> dict:
+    """
+    Download the reference files from config.github_base_url into snapshot_dir/data
+    and compile them into the artifact snapshot_dir/artifact.
+
+    Returns:
+        The artifact manifest
+    """
+    from .github_functions import get_shape_data_from_github
+    from .reference_artifact import build_artifact
+
+    data_dir = Path(snapshot_dir) / "data"
+    shape_dir = data_dir / "KRM_locatiedetails"
+    shape_dir.mkdir(parents=True, exist_ok=True)
+
+    files = [(config.github_base_url, name, data_dir) for name in TABLES]
+    files += [
+        (f"{config.github_base_url}/KRM_locatiedetails", f"{prefix}{ext}", shape_dir)
+        for prefix in SHAPEFILES for ext in SHAPEFILE_EXTENSIONS
+    ]
+    for base_url, filename, folder in files:
+        (folder / filename).unlink(missing_ok=True)
+        get_shape_data_from_github(f"{base_url}/{filename}", filename, str(folder))
+        if not (folder / filename).exists() and filename.endswith(('.csv', '.shp', '.dbf')):
+            raise RuntimeError(f"Could not download {base_url}/{filename}")
+
+    return build_artifact(
+        data_dir, Path(snapshot_dir) / "artifact", config.github_base_url, config.distance_crs
+    )
+
+
+def find_bundles(paths: list[Path]) -> list[Path]:
+    """Bundle files among paths; folders contribute their ZIP and CSV files."""
+    bundles = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            bundles += sorted(p for p in path.iterdir() if p.suffix.lower() in BUNDLE_SUFFIXES)
+        elif path.exists():
+            bundles.append(path)
+        else:
+            raise FileNotFoundError(f"Bundle {path} does not exist")
+    return bundles
+
+
+def reference_config(reference: Path, out_dir: Path, **kwargs: Any) -> ValidationConfig:
+    """
+    Local config that reads the reference data from an artifact or a folder of reference files.
+
+    An artifact given here is the reference data version to validate against, so it is
+    pinned to its own hash unless KRM_REFERENCE_DATA_HASH pins another one.
+    """
+    reference = Path(reference)
+    if (reference / "artifact" / MANIFEST).exists():
+        reference = reference / "artifact"
+    if (reference / MANIFEST).exists():
+        sources = {
+            'reference_artifact_dir': reference, 'reference_data_dir': None,
+            'reference_data_hash': os.environ.get("KRM_REFERENCE_DATA_HASH")
+            or ReferenceArtifact(reference).source_hash,
+        }
+    elif (reference / "validatielijst.csv").exists():
+        sources = {'reference_artifact_dir': None, 'reference_data_dir': reference}
+    else:
+        raise FileNotFoundError(
+            f"No reference data in {reference}; run 'krm-validate snapshot' or pass --reference"
+        )
+    return ValidationConfig(is_local=True, local_folder=Path(out_dir), **sources, **kwargs)
+
+
+# Reference data of a worker process, loaded once per worker by _init_worker
+_worker_ref_data: Optional["ReferenceDataLoader"] = None
+
+
+def _init_worker(config: ValidationConfig) -> None:
+    from .reference_data import ReferenceDataLoader
+
+    global _worker_ref_data
+    _worker_ref_data = ReferenceDataLoader(config)
+
+
+def validate_bundle(config: ValidationConfig, path: Path) -> dict[str, Any]:
+    """
+    Validate one local bundle and write its reports to config.temp_folder.
+
+    Returns:
+        Dict with the bundle, its size and the validation results, or the error
+    """
+    from .processor import DataBundleProcessor
+    from .reference_data import ReferenceDataLoader
+    from .reporting import generate_count_report
+    from .validator import KRMValidator
+
+    start = time.perf_counter()
+    package_name = DataBundleProcessor.extract_package_name(str(path))
+    clean_package_name = package_name.replace('+', ' ')
+    result: dict[str, Any] = {'bundle': clean_package_name}
+    try:
+        ref_data = _worker_ref_data or ReferenceDataLoader(config)
+        processor = DataBundleProcessor(config)
+        csv_content, has_akkoord = processor.read_bundle(path)
+        gdf = processor.to_geodataframe(csv_content)
+
+        validator = KRMValidator(config, ref_data)
+        report = validator.validate(gdf, package_name)
+
+        generate_count_report(config, ref_data, gdf, validator.rules, package_name, validator.count_table)
+        report.to_csv(
+            config.temp_folder / f'{clean_package_name}.csv',
+            max_rows_per_group=config.report_max_rows_per_group
+        )
+        report.to_parquet(config.temp_folder / f'{clean_package_name}.parquet')
+
+        result.update({
+            'rows': len(gdf),
+            'bundle_valid': report.is_valid,
+            'has_akkoord': has_akkoord,
+            'validation_failures': report.failure_count,
+            'failures_by_section': {
+                section.value: count
+                for section, count in report.failures_by_section().items()
+            },
+        })
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = round(time.perf_counter() - start, 1)
+    return result
+
+
+def validate_bundles(config: ValidationConfig, bundles: list[Path], jobs: int = 1) -> list[dict[str, Any]]:
+    """Validate bundles, largest first, on a pool of jobs worker processes; results in bundle order."""
+    config.temp_folder.mkdir(parents=True, exist_ok=True)
+    if jobs < 2 or len(bundles) < 2:
+        _init_worker(config)
+        return [validate_bundle(config, path) for path in bundles]
+
+    # Largest first, so a big delivery does not start last and finish alone
+    order = sorted(range(len(bundles)), key=lambda i: -bundles[i].stat().st_size)
+    results: list[dict[str, Any]] = [{}] * len(bundles)
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(bundles)), initializer=_init_worker, initargs=(config,)
+    ) as pool:
+        futures = {i: pool.submit(validate_bundle, config, bundles[i]) for i in order}
+        for i, future in futures.items():
+            results[i] = future.result()
+    return results
+
+
+def format_results(results: list[dict[str, Any]]) -> str:
+    lines = [f"{'records':>9}  {'failures':>8}  {'seconds':>7}  bundle"]
+    for result in results:
+        if 'error' in result:
+            lines.append(f"{'':>9}  {'ERROR':>8}  {result['seconds']:7.1f}  {result['bundle']}: {result['error']}")
+        else:
+            lines.append(
+                f"{result['rows']:9d}  {result['validation_failures']:8d}  "
+                f"{result['seconds']:7.1f}  {result['bundle']}"
+            )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="krm-validate", description="Validate KRM data bundles offline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    snapshot = commands.add_parser("snapshot", help="Download the reference data for offline validation")
+    snapshot.add_argument("--dir", type=Path, default=default_snapshot_dir(),
+                          help="Snapshot folder (default: %(default)s)")
+
+    validate = commands.add_parser("validate", help="Validate ZIP or CSV bundles, or folders of them")
+    validate.add_argument("bundles", type=Path, nargs="+")
+    validate.add_argument("--out", type=Path, default=Path("rapportages"),
+                          help="Report folder (default: %(default)s)")
+    validate.add_argument("--reference", type=Path, default=default_snapshot_dir(),
+                          help="Reference snapshot, artifact or data folder (default: %(default)s)")
+    validate.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                          help="Bundles validated in parallel (default: %(default)s)")
+    validate.add_argument("--max-rows", type=int, default=None,
+                          help="Report rows per failure group, 0 for all (default: KRM_REPORT_MAX_ROWS or 100)")
+    args = parser.parse_args(argv)
+
+    if args.command == "snapshot":
+        manifest = download_snapshot(ValidationConfig(is_local=True), args.dir)
+        print(f"Reference snapshot {manifest['source_hash'][:12]} written to {args.dir}")
+        return 0
+
+    overrides = {} if args.max_rows is None else {'report_max_rows_per_group': args.max_rows}
+    config = reference_config(args.reference, args.out, **overrides)
+    results = validate_bundles(config, find_bundles(args.bundles), args.jobs)
+    print(format_results(results))
+
+    # Non-zero when a bundle failed validation or could not be validated
+    return 0 if all(result.get('bundle_valid') for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
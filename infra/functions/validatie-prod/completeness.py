@@ -0,0 +1,62 @@
+"""Completeness of parameter collections (verzamelingen) per monster."""
+
+from __future__ import annotations
+
+import pandas as pd
+
+
+def required_parameters(group: pd.DataFrame) -> pd.DataFrame:
+    """
+    Required parameters per group.
+
+    A parameter is required when its row in the group list has
+    elke_param_verplicht 'ja'; groups marked 'nee' (e.g. taxon lists) require nothing.
+
+    Args:
+        group: Group list (groep.csv)
+
+    Returns:
+        DataFrame with columns groep, parameter (display) and parameter_key
+        (case-folded), one row per required parameter
+    """
+    verplicht = group['elke_param_verplicht'].astype(str).str.strip().str.lower() == 'ja'
+    required = group.loc[verplicht & group['parameter'].notna(), ['groep', 'parameter']]
+    required = required.assign(parameter_key=required['parameter'].str.casefold())
+    return required.drop_duplicates(['groep', 'parameter_key']).reset_index(drop=True)
+
+
+def missing_parameters(reported: pd.DataFrame, required: pd.DataFrame) -> pd.DataFrame:
+    """
+    Required parameters that were not reported, per monster and group.
+
+    The reported (monster, groep) pairs are expanded with the required set of their
+    group and anti-joined against the reported parameter keys, so the cost is linear
+    in the number of pairs times the group size instead of a Python loop per pair.
+
+    Args:
+        reported: DataFrame with columns monster, groep and parameter_key,
+            one row per reported record
+        required: Output of required_parameters
+
+    Returns:
+        DataFrame with columns monster, groep and missing (sorted list of display
+        names), one row per incomplete (monster, groep), ordered by monster and groep
+    """
+    columns = ['monster', 'groep', 'missing']
+    present = reported[['monster', 'groep', 'parameter_key']].dropna().drop_duplicates()
+    if present.empty or required.empty:
+        return pd.DataFrame(columns=columns)
+
+    pairs = present[['monster', 'groep']].drop_duplicates()
+    expected = pairs.merge(required, on='groep')
+    expected = expected.merge(present, on=['monster', 'groep', 'parameter_key'], how='left', indicator=True)
+    missing = expected[expected['_merge'] == 'left_only']
+    if missing.empty:
+        return pd.DataFrame(columns=columns)
+
+    return (
+        missing.groupby(['monster', 'groep'], sort=True)['parameter']
+        .agg(lambda names: sorted(names, key=str.casefold))
+        .rename('missing')
+        .reset_index()
+    )
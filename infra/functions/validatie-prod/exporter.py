@@ -71,7 +71,8 @@ class GeoPackageExporter:
         self,
         gdf: gpd.GeoDataFrame,
         filepath: Path,
-        layer_name: str = DEFAULT_LAYER_NAME
+        layer_name: str = DEFAULT_LAYER_NAME,
+        append: bool = False
     ) -> None:
         """
         Export GeoDataFrame to GeoPackage.
@@ -80,6 +81,8 @@ class GeoPackageExporter:
             gdf: GeoDataFrame to export
             filepath: Output file path
             layer_name: Name of the layer in the GeoPackage
+            append: Add the records to the layer instead of replacing it, to
+                export a bundle in chunks
         """
         gdf = gdf.copy()
         
@@ -97,24 +100,20 @@ class GeoPackageExporter:
         keep = [c for c in exportcols if c in gdf.columns]
         gdf = gdf[keep].copy()
         
-        gdf.to_file(filepath, layer=layer_name, driver='GPKG')
+        gdf.to_file(filepath, layer=layer_name, driver='GPKG', mode='a' if append else 'w')
 
 
-def set_criteria(
-    df: pd.DataFrame,
-    validatielijst: pd.DataFrame,
-    package_name: str
-) -> pd.DataFrame:
+def criteria_columns(validatielijst: pd.DataFrame, package_name: str) -> list[dict[str, str]]:
     """
-    Duplicate records for each applicable KRM criterion.
+    Values of the criterion columns of each copy of the records made by set_criteria.
     
     Args:
-        df: Original DataFrame
         validatielijst: Validation rules DataFrame
         package_name: Data bundle name
         
     Returns:
-        DataFrame with records duplicated for each criterion
+        krmcriterium and monprog.naam per applicable KRM criterion; empty when no
+        validation rule applies
     """
     clean_name = package_name.replace('+', ' ')
     
@@ -124,20 +123,38 @@ def set_criteria(
     ]
     
     if validatie_regels.empty:
-        return df
+        return []
     
     # Get criteria string and split
     criteria = validatie_regels['criteria'].values[0]
-    criteria_list = criteria.split(';')
-
     monprog_naam = validatie_regels['databundelcode'].values[0]
     
-    # Duplicate records for each criterion
-    duplicated_dfs = []
-    for criterium in criteria_list:
-        temp_df = df.copy()
-        temp_df['krmcriterium'] = f"ANSNL-{criterium}"
-        temp_df['monprog.naam'] = monprog_naam
-        duplicated_dfs.append(temp_df)
+    return [
+        {'krmcriterium': f"ANSNL-{criterium}", 'monprog.naam': monprog_naam}
+        for criterium in criteria.split(';')
+    ]
+
+
+def set_criteria(
+    df: pd.DataFrame,
+    validatielijst: pd.DataFrame,
+    package_name: str
+) -> pd.DataFrame:
+    """
+    Duplicate records for each applicable KRM criterion.
     
-    return pd.concat(duplicated_dfs, ignore_index=True)
+    Args:
+        df: Original DataFrame
+        validatielijst: Validation rules DataFrame
+        package_name: Data bundle name
+        
+    Returns:
+        DataFrame with records duplicated for each criterion (criteria_columns)
+    """
+    criteria = criteria_columns(validatielijst, package_name)
+    
+    if not criteria:
+        return df
+    
+    # Duplicate records for each criterion
+    return pd.concat([df.assign(**columns) for columns in criteria], ignore_index=True)
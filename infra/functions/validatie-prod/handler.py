@@ -1,19 +1,64 @@
-"""AWS Lambda handler for KRM validation."""
+"""
+AWS Lambda handler for KRM validation.
+
+Only the configuration and the S3 helpers are imported at module load. The pipeline
+stages import their modules (and with them pandas, geopandas, shapely and pyproj) when
+they run, so the cold start stays small and an invocation that fails early, or only
+compacts the status store, never pays for the geo stack. The import-time budget is
+checked in tests/benchmarks/test_import_time.py.
+
+A bundle that does not fit in the invocation time is checkpointed to S3 and
+continued in a new invocation of the same function (see checkpoint.py). Duplicate
+events for the same bundle version reuse the result of the first (see idempotency.py);
+a duplicate of a bundle that is still running fails, so the event is retried.
+"""
 
 from __future__ import annotations
 
 import os
+import tempfile
+from dataclasses import asdict
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, Callable, Optional
 
-from .s3_functions import delete_file_from_s3, publish_to_sqs, report_databundle, upload_file_to_s3
+from .checkpoint import Budget, checkpoint_key, delete_checkpoint, load_checkpoint, save_checkpoint
+from .idempotency import (
+    LEASE_DONE,
+    Lease,
+    LeaseHeld,
+    acquire_lease,
+    complete_lease,
+    job_id,
+    keep_lease,
+    object_version,
+    release_lease,
+    renew_lease,
+)
+from .s3_functions import (
+    compact_databundle_status,
+    delete_file_from_s3,
+    invoke_lambda_async,
+    object_etag,
+    publish_batch_to_sqs,
+    report_databundle,
+    upload_file_to_s3,
+)
 
 from .config import ValidationConfig
-from .exporter import GeoPackageExporter, set_criteria
-from .processor import DataBundleProcessor
-from .reference_data import ReferenceDataLoader
-from .reporting import generate_count_report
-from .validator import KRMValidator
+
+# Folder of the exported bundle GeoPackages, read by the publication
+GEOPACKAGE_FOLDER = 'geopackages'
+
+# Columns of a bundle not exported to the GeoPackage
+DROPPED_COLUMNS = ['resultaatdatum', 'namespace', 'analysecompartiment.code']
+
+if TYPE_CHECKING:
+    import geopandas as gpd
+    import pandas as pd
+
+    from .reference_data import ReferenceDataLoader
+    from .report import ValidationReport
+    from .streaming import SpilledBundle
 
 
 def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
@@ -21,7 +66,10 @@ def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
     AWS Lambda entry point for KRM data bundle validation.
     
     Args:
-        event: Lambda event (S3 trigger event or empty for local testing)
+        event: Lambda event (S3 trigger event, {"action": "compact_status"} from
+            the schedule that rebuilds akkoorddata.csv, {"action": "resume",
+            "checkpoint_key": ...} to continue a checkpointed bundle, or empty for
+            local testing)
         context: Lambda context
         
     Returns:
@@ -30,21 +78,53 @@ def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
     # Initialize configuration
     config = ValidationConfig.from_environment()
     
+    if event.get('action') == 'compact_status':
+        status = compact_databundle_status()
+        return {
+            'statusCode': 200,
+            'message': f'Compacted status of {len(status)} data bundles'
+        }
+    
+    budget = Budget(context, config.checkpoint_reserve_ms)
+    enqueue = _resume_invoker(context)
+    
     # Get input parameters
-    if config.is_local:
+    version = None
+    if event.get('action') == 'resume':
+        bucket_name = zip_file_key = None
+    elif config.is_local:
         bucket_name = config.bucket_name
         zip_file_key = "input/WMR_2024_01+Noordzeebenthos+bodemschaaf_tijdkolom_3031.zip"
     else:
         bucket_name = event['Records'][0]['s3']['bucket']['name']
         zip_file_key = event['Records'][0]['s3']['object']['key']
+        version = object_version(bucket_name, zip_file_key, event['Records'][0]['s3']['object'])
     
     try:
-        result = process_data_bundle(config, bucket_name, zip_file_key)
+        if event.get('action') == 'resume':
+            result = resume_data_bundle(config, event['checkpoint_key'], budget, enqueue)
+        else:
+            result = process_data_bundle(config, bucket_name, zip_file_key, budget, enqueue, version=version)
+        if result.get('duplicate'):
+            return {
+                'statusCode': 200,
+                'message': 'Duplicate event, data bundle already processed',
+                **result
+            }
+        if 'checkpoint' in result:
+            return {
+                'statusCode': 202,
+                'message': 'Data bundle checkpointed, continuing in a new invocation',
+                **result
+            }
         return {
             'statusCode': 200,
             'message': 'Data bundle processed successfully',
             **result
         }
+    except LeaseHeld:
+        # Raised, so Lambda retries the event after the running job finished or died
+        raise
     except Exception as e:
         print(f"Error processing data bundle: {e}")
         return {
@@ -53,10 +133,39 @@ def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
         }
 
 
+def _resume_invoker(context: Any) -> Optional[Callable[[str], Any]]:
+    """Callable that continues a checkpoint in a new invocation of this function."""
+    function_name = getattr(context, 'function_name', None)
+    if not function_name:
+        return None
+    return lambda key: invoke_lambda_async(
+        function_name, {'action': 'resume', 'checkpoint_key': key}
+    )
+
+
+def resume_data_bundle(
+    config: ValidationConfig,
+    key: str,
+    budget: Optional[Budget] = None,
+    enqueue: Optional[Callable[[str], Any]] = None
+) -> dict[str, Any]:
+    """Continue processing a data bundle from the checkpoint at key in config.bucket_name."""
+    state = load_checkpoint(config.bucket_name, config.checkpoint_prefix, key)
+    return process_data_bundle(
+        config, state['bucket_name'], state['zip_file_key'], budget, enqueue, checkpoint=state
+    )
+
+
 def process_data_bundle(
     config: ValidationConfig,
     bucket_name: str,
-    zip_file_key: str
+    zip_file_key: str,
+    budget: Optional[Budget] = None,
+    enqueue: Optional[Callable[[str], Any]] = None,
+    checkpoint: Optional[dict[str, Any]] = None,
+    ref_data: Optional["ReferenceDataLoader"] = None,
+    version: Optional[str] = None,
+    notify: Optional[Callable[[dict[str, Any]], Any]] = None
 ) -> dict[str, Any]:
     """
     Process a single data bundle.
@@ -65,82 +174,244 @@ def process_data_bundle(
         config: Validation configuration
         bucket_name: S3 bucket name
         zip_file_key: Path to ZIP file in S3
+        budget: Optional time budget; when it runs out before the validation has
+            finished, the state is checkpointed and enqueue is called
+        enqueue: Called with the checkpoint key to continue the bundle later
+        checkpoint: State of an earlier, interrupted run to continue from
+        ref_data: Reference data to reuse, e.g. kept loaded by a worker; loaded
+            for this bundle when omitted
+        version: versionId or ETag of the bundle object from the S3 event; read
+            from S3 when omitted
+        notify: Called with the publication notification of an exported bundle
+            (see _notification) instead of sending it to config.sqs_queue_url, e.g.
+            to send the notifications of several bundles in one batch
         
     Returns:
-        Dict with processing results
+        Dict with processing results, with the checkpoint key when interrupted, or
+        with duplicate=True when this bundle version was already processed (with
+        config.idempotency)
+    
+    Raises:
+        LeaseHeld: This bundle version is still being processed by another
+            invocation (with config.idempotency)
     """
-    # Initialize components
-    processor = DataBundleProcessor(config)
-    ref_data = ReferenceDataLoader(config)
+    if checkpoint is not None:
+        job, lease = checkpoint['job_id'], checkpoint['lease']
+        if lease is not None:
+            lease = checkpoint['lease'] = Lease(**lease)
+            renew_lease(lease, _lease_seconds(config, budget))
+    else:
+        version = version or object_version(bucket_name, zip_file_key)
+        job, lease = job_id(bucket_name, zip_file_key, version), None
+        if config.idempotency:
+            lease, previous = acquire_lease(
+                config.bucket_name, config.idempotency_prefix, job,
+                _lease_seconds(config, budget), config.idempotency_wait_s,
+                source_bucket=bucket_name, source_key=zip_file_key, version=version
+            )
+            if lease is None:
+                return _duplicate_result(previous)
     
-    # Extract data from S3
-    csv_content, has_akkoord = processor.extract_from_s3(bucket_name, zip_file_key)
+    try:
+        result = _process_data_bundle(
+            config, bucket_name, zip_file_key, budget, enqueue, checkpoint, ref_data, job, lease, notify
+        )
+    except Exception:
+        if lease is not None:
+            release_lease(lease)
+        raise
+    if lease is not None and 'checkpoint' not in result:
+        complete_lease(lease, result, config.idempotency_retention_s)
+    return result
+
+
+def _lease_seconds(config: ValidationConfig, budget: Optional[Budget]) -> float:
+    """
+    Duration of a lease: until the end of the invocation plus a margin, so the
+    lease of an invocation that is killed expires soon after; at most
+    config.idempotency_lease_s.
+    """
+    remaining = budget.remaining_ms() if budget is not None else None
+    if remaining is None:
+        return config.idempotency_lease_s
+    return min(config.idempotency_lease_s, remaining / 1000 + config.idempotency_lease_margin_s)
+
+
+def _duplicate_result(record: dict[str, Any]) -> dict[str, Any]:
+    """Result of a duplicate event: the stored result of the first; raises LeaseHeld while it runs."""
+    if record['state'] != LEASE_DONE:
+        raise LeaseHeld(f"Data bundle job {record['job_id']} is still running in another invocation")
+    return {
+        'duplicate': True,
+        'job_id': record['job_id'],
+        'in_progress': False,
+        **record.get('result', {}),
+    }
+
+
+def _process_data_bundle(
+    config: ValidationConfig,
+    bucket_name: str,
+    zip_file_key: str,
+    budget: Optional[Budget],
+    enqueue: Optional[Callable[[str], Any]],
+    checkpoint: Optional[dict[str, Any]],
+    ref_data: Optional["ReferenceDataLoader"],
+    job: str,
+    lease: Optional[Lease],
+    notify: Optional[Callable[[dict[str, Any]], Any]]
+) -> dict[str, Any]:
+    """Process a data bundle under its job id and lease, see process_data_bundle."""
+    if ref_data is None:
+        from .reference_data import ReferenceDataLoader
+
+        ref_data = ReferenceDataLoader(config)
     
-    # Convert to GeoDataFrame
-    gdf = processor.to_geodataframe(csv_content)
+    if checkpoint is None:
+        from .processor import DataBundleProcessor
+
+        processor = DataBundleProcessor(config)
+        
+        # Get package name
+        package_name = processor.extract_package_name(zip_file_key)
+        
+        # Delete existing geopackage
+        delete_file_from_s3(config.bucket_name, f'{GEOPACKAGE_FOLDER}/{package_name}.gpkg')
+        
+        # Download the ZIP once to a file; the quick check and the full read both read it
+        with tempfile.TemporaryFile() as zip_file:
+            processor.download_zip(bucket_name, zip_file_key, zip_file)
+            
+            # Tier 0 on the first records, before the whole bundle is read
+            if config.quick_check != 'off' and config.quick_check_rows:
+                head, has_akkoord = processor.read_zip(zip_file, nrows=config.quick_check_rows)
+                result = _quick_check(config, ref_data, head, package_name, has_akkoord)
+                if result is not None:
+                    return result
+            
+            # Extract data from the ZIP; a long bundle is spilled to disk by begindatum
+            # window for a streamed validation
+            csv_content = processor.spill_zip(zip_file, config.stream_min_rows) if config.stream_window else None
+            streaming = csv_content is not None
+            if streaming:
+                has_akkoord = processor.has_akkoord(zip_file)
+            else:
+                csv_content, has_akkoord = processor.read_zip(zip_file)
+        
+        # Tier 0 on the whole bundle
+        if config.quick_check != 'off' and not config.quick_check_rows:
+            result = _quick_check(config, ref_data, csv_content, package_name, has_akkoord)
+            if result is not None:
+                return result
+        
+        # Convert to GeoDataFrame; a streamed validation works on the spilled bundle
+        # and the geometry is added when it is exported
+        gdf = csv_content if streaming else processor.to_geodataframe(csv_content)
+        del csv_content
+        
+        state = {
+            'bucket_name': bucket_name,
+            'zip_file_key': zip_file_key,
+            'package_name': package_name,
+            'has_akkoord': has_akkoord,
+            'gdf': gdf,
+            'streaming': streaming,
+            'validator': None,
+            'resumes': 0,
+            'job_id': job,
+            'lease': lease,
+        }
+        if budget is not None and budget.exhausted():
+            return _checkpoint(config, state, enqueue)
+    else:
+        state = checkpoint
+        package_name = state['package_name']
+        has_akkoord = state['has_akkoord']
+        gdf = state['gdf']
+        if state.get('streaming'):
+            from .processor import DataBundleProcessor
+
+            # A spilled bundle is not part of the checkpoint: spill the ZIP again
+            processor = DataBundleProcessor(config)
+            with tempfile.TemporaryFile() as zip_file:
+                processor.download_zip(state['bucket_name'], state['zip_file_key'], zip_file)
+                gdf = processor.spill_zip(zip_file)
     
-    # Get package name
-    package_name = processor.extract_package_name(zip_file_key)
     clean_package_name = package_name.replace('+', ' ')
     
-    # Delete existing geopackage
-    delete_file_from_s3(config.bucket_name, f'geopackages/{package_name}.gpkg')
-    
     # Run validation
-    validator = KRMValidator(config, ref_data)
-    report = validator.validate(gdf, package_name)
+    from .reporting import generate_count_report
+    from .sharding import ShardedKRMValidator
+    from .streaming import StreamingKRMValidator
+
+    if state.get('streaming'):
+        validator = StreamingKRMValidator(config, ref_data)
+    else:
+        validator = ShardedKRMValidator(config, ref_data)
+    if state['validator'] is not None:
+        validator.restore_state(state['validator'])
+    
+    def should_stop() -> bool:
+        # Checked between the steps and chunks: renews the lease while validation runs
+        if lease is not None:
+            keep_lease(lease, lambda: _lease_seconds(config, budget))
+        return budget is not None and budget.exhausted()
     
-    # Get the determined rules for reporting
-    rules = validator._determine_rules(gdf, clean_package_name)
+    report = validator.validate(gdf, package_name, should_stop=should_stop)
+    if not validator.complete:
+        state['validator'] = validator.checkpoint_state()
+        return _checkpoint(config, state, enqueue)
     
-    # Generate and save count report
+    if lease is not None:
+        keep_lease(lease, lambda: _lease_seconds(config, budget))
+    
+    # Generate and save count report from the rules and counts of the validation
     count_report_df, count_report_path = generate_count_report(
-        config, ref_data, gdf, rules, package_name
+        config, ref_data, None if state.get('streaming') else gdf, validator.rules, package_name,
+        validator.count_table
     )
-    upload_file_to_s3(
+    _upload(
         str(count_report_path),
         config.bucket_name,
         f'rapportages/validatielijst_per_locatie_met_aantal_{clean_package_name}.csv'
     )
     
     # Save validation report
-    report_path = config.temp_folder / f'{clean_package_name}.csv'
-    report.to_csv(report_path)
-    upload_file_to_s3(
-        str(report_path),
-        config.bucket_name,
-        f'rapportages/{clean_package_name}.csv'
-    )
+    _upload_report(config, report, clean_package_name)
     
     # Apply criteria and prepare output
-    df_with_criteria = set_criteria(gdf, ref_data.validatielijst, package_name)
-    
-    # Drop columns not needed in output
-    drop_cols = ['resultaatdatum', 'namespace', 'analysecompartiment.code']
-    df_with_criteria = df_with_criteria.drop(
-        columns=[c for c in drop_cols if c in df_with_criteria.columns]
-    )
-    
+    from .exporter import set_criteria
+
     bundel_akkoord = report.is_valid
+    export = bundel_akkoord or has_akkoord
+    status = f"Databundel validatie is: {bundel_akkoord} en akkoord file is: {has_akkoord}"
     
-    # Export if valid or has akkoord file
-    if bundel_akkoord or has_akkoord:
-        _export_geopackage(config, df_with_criteria, package_name)
+    if state.get('streaming'):
+        # A spilled bundle is exported chunk by chunk
+        df_with_criteria = set_criteria(gdf.head(1), ref_data.validatielijst, package_name)
+        if export:
+            rows, criteria = _export_spilled(config, ref_data, gdf, package_name)
+    else:
+        df_with_criteria = set_criteria(gdf, ref_data.validatielijst, package_name)
         
-        report_databundle(
-            df_with_criteria,
-            package_name,
-            f"Databundel validatie is: {bundel_akkoord} en akkoord file is: {has_akkoord}"
+        # Drop columns not needed in output
+        df_with_criteria = df_with_criteria.drop(
+            columns=[c for c in DROPPED_COLUMNS if c in df_with_criteria.columns]
         )
         
-        if not config.is_local:
-            _upload_and_notify(config, package_name)
-    else:
-        report_databundle(
-            df_with_criteria,
-            package_name,
-            f"Databundel validatie is: {bundel_akkoord} en akkoord file is: {has_akkoord}"
-        )
+        # Export if valid or has akkoord file
+        if export:
+            _export_geopackage(config, df_with_criteria, package_name)
+            rows = len(df_with_criteria)
+            criteria = sorted(df_with_criteria['krmcriterium'].dropna().astype(str).unique())
+    
+    report_databundle(df_with_criteria, package_name, status)
+    
+    if export and not config.is_local:
+        _upload_and_notify(config, rows, criteria, package_name, job, notify)
+    
+    if checkpoint is not None:
+        delete_checkpoint(config.bucket_name, checkpoint_key(config.checkpoint_prefix, package_name))
     
     return {
         'bundle_valid': bundel_akkoord,
@@ -153,33 +424,205 @@ def process_data_bundle(
     }
 
 
+def _quick_check(
+    config: ValidationConfig,
+    ref_data: "ReferenceDataLoader",
+    df: "pd.DataFrame | SpilledBundle",
+    package_name: str,
+    has_akkoord: bool
+) -> Optional[dict[str, Any]]:
+    """
+    Run the tier 0 checks and upload their preliminary report.
+    
+    Returns the processing result when the full validation is skipped: the quick
+    check failed, config.quick_check is "gate" and there is no akkoord file (with
+    one the bundle is exported regardless, which needs the full validation).
+    """
+    from .streaming import SpilledBundle, StreamingKRMValidator
+    from .validator import KRMValidator
+
+    clean_package_name = package_name.replace('+', ' ')
+    validator_class = StreamingKRMValidator if isinstance(df, SpilledBundle) else KRMValidator
+    report = validator_class(config, ref_data).quick_check(df, package_name)
+    
+    _upload_report(config, report, f'snelle_controle_{clean_package_name}')
+    
+    if report.is_valid or config.quick_check != 'gate' or has_akkoord:
+        return None
+    
+    # The quick check report is the validation report of this bundle
+    _upload_report(config, report, clean_package_name)
+    
+    from .exporter import set_criteria
+
+    report_databundle(
+        set_criteria(df.head(1), ref_data.validatielijst, package_name),
+        package_name,
+        f"Databundel validatie is: False (snelle controle) en akkoord file is: {has_akkoord}"
+    )
+    
+    return {
+        'bundle_valid': False,
+        'has_akkoord': has_akkoord,
+        'quick_check_only': True,
+        'validation_failures': report.failure_count,
+        'failures_by_section': {
+            section.value: count
+            for section, count in report.failures_by_section().items()
+        }
+    }
+
+
+def _upload_report(config: ValidationConfig, report: "ValidationReport", name: str) -> None:
+    """
+    Upload a validation report as rapportages/<name>.csv, capped at
+    config.report_max_rows_per_group rows per failure group, with all failures in
+    the rapportages/<name>.parquet sidecar.
+    """
+    report_path = config.temp_folder / f'{name}.csv'
+    report.to_csv(report_path, max_rows_per_group=config.report_max_rows_per_group)
+    _upload(str(report_path), config.bucket_name, f'rapportages/{name}.csv')
+    
+    detail_path = config.temp_folder / f'{name}.parquet'
+    report.to_parquet(detail_path)
+    _upload(str(detail_path), config.bucket_name, f'rapportages/{name}.parquet')
+
+
+def _upload(file_name: str, bucket_name: str, key: str) -> None:
+    """Upload an output; raises when it failed, so the bundle is not reported done."""
+    if not upload_file_to_s3(file_name, bucket_name, key):
+        raise RuntimeError(f"Upload of {file_name} to {bucket_name}/{key} failed")
+
+
+def _checkpoint(
+    config: ValidationConfig,
+    state: dict[str, Any],
+    enqueue: Optional[Callable[[str], Any]]
+) -> dict[str, Any]:
+    """Save the state of an interrupted bundle to S3 and enqueue its continuation."""
+    if enqueue is None:
+        raise RuntimeError("Time budget exhausted and no way to continue in a new invocation")
+    if state['resumes'] >= config.max_resumes:
+        raise RuntimeError(
+            f"Data bundle {state['package_name']} not validated after {state['resumes']} resumes"
+        )
+    state['resumes'] += 1
+    
+    key = checkpoint_key(config.checkpoint_prefix, state['package_name'])
+    lease = state['lease']
+    if lease is not None:
+        # Held until the continuation renews it for its own invocation
+        renew_lease(lease, config.idempotency_lease_s)
+    save_checkpoint(config.bucket_name, key, {
+        **state,
+        # A spilled bundle is spilled again from the ZIP on resume
+        'gdf': None if state.get('streaming') else state['gdf'],
+        'lease': asdict(lease) if lease is not None else None,
+    })
+    enqueue(key)
+    
+    validator_state = state['validator']
+    return {
+        'checkpoint': key,
+        'resumes': state['resumes'],
+        'completed_steps': validator_state['completed_steps'] if validator_state else 0,
+    }
+
+
 def _export_geopackage(
     config: ValidationConfig,
-    gdf,
+    gdf: "gpd.GeoDataFrame",
     package_name: str
 ) -> None:
     """Export data to GeoPackage file."""
+    from .exporter import GeoPackageExporter
+
     exporter = GeoPackageExporter(config)
-    gpkg_path = config.temp_folder / 'output.gpkg'
+    gpkg_path = config.temp_folder / f'{package_name}.gpkg'
     exporter.export(gdf, gpkg_path)
 
 
-def _upload_and_notify(config: ValidationConfig, package_name: str) -> None:
-    """Upload GeoPackage to S3 and send SQS notification."""
-    gpkg_path = config.temp_folder / 'output.gpkg'
+def _export_spilled(
+    config: ValidationConfig,
+    ref_data: "ReferenceDataLoader",
+    bundle: "SpilledBundle",
+    package_name: str
+) -> tuple[int, list[str]]:
+    """
+    Export a spilled bundle to GeoPackage like _export_geopackage, a CSV chunk at a
+    time: the records with their geometry and criteria, in the order of set_criteria.
     
-    upload_file_to_s3(
-        str(gpkg_path),
-        config.bucket_name,
-        f'geopackages/{package_name}.gpkg'
-    )
+    Returns:
+        The number of exported records and their criteria
+    """
+    from .exporter import GeoPackageExporter, criteria_columns
+    from .processor import DataBundleProcessor
+
+    processor = DataBundleProcessor(config)
+    exporter = GeoPackageExporter(config)
+    gpkg_path = config.temp_folder / f'{package_name}.gpkg'
     
-    publish_to_sqs(
-        queue_url=config.sqs_queue_url,
-        message_body="test",
-        message_attributes=None,
-        message_group_id='example_group_id'
-    )
+    rows, criteria = 0, set()
+    for columns in criteria_columns(ref_data.validatielijst, package_name) or [{}]:
+        for chunk in bundle.iter_chunks():
+            gdf = processor.to_geodataframe(chunk).assign(**columns)
+            gdf = gdf.drop(columns=[c for c in DROPPED_COLUMNS if c in gdf.columns])
+            exporter.export(gdf, gpkg_path, append=rows > 0)
+            rows += len(gdf)
+            criteria.update(gdf['krmcriterium'].dropna().astype(str))
+    return rows, sorted(criteria)
+
+
+def _upload_and_notify(
+    config: ValidationConfig,
+    rows: int,
+    criteria: list[str],
+    package_name: str,
+    job: str,
+    notify: Optional[Callable[[dict[str, Any]], Any]] = None
+) -> None:
+    """Upload GeoPackage to S3 and notify the publication, deduplicated on the job id."""
+    gpkg_path = config.temp_folder / f'{package_name}.gpkg'
+    gpkg_key = f'{GEOPACKAGE_FOLDER}/{package_name}.gpkg'
+    
+    _upload(str(gpkg_path), config.bucket_name, gpkg_key)
+    
+    notification = _notification(config, rows, criteria, package_name, gpkg_key, job)
+    if notify is not None:
+        notify(notification)
+    else:
+        publish_batch_to_sqs(config.sqs_queue_url, [notification])
+
+
+def _notification(
+    config: ValidationConfig,
+    rows: int,
+    criteria: list[str],
+    package_name: str,
+    gpkg_key: str,
+    job: str
+) -> dict[str, Any]:
+    """
+    Publication notification of an exported bundle, as a publish_batch_to_sqs message.
+    
+    The body tells the publication which GeoPackage (and which version of it)
+    changed, and in which bucket, so a publication never publishes the bundles of
+    another environment. All notifications share the message group of the GeoPackage folder,
+    so the publication consumes them in order, one batch at a time.
+    """
+    return {
+        'body': {
+            'bucket': config.bucket_name,
+            'bundle': package_name.replace('+', ' '),
+            'gpkg_key': gpkg_key,
+            'etag': object_etag(config.bucket_name, gpkg_key),
+            'rows': rows,
+            'criteria': criteria,
+            'job_id': job,
+        },
+        'group_id': GEOPACKAGE_FOLDER,
+        'deduplication_id': job,
+    }
 
 
 # Allow running directly for local testing
@@ -0,0 +1,182 @@
+"""
+Idempotent processing of data bundle uploads.
+
+S3 event notifications are delivered at least once, and a re-upload of the same
+object fires the Lambda again. Each bundle version is therefore processed under a
+lease: a small JSON object at
+
+    s3://<bucket_name><idempotency_prefix><job_id>.json
+
+where job_id is derived from (bucket, key, versionId or ETag). The first
+invocation creates the lease with a conditional write (If-None-Match) and holds it
+while it validates, also across checkpoint/resume invocations. A duplicate waits
+for the lease to be completed and then reuses the stored result instead of
+deleting the GeoPackage, validating, exporting and publishing again. A lease whose
+holder died expires and is taken over (If-Match on the expired lease). The
+completed lease keeps the result for config.idempotency_retention_s.
+
+A Lambda invocation that times out or runs out of memory cannot release its lease,
+so a lease runs at most until the end of the invocation plus a margin, and is
+renewed while the job runs (keep_lease). A duplicate that finds the lease still
+running after waiting raises LeaseHeld instead of reporting success, so the event
+is retried (Lambda's async retries, or the worker leaves the message on the
+queue) and processed once the lease of a dead holder has expired.
+
+The job id is also the deduplication id of the SQS message published for the
+bundle, so a duplicate that does get through is dropped by the FIFO queue.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+import boto3
+from botocore.exceptions import ClientError
+
+from .s3_functions import _get_status, _is_precondition_failure
+
+LEASE_RUNNING = 'running'
+LEASE_DONE = 'done'
+
+# Seconds between reads of a lease held by another invocation
+POLL_SECONDS = 2
+
+
+def object_version(bucket_name: str, key: str, s3_object: Optional[dict] = None) -> str:
+    """
+    Version of an S3 object: its versionId in a versioned bucket, else its ETag.
+
+    Taken from the object of an S3 event record when given, as S3 sends it
+    (versionId, eTag); otherwise read with a HEAD request.
+    """
+    if s3_object and (s3_object.get('versionId') or s3_object.get('eTag')):
+        version, etag = s3_object.get('versionId'), s3_object.get('eTag')
+    else:
+        response = boto3.client('s3').head_object(Bucket=bucket_name, Key=key)
+        version, etag = response.get('VersionId'), response['ETag']
+    if version and version != 'null':
+        return version
+    return etag.strip('"')
+
+
+def job_id(bucket_name: str, key: str, version: str) -> str:
+    """Deterministic id of processing one version of an object; a valid SQS deduplication id."""
+    return hashlib.sha256(f"{bucket_name}/{key}@{version}".encode('utf-8')).hexdigest()
+
+
+class LeaseHeld(RuntimeError):
+    """The job is still running under the lease of another invocation."""
+
+
+@dataclass
+class Lease:
+    """
+    A lease held by this invocation; etag is the version of the lease object written
+    last, expires_at and seconds the expiry and duration it was written with.
+    """
+
+    bucket_name: str
+    key: str
+    job_id: str
+    owner: str
+    etag: str
+    expires_at: float = 0.0
+    seconds: float = 0.0
+
+
+def acquire_lease(
+    bucket_name: str,
+    prefix: str,
+    job: str,
+    lease_seconds: int,
+    wait_seconds: int,
+    **details: Any
+) -> tuple[Optional[Lease], Optional[dict[str, Any]]]:
+    """
+    Take the lease of a job.
+
+    Returns:
+        (lease, None) when this invocation should process the job, or (None, record)
+        for a duplicate: record is the completed lease with the result, or the lease
+        still running after wait_seconds
+    """
+    s3 = boto3.client('s3')
+    key = f"{prefix}{job}.json"
+    owner = uuid.uuid4().hex
+    deadline = time.monotonic() + wait_seconds
+
+    while True:
+        record, etag = _get_status(s3, bucket_name, key)
+        if record is None or record['expires_at'] <= time.time():
+            expires_at = time.time() + lease_seconds
+            body = {
+                **details,
+                'job_id': job,
+                'owner': owner,
+                'state': LEASE_RUNNING,
+                'expires_at': expires_at,
+            }
+            condition = {'IfNoneMatch': '*'} if etag is None else {'IfMatch': etag}
+            try:
+                response = _put(s3, bucket_name, key, body, condition)
+            except ClientError as e:
+                if not _is_precondition_failure(e):
+                    raise
+                continue
+            return Lease(bucket_name, key, job, owner, response['ETag'], expires_at, lease_seconds), None
+
+        if record['state'] == LEASE_DONE or time.monotonic() >= deadline:
+            print(f"Job {job} is a duplicate ({record['state']}), not processing it again.")
+            return None, record
+        time.sleep(POLL_SECONDS)
+
+
+def renew_lease(lease: Lease, lease_seconds: float) -> None:
+    """Extend a running lease, e.g. when a checkpointed job is resumed."""
+    expires_at = time.time() + lease_seconds
+    _update(lease, {'state': LEASE_RUNNING, 'expires_at': expires_at})
+    lease.expires_at, lease.seconds = expires_at, lease_seconds
+
+
+def keep_lease(lease: Lease, lease_seconds: Callable[[], float]) -> None:
+    """Renew a running lease for lease_seconds() once half of its duration has passed."""
+    if time.time() >= lease.expires_at - lease.seconds / 2:
+        renew_lease(lease, lease_seconds())
+
+
+def complete_lease(lease: Lease, result: dict[str, Any], retention_seconds: int) -> None:
+    """Store the result of the job, for duplicates to reuse during retention_seconds."""
+    _update(lease, {'state': LEASE_DONE, 'expires_at': time.time() + retention_seconds, 'result': result})
+
+
+def release_lease(lease: Lease) -> None:
+    """Give up a lease after a failure, so a retry can process the job; unless it was taken over."""
+    s3 = boto3.client('s3')
+    record, _ = _get_status(s3, lease.bucket_name, lease.key)
+    if record is not None and record.get('owner') == lease.owner:
+        s3.delete_object(Bucket=lease.bucket_name, Key=lease.key)
+
+
+def _update(lease: Lease, changes: dict[str, Any]) -> None:
+    """Rewrite the lease object if it is still ours; raises when another invocation took it over."""
+    s3 = boto3.client('s3')
+    record, _ = _get_status(s3, lease.bucket_name, lease.key)
+    try:
+        response = _put(s3, lease.bucket_name, lease.key, {**(record or {}), **changes}, {'IfMatch': lease.etag})
+    except ClientError as e:
+        if not _is_precondition_failure(e):
+            raise
+        raise RuntimeError(f"Lease of job {lease.job_id} expired and was taken over") from e
+    lease.etag = response['ETag']
+
+
+def _put(s3, bucket_name: str, key: str, body: dict[str, Any], condition: dict[str, str]) -> dict:
+    return s3.put_object(
+        Bucket=bucket_name, Key=key, Body=json.dumps(body, default=str),
+        ContentType='application/json', **condition
+    )
@@ -0,0 +1,244 @@
+"""
+Compiled reference data artifact.
+
+The reference CSVs and the KRM location shapefiles are compiled at image build time
+into a directory of uncompressed Feather (Arrow IPC) files, which are memory-mapped
+on load, plus a manifest with the artifact version, the configured source and a
+content hash of the source files:
+
+    reference_artifact/
+        manifest.json
+        validatielijst.feather
+        groep.feather
+        kolomdefinitie.feather
+        locaties.feather       # LOCATION_COLUMNS, WKB geometry and pre-projected WKB geometry
+
+Build it from the repository's data/ folder with:
+
+    python -m krm_validator.reference_artifact data/ build/reference_artifact
+
+The image build pins the content hash (KRM_REFERENCE_DATA_HASH, printed by
+``--print-hash``): it passes it as ``--expect-hash``, which fails the build when
+data/ has another hash, and sets it in the image, where the artifact is only used
+with that hash (see ReferenceDataLoader).
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    import geopandas as gpd
+
+ARTIFACT_VERSION = 1
+MANIFEST = "manifest.json"
+
+# Reference CSV -> artifact table
+TABLES = {
+    "validatielijst.csv": "validatielijst.feather",
+    "groep.csv": "groep.feather",
+    "kolomdefinitie.csv": "kolomdefinitie.feather",
+}
+LOCATIONS = "locaties.feather"
+SHAPEFILES = ("KRM2_P", "KRM2_V")
+SHAPEFILE_EXTENSIONS = (".shp", ".shx", ".prj", ".dbf", ".cpg")
+# Location attributes the validation uses, besides the geometry
+LOCATION_COLUMNS = ("MPNIDENT",)
+
+
+def read_reference_csv(path: Path) -> pd.DataFrame:
+    """Read a reference CSV with the same parsing as get_data_from_github."""
+    df = pd.read_csv(path, encoding='windows-1252', delimiter=';')
+    df['new_index'] = range(1, len(df) + 1)
+    return df
+
+
+def read_location_shapefiles(
+    shape_folder: Path,
+    columns: tuple[str, ...] = LOCATION_COLUMNS
+) -> "gpd.GeoDataFrame":
+    """
+    Read and combine the point and polygon location shapefiles.
+
+    Only the given attribute columns are read, as Arrow tables through pyogrio. The
+    tables of both shapefiles are chained (pa.concat_tables does not copy) and
+    converted to a GeoDataFrame once.
+    """
+    import geopandas as gpd
+    import pyarrow as pa
+    import pyogrio
+
+    tables = []
+    crs = set()
+    for prefix in SHAPEFILES:
+        meta, table = pyogrio.read_arrow(Path(shape_folder) / f"{prefix}.shp", columns=list(columns))
+        geometry_name = meta["geometry_name"] or "wkb_geometry"
+        tables.append(table.select([*columns, geometry_name]).rename_columns([*columns, "geometry"]))
+        crs.add(meta["crs"])
+    if len(crs) != 1:
+        raise ValueError(f"Location shapefiles in {shape_folder} have different CRS: {sorted(crs)}")
+
+    table = pa.concat_tables(tables)
+    geometry = gpd.GeoSeries.from_wkb(table.column("geometry").to_numpy(zero_copy_only=False), crs=crs.pop())
+    return gpd.GeoDataFrame(table.select(list(columns)).to_pandas(), geometry=geometry)
+
+
+def source_files(data_dir: Path) -> list[Path]:
+    """Reference files that make up the source, in hashing order."""
+    data_dir = Path(data_dir)
+    files = [data_dir / name for name in TABLES]
+    files += [
+        data_dir / "KRM_locatiedetails" / f"{prefix}{ext}"
+        for prefix in SHAPEFILES for ext in SHAPEFILE_EXTENSIONS
+    ]
+    return [path for path in files if path.exists()]
+
+
+def source_hash(data_dir: Path) -> str:
+    """SHA-256 over the relative paths and contents of the reference files."""
+    digest = hashlib.sha256()
+    for path in source_files(data_dir):
+        digest.update(path.relative_to(data_dir).as_posix().encode())
+        digest.update(b"\0")
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def build_artifact(
+    data_dir: Path,
+    out_dir: Path,
+    source: str,
+    projected_crs: str = "EPSG:32631"
+) -> dict:
+    """
+    Compile the reference data in data_dir into an artifact in out_dir.
+
+    Args:
+        data_dir: Folder with the reference CSVs and KRM_locatiedetails/
+        out_dir: Artifact folder, created if needed
+        source: Source the data was taken from (the configured github_base_url)
+        projected_crs: CRS of the pre-projected location geometry
+
+    Returns:
+        The manifest
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    data_dir = Path(data_dir)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    for csv_name, table_name in TABLES.items():
+        df = read_reference_csv(data_dir / csv_name)
+        feather.write_feather(df, out_dir / table_name, compression='uncompressed')
+
+    locations = read_location_shapefiles(data_dir / "KRM_locatiedetails")
+    table = pd.DataFrame(locations.drop(columns='geometry'))
+    table['geometry_wkb'] = locations.geometry.to_wkb()
+    table['geometry_projected_wkb'] = locations.to_crs(projected_crs).geometry.to_wkb()
+    feather.write_feather(
+        pa.Table.from_pandas(table, preserve_index=False), out_dir / LOCATIONS,
+        compression='uncompressed'
+    )
+
+    manifest = {
+        "version": ARTIFACT_VERSION,
+        "source": source,
+        "source_hash": source_hash(data_dir),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "crs": locations.crs.to_string(),
+        "projected_crs": projected_crs,
+        "tables": {name.removesuffix(".csv"): file for name, file in TABLES.items()},
+        "locations": LOCATIONS,
+    }
+    (out_dir / MANIFEST).write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+    return manifest
+
+
+class ReferenceArtifact:
+    """Read access to a compiled reference data artifact."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.manifest = json.loads((self.path / MANIFEST).read_text(encoding="utf-8"))
+
+    @classmethod
+    def open(cls, path: Path | None) -> "ReferenceArtifact | None":
+        """Open the artifact at path; None when there is none or it has another version."""
+        if path is None or not (Path(path) / MANIFEST).exists():
+            return None
+        artifact = cls(path)
+        if artifact.manifest.get("version") != ARTIFACT_VERSION:
+            return None
+        return artifact
+
+    @property
+    def source_hash(self) -> str:
+        return self.manifest["source_hash"]
+
+    def _read(self, filename: str, columns: list[str] | None = None) -> pd.DataFrame:
+        import pyarrow.feather as feather
+
+        return feather.read_table(self.path / filename, columns=columns, memory_map=True).to_pandas()
+
+    def table(self, name: str) -> pd.DataFrame:
+        """Reference table by CSV name without extension, e.g. 'validatielijst'."""
+        df = self._read(self.manifest["tables"][name])
+        # Arrow nulls come back as None in object columns; read_csv gives NaN
+        text = df.select_dtypes(include='object').columns
+        df[text] = df[text].where(df[text].notna(), np.nan)
+        return df
+
+    def locations(self, projected: bool = False) -> "gpd.GeoDataFrame":
+        """Location GeoDataFrame, in the source CRS or pre-projected to projected_crs."""
+        import geopandas as gpd
+
+        column = 'geometry_projected_wkb' if projected else 'geometry_wkb'
+        df = self._read(self.manifest["locations"], [*LOCATION_COLUMNS, column])
+        geometry = gpd.GeoSeries.from_wkb(
+            df.pop(column), crs=self.manifest["projected_crs" if projected else "crs"]
+        )
+        return gpd.GeoDataFrame(df, geometry=geometry)
+
+
+def main() -> None:
+    from .config import ValidationConfig
+
+    config = ValidationConfig()
+    parser = argparse.ArgumentParser(description="Compile the KRM reference data into an artifact.")
+    parser.add_argument("data_dir", type=Path, help="Folder with the reference CSVs and KRM_locatiedetails/")
+    parser.add_argument("out_dir", type=Path, nargs="?", help="Artifact folder")
+    parser.add_argument("--source", default=config.github_base_url,
+                        help="Source recorded in the manifest (default: the configured GitHub URL)")
+    parser.add_argument("--expect-hash",
+                        help="Fail unless data_dir has this content hash (the pinned KRM_REFERENCE_DATA_HASH)")
+    parser.add_argument("--print-hash", action="store_true",
+                        help="Only print the content hash of data_dir")
+    args = parser.parse_args()
+
+    if args.print_hash:
+        print(source_hash(args.data_dir))
+        return
+    if args.out_dir is None:
+        parser.error("out_dir is required")
+    if args.expect_hash is not None and source_hash(args.data_dir) != args.expect_hash:
+        parser.error(
+            f"{args.data_dir} has content hash {source_hash(args.data_dir)}, "
+            f"not the pinned {args.expect_hash or '(empty)'}"
+        )
+
+    manifest = build_artifact(args.data_dir, args.out_dir, args.source, config.distance_crs)
+    print(f"Reference artifact {manifest['source_hash'][:12]} written to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from io import StringIO
-import uuid
+import hashlib
 import boto3
 import json
 
 from botocore.exceptions import NoCredentialsError, ClientError
-import pandas as pd
 
-def publish_to_sqs(queue_url, message_body, message_attributes=None, message_group_id=None, deduplication_id=str(uuid.uuid4())):
+def publish_to_sqs(queue_url, message_body, message_attributes=None, message_group_id=None, deduplication_id=None):
     """
     Publish a message to an SQS queue.
     
@@ -15,7 +15,8 @@ def publish_to_sqs(queue_url, message_body, message_attributes=None, message_gro
     :param message_body: The message body (dict or string).
     :param message_attributes: Optional. Dictionary of message attributes.
     :param message_group_id: Required for FIFO queues. The group ID for the message.
-    :param deduplication_id: Optional. Unique deduplication ID for the message (FIFO queues).
+    :param deduplication_id: Optional. Deduplication ID for the message (FIFO queues); defaults
+        to a hash of the group and body, so a resent identical message is dropped.
     :return: The response from the SQS send_message call.
     """
     # Initialize SQS client
@@ -38,8 +39,7 @@ def publish_to_sqs(queue_url, message_body, message_attributes=None, message_gro
             if not message_group_id:
                 raise ValueError("MessageGroupId is required for FIFO queues.")
             params['MessageGroupId'] = message_group_id
-            if deduplication_id:
-                params['MessageDeduplicationId'] = deduplication_id
+            params['MessageDeduplicationId'] = deduplication_id or _deduplication_id(message_group_id, message_body)
         
         response = sqs.send_message(**params)
         print(f"Message sent to SQS queue. Message ID: {response['MessageId']}")
@@ -48,6 +48,66 @@ def publish_to_sqs(queue_url, message_body, message_attributes=None, message_gro
         print(f"Failed to send message to SQS: {str(e)}")
         raise
 
+
+# Entries per send_message_batch call, and attempts for entries that failed
+SQS_BATCH_SIZE = 10
+SQS_BATCH_ATTEMPTS = 3
+
+
+def _deduplication_id(message_group_id, message_body):
+    """Deterministic FIFO deduplication ID: a hash of the group and body."""
+    return hashlib.sha256(f"{message_group_id}:{message_body}".encode('utf-8')).hexdigest()
+
+
+def publish_batch_to_sqs(queue_url, messages):
+    """
+    Publish messages to an SQS queue with send_message_batch, up to 10 per call.
+
+    Entries that failed with a server side error are sent again, up to
+    SQS_BATCH_ATTEMPTS times.
+
+    :param queue_url: The URL of the SQS queue.
+    :param messages: List of dicts with 'body' (dict or string) and, for FIFO queues,
+        'group_id' and optionally 'deduplication_id' (see publish_to_sqs).
+    :return: The message IDs, in the order of messages.
+    """
+    sqs = boto3.client('sqs')
+    fifo = 'fifo' in queue_url.lower()
+
+    entries = []
+    for i, message in enumerate(messages):
+        body = message['body']
+        if isinstance(body, dict):
+            body = json.dumps(body, default=str)
+        entry = {'Id': str(i), 'MessageBody': body}
+        if fifo:
+            if not message.get('group_id'):
+                raise ValueError("MessageGroupId is required for FIFO queues.")
+            entry['MessageGroupId'] = message['group_id']
+            entry['MessageDeduplicationId'] = (
+                message.get('deduplication_id') or _deduplication_id(message['group_id'], body)
+            )
+        entries.append(entry)
+
+    message_ids = {}
+    for start in range(0, len(entries), SQS_BATCH_SIZE):
+        pending = entries[start:start + SQS_BATCH_SIZE]
+        for attempt in range(SQS_BATCH_ATTEMPTS):
+            response = sqs.send_message_batch(QueueUrl=queue_url, Entries=pending)
+            message_ids.update({sent['Id']: sent['MessageId'] for sent in response.get('Successful', [])})
+            failed = {failure['Id']: failure for failure in response.get('Failed', [])}
+            permanent = [failure for failure in failed.values() if failure.get('SenderFault')]
+            if permanent:
+                raise RuntimeError(f"SQS rejected messages: {permanent}")
+            pending = [entry for entry in pending if entry['Id'] in failed]
+            if not pending:
+                break
+        else:
+            raise RuntimeError(f"Failed to send {len(pending)} messages to SQS after {SQS_BATCH_ATTEMPTS} attempts")
+
+    print(f"{len(message_ids)} messages sent to SQS queue in {-(-len(entries) // SQS_BATCH_SIZE)} batches.")
+    return [message_ids[entry['Id']] for entry in entries]
+
 def download_file_from_s3(bucket_name, s3_file_key, local_file_path):
     """
     Download a file from an S3 bucket to local storage.
@@ -92,6 +152,17 @@ def upload_file_to_s3(file_name, bucket_name, s3_file_key):
         print(f"An error occurred: {str(e)}")
         return False
 
+def object_etag(bucket_name, s3_file_key):
+    """
+    ETag of an object in an S3 bucket, without the surrounding quotes.
+
+    :param bucket_name: Name of the S3 bucket.
+    :param s3_file_key: The key (path) of the object.
+    :return: The ETag.
+    """
+    s3 = boto3.client('s3')
+    return s3.head_object(Bucket=bucket_name, Key=s3_file_key)['ETag'].strip('"')
+
 def delete_file_from_s3(bucket_name, s3_file_key):
     """
     Deletes a file from an S3 bucket.
@@ -123,38 +194,139 @@ def delete_file_from_s3(bucket_name, s3_file_key):
         print(f"An error occurred: {e}")
         return False
        
-def report_databundle(df, package_name, state):
+# Bundle status store: one small object per bundle under STATUS_PREFIX, compacted
+# into AKKOORDDATA_KEY for the dashboard by compact_databundle_status.
+STATUS_BUCKET = "krm-validatie-data-prod"
+STATUS_PREFIX = "rapportages/status/"
+AKKOORDDATA_KEY = "rapportages/akkoorddata.csv"
+STATUS_COLUMNS = ['databundelcode', 'krmcriterium', 'last_updated', 'status']
+STATUS_MAX_ATTEMPTS = 10
 
-    s3 = boto3.client('s3')
-    
-    bucket_name = "krm-validatie-data-prod"
 
-    response = s3.get_object(Bucket=bucket_name, Key='rapportages/akkoorddata.csv')
-    csv_data = response['Body'].read().decode('utf-8')
-    
-    current_datetime = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+def status_key(package_name):
+    """S3 key of the status object of a data bundle."""
+    return f"{STATUS_PREFIX}{package_name}.json"
+
+
+def _is_precondition_failure(error):
+    return error.response['Error']['Code'] in ('PreconditionFailed', 'ConditionalRequestConflict', '412', '409')
+
 
-    row = { 
+def _get_status(s3, bucket_name, key):
+    """Return (status dict, ETag) of a status object, or (None, None) if it does not exist."""
+    try:
+        response = s3.get_object(Bucket=bucket_name, Key=key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+            return None, None
+        raise
+    return json.loads(response['Body'].read()), response['ETag']
+
+
+def report_databundle(df, package_name, state, bucket_name=STATUS_BUCKET):
+    """
+    Record the validation status of a data bundle.
+
+    Writes only the status object of this bundle, so the cost does not depend on the
+    number of bundles. The write is conditional on the ETag that was read (If-Match, or
+    If-None-Match for a new bundle); when another invocation wrote in between, the
+    object is re-read and the write retried. An update older than the stored one is
+    dropped so a slow invocation cannot overwrite a newer status.
+
+    :param df: DataFrame of the bundle, the krmcriterium of the first row is recorded.
+    :param package_name: Name of the data bundle.
+    :param state: Status text.
+    :param bucket_name: Name of the S3 bucket holding the status store.
+    :return: The recorded status, or None if a newer status was already stored.
+    """
+    s3 = boto3.client('s3')
+
+    now = datetime.now()
+    row = {
             'databundelcode': package_name,
             'krmcriterium': df['krmcriterium'].values[0],
-            'last_updated': current_datetime,
-            'status': state
+            'last_updated': now.strftime('%Y-%m-%d %H:%M:%S'),
+            'status': state,
+            'updated_at': now.isoformat(timespec='microseconds')
            }
+    body = json.dumps(row, default=str)
+    key = status_key(package_name)
+
+    for attempt in range(STATUS_MAX_ATTEMPTS):
+        current, etag = _get_status(s3, bucket_name, key)
+        if current is not None and current.get('updated_at', '') > row['updated_at']:
+            print(f"Status of {package_name} is newer than this update, skipping.")
+            return None
 
-    # Step 2: Load the CSV data into a DataFrame
-    val = pd.read_csv(StringIO(csv_data), sep=';')
+        condition = {'IfNoneMatch': '*'} if etag is None else {'IfMatch': etag}
+        try:
+            s3.put_object(Bucket=bucket_name, Key=key, Body=body,
+                          ContentType='application/json', **condition)
+            return row
+        except ClientError as e:
+            if not _is_precondition_failure(e):
+                raise
+            print(f"Status of {package_name} changed concurrently, retrying ({attempt + 1}).")
 
-    if package_name in val['databundelcode'].values:
-        # Update the existing record
-        val.loc[val['databundelcode'] == package_name, ['krmcriterium', 'status', 'last_updated']] = row['krmcriterium'], row['status'], row['last_updated']
-    else:
-        # Append the new record
-        new_record_df = pd.DataFrame([row])
-        val = pd.concat([val, new_record_df], ignore_index=True)
+    raise RuntimeError(f"Could not record status of {package_name} after {STATUS_MAX_ATTEMPTS} attempts")
+
+
+def compact_databundle_status(bucket_name=STATUS_BUCKET, max_workers=16):
+    """
+    Materialize the status store into akkoorddata.csv for the dashboard.
+
+    Bundles that only occur in the existing akkoorddata.csv (recorded before the status
+    store existed) are kept. The CSV is derived data, so concurrent compactions are
+    harmless: the last one wins with an equally complete file.
+
+    :param bucket_name: Name of the S3 bucket holding the status store.
+    :param max_workers: Number of parallel status object reads.
+    :return: The compacted DataFrame.
+    """
+    import pandas as pd
+
+    s3 = boto3.client('s3')
+
+    keys = []
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=STATUS_PREFIX):
+        keys.extend(obj['Key'] for obj in page.get('Contents', []) if obj['Key'].endswith('.json'))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        statuses = [status for status, _ in executor.map(lambda key: _get_status(s3, bucket_name, key), keys)
+                    if status is not None]
+    current = pd.DataFrame(statuses, columns=STATUS_COLUMNS)
+
+    try:
+        response = s3.get_object(Bucket=bucket_name, Key=AKKOORDDATA_KEY)
+        legacy = pd.read_csv(StringIO(response['Body'].read().decode('utf-8')), sep=';')
+        legacy = legacy[~legacy['databundelcode'].isin(current['databundelcode'])]
+        val = pd.concat([legacy, current], ignore_index=True)
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('NoSuchKey', '404'):
+            raise
+        val = current
 
-    # Step 4: Write the updated DataFrame back to a CSV format
     csv_buffer = StringIO()
     val.to_csv(csv_buffer, index=False, sep=';')
+    s3.put_object(Bucket=bucket_name, Key=AKKOORDDATA_KEY, Body=csv_buffer.getvalue())
+    print(f"Compacted status of {len(current)} bundles into {AKKOORDDATA_KEY}")
+    return val
+
 
-    # Step 5: Upload the updated CSV back to S3
-    s3.put_object(Bucket=bucket_name, Key='rapportages/akkoorddata.csv', Body=csv_buffer.getvalue())
+def invoke_lambda_async(function_name, payload):
+    """
+    Invoke a Lambda function asynchronously (fire and forget).
+
+    :param function_name: Name or ARN of the Lambda function.
+    :param payload: Event for the invocation (dict).
+    :return: The response from the Lambda invoke call.
+    """
+    client = boto3.client('lambda')
+    response = client.invoke(
+        FunctionName=function_name,
+        InvocationType='Event',
+        Payload=json.dumps(payload).encode('utf-8')
+    )
+    print(f"Invoked {function_name} asynchronously with {payload}")
+    return response
@@ -0,0 +1,171 @@
+"""Location-partitioned sharded validation of large data bundles."""
+
+from __future__ import annotations
+
+import heapq
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import TYPE_CHECKING, Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .validator import KRMValidator
+
+if TYPE_CHECKING:
+    import geopandas as gpd
+
+    from config import ValidationConfig
+    from reference_data import ReferenceDataLoader
+    from report import ValidationReport
+
+
+def location_shards(locations: pd.Series, n_shards: int) -> list[np.ndarray]:
+    """
+    Split records into shards of whole locations with balanced sizes.
+
+    Locations are assigned largest first to the currently smallest shard, so all
+    records of a location end up in the same shard.
+
+    Args:
+        locations: Location of each record (meetobject.lokaalid)
+        n_shards: Maximum number of shards
+
+    Returns:
+        Ascending record positions per non-empty shard
+    """
+    codes, uniques = pd.factorize(locations, use_na_sentinel=False)
+    sizes = np.bincount(codes, minlength=len(uniques))
+
+    shard_of_location = np.empty(len(uniques), dtype=int)
+    loads = [(0, shard) for shard in range(max(1, n_shards))]
+    for location in np.argsort(-sizes, kind='stable'):
+        load, shard = heapq.heappop(loads)
+        shard_of_location[location] = shard
+        heapq.heappush(loads, (load + sizes[location], shard))
+
+    shard_of_record = shard_of_location[codes]
+    shards = [np.flatnonzero(shard_of_record == shard) for shard in range(max(1, n_shards))]
+    return [positions for positions in shards if len(positions)]
+
+
+# Validator of a worker process, created once per worker by _init_worker
+_worker_validator: Optional[KRMValidator] = None
+
+
+def _init_worker(config: "ValidationConfig", ref_data: "ReferenceDataLoader") -> None:
+    global _worker_validator
+    _worker_validator = KRMValidator(config, ref_data)
+
+
+def _shard_rule_records(shard, package_name, validatieregels, group) -> list[dict]:
+    return _worker_validator._rule_records(shard, package_name, validatieregels, group)
+
+
+def _shard_column_value_findings(shard, rules) -> list[tuple]:
+    return _worker_validator._column_value_findings(shard, rules)
+
+
+class ShardedKRMValidator(KRMValidator):
+    """
+    KRMValidator that runs the per-record checks on a process pool.
+
+    Rule determination and the column value check loop over every record and every
+    validation rule and take nearly all of the validation time. For bundles of at
+    least min_rows records they are run per shard of whole locations (see
+    location_shards) on a pool of worker processes. The workers get the reference
+    data once, at start-up. The checks over the whole bundle (counts, verzamelingen,
+    date range, ...) run in this process on the combined rules, and shard results are
+    put back in record order, so the report equals that of a single-process run.
+
+    Smaller bundles, a single worker, or a platform without process pools (AWS
+    Lambda has no /dev/shm) validate in a single process.
+    """
+
+    def __init__(
+        self,
+        config: "ValidationConfig",
+        ref_data: "ReferenceDataLoader",
+        workers: Optional[int] = None,
+        min_rows: Optional[int] = None
+    ):
+        super().__init__(config, ref_data)
+        self.workers = config.shard_workers if workers is None else workers
+        self.min_rows = config.shard_min_rows if min_rows is None else min_rows
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def validate(
+        self,
+        gdf: "gpd.GeoDataFrame",
+        package_name: str,
+        should_stop: Optional[Callable[[], bool]] = None
+    ) -> "ValidationReport":
+        if self.workers < 2 or len(gdf) < self.min_rows:
+            return super().validate(gdf, package_name, should_stop)
+
+        try:
+            pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=self._mp_context(),
+                initializer=_init_worker,
+                initargs=(self.config, self.ref_data)
+            )
+        except OSError as e:
+            print(f"No process pool available ({e}); validating in a single process")
+            return super().validate(gdf, package_name, should_stop)
+
+        with pool:
+            self._pool = pool
+            try:
+                return super().validate(gdf, package_name, should_stop)
+            finally:
+                self._pool = None
+
+    @staticmethod
+    def _mp_context():
+        # Fork shares the loaded reference data with the workers without pickling
+        methods = multiprocessing.get_all_start_methods()
+        return multiprocessing.get_context('fork' if 'fork' in methods else None)
+
+    def _shards(self, df: pd.DataFrame) -> tuple[list[np.ndarray], list[pd.DataFrame]]:
+        """Shard positions and shard frames, without geometry (not used per record)."""
+        frame = pd.DataFrame(df).reset_index(drop=True)
+        if hasattr(df, 'geometry'):
+            frame = frame.drop(columns=df.geometry.name)
+        shards = location_shards(frame['meetobject.lokaalid'], self.workers)
+        return shards, [frame.iloc[positions] for positions in shards]
+
+    def _rule_records(
+        self,
+        df: pd.DataFrame,
+        package_name: str,
+        validatieregels: pd.DataFrame,
+        group: pd.DataFrame
+    ) -> list[dict]:
+        if self._pool is None:
+            return super()._rule_records(df, package_name, validatieregels, group)
+
+        shards, frames = self._shards(df)
+        records: list[dict] = [None] * len(df)
+        results = self._pool.map(
+            _shard_rule_records, frames, repeat(package_name), repeat(validatieregels), repeat(group)
+        )
+        for positions, shard_records in zip(shards, results):
+            for position, record in zip(positions, shard_records):
+                records[position] = record
+        return records
+
+    def _column_value_findings(self, df: pd.DataFrame, rules: pd.DataFrame) -> list[tuple]:
+        if self._pool is None:
+            return super()._column_value_findings(df, rules)
+
+        _, frames = self._shards(df)
+        findings = [
+            finding
+            for shard_findings in self._pool.map(_shard_column_value_findings, frames, repeat(rules))
+            for finding in shard_findings
+        ]
+        # Shard findings are labelled with record positions; restore record order and labels
+        findings.sort(key=lambda finding: finding[0])
+        return [(df.index[position], record_id, informatie) for position, record_id, informatie in findings]
@@ -24,6 +24,9 @@ resource "aws_lambda_function" "krm_validatie_lambda" {
 
       # S3 settings
       KRM_BUCKET_NAME = "${var.bucket_name}-${terraform.workspace}"
+
+      # Publication notifications
+      KRM_SQS_QUEUE_URL = aws_sqs_queue.publish_queue.url
     }
   }
 }
@@ -88,6 +91,16 @@ data "aws_iam_policy_document" "lambda_s3_policy" {
   }
 }
 
+# Lets the validation Lambda continue a checkpointed data bundle in a new invocation
+data "aws_iam_policy_document" "lambda_invoke_self_policy" {
+  statement {
+    actions = [
+      "lambda:InvokeFunction"
+    ]
+    resources = ["arn:aws:lambda:eu-west-1:*:function:krm-validatie-lambda-${terraform.workspace}"]
+  }
+}
+
 data "aws_iam_policy_document" "lambda_assume_role_policy" {
   statement {
     effect = "Allow"
@@ -119,6 +132,11 @@ resource "aws_iam_role" "function_role" {
     name   = "lambda_s3_policy"
     policy = data.aws_iam_policy_document.lambda_s3_policy.json
   }
+
+  inline_policy {
+    name   = "lambda_invoke_self_policy"
+    policy = data.aws_iam_policy_document.lambda_invoke_self_policy.json
+  }
 }
 
 resource "aws_lambda_permission" "allow_bucket" {
@@ -187,3 +205,56 @@ resource "aws_s3_bucket_notification" "bucket_notification" {
 
 #   depends_on = [aws_lambda_permission.allow_sns_publish_prod]
 # }
+
+# Periodically materialize the per-bundle status objects into rapportages/akkoorddata.csv
+resource "aws_cloudwatch_event_rule" "compact_status" {
+  name                = "krm-validatie-compact-status-${terraform.workspace}"
+  schedule_expression = "rate(15 minutes)"
+}
+
+resource "aws_cloudwatch_event_target" "compact_status" {
+  rule  = aws_cloudwatch_event_rule.compact_status.name
+  arn   = aws_lambda_function.krm_validatie_lambda.arn
+  input = jsonencode({ action = "compact_status" })
+}
+
+resource "aws_lambda_permission" "allow_compact_status" {
+  statement_id  = "AllowExecutionFromCompactStatusSchedule"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.krm_validatie_lambda.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.compact_status.arn
+}
+
+# Publication notifications of the validation (bucket, bundle, GeoPackage key and
+# ETag). The publication Lambda publishes each batch of up to 10 notifications once.
+# One queue per workspace, so the publication of an environment only receives the
+# notifications of its own bucket. The Lambda publishes a batch in order up to the
+# first notification that fails (about another bucket, or its publication raised);
+# that one and the ones after it are reported as batch item failures and stay on the
+# queue. A notification that failed 5 times moves to the dead-letter queue, so it no
+# longer blocks the message group. The visibility timeout is the publication Lambda
+# timeout.
+resource "aws_sqs_queue" "publish_queue" {
+  name                       = "krm-publicatie-${terraform.workspace}.fifo"
+  fifo_queue                 = true
+  visibility_timeout_seconds = aws_lambda_function.krm_publicatie_lambda.timeout
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.publish_dead_letter_queue.arn
+    maxReceiveCount     = 5
+  })
+}
+
+resource "aws_sqs_queue" "publish_dead_letter_queue" {
+  name                      = "krm-publicatie-${terraform.workspace}-dlq.fifo"
+  fifo_queue                = true
+  message_retention_seconds = 1209600
+}
+
+resource "aws_lambda_event_source_mapping" "publish_notifications" {
+  event_source_arn        = aws_sqs_queue.publish_queue.arn
+  function_name           = aws_lambda_function.krm_publicatie_lambda.arn
+  batch_size              = 10
+  function_response_types = ["ReportBatchItemFailures"]
+}
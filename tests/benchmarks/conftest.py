@@ -0,0 +1,129 @@
+"""
+Fixtures for the validation benchmarks.
+
+Bundle sizes and shapes are set through environment variables so the same suite
+runs as a quick smoke test and as a full-size benchmark:
+
+    KRM_BENCH_ROWS=1000,100000,5000000   records per bundle (default 200)
+    KRM_BENCH_PROFILES=biotaxon,timeseries,multicriterion
+    KRM_BENCH_FAULT_RATE=0.02            fraction of records with an injected fault
+    KRM_BENCH_ROUNDS=3                   timed rounds per stage
+    KRM_BENCH_WORKERS=2                  worker processes of the sharded validation
+"""
+
+import io
+import os
+import sys
+import tracemalloc
+import zipfile
+from pathlib import Path
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from synthetic import DATA_DIR, PROFILES, write_bundle_zip  # noqa: E402
+
+BENCH_ROWS = [int(n) for n in (os.environ.get("KRM_BENCH_ROWS") or "200").split(",")]
+BENCH_PROFILES = (os.environ.get("KRM_BENCH_PROFILES") or ",".join(PROFILES)).split(",")
+BENCH_FAULT_RATE = float(os.environ.get("KRM_BENCH_FAULT_RATE", "0.02"))
+BENCH_ROUNDS = int(os.environ.get("KRM_BENCH_ROUNDS", "3"))
+
+# Clients are created against moto or not used at all, but boto3 needs a region
+os.environ.setdefault("AWS_DEFAULT_REGION", "eu-west-1")
+
+
+def run_stage(benchmark, func, rows, setup=None, stage=None):
+    """
+    Benchmark one stage and record throughput and peak memory in extra_info.
+
+    Peak memory is measured in a separate, untimed run under tracemalloc, which
+    would otherwise slow down the timed rounds.
+
+    Args:
+        benchmark: pytest-benchmark fixture
+        func: Stage to run
+        rows: Number of records the stage processes
+        setup: Optional callable returning (args, kwargs) for func, run before every
+            round and not timed (for stages that mutate their input)
+        stage: Name of the function under test, reported by the regression gate;
+            defaults to the module and qualified name of func
+    """
+    args, kwargs = setup() if setup else ((), {})
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    result = benchmark.pedantic(func, setup=setup, rounds=BENCH_ROUNDS, iterations=1)
+
+    if stage is None:
+        stage = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+    benchmark.extra_info["stage"] = stage
+    benchmark.extra_info["rows"] = rows
+    benchmark.extra_info["peak_memory_mb"] = round(peak / 2**20, 1)
+    if benchmark.stats is not None:
+        benchmark.extra_info["rows_per_second"] = round(rows / benchmark.stats.stats.mean)
+    return result
+
+
+@pytest.fixture(scope="session")
+def config(tmp_path_factory):
+    from krm_validator.config import ValidationConfig
+
+    return ValidationConfig(
+        is_local=True,
+        local_folder=tmp_path_factory.mktemp("krm"),
+        reference_data_dir=DATA_DIR,
+    )
+
+
+@pytest.fixture(scope="session")
+def ref_data(config):
+    """Reference data read from data/, loaded once so stages time only their own work."""
+    from krm_validator.reference_data import ReferenceDataLoader
+
+    loader = ReferenceDataLoader(config)
+    loader.validatielijst, loader.group, loader.column_definition, loader.location_gdf
+    return loader
+
+
+@pytest.fixture(
+    scope="session",
+    params=[(profile, rows) for profile in BENCH_PROFILES for rows in BENCH_ROWS],
+    ids=lambda param: f"{param[0]}-{param[1]}",
+)
+def bundle(request, config, ref_data, tmp_path_factory):
+    """A synthetic bundle as ZIP, as CSV content and as the validator's intermediate frames."""
+    from krm_validator.processor import DataBundleProcessor
+    from krm_validator.validator import KRMValidator
+
+    profile, rows = request.param
+    zip_path = write_bundle_zip(
+        profile, rows, tmp_path_factory.mktemp("bundles"), fault_rate=BENCH_FAULT_RATE
+    )
+
+    with zipfile.ZipFile(zip_path) as z, z.open(z.namelist()[0]) as csvfile:
+        csv_content = pd.read_csv(io.TextIOWrapper(csvfile, encoding="cp1252"), delimiter=";")
+    csv_content.columns = csv_content.columns.str.lower().str.strip()
+
+    gdf = DataBundleProcessor(config).to_geodataframe(csv_content)
+    package_name = zip_path.stem
+    validator = KRMValidator(config, ref_data)
+    prepared = validator._with_parameters(gdf)
+    rules = validator._determine_rules(prepared, package_name)
+
+    return SimpleNamespace(
+        profile=profile,
+        rows=rows,
+        zip_path=zip_path,
+        package_name=package_name,
+        csv_content=csv_content,
+        gdf=gdf,
+        prepared=prepared,
+        rules=rules,
+    )
@@ -0,0 +1,223 @@
+"""
+Performance regression gate for the validation benchmarks.
+
+Runs the benchmark suite (offline reference data from data/, S3 against moto),
+compares throughput and peak memory per stage with a versioned baseline and exits
+non-zero when a stage regressed past the tolerance:
+
+    python tests/benchmarks/regression_gate.py                  # compare
+    python tests/benchmarks/regression_gate.py --update         # write a new baseline
+    python tests/benchmarks/regression_gate.py --results run.json   # compare existing results
+
+Bundle size and shape follow the KRM_BENCH_* variables of conftest.py; the gate
+runs with the sizes stored in the baseline unless KRM_BENCH_ROWS is set.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).parent
+REPO_ROOT = BENCH_DIR.parents[1]
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+DEFAULT_TOLERANCE = 0.25
+BASELINE_VERSION = 1
+
+
+@dataclass
+class StageComparison:
+    """Comparison of one benchmark with its baseline."""
+
+    name: str
+    stage: str
+    baseline_rps: float | None
+    current_rps: float | None
+    baseline_mb: float | None
+    current_mb: float | None
+    status: str
+
+    @staticmethod
+    def _change(baseline, current):
+        if not baseline or current is None:
+            return ""
+        return f"{(current - baseline) / baseline:+.0%}"
+
+    @property
+    def rps_change(self) -> str:
+        return self._change(self.baseline_rps, self.current_rps)
+
+    @property
+    def mb_change(self) -> str:
+        return self._change(self.baseline_mb, self.current_mb)
+
+
+def stages_from_results(results: dict) -> dict:
+    """
+    Per-stage figures from a pytest-benchmark JSON report.
+
+    Benchmarks that do not record a row count (e.g. the publication reads) are
+    compared on runs per second instead.
+
+    Returns:
+        Dict of benchmark name -> stage, rows, rows_per_second and peak_memory_mb
+    """
+    stages = {}
+    for bench in results["benchmarks"]:
+        extra = bench.get("extra_info", {})
+        rows = extra.get("rows")
+        mean = bench["stats"]["mean"]
+        stages[bench["name"]] = {
+            "stage": extra.get("stage", bench["name"]),
+            "rows": rows,
+            "rows_per_second": round((rows or 1) / mean, 1) if mean else None,
+            "peak_memory_mb": extra.get("peak_memory_mb"),
+        }
+    return stages
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list[StageComparison]:
+    """
+    Compare current stage figures with the baseline.
+
+    A stage regresses when its throughput dropped, or its peak memory grew, by more
+    than tolerance (a fraction). Stages only present on one side are reported as
+    'new' or 'missing' and do not fail the gate.
+    """
+    comparisons = []
+    for name in sorted(baseline.keys() | current.keys()):
+        base = baseline.get(name)
+        cur = current.get(name)
+        if base is None:
+            status = "new"
+        elif cur is None:
+            status = "missing"
+        else:
+            slower = (
+                base["rows_per_second"] and cur["rows_per_second"] is not None
+                and cur["rows_per_second"] < base["rows_per_second"] * (1 - tolerance)
+            )
+            larger = (
+                base["peak_memory_mb"] and cur["peak_memory_mb"] is not None
+                and cur["peak_memory_mb"] > base["peak_memory_mb"] * (1 + tolerance)
+            )
+            if slower and larger:
+                status = "REGRESSED (time, memory)"
+            elif slower:
+                status = "REGRESSED (time)"
+            elif larger:
+                status = "REGRESSED (memory)"
+            else:
+                status = "ok"
+
+        comparisons.append(StageComparison(
+            name=name,
+            stage=(cur or base)["stage"],
+            baseline_rps=base and base["rows_per_second"],
+            current_rps=cur and cur["rows_per_second"],
+            baseline_mb=base and base["peak_memory_mb"],
+            current_mb=cur and cur["peak_memory_mb"],
+            status=status,
+        ))
+    return comparisons
+
+
+def format_table(comparisons: list[StageComparison]) -> str:
+    """Plain-text diff table, regressions first."""
+    def fmt(value):
+        return "-" if value is None else f"{value:,}"
+
+    header = ("benchmark", "stage", "rows/s base", "rows/s now", "Δ", "MB base", "MB now", "Δ", "status")
+    rows = [
+        (c.name, c.stage, fmt(c.baseline_rps), fmt(c.current_rps), c.rps_change,
+         fmt(c.baseline_mb), fmt(c.current_mb), c.mb_change, c.status)
+        for c in sorted(comparisons, key=lambda c: (not c.status.startswith("REGRESSED"), c.name))
+    ]
+    widths = [max(len(str(row[i])) for row in [header, *rows]) for i in range(len(header))]
+    lines = ["  ".join(str(value).ljust(width) for value, width in zip(row, widths)) for row in [header, *rows]]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
+
+
+def run_benchmarks(output: Path, rows: str | None, pytest_args: list[str]) -> None:
+    """Run the benchmark suite and write the pytest-benchmark JSON to output."""
+    env = dict(os.environ)
+    if rows and not env.get("KRM_BENCH_ROWS"):
+        env["KRM_BENCH_ROWS"] = rows
+    command = [
+        sys.executable, "-m", "pytest", str(BENCH_DIR),
+        "--benchmark-only", f"--benchmark-json={output}", "-q", *pytest_args,
+    ]
+    subprocess.run(command, cwd=REPO_ROOT, env=env, check=True)
+
+
+def write_baseline(path: Path, stages: dict) -> None:
+    baseline = {
+        "version": BASELINE_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": {"python": platform.python_version(), "processor": platform.machine(),
+                    "cpu_count": os.cpu_count()},
+        "rows": ",".join(str(n) for n in sorted({s["rows"] for s in stages.values() if s["rows"]})),
+        "stages": stages,
+    }
+    path.write_text(json.dumps(baseline, indent=2) + "\n", encoding="utf-8")
+
+
+def load_baseline(path: Path) -> dict:
+    baseline = json.loads(path.read_text(encoding="utf-8"))
+    if baseline.get("version") != BASELINE_VERSION:
+        raise ValueError(
+            f"Baseline {path} has version {baseline.get('version')}, expected {BASELINE_VERSION}; "
+            "regenerate it with --update"
+        )
+    return baseline
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=float(
+        os.environ.get("KRM_BENCH_TOLERANCE", DEFAULT_TOLERANCE)),
+        help="Allowed regression as a fraction (default 0.25, or KRM_BENCH_TOLERANCE)")
+    parser.add_argument("--update", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--results", type=Path, help="Existing pytest-benchmark JSON instead of a new run")
+    parser.add_argument("pytest_args", nargs="*", help="Extra arguments for pytest, after --")
+    args = parser.parse_args(argv)
+
+    baseline = None if args.update else load_baseline(args.baseline)
+
+    if args.results:
+        results = json.loads(args.results.read_text(encoding="utf-8"))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / "results.json"
+            run_benchmarks(output, baseline and baseline.get("rows"), args.pytest_args)
+            results = json.loads(output.read_text(encoding="utf-8"))
+    current = stages_from_results(results)
+
+    if args.update:
+        write_baseline(args.baseline, current)
+        print(f"Baseline with {len(current)} benchmarks written to {args.baseline}")
+        return 0
+
+    comparisons = compare(baseline["stages"], current, args.tolerance)
+    print(format_table(comparisons))
+    regressed = [c for c in comparisons if c.status.startswith("REGRESSED")]
+    if regressed:
+        stages = sorted({c.stage for c in regressed})
+        print(f"\n{len(regressed)} benchmark(s) regressed more than {args.tolerance:.0%}: {', '.join(stages)}")
+        return 1
+    print(f"\nNo regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+"""
+Synthetic KRM data bundles for benchmarks.
+
+Bundles are generated from the reference data in data/ (validatielijst.csv,
+groep.csv, kolomdefinitie.csv and the KRM2 location shapefiles), so records match
+the validation rules of a real databundelcode. Faults can be injected at a given
+rate to produce bundles that fail validation.
+
+Generate ZIPs like real uploads from the command line:
+
+    python tests/benchmarks/synthetic.py --profile biotaxon --rows 100000 --out /tmp/bundles
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = Path(__file__).parents[2] / "data"
+
+
+@dataclass(frozen=True)
+class Profile:
+    """Shape of a synthetic bundle."""
+
+    databundelcode: str
+    records_per_monster: int
+    description: str
+
+
+PROFILES = {
+    "biotaxon": Profile(
+        "WMR_2024_01 Noordzeebenthos", 25,
+        "Benthos samples with many taxa per monster"
+    ),
+    "timeseries": Profile(
+        "RWS_2024_12_O2_T_sal_3_dieptes", 3,
+        "O2, temperature and salinity time series at fixed locations"
+    ),
+    "multicriterion": Profile(
+        "RWS_2022_06 P_N_sal_chlor", 6,
+        "Nutrients bundle published under two KRM criteria"
+    ),
+}
+
+# Data column -> validatielijst column copied from the matching rule
+RULE_COLUMNS = {
+    "Grootheid.code": "grootheid_code",
+    "Typering.code": "typering_code",
+    "Eenheid.code": "eenheid_code",
+    "Hoedanigheid.code": "hoedanigheid_code",
+    "MonsterCompartiment.code": "monstercompartiment_code",
+    "Orgaan.code": "orgaan_code",
+    "Organisme.naam": "organisme_naam",
+    "Waardebewerkingsmethode.code": "waardebewerkingsmethode_code",
+    "Bemonsteringsapparaat.omschrijving": "bemonsteringsapparaat_omschrijving",
+}
+
+FAULTS = ("locatie", "datum", "kwaliteitsoordeel", "referentiehorizontaal", "parameter")
+
+
+def _first_option(value):
+    return str(value).split(";")[0].strip() if pd.notna(value) else np.nan
+
+
+def _read_reference_csv(name: str, data_dir: Path) -> pd.DataFrame:
+    return pd.read_csv(data_dir / name, encoding="windows-1252", delimiter=";")
+
+
+class BundleGenerator:
+    """
+    Generates the CSV content of a data bundle for one databundelcode.
+
+    Monsters are spread over the (rule, location) combinations of the bundle; the
+    records of a monster share location and date and cycle through the parameters of
+    the rule's group, so verzamelingen are complete unless faults are injected.
+    """
+
+    def __init__(self, databundelcode: str, data_dir: Path = DATA_DIR):
+        import geopandas as gpd
+
+        self.databundelcode = databundelcode
+        validatielijst = _read_reference_csv("validatielijst.csv", data_dir)
+        validatielijst.columns = validatielijst.columns.str.strip().str.lower()
+        self.rules = validatielijst[
+            validatielijst["databundelcode"] == databundelcode
+        ].reset_index(drop=True)
+        if self.rules.empty:
+            raise ValueError(f"No validation rules for {databundelcode}")
+
+        group = _read_reference_csv("groep.csv", data_dir)
+        self.columns = (
+            _read_reference_csv("kolomdefinitie.csv", data_dir)["kolomnaam"].str.strip().tolist()
+        )
+
+        shape_dir = data_dir / "KRM_locatiedetails"
+        locations = pd.concat(
+            [gpd.read_file(shape_dir / "KRM2_P.shp"), gpd.read_file(shape_dir / "KRM2_V.shp")],
+            ignore_index=True,
+        ).drop_duplicates("MPNIDENT")
+        points = locations.geometry.representative_point()
+        self.location_xy = dict(zip(locations["MPNIDENT"], zip(points.x, points.y)))
+
+        # One entry per (rule, location) combination
+        combos = []
+        for rule_nr, rule in self.rules.iterrows():
+            for locatie in str(rule["locatiecode"]).split(";"):
+                combos.append((rule_nr, locatie.strip()))
+        self.combos = combos
+
+        self.members = {
+            rule_nr: (
+                group.loc[group["groep"] == rule["groep"], "parameter"].dropna().to_numpy(dtype=object)
+                if pd.notna(rule["groep"]) else np.array([], dtype=object)
+            )
+            for rule_nr, rule in self.rules.iterrows()
+        }
+
+    def generate(
+        self,
+        n_rows: int,
+        records_per_monster: int,
+        fault_rate: float = 0.0,
+        seed: int = 0,
+        start_row: int = 0,
+    ) -> pd.DataFrame:
+        """
+        Generate n_rows records.
+
+        Args:
+            n_rows: Number of records
+            records_per_monster: Records sharing a monster
+            fault_rate: Fraction of records with an injected fault, spread over FAULTS
+            seed: Random seed
+            start_row: Offset for the record and monster ids, to generate a large
+                bundle in chunks
+
+        Returns:
+            DataFrame with the kolomdefinitie columns, as in an uploaded CSV
+        """
+        rng = np.random.default_rng(seed)
+        row_nr = np.arange(start_row, start_row + n_rows)
+        monster_nr = row_nr // records_per_monster
+        position = row_nr % records_per_monster
+
+        # Monster level: (rule, location) combination and date
+        combo = monster_nr % len(self.combos)
+        rule_nr = np.array([self.combos[c][0] for c in range(len(self.combos))])[combo]
+        locatie = np.array([self.combos[c][1] for c in range(len(self.combos))], dtype=object)[combo]
+
+        start = pd.to_datetime(self.rules["startdatum"], dayfirst=True, errors="coerce")
+        end = pd.to_datetime(self.rules["einddatum"], dayfirst=True, errors="coerce")
+        start = start.fillna(pd.Timestamp("2024-01-01")).to_numpy()[rule_nr]
+        end = end.fillna(pd.Timestamp("2024-12-31")).to_numpy()[rule_nr]
+        # Deterministic per monster, also across chunks
+        fraction = (monster_nr * 2654435761 % 2**32) / 2**32
+        begindatum = pd.DatetimeIndex(start + (end - start) * fraction).normalize()
+
+        df = pd.DataFrame(index=pd.RangeIndex(n_rows))
+        for column, rule_column in RULE_COLUMNS.items():
+            values = self.rules[rule_column].map(_first_option).to_numpy(dtype=object)
+            df[column] = values[rule_nr]
+
+        # Record level: parameter from the rule's group
+        parameter = np.full(n_rows, np.nan, dtype=object)
+        for nr, members in self.members.items():
+            mask = rule_nr == nr
+            if len(members) and mask.any():
+                parameter[mask] = members[position[mask] % len(members)]
+        biotaxon = (
+            self.rules["biotaxon_of_niet"].astype(str).str.strip().str.lower().eq("j").to_numpy()[rule_nr]
+        )
+        df["Parameter.code"] = np.where(biotaxon, np.nan, parameter)
+        df["Biotaxon.naam"] = np.where(biotaxon, parameter, np.nan)
+
+        xy = np.array([self.location_xy.get(code, (3.5, 53.0)) for code in locatie])
+        df["Meetobject.Namespace"] = "NL80"
+        df["Namespace"] = "NL80"
+        df["Meetobject.LokaalID"] = "NL80_" + locatie.astype(str)
+        df["Monster.lokaalID"] = [f"NL80_M{nr:08d}" for nr in monster_nr]
+        df["Meetwaarde.lokaalID"] = [f"NL80_W{nr:09d}" for nr in row_nr]
+        df["GeometriePunt.X"] = xy[:, 0]
+        df["GeometriePunt.Y"] = xy[:, 1]
+        df["Begindatum"] = begindatum.strftime("%Y-%m-%d")
+        df["Einddatum"] = df["Begindatum"]
+        df["Begintijd"] = "12:00:00"
+        df["ResultaatDatum"] = df["Begindatum"]
+        df["Limietsymbool"] = np.nan
+        df["Numeriekewaarde"] = np.round(rng.gamma(2.0, 5.0, n_rows), 3)
+        df["Kwaliteitsoordeel.code"] = "00"
+        df["Referentiehorizontaal.code"] = "EPSG:4258"
+
+        if fault_rate > 0:
+            self._inject_faults(df, rng, fault_rate)
+
+        return df.reindex(columns=self.columns)
+
+    @staticmethod
+    def _inject_faults(df: pd.DataFrame, rng: np.random.Generator, fault_rate: float) -> None:
+        faulty = np.flatnonzero(rng.random(len(df)) < fault_rate)
+        kinds = rng.integers(len(FAULTS), size=len(faulty))
+        for kind, fault in enumerate(FAULTS):
+            rows = df.index[faulty[kinds == kind]]
+            if fault == "locatie":
+                df.loc[rows, "Meetobject.LokaalID"] = "NL80_ONBEKEND"
+                df.loc[rows, ["GeometriePunt.X", "GeometriePunt.Y"]] = (0.0, 45.0)
+            elif fault == "datum":
+                df.loc[rows, "Begindatum"] = "1990-01-01"
+            elif fault == "kwaliteitsoordeel":
+                df.loc[rows, "Kwaliteitsoordeel.code"] = "77"
+            elif fault == "referentiehorizontaal":
+                df.loc[rows, "Referentiehorizontaal.code"] = "EPSG:28992"
+            elif fault == "parameter":
+                df.loc[rows, "Parameter.code"] = "ONBEKEND"
+                df.loc[rows, "Biotaxon.naam"] = np.nan
+
+
+def bundle_name(profile: str, n_rows: int, fault_rate: float = 0.0) -> str:
+    """Package name of a synthetic bundle; starts with the databundelcode like a real upload."""
+    kind = "faulty" if fault_rate > 0 else "valid"
+    return f"{PROFILES[profile].databundelcode}_synthetic_{kind}_{n_rows}"
+
+
+def generate_bundle(
+    profile: str,
+    n_rows: int,
+    fault_rate: float = 0.0,
+    seed: int = 0,
+    data_dir: Path = DATA_DIR,
+) -> pd.DataFrame:
+    """Generate the CSV content of a bundle for one of the PROFILES."""
+    spec = PROFILES[profile]
+    generator = BundleGenerator(spec.databundelcode, data_dir)
+    return generator.generate(n_rows, spec.records_per_monster, fault_rate, seed)
+
+
+def write_bundle_zip(
+    profile: str,
+    n_rows: int,
+    out_dir: Path,
+    fault_rate: float = 0.0,
+    seed: int = 0,
+    akkoord: bool = False,
+    chunk_rows: int = 500_000,
+    data_dir: Path = DATA_DIR,
+) -> Path:
+    """
+    Write a bundle as a ZIP with a cp1252 ';'-separated CSV, like a real upload.
+
+    Large bundles are generated and written in chunks of chunk_rows records, so a
+    5M-record bundle does not have to fit in memory at once.
+
+    Returns:
+        Path of the ZIP file
+    """
+    spec = PROFILES[profile]
+    generator = BundleGenerator(spec.databundelcode, data_dir)
+    name = bundle_name(profile, n_rows, fault_rate)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    zip_path = out_dir / f"{name}.zip"
+
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as z:
+        with z.open(f"{name}.csv", "w", force_zip64=True) as raw:
+            with io.TextIOWrapper(raw, encoding="cp1252", newline="") as text:
+                for chunk_nr, start_row in enumerate(range(0, n_rows, chunk_rows)):
+                    chunk = generator.generate(
+                        min(chunk_rows, n_rows - start_row), spec.records_per_monster,
+                        fault_rate, seed=seed + chunk_nr, start_row=start_row
+                    )
+                    chunk.to_csv(text, sep=";", index=False, header=chunk_nr == 0)
+        if akkoord:
+            z.writestr("akkoord.txt", "akkoord")
+
+    return zip_path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="biotaxon")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--fault-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--akkoord", action="store_true")
+    parser.add_argument("--out", type=Path, default=Path("."))
+    args = parser.parse_args()
+
+    path = write_bundle_zip(
+        args.profile, args.rows, args.out, args.fault_rate, args.seed, args.akkoord
+    )
+    print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Memory and throughput of the bundle frames with object and categorical code columns.
+
+Each stage runs on the same bundle read once with categorical_codes off (object
+columns) and once on (DataBundleProcessor.categorize_codes); the size of the frame
+a stage works on is reported as frame_memory_mb. The gain shows on large bundles, e.g.
+
+    KRM_BENCH_ROWS=1000000 KRM_BENCH_PROFILES=timeseries pytest tests/benchmarks/test_code_dtypes.py
+
+Only the stages that need no rule determination run here, which at this size
+would dominate the run. At 1M rows the object frames take about 1.5 GB each, and
+tracemalloc adds to that, so run this size on a machine with plenty of memory.
+"""
+
+import zipfile
+from dataclasses import replace
+
+import pandas as pd
+import pytest
+from conftest import BENCH_FAULT_RATE, BENCH_PROFILES, BENCH_ROWS, run_stage
+from synthetic import write_bundle_zip
+
+from krm_validator.exporter import GeoPackageExporter, set_criteria
+from krm_validator.processor import DataBundleProcessor
+from krm_validator.validator import KRMValidator
+
+DTYPES = {"object": False, "categorical": True}
+
+# Vectorised checks that work on the code columns
+CHECKS = ["_check_geo_control", "_check_fixed_values", "_check_other", "_check_date_range"]
+
+
+@pytest.fixture(
+    scope="module",
+    params=[(profile, rows) for profile in BENCH_PROFILES for rows in BENCH_ROWS],
+    ids=lambda param: f"{param[0]}-{param[1]}",
+)
+def csv_bundle(request, tmp_path_factory):
+    """A synthetic bundle as CSV content, without the rule determination of the bundle fixture."""
+    profile, rows = request.param
+    zip_path = write_bundle_zip(
+        profile, rows, tmp_path_factory.mktemp("bundles"), fault_rate=BENCH_FAULT_RATE
+    )
+    with zipfile.ZipFile(zip_path) as z, z.open(z.namelist()[0]) as csvfile:
+        csv_content = DataBundleProcessor.read_csv(csvfile)
+    return zip_path, csv_content
+
+
+@pytest.fixture(scope="module", params=DTYPES)
+def frame(request, config, csv_bundle):
+    """Config with the code dtype under test and the bundle read with it."""
+    dtype_config = replace(config, categorical_codes=DTYPES[request.param])
+    zip_path, csv_content = csv_bundle
+    gdf = DataBundleProcessor(dtype_config).to_geodataframe(csv_content)
+    return dtype_config, zip_path.stem, gdf
+
+
+def frame_memory_mb(df: pd.DataFrame) -> float:
+    return round(df.memory_usage(deep=True).sum() / 2**20, 1)
+
+
+@pytest.mark.benchmark(group="dtype-read")
+def test_read_bundle(benchmark, frame, csv_bundle):
+    dtype_config, _, _ = frame
+    zip_path, csv_content = csv_bundle
+    processor = DataBundleProcessor(dtype_config)
+
+    content, _ = run_stage(benchmark, processor.read_bundle, len(csv_content), lambda: ((zip_path,), {}))
+
+    benchmark.extra_info["frame_memory_mb"] = frame_memory_mb(content)
+    assert (content.dtypes == "category").any() == dtype_config.categorical_codes
+
+
+@pytest.mark.benchmark(group="dtype-geodataframe")
+def test_to_geodataframe(benchmark, frame, csv_bundle):
+    dtype_config, _, _ = frame
+    _, csv_content = csv_bundle
+    processor = DataBundleProcessor(dtype_config)
+
+    gdf = run_stage(benchmark, processor.to_geodataframe, len(csv_content), lambda: ((csv_content,), {}))
+
+    benchmark.extra_info["frame_memory_mb"] = frame_memory_mb(gdf)
+    assert (gdf.dtypes == "category").any() == dtype_config.categorical_codes
+
+
+@pytest.mark.parametrize("check", CHECKS)
+def test_check(benchmark, ref_data, frame, check):
+    dtype_config, package_name, gdf = frame
+    benchmark.group = f"dtype{check.removeprefix('_check')}"
+
+    def setup():
+        return (KRMValidator(dtype_config, ref_data), gdf, package_name), {}
+
+    run_stage(
+        benchmark, lambda validator, *args: getattr(validator, check)(*args), len(gdf), setup,
+        stage=f"validator.KRMValidator.{check}"
+    )
+    benchmark.extra_info["frame_memory_mb"] = frame_memory_mb(gdf)
+
+
+@pytest.mark.benchmark(group="dtype-export")
+def test_export_geopackage(benchmark, ref_data, frame, tmp_path):
+    dtype_config, package_name, gdf = frame
+    df = set_criteria(gdf, ref_data.validatielijst, package_name)
+    exporter = GeoPackageExporter(dtype_config)
+
+    def setup():
+        (tmp_path / "output.gpkg").unlink(missing_ok=True)
+        return (df, tmp_path / "output.gpkg"), {}
+
+    run_stage(benchmark, exporter.export, len(df), setup)
+    benchmark.extra_info["frame_memory_mb"] = frame_memory_mb(df)
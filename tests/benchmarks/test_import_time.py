@@ -0,0 +1,110 @@
+"""
+Import-time profile and cold-start budget of the validation Lambda handler.
+
+The handler is imported in a fresh interpreter under `python -X importtime`; the
+per-module timings are parsed into a report that is printed when the budget is
+exceeded. Set KRM_IMPORT_BUDGET_MS to tighten or relax the budget.
+"""
+
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+
+import pytest
+
+HANDLER_MODULE = "krm_validator.handler"
+IMPORT_BUDGET_MS = float(os.environ.get("KRM_IMPORT_BUDGET_MS", "800"))
+
+# Loaded by the pipeline stages, never by the handler module itself
+HEAVY_MODULES = ("pandas", "numpy", "geopandas", "shapely", "pyproj", "pyogrio")
+
+
+@dataclass
+class ImportTiming:
+    """One line of `-X importtime` output."""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def import_profile(module: str) -> list[ImportTiming]:
+    """Import module in a fresh interpreter and parse the `-X importtime` output."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        timings.append(ImportTiming(
+            module=name.strip(),
+            self_us=int(self_us),
+            cumulative_us=int(cumulative_us),
+            depth=(len(name) - len(name.lstrip()) - 1) // 2,
+        ))
+    return timings
+
+
+def direct_imports(timings: list[ImportTiming], module: str) -> list[ImportTiming]:
+    """Modules imported directly by module; importtime lists children before their parent."""
+    index = max(i for i, t in enumerate(timings) if t.module == module)
+    depth = timings[index].depth
+    children = []
+    for timing in reversed(timings[:index]):
+        if timing.depth <= depth:
+            break
+        if timing.depth == depth + 1:
+            children.append(timing)
+    return children
+
+
+def format_import_report(timings: list[ImportTiming], module: str = HANDLER_MODULE, top: int = 15) -> str:
+    """Direct imports of module by cumulative import time, slowest first."""
+    total = max(t.cumulative_us for t in timings if t.module == module)
+    lines = [f"{'cumulative ms':>13}  {'self ms':>8}  module"]
+    lines += [
+        f"{t.cumulative_us / 1000:13.1f}  {t.self_us / 1000:8.1f}  {t.module}"
+        for t in sorted(direct_imports(timings, module), key=lambda t: -t.cumulative_us)[:top]
+    ]
+    lines.append(f"{total / 1000:13.1f}  {'':8}  {module} (total)")
+    return "\n".join(lines)
+
+
+def handler_import_ms(timings: list[ImportTiming]) -> float:
+    return max(t.cumulative_us for t in timings if t.module == HANDLER_MODULE) / 1000
+
+
+@pytest.fixture(scope="module")
+def handler_profile():
+    return import_profile(HANDLER_MODULE)
+
+
+def test_handler_does_not_import_heavy_modules(handler_profile):
+    imported = {t.module.split(".")[0] for t in handler_profile}
+    assert not imported & set(HEAVY_MODULES), format_import_report(handler_profile)
+
+
+def test_handler_import_budget(handler_profile):
+    total_ms = handler_import_ms(handler_profile)
+    assert total_ms <= IMPORT_BUDGET_MS, (
+        f"Importing {HANDLER_MODULE} took {total_ms:.0f} ms, budget {IMPORT_BUDGET_MS:.0f} ms\n"
+        + format_import_report(handler_profile)
+    )
+
+
+@pytest.mark.benchmark(group="cold-start")
+def test_handler_cold_start(benchmark):
+    """Wall time of a fresh interpreter importing the handler, as on a Lambda cold start."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    command = [sys.executable, "-c", f"import {HANDLER_MODULE}"]
+
+    benchmark.pedantic(subprocess.run, args=(command,), kwargs={"env": env, "check": True},
+                       rounds=5, iterations=1)
+    benchmark.extra_info["stage"] = f"{HANDLER_MODULE} import"
+    benchmark.extra_info["import_ms"] = handler_import_ms(import_profile(HANDLER_MODULE))
@@ -0,0 +1,123 @@
+"""Read benchmark: merged GeoPackage vs partitioned GeoParquet for per-criterion queries."""
+
+import importlib.util
+import os
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pyogrio
+import pytest
+from shapely.geometry import Point
+
+PUBLICATIE = Path(__file__).parents[2] / "infra" / "functions" / "publicatie-dev" / "krm-publicatie.py"
+
+# Rows in the merged dataset; raise to benchmark national-scale volumes
+N_ROWS = int(os.environ.get("KRM_BENCH_PUBLICATION_ROWS", "20000"))
+CRITERIA = ["ANSNL-D1C2", "ANSNL-D4C1", "ANSNL-D5C2", "ANSNL-D6C5", "ANSNL-D8C1", "ANSNL-D10C1"]
+
+
+def _load_publicatie():
+    os.environ.setdefault("AWS_DEFAULT_REGION", "eu-west-1")
+    spec = importlib.util.spec_from_file_location("krm_publicatie", PUBLICATIE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="module")
+def datasets(tmp_path_factory):
+    """Merged GeoPackage and GeoParquet dataset built from the same synthetic bundles."""
+    publicatie = _load_publicatie()
+    root = tmp_path_factory.mktemp("publicatie")
+    rng = np.random.default_rng(42)
+
+    bundles = []
+    for i, criterium in enumerate(CRITERIA):
+        n = N_ROWS // len(CRITERIA)
+        dates = pd.Timestamp("2018-01-01") + pd.to_timedelta(rng.integers(0, 6 * 365, n), unit="D")
+        gdf = gpd.GeoDataFrame(
+            {
+                "meetobject.lokaalid": [f"NRDZE_{j % 250:04d}" for j in range(n)],
+                "begindatum": dates.strftime("%Y-%m-%d"),
+                "grootheid.code": rng.choice(["AANTPOPVTE", "CONCTTE", "MASSA"], n),
+                "numeriekewaarde": rng.random(n) * 100,
+                "krmcriterium": criterium,
+                "monprog.naam": f"RWS_2024_{i:02d} bundel",
+            },
+            geometry=[Point(xy) for xy in zip(rng.uniform(2.5, 7, n), rng.uniform(51, 55.5, n))],
+            crs="EPSG:4258",
+        )
+        path = root / f"bundel_{i}.gpkg"
+        gdf.to_file(path, layer="krm_actuele_dataset", driver="GPKG")
+        bundles.append(str(path))
+
+    gpkg = str(root / "merged.gpkg")
+    geoparquet = root / "geoparquet"
+    dataset = publicatie.GeoParquetDataset(str(geoparquet))
+    publicatie.merge_geopackages(bundles, gpkg, geoparquet=dataset)
+    dataset.close()
+    return gpkg, str(geoparquet)
+
+
+def _gpkg_criterium(gpkg, criterium):
+    return pyogrio.read_dataframe(gpkg, where=f"krmcriterium = '{criterium}'")
+
+
+def _parquet_criterium(geoparquet, criterium):
+    return gpd.read_parquet(geoparquet, filters=[("krmcriterium", "=", criterium)])
+
+
+def _gpkg_criterium_year(gpkg, criterium, year):
+    return pyogrio.read_dataframe(
+        gpkg, where=f"krmcriterium = '{criterium}' AND begindatum LIKE '{year}-%'"
+    )
+
+
+def _parquet_criterium_year(geoparquet, criterium, year):
+    return gpd.read_parquet(
+        geoparquet, filters=[("krmcriterium", "=", criterium), ("jaar", "=", year)]
+    )
+
+
+@pytest.mark.benchmark(group="publication-read-criterium")
+def test_gpkg_read_criterium(benchmark, datasets):
+    gpkg, _ = datasets
+    result = benchmark(_gpkg_criterium, gpkg, "ANSNL-D6C5")
+    assert len(result) == N_ROWS // len(CRITERIA)
+
+
+@pytest.mark.benchmark(group="publication-read-criterium")
+def test_geoparquet_read_criterium(benchmark, datasets):
+    gpkg, geoparquet = datasets
+    result = benchmark(_parquet_criterium, geoparquet, "ANSNL-D6C5")
+    assert len(result) == len(_gpkg_criterium(gpkg, "ANSNL-D6C5"))
+
+
+@pytest.mark.benchmark(group="publication-read-criterium-year")
+def test_gpkg_read_criterium_year(benchmark, datasets):
+    gpkg, _ = datasets
+    result = benchmark(_gpkg_criterium_year, gpkg, "ANSNL-D1C2", 2021)
+    assert len(result) > 0
+
+
+@pytest.mark.benchmark(group="publication-read-criterium-year")
+def test_geoparquet_read_criterium_year(benchmark, datasets):
+    gpkg, geoparquet = datasets
+    result = benchmark(_parquet_criterium_year, geoparquet, "ANSNL-D1C2", 2021)
+    assert len(result) == len(_gpkg_criterium_year(gpkg, "ANSNL-D1C2", 2021))
+
+
+@pytest.mark.benchmark(group="publication-read-bbox")
+def test_gpkg_read_bbox(benchmark, datasets):
+    gpkg, _ = datasets
+    result = benchmark(pyogrio.read_dataframe, gpkg, bbox=(3.0, 52.0, 4.0, 53.0))
+    assert len(result) > 0
+
+
+@pytest.mark.benchmark(group="publication-read-bbox")
+def test_geoparquet_read_bbox(benchmark, datasets):
+    gpkg, geoparquet = datasets
+    result = benchmark(gpd.read_parquet, geoparquet, bbox=(3.0, 52.0, 4.0, 53.0))
+    assert len(result) == len(pyogrio.read_dataframe(gpkg, bbox=(3.0, 52.0, 4.0, 53.0)))
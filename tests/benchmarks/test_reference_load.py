@@ -0,0 +1,47 @@
+"""Load-time benchmark of the KRM location shapefiles."""
+
+import geopandas as gpd
+import pandas as pd
+import pytest
+from conftest import run_stage
+from synthetic import DATA_DIR
+
+from krm_validator.reference_artifact import SHAPEFILES, read_location_shapefiles
+from krm_validator.reference_data import ReferenceDataLoader
+
+SHAPE_FOLDER = DATA_DIR / "KRM_locatiedetails"
+
+
+def read_all_attributes():
+    """Every attribute with gpd.read_file and a concat copy: the reference for the column-limited read."""
+    frames = [gpd.read_file(SHAPE_FOLDER / f"{prefix}.shp") for prefix in SHAPEFILES]
+    return gpd.GeoDataFrame(pd.concat(frames, ignore_index=True), geometry="geometry")
+
+
+@pytest.fixture(scope="module")
+def locations():
+    return read_location_shapefiles(SHAPE_FOLDER)
+
+
+@pytest.mark.benchmark(group="reference-locations")
+def test_read_location_shapefiles(benchmark, locations):
+    result = run_stage(benchmark, read_location_shapefiles, len(locations), lambda: ((SHAPE_FOLDER,), {}))
+    assert list(result.columns) == ["MPNIDENT", "geometry"]
+
+
+@pytest.mark.benchmark(group="reference-locations")
+def test_read_all_attributes(benchmark, locations):
+    result = run_stage(benchmark, read_all_attributes, len(locations), stage="gpd.read_file")
+    assert result["MPNIDENT"].equals(locations["MPNIDENT"])
+
+
+@pytest.mark.benchmark(group="reference-location-identifiers")
+def test_location_identifiers(benchmark, config, locations):
+    loader = ReferenceDataLoader(config)
+    loader._location_gdf = locations
+
+    identifiers = run_stage(
+        benchmark, lambda: loader.location_identifiers, len(locations),
+        stage="reference_data.ReferenceDataLoader.location_identifiers"
+    )
+    assert identifiers is loader.location_identifiers
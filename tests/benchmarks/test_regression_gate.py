@@ -0,0 +1,50 @@
+"""Tests for the comparison logic of the regression gate."""
+
+from regression_gate import compare, format_table, stages_from_results
+
+
+def _stage(rps, mb, stage="validator.KRMValidator._determine_rules"):
+    return {"stage": stage, "rows": 1000, "rows_per_second": rps, "peak_memory_mb": mb}
+
+
+def test_stages_from_results():
+    results = {"benchmarks": [{
+        "name": "test_determine_rules[biotaxon-1000]",
+        "stats": {"mean": 0.5},
+        "extra_info": {"stage": "validator.KRMValidator._determine_rules", "rows": 1000,
+                       "peak_memory_mb": 12.5},
+    }]}
+    stages = stages_from_results(results)
+    assert stages["test_determine_rules[biotaxon-1000]"] == _stage(2000, 12.5)
+
+
+def test_compare_within_tolerance():
+    [result] = compare({"a": _stage(1000, 10.0)}, {"a": _stage(800, 12.0)}, tolerance=0.25)
+    assert result.status == "ok"
+    assert result.rps_change == "-20%"
+
+
+def test_compare_regressions():
+    baseline = {"slow": _stage(1000, 10.0), "large": _stage(1000, 10.0), "both": _stage(1000, 10.0)}
+    current = {"slow": _stage(700, 10.0), "large": _stage(1000, 13.0), "both": _stage(700, 13.0)}
+    status = {c.name: c.status for c in compare(baseline, current, tolerance=0.25)}
+    assert status == {
+        "slow": "REGRESSED (time)",
+        "large": "REGRESSED (memory)",
+        "both": "REGRESSED (time, memory)",
+    }
+
+
+def test_compare_new_and_missing_stages_do_not_fail():
+    status = {c.name: c.status for c in compare({"old": _stage(1, 1.0)}, {"new": _stage(1, 1.0)}, 0.25)}
+    assert status == {"old": "missing", "new": "new"}
+
+
+def test_format_table_lists_regressions_first():
+    baseline = {"a": _stage(1000, 10.0, "counts.CountAggregator.aggregate"), "b": _stage(1000, 10.0)}
+    current = {"a": _stage(1000, 10.0, "counts.CountAggregator.aggregate"), "b": _stage(500, 10.0)}
+    lines = format_table(compare(baseline, current, 0.25)).splitlines()
+    assert lines[0].split()[:2] == ["benchmark", "stage"]
+    assert "validator.KRMValidator._determine_rules" in lines[2]
+    assert "REGRESSED (time)" in lines[2]
+    assert "-50%" in lines[2]
@@ -0,0 +1,97 @@
+"""
+Peak memory and throughput of the batch and the streamed (begindatum window) validation.
+
+Both stages validate a bundle ZIP: the batch run reads the whole CSV into the
+GeoDataFrame of DataBundleProcessor.to_geodataframe, the streamed run reads it in
+chunks of CHUNK_ROWS records and spills them to disk by monthly window
+(DataBundleProcessor.spill_zip). peak_memory_mb shows the whole bundle and the
+working copies of the batch run against one window of the streamed one, e.g.
+
+    KRM_BENCH_ROWS=100000 KRM_BENCH_PROFILES=timeseries pytest tests/benchmarks/test_streaming_validation.py
+
+test_peak_memory_by_bundle_length validates time-series bundles of 1, 2 and 4 times
+the largest KRM_BENCH_ROWS. Peak memory of the streamed run follows the largest
+window, not the length of the bundle; the synthetic time series spread any number
+of records over the same months, so their monthly windows grow with the bundle,
+and their daily windows do not. Peak RSS above the loaded reference data, in MB:
+
+    rows      batch   streamed (M)   streamed (D)
+    10000        91             60             47
+    20000       177             69
+    40000       260            100             48
+
+Smaller windows cost time: every window runs the checks once, and the daily run
+of 40000 records took 2.8 times as long as the monthly one.
+"""
+
+from dataclasses import replace
+
+import pytest
+from conftest import BENCH_FAULT_RATE, BENCH_ROWS, run_stage
+from synthetic import write_bundle_zip
+
+from krm_validator.processor import DataBundleProcessor
+from krm_validator.streaming import StreamingKRMValidator
+from krm_validator.validator import KRMValidator
+
+WINDOW = "M"
+# Records per CSV chunk of the streamed run
+CHUNK_ROWS = 5000
+# Multiples of the largest KRM_BENCH_ROWS for the peak memory by bundle length
+LENGTHS = (1, 2, 4)
+
+
+def validate_batch(config, ref_data, zip_path, package_name):
+    processor = DataBundleProcessor(config)
+    csv_content, _ = processor.read_zip(zip_path)
+    return KRMValidator(config, ref_data).validate(processor.to_geodataframe(csv_content), package_name)
+
+
+def validate_streamed(config, ref_data, zip_path, package_name):
+    config = replace(config, stream_window=WINDOW, stream_chunk_rows=CHUNK_ROWS)
+    bundle = DataBundleProcessor(config).spill_zip(zip_path)
+    return StreamingKRMValidator(config, ref_data).validate(bundle, package_name)
+
+
+@pytest.fixture(scope="module")
+def expected(config, ref_data, bundle):
+    return validate_batch(config, ref_data, bundle.zip_path, bundle.package_name)
+
+
+@pytest.mark.parametrize("validate", [validate_batch, validate_streamed])
+def test_validation(benchmark, config, ref_data, bundle, expected, validate):
+    benchmark.group = f"validation-streaming-{bundle.profile}-{bundle.rows}"
+
+    report = run_stage(
+        benchmark, validate, bundle.rows,
+        lambda: ((config, ref_data, bundle.zip_path, bundle.package_name), {})
+    )
+    assert report.results == expected.results
+
+
+@pytest.fixture(scope="module")
+def long_bundle(tmp_path_factory):
+    """Function of a length (LENGTHS) to the ZIP and name of a time-series bundle."""
+    bundles = {}
+
+    def make(length):
+        if length not in bundles:
+            zip_path = write_bundle_zip(
+                "timeseries", max(BENCH_ROWS) * length, tmp_path_factory.mktemp("long"), fault_rate=BENCH_FAULT_RATE
+            )
+            bundles[length] = zip_path, zip_path.stem
+        return bundles[length]
+
+    return make
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+@pytest.mark.parametrize("validate", [validate_batch, validate_streamed])
+def test_peak_memory_by_bundle_length(benchmark, config, ref_data, long_bundle, validate, length):
+    zip_path, package_name = long_bundle(length)
+    benchmark.group = f"validation-streaming-length-{max(BENCH_ROWS)}"
+
+    run_stage(
+        benchmark, validate, max(BENCH_ROWS) * length,
+        lambda: ((config, ref_data, zip_path, package_name), {})
+    )
@@ -0,0 +1,139 @@
+"""Benchmarks for each stage of process_data_bundle and each validation check."""
+
+import os
+
+import boto3
+import pytest
+from conftest import run_stage
+from moto import mock_aws
+
+from krm_validator.exporter import GeoPackageExporter, set_criteria
+from krm_validator.processor import DataBundleProcessor
+from krm_validator.reporting import generate_count_report
+from krm_validator.sharding import ShardedKRMValidator
+from krm_validator.validator import KRMValidator
+
+BUCKET = "krm-validatie-data-dev"
+SHARD_WORKERS = int(os.environ.get("KRM_BENCH_WORKERS", "2"))
+
+# Validation checks and the inputs they take
+CHECKS = {
+    "_check_geo_control": ("gdf",),
+    "_check_mandatory_columns": ("gdf",),
+    "_check_column_values": ("gdf",),
+    "_check_counts": ("gdf", "rules"),
+    "_check_parameters": ("prepared", "rules"),
+    "_check_parameter_aggregates": ("prepared", "rules"),
+    "_check_fixed_values": ("gdf",),
+    "_check_rules": ("rules",),
+    "_check_other": ("gdf",),
+    "_check_date_range": ("gdf",),
+}
+
+
+@pytest.mark.benchmark(group="stage-extract")
+def test_extract_from_s3(benchmark, config, bundle):
+    with mock_aws():
+        s3 = boto3.client("s3")
+        s3.create_bucket(Bucket=BUCKET, CreateBucketConfiguration={"LocationConstraint": "eu-west-1"})
+        key = f"input/{bundle.zip_path.name}"
+        s3.upload_file(str(bundle.zip_path), BUCKET, key)
+        processor = DataBundleProcessor(config)
+
+        csv_content, _ = run_stage(
+            benchmark, processor.extract_from_s3, bundle.rows, lambda: ((BUCKET, key), {})
+        )
+
+    assert len(csv_content) == bundle.rows
+
+
+@pytest.mark.benchmark(group="stage-geodataframe")
+def test_to_geodataframe(benchmark, config, bundle):
+    processor = DataBundleProcessor(config)
+    gdf = run_stage(benchmark, processor.to_geodataframe, bundle.rows, lambda: ((bundle.csv_content,), {}))
+    assert len(gdf) == bundle.rows
+
+
+@pytest.mark.benchmark(group="stage-determine-rules")
+def test_determine_rules(benchmark, config, ref_data, bundle):
+    validator = KRMValidator(config, ref_data)
+    rules = run_stage(
+        benchmark, validator._determine_rules, bundle.rows,
+        lambda: ((bundle.prepared, bundle.package_name), {})
+    )
+    assert len(rules) == bundle.rows
+
+
+@pytest.mark.parametrize("check", CHECKS)
+def test_check(benchmark, config, ref_data, bundle, check):
+    benchmark.group = f"check{check.removeprefix('_check')}"
+
+    def setup():
+        validator = KRMValidator(config, ref_data)
+        inputs = [getattr(bundle, name) for name in CHECKS[check]]
+        if inputs[0] is not bundle.rules:
+            inputs.insert(1, bundle.package_name)
+        return (validator, *inputs), {}
+
+    run_stage(
+        benchmark, lambda validator, *args: getattr(validator, check)(*args), bundle.rows, setup,
+        stage=f"validator.KRMValidator.{check}"
+    )
+
+
+@pytest.mark.benchmark(group="stage-validate")
+def test_validate(benchmark, config, ref_data, bundle):
+    def setup():
+        return (KRMValidator(config, ref_data), bundle.gdf, bundle.package_name), {}
+
+    report = run_stage(
+        benchmark, lambda validator, *args: validator.validate(*args), bundle.rows, setup,
+        stage="validator.KRMValidator.validate"
+    )
+    assert report.failure_count > 0
+
+
+@pytest.mark.benchmark(group="stage-validate")
+def test_validate_sharded(benchmark, config, ref_data, bundle):
+    def setup():
+        validator = ShardedKRMValidator(config, ref_data, workers=SHARD_WORKERS, min_rows=0)
+        return (validator, bundle.gdf, bundle.package_name), {}
+
+    report = run_stage(
+        benchmark, lambda validator, *args: validator.validate(*args), bundle.rows, setup,
+        stage="sharding.ShardedKRMValidator.validate"
+    )
+    assert report.failure_count > 0
+
+
+@pytest.mark.benchmark(group="stage-count-report")
+def test_count_report(benchmark, config, ref_data, bundle):
+    validator = KRMValidator(config, ref_data)
+    validator._check_counts(bundle.gdf, bundle.package_name, bundle.rules)
+
+    run_stage(
+        benchmark, generate_count_report, bundle.rows,
+        lambda: ((config, ref_data, bundle.gdf, bundle.rules, bundle.package_name, validator.count_table), {})
+    )
+
+
+@pytest.mark.benchmark(group="stage-set-criteria")
+def test_set_criteria(benchmark, ref_data, bundle):
+    result = run_stage(
+        benchmark, set_criteria, bundle.rows,
+        lambda: ((bundle.gdf, ref_data.validatielijst, bundle.package_name), {})
+    )
+    assert len(result) >= bundle.rows
+
+
+@pytest.mark.benchmark(group="stage-export")
+def test_export_geopackage(benchmark, config, ref_data, bundle, tmp_path):
+    df = set_criteria(bundle.gdf, ref_data.validatielijst, bundle.package_name)
+    df = df.drop(columns=[c for c in ['resultaatdatum', 'namespace', 'analysecompartiment.code'] if c in df.columns])
+    exporter = GeoPackageExporter(config)
+
+    def setup():
+        (tmp_path / "output.gpkg").unlink(missing_ok=True)
+        return (df, tmp_path / "output.gpkg"), {}
+
+    run_stage(benchmark, exporter.export, bundle.rows, setup)
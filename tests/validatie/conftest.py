@@ -0,0 +1,38 @@
+"""
+Shared configuration of the validation tests.
+
+The tests validate synthetic bundles (tests/benchmarks/synthetic.py) against the
+reference data in data/. Test modules take the config factory from here:
+
+    from conftest import make_config
+
+and get the reference data from the ref_data fixture.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "benchmarks"))
+
+from synthetic import DATA_DIR  # noqa: E402
+
+# Clients are created against moto or not used at all, but boto3 needs a region
+os.environ.setdefault("AWS_DEFAULT_REGION", "eu-west-1")
+
+
+def make_config(tmp_path, **kwargs):
+    """Local ValidationConfig that reads the reference data from data/ and writes to tmp_path."""
+    from krm_validator.config import ValidationConfig
+
+    return ValidationConfig(is_local=True, local_folder=tmp_path, reference_data_dir=DATA_DIR, **kwargs)
+
+
+@pytest.fixture(scope="module")
+def ref_data(tmp_path_factory):
+    """Reference data read from data/, loaded once per test module."""
+    from krm_validator.reference_data import ReferenceDataLoader
+
+    return ReferenceDataLoader(make_config(tmp_path_factory.mktemp("ref")))
@@ -0,0 +1,94 @@
+"""Tests for the HTTP validation API with streamed results."""
+
+import asyncio
+import json
+
+import pytest
+
+from krm_validator.api import encode_event, read_bundle_bytes, validation_events
+from krm_validator.processor import DataBundleProcessor
+from krm_validator.validator import KRMValidator
+
+from conftest import make_config
+from synthetic import bundle_name, write_bundle_zip
+
+ROWS = 240
+
+
+def bundle(tmp_path, fault_rate, **kwargs):
+    zip_path = write_bundle_zip("timeseries", ROWS, tmp_path, fault_rate=fault_rate, seed=5, **kwargs)
+    return zip_path.read_bytes()
+
+
+def test_events_stream_the_full_report(tmp_path, ref_data):
+    config = make_config(tmp_path, quick_check="off")
+    csv_content, has_akkoord = read_bundle_bytes(config, bundle(tmp_path, 0.1))
+    package_name = bundle_name("timeseries", ROWS, 0.1)
+
+    events = list(validation_events(config, ref_data, csv_content, package_name, has_akkoord))
+
+    assert events[0] == {'event': 'started', 'bundle': package_name, 'rows': ROWS}
+    assert events[-1]['event'] == 'done'
+    results = [event for event in events if event['event'] == 'results']
+    assert {event['step'] for event in results} <= set(KRMValidator.VALIDATION_STEPS)
+    steps = [event['step'] for event in results]
+    assert steps == sorted(steps, key=KRMValidator.VALIDATION_STEPS.index)
+
+    expected = KRMValidator(config, ref_data).validate(
+        DataBundleProcessor(config).to_geodataframe(csv_content), package_name
+    )
+    entries = [entry for event in results for entry in event['entries']]
+    assert entries == [
+        {'record_id': r.record_id, 'uitvalreden': r.uitvalreden, 'informatie': r.informatie}
+        for r in expected.results
+    ]
+    assert events[-1]['validation_failures'] == expected.failure_count > 0
+    assert events[-1]['bundle_valid'] is False
+
+
+def test_quick_check_gate_ends_the_stream(tmp_path, ref_data):
+    config = make_config(tmp_path, quick_check="gate")
+    csv_content, _ = read_bundle_bytes(config, bundle(tmp_path, 0.1))
+    csv_content["namespace"] = csv_content["namespace"].cat.add_categories("NL81")
+    csv_content.loc[csv_content.index[:2], "namespace"] = "NL81"
+
+    events = list(validation_events(config, ref_data, csv_content, "gated_bundle"))
+
+    assert [event['event'] for event in events[-2:]] == ['quick_check', 'done']
+    assert {event['step'] for event in events if event['event'] == 'results'} == {'quick_check'}
+    assert events[-2]['valid'] is False
+    assert events[-1]['quick_check_only'] is True
+    assert events[-1]['validation_failures'] == events[-2]['failures'] > 0
+
+
+def test_encode_event():
+    event = {'event': 'done', 'bundle_valid': True}
+    assert encode_event(event, 'ndjson') == b'{"event": "done", "bundle_valid": true}\n'
+    assert encode_event(event, 'sse') == b'event: done\ndata: {"event": "done", "bundle_valid": true}\n\n'
+
+
+def test_http_validate_streams_ndjson(tmp_path, ref_data):
+    pytest.importorskip("aiohttp")
+    from aiohttp.test_utils import TestClient, TestServer
+
+    from krm_validator.api import create_app
+
+    config = make_config(tmp_path, quick_check="off")
+    body = bundle(tmp_path, 0.0)
+
+    async def run():
+        async with TestClient(TestServer(create_app(config, ref_data))) as client:
+            health = await client.get("/health")
+            assert (await health.json()) == {'status': 'ok'}
+
+            missing_name = await client.post("/validate", data=body)
+            assert missing_name.status == 400
+
+            response = await client.post("/validate", params={'name': 'clean_bundle'}, data=body)
+            assert response.headers['Content-Type'].startswith('application/x-ndjson')
+            return [json.loads(line) for line in (await response.text()).splitlines()]
+
+    events = asyncio.run(run())
+    assert events[0]['event'] == 'started'
+    assert events[-1]['event'] == 'done'
+    assert events[-1]['bundle_valid'] is True
@@ -0,0 +1,57 @@
+"""Tests for the categorical code columns of the bundle frames."""
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+
+from krm_validator.exporter import GeoPackageExporter, set_criteria
+from krm_validator.processor import DataBundleProcessor
+from krm_validator.reporting import CountReportGenerator
+from krm_validator.validator import KRMValidator
+
+from conftest import make_config
+from synthetic import PROFILES, write_bundle_zip
+
+ROWS = 300
+
+
+def test_categorize_codes():
+    df = pd.DataFrame({
+        "code": ["b", "a", np.nan, "b"],
+        "id": ["1", "2", "3", "4"],
+        "mixed": ["a", 1, "a", "a"],
+        "value": [1.0, 2.0, 2.0, 2.0],
+    })
+
+    result = DataBundleProcessor.categorize_codes(df.copy())
+
+    assert list(result["code"].cat.categories) == ["a", "b"]
+    assert result["code"].isna().tolist() == df["code"].isna().tolist()
+    assert result["code"].astype(object).fillna("-").tolist() == ["b", "a", "-", "b"]
+    assert [str(result[c].dtype) for c in ("id", "mixed", "value")] == ["object", "object", "float64"]
+
+
+@pytest.mark.parametrize("profile", PROFILES)
+def test_categorical_codes_give_identical_results(tmp_path, ref_data, profile):
+    zip_path = write_bundle_zip(profile, ROWS, tmp_path, fault_rate=0.1, seed=7)
+    outputs = []
+    for categorical in (False, True):
+        config = make_config(tmp_path, categorical_codes=categorical)
+        processor = DataBundleProcessor(config)
+        csv_content, _ = processor.read_bundle(zip_path)
+        gdf = processor.to_geodataframe(csv_content)
+        assert (gdf.dtypes == "category").any() == categorical
+
+        validator = KRMValidator(config, ref_data)
+        report = validator.validate(gdf, zip_path.stem).to_dataframe()
+        counts = CountReportGenerator(config, ref_data).generate(
+            gdf, validator.rules, zip_path.stem, validator.count_table
+        )
+        gpkg = tmp_path / f"{categorical}.gpkg"
+        GeoPackageExporter(config).export(set_criteria(gdf, ref_data.validatielijst, zip_path.stem), gpkg)
+        outputs.append((report, validator.rules, counts, gpd.read_file(gpkg)))
+
+    assert len(outputs[0][0]) > 0
+    for expected, actual in zip(*outputs):
+        pd.testing.assert_frame_equal(expected, actual)
@@ -0,0 +1,169 @@
+"""Tests for checkpointing and resuming a validation that runs out of time."""
+
+from functools import partial
+from pathlib import Path
+
+import boto3
+import pandas as pd
+import pytest
+from moto import mock_aws
+
+from krm_validator.checkpoint import Budget, checkpoint_key, load_checkpoint, save_checkpoint
+from krm_validator.handler import process_data_bundle, resume_data_bundle
+from krm_validator.processor import DataBundleProcessor
+from krm_validator.reference_data import ReferenceDataLoader
+from krm_validator.s3_functions import STATUS_BUCKET
+from krm_validator.validator import KRMValidator
+
+from conftest import make_config
+from synthetic import bundle_name, generate_bundle, write_bundle_zip
+
+BUCKET = "krm-validatie-data-dev"
+ROWS = 240
+
+
+class FakeContext:
+    """Lambda context whose remaining time shrinks by step_ms on every check."""
+
+    function_name = "krm-validatie-lambda-test"
+
+    def __init__(self, remaining_ms: int, step_ms: int):
+        self.remaining_ms = remaining_ms
+        self.step_ms = step_ms
+
+    def get_remaining_time_in_millis(self) -> int:
+        self.remaining_ms -= self.step_ms
+        return self.remaining_ms
+
+
+checkpoint_config = partial(
+    make_config, bucket_name=BUCKET, record_chunk_rows=50, checkpoint_reserve_ms=1000, quick_check="off"
+)
+
+
+def test_budget():
+    budget = Budget(FakeContext(3500, 1000), reserve_ms=1000)
+    assert [budget.exhausted() for _ in range(3)] == [False, False, True]
+    assert not Budget(None, reserve_ms=1000).exhausted()
+
+
+def round_trip(config, state):
+    """State as read back from a checkpoint in S3."""
+    key = checkpoint_key(config.checkpoint_prefix, "bundle")
+    save_checkpoint(BUCKET, key, state)
+    return load_checkpoint(BUCKET, config.checkpoint_prefix, key)
+
+
+@pytest.fixture
+def bucket():
+    with mock_aws():
+        s3 = boto3.client("s3")
+        s3.create_bucket(Bucket=BUCKET, CreateBucketConfiguration={"LocationConstraint": "eu-west-1"})
+        yield s3
+
+
+def test_interrupted_validation_resumes_to_same_report(tmp_path, bucket):
+    config = checkpoint_config(tmp_path)
+    ref_data = ReferenceDataLoader(config)
+    df = generate_bundle("multicriterion", ROWS, fault_rate=0.05, seed=3)
+    df.columns = df.columns.str.lower().str.strip()
+    gdf = DataBundleProcessor(config).to_geodataframe(df)
+    package_name = bundle_name("multicriterion", ROWS, 0.05)
+
+    single = KRMValidator(config, ref_data)
+    expected = single.validate(gdf, package_name).to_dataframe()
+
+    validator = KRMValidator(config, ref_data)
+    runs = 0
+    while not validator.complete:
+        # Stop after every third check, continuing in a new validator from a checkpoint
+        checks = iter(range(3))
+        validator.validate(gdf, package_name, should_stop=lambda: next(checks, None) is None)
+        state = round_trip(config, validator.checkpoint_state())
+        validator = KRMValidator(config, ref_data)
+        validator.restore_state(state)
+        runs += 1
+
+    assert runs > len(KRMValidator.VALIDATION_STEPS) // 3
+    pd.testing.assert_frame_equal(validator.report.to_dataframe(), expected)
+    pd.testing.assert_frame_equal(validator.rules, single.rules)
+    pd.testing.assert_frame_equal(validator.count_table, single.count_table)
+
+
+def test_checkpoint_outside_prefix_is_not_read(tmp_path, bucket):
+    config = checkpoint_config(tmp_path)
+    bucket.put_object(Bucket=BUCKET, Key="input/state.json", Body=b'{"version": 3}')
+
+    for key in ("input/state.json", f"{config.checkpoint_prefix}bundle.pkl", "state.json"):
+        with pytest.raises(ValueError, match="not a checkpoint"):
+            resume_data_bundle(config, key)
+
+
+@pytest.fixture
+def buckets(tmp_path):
+    with mock_aws():
+        s3 = boto3.client("s3")
+        for bucket in (BUCKET, STATUS_BUCKET):
+            s3.create_bucket(Bucket=bucket, CreateBucketConfiguration={"LocationConstraint": "eu-west-1"})
+        zip_path = write_bundle_zip("timeseries", ROWS, tmp_path / "input", fault_rate=0.05, seed=5)
+        key = f"input/{zip_path.name}"
+        s3.upload_file(str(zip_path), BUCKET, key)
+        yield s3, key
+
+
+def read_report(s3, package_name):
+    body = s3.get_object(Bucket=BUCKET, Key=f"rapportages/{package_name.replace('+', ' ')}.csv")["Body"]
+    return body.read()
+
+
+# Batch, and streamed from a bundle spilled to disk, which is spilled again on resume
+@pytest.mark.parametrize("stream", [{}, {"stream_window": "M", "stream_min_rows": 0, "stream_chunk_rows": 50}])
+def test_handler_checkpoints_and_resumes(tmp_path, buckets, stream):
+    s3, key = buckets
+    package_name = Path(key).stem
+
+    (tmp_path / "single").mkdir()
+    # Its own lease prefix, so the resumed run below is not a duplicate of this one
+    expected = process_data_bundle(
+        checkpoint_config(tmp_path / "single", idempotency_prefix="work/leases-single/", **stream), BUCKET, key
+    )
+    expected_report = read_report(s3, package_name)
+    s3.delete_object(Bucket=BUCKET, Key=f"rapportages/{package_name.replace('+', ' ')}.csv")
+
+    (tmp_path / "resumed").mkdir()
+    config = checkpoint_config(tmp_path / "resumed", **stream)
+    enqueued = []
+
+    def invocation():
+        # Five budget checks per invocation, one of them for the lease duration
+        return Budget(FakeContext(remaining_ms=1000 + 5 * 100, step_ms=100), config.checkpoint_reserve_ms)
+
+    result = process_data_bundle(config, BUCKET, key, invocation(), enqueued.append)
+    while "checkpoint" in result:
+        assert enqueued[-1] == result["checkpoint"] == checkpoint_key(config.checkpoint_prefix, package_name)
+        result = resume_data_bundle(config, enqueued[-1], invocation(), enqueued.append)
+
+    assert len(enqueued) > 1
+    assert result == expected
+    assert read_report(s3, package_name) == expected_report
+    assert "Contents" not in s3.list_objects_v2(Bucket=BUCKET, Prefix=config.checkpoint_prefix)
+
+    # The lease was kept across the resumes; a duplicate event reuses the result
+    duplicate = process_data_bundle(config, BUCKET, key)
+    assert duplicate["duplicate"] and not duplicate["in_progress"]
+    assert {name: duplicate[name] for name in expected} == expected
+
+
+def test_handler_gives_up_after_max_resumes(tmp_path, buckets):
+    _, key = buckets
+    config = checkpoint_config(tmp_path, max_resumes=2)
+    enqueued = []
+
+    def invocation():
+        return Budget(FakeContext(remaining_ms=1000 + 2 * 100, step_ms=100), config.checkpoint_reserve_ms)
+
+    result = process_data_bundle(config, BUCKET, key, invocation(), enqueued.append)
+    result = resume_data_bundle(config, enqueued[-1], invocation(), enqueued.append)
+    with pytest.raises(RuntimeError, match="after 2 resumes"):
+        resume_data_bundle(config, enqueued[-1], invocation(), enqueued.append)
+    assert result["resumes"] == 2
@@ -0,0 +1,82 @@
+"""Tests for the offline command-line validator."""
+
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from krm_validator import cli
+from krm_validator.config import ValidationConfig
+from krm_validator.processor import DataBundleProcessor
+from krm_validator.reference_data import ReferenceDataLoader
+from krm_validator.validator import KRMValidator
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "benchmarks"))
+from synthetic import DATA_DIR, bundle_name, write_bundle_zip  # noqa: E402
+
+ROWS = 120
+
+
+@pytest.fixture
+def bundles(tmp_path):
+    os.environ.setdefault("AWS_DEFAULT_REGION", "eu-west-1")
+    folder = tmp_path / "bundles"
+    write_bundle_zip("biotaxon", ROWS, folder, fault_rate=0.1, seed=1)
+    write_bundle_zip("timeseries", ROWS, folder, fault_rate=0.0, seed=2, akkoord=True)
+    return folder
+
+
+def test_cli_validates_folder_on_process_pool(tmp_path, bundles):
+    out = tmp_path / "reports"
+    exit_code = cli.main([
+        "validate", str(bundles), "--reference", str(DATA_DIR), "--out", str(out), "--jobs", "2", "--max-rows", "0"
+    ])
+    assert exit_code == 1
+
+    config = ValidationConfig(is_local=True, local_folder=tmp_path, reference_data_dir=DATA_DIR)
+    ref_data = ReferenceDataLoader(config)
+    for profile, fault_rate in (("biotaxon", 0.1), ("timeseries", 0.0)):
+        name = bundle_name(profile, ROWS, fault_rate).replace("+", " ")
+        assert (out / f"validatielijst_per_locatie_met_aantal_{name}.csv").exists()
+
+        processor = DataBundleProcessor(config)
+        csv_content, _ = processor.read_bundle(bundles / f"{bundle_name(profile, ROWS, fault_rate)}.zip")
+        report = KRMValidator(config, ref_data).validate(processor.to_geodataframe(csv_content), name)
+        expected = tmp_path / "expected.csv"
+        report.to_csv(expected)
+        assert (out / f"{name}.csv").read_text() == expected.read_text()
+        assert pd.read_parquet(out / f"{name}.parquet").to_dict("records") == report.to_dataframe().to_dict("records")
+
+
+def test_read_bundle_csv_matches_zip(tmp_path, bundles):
+    zip_path = next(bundles.glob("*.zip"))
+    processor = DataBundleProcessor(ValidationConfig(is_local=True))
+    from_zip, _ = processor.read_bundle(zip_path)
+
+    csv_path = tmp_path / f"{zip_path.stem}.csv"
+    from_zip.to_csv(csv_path, sep=";", index=False, encoding="cp1252")
+    from_csv, has_akkoord = processor.read_bundle(csv_path)
+
+    assert not has_akkoord
+    pd.testing.assert_frame_equal(from_csv, from_zip)
+    assert cli.find_bundles([bundles, csv_path]) == sorted(bundles.glob("*.zip")) + [csv_path]
+
+
+def test_snapshot_is_used_offline(tmp_path, monkeypatch):
+    def fake_download(url, local_filename, local_folder):
+        relative = url.split("/data/", 1)[1]
+        shutil.copy(DATA_DIR / relative, Path(local_folder) / local_filename)
+
+    monkeypatch.setattr("krm_validator.github_functions.get_shape_data_from_github", fake_download)
+    assert cli.main(["snapshot", "--dir", str(tmp_path / "snapshot")]) == 0
+
+    config = cli.reference_config(tmp_path / "snapshot", tmp_path / "reports")
+    ref_data = ReferenceDataLoader(config)
+    assert ref_data.artifact is not None
+    assert len(ref_data.validatielijst) > 0
+
+    with pytest.raises(FileNotFoundError, match="krm-validate snapshot"):
+        cli.reference_config(tmp_path / "missing", tmp_path / "reports")
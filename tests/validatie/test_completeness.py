@@ -0,0 +1,102 @@
+"""Unit tests for the verzameling completeness check."""
+
+import pandas as pd
+
+from krm_validator.completeness import missing_parameters, required_parameters
+from krm_validator.config import ValidationConfig
+from krm_validator.report import ValidationSection
+from krm_validator.validator import KRMValidator
+
+
+GROUP = pd.DataFrame({
+    'groep': ['PCB', 'PCB', 'PCB', 'benthos', 'benthos'],
+    'parameter': ['PCB28', 'PCB52', 'PCB101', 'Abra alba', 'Ensis'],
+    'typegroep': ['Chemische stof'] * 3 + ['Biotaxon'] * 2,
+    'elke_param_verplicht': ['ja', 'ja', 'ja', 'nee', 'nee'],
+})
+
+
+class FakeReferenceData:
+    """Reference data with one validation rule for the PCB group."""
+
+    group = GROUP
+
+    def get_validation_rules(self, package_name):
+        # Index 0 becomes validatieregel 2 (Excel row number)
+        return pd.DataFrame({'databundelcode': ['bundel'], 'groep': ['PCB']})
+
+
+class TestRequiredParameters:
+    """Tests for required_parameters."""
+
+    def test_only_verplicht_parameters(self):
+        required = required_parameters(GROUP)
+
+        assert required['groep'].unique().tolist() == ['PCB']
+        assert required['parameter_key'].tolist() == ['pcb28', 'pcb52', 'pcb101']
+
+
+class TestMissingParameters:
+    """Tests for missing_parameters."""
+
+    def test_lists_missing_per_monster(self):
+        reported = pd.DataFrame({
+            'monster': ['m1', 'm1', 'm2', 'm2', 'm2'],
+            'groep': ['PCB'] * 5,
+            'parameter_key': ['pcb28', 'pcb52', 'pcb28', 'pcb52', 'pcb101'],
+        })
+
+        missing = missing_parameters(reported, required_parameters(GROUP))
+
+        assert missing['monster'].tolist() == ['m1']
+        assert missing['missing'].tolist() == [['PCB101']]
+
+    def test_group_without_required_parameters(self):
+        reported = pd.DataFrame({'monster': ['m1'], 'groep': ['benthos'], 'parameter_key': ['abra alba']})
+
+        assert missing_parameters(reported, required_parameters(GROUP)).empty
+
+
+class TestCheckParameterAggregates:
+    """Tests for KRMValidator._check_parameter_aggregates."""
+
+    @staticmethod
+    def _data():
+        gdf = pd.DataFrame({
+            'meetwaarde.lokaalid': ['NL80_1', 'NL80_2', 'NL80_3'],
+            'monster.lokaalid': ['NL80_m1', 'NL80_m1', 'NL80_m2'],
+            'parameter.code': ['PCB28', 'pcb52', 'PCB28'],
+            'biotaxon.naam': [None, None, None],
+        })
+        rules = pd.DataFrame({
+            'databundelcode': 'bundel',
+            'record_id': ['1', '2', '3'],
+            'uitvalreden': 0,
+            'validatieregel': [2, 2, 2],
+            'betreftverzameling': [1, 0, 0],
+            'monster_identificatie': gdf['monster.lokaalid'],
+        })
+        return gdf, rules
+
+    def test_reports_incomplete_verzameling(self):
+        gdf, rules = self._data()
+        validator = KRMValidator(ValidationConfig(), FakeReferenceData())
+
+        validator._check_parameter_aggregates(gdf, 'bundel', rules)
+
+        # m2 has no record in a verzameling, so only m1 is checked
+        failures = validator.report.to_dataframe()
+        assert len(failures) == 1
+        assert failures.iloc[0]['section'] == ValidationSection.PARAMETER_AGGREGATE.value
+        assert failures.iloc[0]['record_id'] == '1'
+        assert failures.iloc[0]['informatie'] == 'parameter(s) "PCB101" uit groep "PCB" niet gevonden in monster "m1"'
+
+    def test_complete_verzameling(self):
+        gdf, rules = self._data()
+        gdf.loc[2, ['monster.lokaalid', 'parameter.code']] = ['NL80_m1', 'PCB101']
+        rules['monster_identificatie'] = gdf['monster.lokaalid']
+        validator = KRMValidator(ValidationConfig(), FakeReferenceData())
+
+        validator._check_parameter_aggregates(gdf, 'bundel', rules)
+
+        assert validator.report.failure_count == 0
@@ -0,0 +1,201 @@
+"""Tests for the idempotent processing of duplicate S3 events."""
+
+import json
+import time
+from functools import partial
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from krm_validator import handler
+from krm_validator.checkpoint import Budget
+from krm_validator.idempotency import (
+    LEASE_DONE,
+    LEASE_RUNNING,
+    LeaseHeld,
+    acquire_lease,
+    job_id,
+    keep_lease,
+    object_version,
+    renew_lease,
+)
+from krm_validator.s3_functions import STATUS_BUCKET, publish_to_sqs
+
+from conftest import make_config
+from synthetic import write_bundle_zip
+
+BUCKET = "krm-validatie-data-dev"
+ROWS = 120
+
+
+bucket_config = partial(make_config, bucket_name=BUCKET, quick_check="off", idempotency_wait_s=0)
+
+
+class FakeContext:
+    """Lambda context of an invocation that ends remaining_ms from now."""
+
+    function_name = "krm-validatie-lambda-test"
+
+    def __init__(self, remaining_ms: int):
+        self.deadline = time.monotonic() + remaining_ms / 1000
+
+    def get_remaining_time_in_millis(self) -> int:
+        return int((self.deadline - time.monotonic()) * 1000)
+
+
+class Killed(BaseException):
+    """An invocation ended by the Lambda timeout or out of memory: nothing after it runs."""
+
+
+@pytest.fixture
+def s3(tmp_path):
+    with mock_aws():
+        s3 = boto3.client("s3")
+        for bucket in (BUCKET, STATUS_BUCKET):
+            s3.create_bucket(Bucket=bucket, CreateBucketConfiguration={"LocationConstraint": "eu-west-1"})
+        yield s3
+
+
+@pytest.fixture
+def key(s3, tmp_path):
+    zip_path = write_bundle_zip("timeseries", ROWS, tmp_path / "input", seed=3)
+    key = f"input/{zip_path.name}"
+    s3.upload_file(str(zip_path), BUCKET, key)
+    return key
+
+
+def lease_record(s3, config, job):
+    body = s3.get_object(Bucket=BUCKET, Key=f"{config.idempotency_prefix}{job}.json")["Body"]
+    return json.loads(body.read())
+
+
+def test_object_version_of_event_matches_head(s3, key):
+    etag = s3.head_object(Bucket=BUCKET, Key=key)["ETag"].strip('"')
+    assert object_version(BUCKET, key) == etag
+    assert object_version(BUCKET, key, {"key": key, "eTag": etag, "sequencer": "0A1B"}) == etag
+    assert object_version(BUCKET, key, {"eTag": etag, "versionId": "v3"}) == "v3"
+    assert job_id(BUCKET, key, etag) == job_id(BUCKET, key, etag) != job_id(BUCKET, key, "v3")
+
+
+def test_duplicate_event_reuses_result(s3, key, tmp_path, monkeypatch):
+    config = bucket_config(tmp_path)
+    first = handler.process_data_bundle(config, BUCKET, key)
+
+    deleted = []
+    monkeypatch.setattr(handler, "delete_file_from_s3", lambda *args: deleted.append(args))
+    duplicate = handler.process_data_bundle(config, BUCKET, key)
+
+    assert not deleted
+    assert duplicate == {
+        "duplicate": True, "job_id": job_id(BUCKET, key, object_version(BUCKET, key)),
+        "in_progress": False, **first,
+    }
+
+    # A new version of the bundle is processed again
+    s3.put_object(Bucket=BUCKET, Key=key, Body=s3.get_object(Bucket=BUCKET, Key=key)["Body"].read() + b"\0")
+    assert "duplicate" not in handler.process_data_bundle(config, BUCKET, key)
+
+
+def test_duplicate_of_running_job_fails_for_a_retry(s3, key, tmp_path):
+    config = bucket_config(tmp_path)
+    job = job_id(BUCKET, key, object_version(BUCKET, key))
+    lease, _ = acquire_lease(BUCKET, config.idempotency_prefix, job, 600, 0)
+
+    with pytest.raises(LeaseHeld, match="still running"):
+        handler.process_data_bundle(config, BUCKET, key)
+
+    assert lease_record(s3, config, job)["owner"] == lease.owner
+
+
+def test_retry_after_killed_invocation_processes_bundle(s3, key, tmp_path, monkeypatch):
+    config = bucket_config(tmp_path, idempotency_lease_margin_s=1)
+    job = job_id(BUCKET, key, object_version(BUCKET, key))
+
+    def kill(*args, **kwargs):
+        raise Killed()
+
+    # The first invocation dies without releasing its lease
+    monkeypatch.setattr(handler, "_upload_report", kill)
+    with pytest.raises(Killed):
+        handler.process_data_bundle(config, BUCKET, key, Budget(FakeContext(1000), 0))
+    monkeypatch.undo()
+
+    # Its lease runs until the end of the invocation plus the margin, not the full lease
+    record = lease_record(s3, config, job)
+    assert record["state"] == LEASE_RUNNING
+    assert record["expires_at"] <= time.time() + 2
+
+    # A retry inside the lease window fails, so it is retried again ...
+    with pytest.raises(LeaseHeld):
+        handler.process_data_bundle(config, BUCKET, key, Budget(FakeContext(900000), 0))
+
+    # ... and a retry that waits for the lease takes it over and processes the bundle
+    config = bucket_config(tmp_path, idempotency_lease_margin_s=1, idempotency_wait_s=10)
+    result = handler.process_data_bundle(config, BUCKET, key, Budget(FakeContext(900000), 0))
+
+    assert "duplicate" not in result
+    record = lease_record(s3, config, job)
+    assert record["state"] == LEASE_DONE and record["result"] == result
+
+
+def test_running_lease_is_renewed(s3, tmp_path):
+    job = job_id(BUCKET, "input/bundle.zip", "v1")
+    lease, _ = acquire_lease(BUCKET, "work/leases/", job, 10, 0)
+    expires_at = lease.expires_at
+
+    keep_lease(lease, lambda: 600)
+    assert lease.expires_at == expires_at
+
+    lease.expires_at = time.time() + 4
+    keep_lease(lease, lambda: 600)
+    assert lease.expires_at > time.time() + 500
+    assert json.loads(
+        s3.get_object(Bucket=BUCKET, Key=f"work/leases/{job}.json")["Body"].read()
+    )["expires_at"] == lease.expires_at
+
+
+def test_expired_lease_is_taken_over(s3, key, tmp_path):
+    config = bucket_config(tmp_path)
+    job = job_id(BUCKET, key, object_version(BUCKET, key))
+    stale, _ = acquire_lease(BUCKET, config.idempotency_prefix, job, 0, 0)
+    time.sleep(0.01)
+
+    result = handler.process_data_bundle(config, BUCKET, key)
+
+    assert "duplicate" not in result
+    record = lease_record(s3, config, job)
+    assert record["state"] == LEASE_DONE and record["result"] == result
+    with pytest.raises(RuntimeError, match="taken over"):
+        renew_lease(stale, 600)
+
+
+def test_failed_job_releases_lease(s3, key, tmp_path, monkeypatch):
+    config = bucket_config(tmp_path)
+    job = job_id(BUCKET, key, object_version(BUCKET, key))
+
+    def fail(*args, **kwargs):
+        assert lease_record(s3, config, job)["state"] == LEASE_RUNNING
+        raise RuntimeError("export failed")
+
+    monkeypatch.setattr(handler, "_upload_report", fail)
+    with pytest.raises(RuntimeError, match="export failed"):
+        handler.process_data_bundle(config, BUCKET, key)
+    monkeypatch.undo()
+
+    assert "Contents" not in s3.list_objects_v2(Bucket=BUCKET, Prefix=config.idempotency_prefix)
+    assert "duplicate" not in handler.process_data_bundle(config, BUCKET, key)
+
+
+def test_publish_deduplication_id_is_deterministic(s3):
+    sqs = boto3.client("sqs")
+    queue_url = sqs.create_queue(
+        QueueName="publish.fifo", Attributes={"FifoQueue": "true"}
+    )["QueueUrl"]
+
+    for body in ("bundle a", "bundle a", "bundle b"):
+        publish_to_sqs(queue_url, body, message_group_id="group")
+    publish_to_sqs(queue_url, "bundle a", message_group_id="group", deduplication_id="job-2")
+
+    messages = sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10)["Messages"]
+    assert [message["Body"] for message in messages] == ["bundle a", "bundle b", "bundle a"]
@@ -0,0 +1,222 @@
+"""Tests for the batched publication notifications and their consumer."""
+
+import importlib.util
+import json
+import os
+import sys
+from pathlib import Path
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from krm_validator import worker as worker_module
+from krm_validator.config import ValidationConfig
+from krm_validator.s3_functions import STATUS_BUCKET, publish_batch_to_sqs
+from krm_validator.worker import QueueWorker
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "benchmarks"))
+from synthetic import DATA_DIR, write_bundle_zip  # noqa: E402
+
+BUCKET = "krm-validatie-data-dev"
+ROWS = 120
+PUBLICATIE = Path(__file__).parents[2] / "infra" / "functions" / "publicatie-dev" / "krm-publicatie.py"
+
+
+@pytest.fixture
+def aws():
+    os.environ.setdefault("AWS_DEFAULT_REGION", "eu-west-1")
+    with mock_aws():
+        s3 = boto3.client("s3")
+        for bucket in (BUCKET, STATUS_BUCKET):
+            s3.create_bucket(Bucket=bucket, CreateBucketConfiguration={"LocationConstraint": "eu-west-1"})
+        yield s3, boto3.client("sqs")
+
+
+def receive_all(sqs, queue_url):
+    messages = []
+    while response := sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10).get("Messages"):
+        messages += response
+        for message in response:
+            sqs.delete_message(QueueUrl=queue_url, ReceiptHandle=message["ReceiptHandle"])
+    return messages
+
+
+def test_publish_batch_to_sqs(aws):
+    _, sqs = aws
+    queue_url = sqs.create_queue(QueueName="notifications")["QueueUrl"]
+    ids = publish_batch_to_sqs(queue_url, [{"body": {"n": i}} for i in range(23)])
+    assert len(set(ids)) == 23
+    assert sorted(json.loads(m["Body"])["n"] for m in receive_all(sqs, queue_url)) == list(range(23))
+
+    fifo_url = sqs.create_queue(QueueName="notifications.fifo", Attributes={"FifoQueue": "true"})["QueueUrl"]
+    publish_batch_to_sqs(fifo_url, [
+        {"body": "a", "group_id": "g", "deduplication_id": "job-1"},
+        {"body": "b", "group_id": "g", "deduplication_id": "job-1"},
+        {"body": "c", "group_id": "g"},
+    ])
+    assert [m["Body"] for m in receive_all(sqs, fifo_url)] == ["a", "c"]
+    with pytest.raises(ValueError, match="MessageGroupId"):
+        publish_batch_to_sqs(fifo_url, [{"body": "d"}])
+
+
+def test_worker_sends_notifications_of_finished_bundles_in_one_batch(aws, tmp_path, monkeypatch):
+    s3, sqs = aws
+    jobs_url = sqs.create_queue(QueueName="krm-validatie-jobs")["QueueUrl"]
+    publish_url = sqs.create_queue(QueueName="publish.fifo", Attributes={"FifoQueue": "true"})["QueueUrl"]
+    bundles = []
+    for profile in ("biotaxon", "timeseries"):
+        zip_path = write_bundle_zip(profile, ROWS, tmp_path / "input", seed=3)
+        s3.upload_file(str(zip_path), BUCKET, f"input/{zip_path.name}")
+        sqs.send_message(QueueUrl=jobs_url, MessageBody=json.dumps({"bucket": BUCKET, "key": f"input/{zip_path.name}"}))
+        bundles.append(zip_path.stem)
+
+    batches = []
+    monkeypatch.setattr(worker_module, "publish_batch_to_sqs", lambda url, messages: (
+        batches.append(len(messages)), publish_batch_to_sqs(url, messages)
+    ))
+    # Exports (not is_local) write to the test folder instead of /tmp
+    monkeypatch.setattr(ValidationConfig, "temp_folder", property(lambda self: tmp_path))
+    config = ValidationConfig(
+        is_local=False, bucket_name=BUCKET, reference_data_dir=DATA_DIR, quick_check="off",
+        sqs_queue_url=publish_url, publish_max_delay_s=600
+    )
+    QueueWorker(config, jobs_url, concurrency=1, wait_seconds=0, visibility_timeout=60).run(idle_exit=True)
+
+    assert batches == [2]
+    notifications = [json.loads(m["Body"]) for m in receive_all(sqs, publish_url)]
+    assert sorted(n["bundle"] for n in notifications) == sorted(b.replace("+", " ") for b in bundles)
+    for notification in notifications:
+        gpkg = s3.head_object(Bucket=BUCKET, Key=notification["gpkg_key"])
+        assert notification["etag"] == gpkg["ETag"].strip('"')
+        assert notification["bucket"] == BUCKET
+        assert notification["rows"] == ROWS and notification["criteria"]
+    assert receive_all(sqs, jobs_url) == []
+
+
+@pytest.fixture
+def publicatie(aws, monkeypatch):
+    spec = importlib.util.spec_from_file_location("krm_publicatie", PUBLICATIE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    calls = []
+    monkeypatch.setattr(module, "publish_incremental", lambda bucket_name, folder, work_dir=None: (
+        calls.append(folder) or {"changed": False, "folder": folder}
+    ))
+    return module, calls
+
+
+def notification(bundle, folder="geopackages", bucket=BUCKET):
+    return json.dumps({
+        "bucket": bucket, "bundle": bundle, "gpkg_key": f"{folder}/{bundle}.gpkg", "etag": "e", "rows": 1
+    })
+
+
+def test_drain_queue_publishes_once_per_batch(aws, publicatie):
+    _, sqs = aws
+    module, calls = publicatie
+    queue_url = sqs.create_queue(QueueName="publish")["QueueUrl"]
+    for body in (notification("a"), notification("b"), "test", notification("c", "geopackages_productie")):
+        sqs.send_message(QueueUrl=queue_url, MessageBody=body)
+
+    publications = module.drain_queue(queue_url, BUCKET, wait_seconds=0)
+
+    assert calls == ["geopackages", "geopackages_productie"]
+    assert set(publications) == set(calls)
+    assert receive_all(sqs, queue_url) == []
+    assert module.drain_queue(queue_url, BUCKET, wait_seconds=0) == {}
+
+
+def test_failed_publication_leaves_batch_on_queue(aws, publicatie, monkeypatch):
+    _, sqs = aws
+    module, _ = publicatie
+    queue_url = sqs.create_queue(QueueName="publish")["QueueUrl"]
+    sqs.send_message(QueueUrl=queue_url, MessageBody=notification("a"))
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("master locked")
+
+    monkeypatch.setattr(module, "publish_incremental", fail)
+    with pytest.raises(RuntimeError):
+        module.drain_queue(queue_url, BUCKET, wait_seconds=0, visibility_timeout=0)
+    assert len(receive_all(sqs, queue_url)) == 1
+
+
+def test_lambda_publishes_sqs_batch_once(publicatie):
+    module, calls = publicatie
+    event = {"Records": [
+        {"eventSource": "aws:sqs", "body": notification(bundle)} for bundle in ("a", "b", "c")
+    ]}
+    assert module.lambda_handler(event, None)["message"] == "Published dataset is up to date"
+    assert calls == ["geopackages"]
+
+
+def test_lambda_leaves_notifications_about_other_bucket_on_queue(publicatie):
+    module, calls = publicatie
+    event = {"Records": [
+        {"eventSource": "aws:sqs", "messageId": "1", "body": notification("a")},
+        {"eventSource": "aws:sqs", "messageId": "2", "body": notification("b", bucket="krm-validatie-data-prod")},
+    ]}
+    assert module.lambda_handler(event, None)["batchItemFailures"] == [{"itemIdentifier": "2"}]
+    assert calls == ["geopackages"]
+
+    event = {"Records": [event["Records"][1]]}
+    assert module.lambda_handler(event, None)["batchItemFailures"] == [{"itemIdentifier": "2"}]
+    assert calls == ["geopackages"]
+
+
+def sqs_event(*bodies):
+    return {"Records": [
+        {"eventSource": "aws:sqs", "messageId": str(i), "body": body} for i, body in enumerate(bodies, 1)
+    ]}
+
+
+def test_lambda_publishes_nothing_past_notification_about_other_bucket(publicatie):
+    module, calls = publicatie
+    event = sqs_event(
+        notification("a"),
+        notification("b", bucket="krm-validatie-data-prod"),
+        notification("c", "geopackages_productie"),
+        notification("d"),
+    )
+
+    failures = module.lambda_handler(event, None)["batchItemFailures"]
+
+    assert failures == [{"itemIdentifier": i} for i in ("2", "3", "4")]
+    assert calls == ["geopackages"]
+
+
+def test_lambda_reports_failed_publication_and_later_notifications(publicatie, monkeypatch):
+    module, calls = publicatie
+    publish = module.publish_incremental
+
+    def fail_productie(bucket_name, folder, work_dir=None):
+        publication = publish(bucket_name, folder, work_dir)
+        if folder == "geopackages_productie":
+            raise RuntimeError("master locked")
+        return publication
+
+    monkeypatch.setattr(module, "publish_incremental", fail_productie)
+    event = sqs_event(
+        notification("a"),
+        notification("b", "geopackages_productie"),
+        notification("c"),
+        notification("d", "geopackages_test"),
+    )
+
+    failures = module.lambda_handler(event, None)["batchItemFailures"]
+
+    assert failures == [{"itemIdentifier": i} for i in ("2", "3", "4")]
+    assert calls == ["geopackages", "geopackages_productie"]
+
+
+def test_drain_queue_leaves_notifications_about_other_bucket_on_queue(aws, publicatie):
+    _, sqs = aws
+    module, calls = publicatie
+    queue_url = sqs.create_queue(QueueName="publish")["QueueUrl"]
+    sqs.send_message(QueueUrl=queue_url, MessageBody=notification("a", bucket="krm-validatie-data-prod"))
+    sqs.send_message(QueueUrl=queue_url, MessageBody=notification("b"))
+
+    assert module.drain_queue(queue_url, BUCKET, wait_seconds=0, visibility_timeout=0) == {}
+    assert calls == []
+    assert [json.loads(m["Body"])["bundle"] for m in receive_all(sqs, queue_url)] == ["a", "b"]
@@ -0,0 +1,416 @@
+"""Tests for the incremental publication of the merged dataset and its GeoParquet copy."""
+
+import importlib.util
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import boto3
+import geopandas as gpd
+import geopandas.testing
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from moto import mock_aws
+from shapely.geometry import Point
+
+BUCKET = "krm-validatie-data-dev"
+FOLDER = "geopackages"
+PUBLICATIE = Path(__file__).parents[2] / "infra" / "functions" / "publicatie-dev" / "krm-publicatie.py"
+
+
+@pytest.fixture
+def publicatie(tmp_path):
+    os.environ.setdefault("AWS_DEFAULT_REGION", "eu-west-1")
+    with mock_aws():
+        boto3.client("s3").create_bucket(
+            Bucket=BUCKET, CreateBucketConfiguration={"LocationConstraint": "eu-west-1"}
+        )
+        spec = importlib.util.spec_from_file_location("krm_publicatie", PUBLICATIE)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        yield module
+
+
+def bundle(name, key, criteria, n=6, start=0, **columns):
+    """Bundle GeoDataFrame: n rows with unique ids, over the criteria and two years."""
+    return gpd.GeoDataFrame(
+        {
+            "meetwaarde.lokaalid": [f"{name}_{start + i}" for i in range(n)],
+            "monprog.naam": key,
+            "krmcriterium": [criteria[i % len(criteria)] for i in range(n)],
+            "begindatum": [f"{2020 + i % 2}-0{1 + i % 9}-15" for i in range(n)],
+            "numeriekewaarde": [float(start + i) for i in range(n)],
+            **columns,
+        },
+        geometry=[Point(3 + i / 10, 52 + i / 20) for i in range(n)],
+        crs="EPSG:4258",
+    )
+
+
+def upload(publicatie, tmp_path, name, gdf):
+    """Upload a bundle GeoPackage to the source folder."""
+    path = tmp_path / "upload" / f"{name}.gpkg"
+    path.parent.mkdir(exist_ok=True)
+    path.unlink(missing_ok=True)
+    gdf.to_file(path, layer=publicatie.LAYER_NAME, driver="GPKG")
+    publicatie.s3.upload_file(str(path), BUCKET, f"{FOLDER}/{name}.gpkg")
+
+
+def rows(gdf):
+    """Rows in a comparable form: by id, with WKT geometry and missing values as None."""
+    df = pd.DataFrame(gdf.drop(columns=gdf.geometry.name))
+    df["geometry"] = gdf.geometry.to_wkt().values
+    df = df.astype(object).where(df.notna(), None)
+    return df.sort_values("meetwaarde.lokaalid", ignore_index=True)[sorted(df.columns)]
+
+
+def remove(publicatie, name):
+    publicatie.s3.delete_object(Bucket=BUCKET, Key=f"{FOLDER}/{name}.gpkg")
+
+
+def manifest_key(publicatie):
+    return f"{publicatie.HISTORY_PREFIX}/{FOLDER}/manifest.json"
+
+
+def master_key(publicatie):
+    return f"{publicatie.HISTORY_PREFIX}/{FOLDER}/{publicatie.LAYER_NAME}.gpkg"
+
+
+def master_rows(publicatie, tmp_path):
+    path = tmp_path / "master.gpkg"
+    publicatie.s3.download_file(BUCKET, master_key(publicatie), str(path))
+    return rows(gpd.read_file(path))
+
+
+def geoparquet_rows(publicatie, tmp_path):
+    """Rows of the GeoParquet copy, without the derived jaar column (bbox is not read)."""
+    root = tmp_path / "geoparquet"
+    shutil.rmtree(root, ignore_errors=True)
+    prefix = f"{publicatie.GEOPARQUET_PREFIX}/{FOLDER}/"
+    for page in publicatie.s3.get_paginator("list_objects_v2").paginate(Bucket=BUCKET, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            path = root / obj["Key"][len(prefix):]
+            path.parent.mkdir(parents=True, exist_ok=True)
+            publicatie.s3.download_file(BUCKET, obj["Key"], str(path))
+    # A dataset read fills fields a file lacks with nulls; all files must have every field
+    assert len({tuple(pq.read_schema(path).names) for path in root.rglob("*.parquet")}) == 1
+    gdf = gpd.read_parquet(root)
+    assert (gdf["jaar"] == pd.to_datetime(gdf["begindatum"]).dt.year).all()
+    gdf = gdf.drop(columns="jaar")
+    gdf["krmcriterium"] = gdf["krmcriterium"].astype(object).replace(publicatie.GEOPARQUET_MISSING_PARTITION, None)
+    return rows(gdf)
+
+
+def full_merge_rows(publicatie, tmp_path):
+    """Rows of a merge of every bundle in the source folder, as a rebuild would write them."""
+    work = tmp_path / "reference"
+    objects = publicatie.list_geopackages(BUCKET, FOLDER)
+    paths = list(publicatie.download_geopackages(BUCKET, objects.values(), str(work / "bundles")))
+    publicatie.merge_geopackages(sorted(paths), str(work / "merged.gpkg"))
+    return rows(gpd.read_file(work / "merged.gpkg"))
+
+
+def assert_published(publicatie, tmp_path):
+    """The master and the GeoParquet copy have the rows of a full re-merge."""
+    expected = full_merge_rows(publicatie, tmp_path)
+    pd.testing.assert_frame_equal(master_rows(publicatie, tmp_path), expected)
+    pd.testing.assert_frame_equal(geoparquet_rows(publicatie, tmp_path)[expected.columns], expected)
+
+
+def geoparquet_partitions(publicatie):
+    prefix = f"{publicatie.GEOPARQUET_PREFIX}/{FOLDER}/"
+    response = publicatie.s3.list_objects_v2(Bucket=BUCKET, Prefix=prefix)
+    return {obj["Key"][len(prefix):].split("/")[0] for obj in response.get("Contents", [])}
+
+
+@pytest.fixture
+def published(publicatie, tmp_path):
+    """Two published bundles with their own bundle key, and the work folder of the publication."""
+    upload(publicatie, tmp_path, "a", bundle("a", "RWS_2024_01 a", ["ANSNL-D5C2", "ANSNL-D6C5"]))
+    upload(publicatie, tmp_path, "b", bundle("b", "RWS_2024_02 b", ["ANSNL-D1C6"]))
+    work_dir = str(tmp_path / "work")
+    publication = publicatie.publish_incremental(BUCKET, FOLDER, work_dir)
+    assert publication["rebuilt"] and publication["changed"]
+    assert_published(publicatie, tmp_path)
+    return work_dir
+
+
+def test_unchanged_bundles_are_not_published_again(publicatie, tmp_path, published):
+    manifest = publicatie.load_manifest(BUCKET, manifest_key(publicatie))
+
+    publication = publicatie.publish_incremental(BUCKET, FOLDER, published)
+
+    assert publication == {
+        "revision": manifest["revision"], "changed": False, "patched": [], "removed": [], "rebuilt": False
+    }
+    assert publicatie.load_manifest(BUCKET, manifest_key(publicatie)) == manifest
+
+
+def test_changed_bundle_replaces_its_rows(publicatie, tmp_path, published):
+    revision = publicatie.load_manifest(BUCKET, manifest_key(publicatie))["revision"]
+    # Fewer rows, other values and no longer in ANSNL-D6C5
+    upload(publicatie, tmp_path, "a", bundle("a", "RWS_2024_01 a", ["ANSNL-D5C2"], n=4, start=100))
+
+    publication = publicatie.publish_incremental(BUCKET, FOLDER, published)
+
+    assert publication["changed"] and not publication["rebuilt"]
+    assert publication["patched"] == [f"{FOLDER}/a.gpkg"] and publication["removed"] == []
+    assert publication["revision"] != revision
+    assert_published(publicatie, tmp_path)
+    assert geoparquet_partitions(publicatie) == {"krmcriterium=ANSNL-D5C2", "krmcriterium=ANSNL-D1C6"}
+
+
+def test_removed_bundle_deletes_its_rows(publicatie, tmp_path, published):
+    remove(publicatie, "b")
+
+    publication = publicatie.publish_incremental(BUCKET, FOLDER, published)
+
+    assert publication["removed"] == [f"{FOLDER}/b.gpkg"] and publication["patched"] == []
+    assert not publication["rebuilt"]
+    assert_published(publicatie, tmp_path)
+    assert geoparquet_partitions(publicatie) == {"krmcriterium=ANSNL-D5C2", "krmcriterium=ANSNL-D6C5"}
+    assert set(publicatie.load_manifest(BUCKET, manifest_key(publicatie))["bundles"]) == {f"{FOLDER}/a.gpkg"}
+
+
+def test_bundle_with_new_fields_adds_them_to_master_and_geoparquet(publicatie, tmp_path, published):
+    upload(publicatie, tmp_path, "c", bundle(
+        "c", "RWS_2024_03 c", ["ANSNL-D1C6"], aantal=[1, 2, 3, 4, 5, 6], opmerking=list("uvwxyz")
+    ))
+
+    publication = publicatie.publish_incremental(BUCKET, FOLDER, published)
+
+    assert publication["patched"] == [f"{FOLDER}/c.gpkg"] and not publication["rebuilt"]
+    path = tmp_path / "master.gpkg"
+    publicatie.s3.download_file(BUCKET, master_key(publicatie), str(path))
+    schema = publicatie.layer_schema(str(path))
+    assert schema["aantal"].kind == "i" and schema["opmerking"].kind == "O"
+    # Every GeoParquet file was rewritten with the new fields, not only that of ANSNL-D1C6
+    assert_published(publicatie, tmp_path)
+
+
+@pytest.mark.parametrize("missing", ["manifest", "master"])
+def test_missing_manifest_or_master_rebuilds(publicatie, tmp_path, published, missing):
+    key = manifest_key(publicatie) if missing == "manifest" else master_key(publicatie)
+    publicatie.s3.delete_object(Bucket=BUCKET, Key=key)
+    upload(publicatie, tmp_path, "a", bundle("a", "RWS_2024_01 a", ["ANSNL-D5C2"], n=3, start=100))
+
+    publication = publicatie.publish_incremental(BUCKET, FOLDER, published)
+
+    assert publication["rebuilt"] and publication["patched"] == [f"{FOLDER}/a.gpkg", f"{FOLDER}/b.gpkg"]
+    assert_published(publicatie, tmp_path)
+    assert geoparquet_partitions(publicatie) == {"krmcriterium=ANSNL-D5C2", "krmcriterium=ANSNL-D1C6"}
+
+
+def test_manifest_of_other_geoparquet_layout_rebuilds(publicatie, tmp_path, published):
+    manifest = publicatie.load_manifest(BUCKET, manifest_key(publicatie))
+    publicatie.s3.put_object(
+        Bucket=BUCKET, Key=manifest_key(publicatie), Body=json.dumps({**manifest, "geoparquet": True})
+    )
+
+    publication = publicatie.publish_incremental(BUCKET, FOLDER, published)
+
+    assert publication["rebuilt"] and not publication["changed"]
+    assert publicatie.load_manifest(BUCKET, manifest_key(publicatie)) == manifest
+    assert_published(publicatie, tmp_path)
+
+
+def test_removed_bundle_sharing_bundle_key_keeps_rows_of_other(publicatie, tmp_path):
+    work_dir = str(tmp_path / "work")
+    upload(publicatie, tmp_path, "a", bundle("a", "RWS_2024_01 bundel", ["ANSNL-D5C2"]))
+    upload(publicatie, tmp_path, "b", bundle("b", "RWS_2024_01 bundel", ["ANSNL-D6C5"]))
+    publicatie.publish_incremental(BUCKET, FOLDER, work_dir)
+    remove(publicatie, "a")
+
+    publication = publicatie.publish_incremental(BUCKET, FOLDER, work_dir)
+
+    # The rows of b were deleted with the bundle key and inserted again
+    assert publication["removed"] == [f"{FOLDER}/a.gpkg"] and not publication["rebuilt"]
+    assert_published(publicatie, tmp_path)
+    assert geoparquet_partitions(publicatie) == {"krmcriterium=ANSNL-D6C5"}
+
+
+def test_delete_bundle_rows(publicatie, tmp_path):
+    path = tmp_path / "layer.gpkg"
+    gdf = pd.concat([bundle("a", "A", ["ANSNL-D5C2"]), bundle("b", "B", ["ANSNL-D5C2"], n=2)])
+    gdf.to_file(path, layer=publicatie.LAYER_NAME, driver="GPKG")
+
+    assert publicatie.delete_bundle_rows(str(path), []) == 0
+    assert publicatie.delete_bundle_rows(str(path), ["B", "C"]) == 2
+    assert set(gpd.read_file(path)["monprog.naam"]) == {"A"}
+
+
+def test_manifest_revision_and_missing_manifest(publicatie):
+    bundles = {"geopackages/a.gpkg": {"etag": "1", "keys": ["A"]}, "geopackages/b.gpkg": {"etag": "2", "keys": []}}
+
+    assert publicatie.manifest_revision(bundles) == publicatie.manifest_revision(dict(reversed(bundles.items())))
+    assert publicatie.manifest_revision(bundles) != publicatie.manifest_revision(
+        {**bundles, "geopackages/b.gpkg": {"etag": "3", "keys": []}}
+    )
+    assert publicatie.load_manifest(BUCKET, "geopackages_history/geopackages/manifest.json") is None
+
+
+def test_new_bundle_sharing_bundle_key_keeps_rows_of_both(publicatie, tmp_path):
+    work_dir = str(tmp_path / "work")
+    upload(publicatie, tmp_path, "a", bundle("a", "RWS_2024_01 bundel", ["ANSNL-D5C2"]))
+    publicatie.publish_incremental(BUCKET, FOLDER, work_dir)
+
+    # A second GeoPackage with the same monprog.naam, in the same and a new partition
+    upload(publicatie, tmp_path, "b", bundle("b", "RWS_2024_01 bundel", ["ANSNL-D5C2", "ANSNL-D6C5"]))
+    publication = publicatie.publish_incremental(BUCKET, FOLDER, work_dir)
+
+    assert not publication["rebuilt"] and publication["patched"] == [f"{FOLDER}/b.gpkg"]
+    assert_published(publicatie, tmp_path)
+    files = {
+        obj["Key"] for obj in publicatie.s3.list_objects_v2(Bucket=BUCKET, Prefix=publicatie.GEOPARQUET_PREFIX)["Contents"]
+    }
+    assert files == {
+        f"{publicatie.GEOPARQUET_PREFIX}/{FOLDER}/krmcriterium={c}/{publicatie.GEOPARQUET_FILE_NAME}"
+        for c in ("ANSNL-D5C2", "ANSNL-D6C5")
+    }
+
+
+def source(name, crs="EPSG:4258", n=5, **columns):
+    """Source GeoPackage layer with upper-case names, a dropped column and the given fields."""
+    points = gpd.GeoSeries([Point(3 + i / 10, 52 + i / 20) for i in range(n)], crs="EPSG:4258").to_crs(crs)
+    return gpd.GeoDataFrame(
+        {"ID": [f"{name}_{i}" for i in range(n)], "monprog.naam": name.upper(), "record_id": range(n), **columns},
+        geometry=points.values,
+    )
+
+
+def concat_reference(publicatie, gdfs):
+    """The merge as pd.concat of the whole layers would produce it."""
+    frames = []
+    for gdf in gdfs:
+        gdf = gdf.to_crs(publicatie.COMMON_CRS)
+        gdf.columns = [column.lower() for column in gdf.columns]
+        frames.append(gdf.drop(columns=publicatie.COLUMNS_TO_DROP, errors="ignore"))
+    merged = pd.concat(frames, ignore_index=True)
+    # pd.concat fills missing text with NaN; the GeoPackage has NULL, read as None
+    text = [c for c in merged.columns if merged[c].dtype == object]
+    merged[text] = merged[text].where(merged[text].notna(), None)
+    return merged[[c for c in merged.columns if c != "geometry"] + ["geometry"]]
+
+
+def test_merge_geopackages_with_other_fields_equals_concat(publicatie, tmp_path):
+    layers = {
+        "a": source("a", numeriekewaarde=[0.5, 1.5, 2.5, 3.5, 4.5], aantal=[1, 2, 3, 4, 5]),
+        "b": source("b", crs="EPSG:28992", opmerking=list("vwxyz")),
+        "c": source("c", diepte=[1.0, None, 3.0, 4.0, 5.0], aantal=[6, 7, 8, 9, 10]),
+    }
+    paths = {}
+    for name, gdf in layers.items():
+        paths[name] = str(tmp_path / f"{name}.gpkg")
+        gdf.to_file(paths[name], layer="bundle", driver="GPKG")
+    output = str(tmp_path / "merged" / "merged.gpkg")
+
+    # Small batches, so fields of later files are added to a layer that already has rows
+    keys = publicatie.merge_geopackages(iter([paths["a"], paths["b"]]), output, batch_size=2)
+
+    assert keys == {paths["a"]: ["A"], paths["b"]: ["B"]}
+    expected = concat_reference(publicatie, [layers["a"], layers["b"]])
+    assert list(publicatie.layer_schema(output)) == list(expected.columns[:-1])
+    merged = gpd.read_file(output)
+    assert merged.crs == publicatie.COMMON_CRS
+    gpd.testing.assert_geodataframe_equal(merged, expected, check_less_precise=True)
+    # Missing numbers are NaN (integer fields become float), missing text is None
+    assert merged["aantal"].dtype == "float64" and merged["aantal"].iloc[5:].isna().all()
+    assert merged["opmerking"].iloc[:5].map(lambda value: value is None).all()
+
+    keys = publicatie.merge_geopackages([paths["c"]], output, batch_size=2, append=True)
+
+    assert keys == {paths["c"]: ["C"]}
+    expected = concat_reference(publicatie, layers.values())
+    assert list(publicatie.layer_schema(output)) == list(expected.columns[:-1])
+    gpd.testing.assert_geodataframe_equal(gpd.read_file(output), expected, check_less_precise=True)
+
+
+def test_align_to_schema_fills_missing_fields_by_type(publicatie):
+    gdf = source("a", n=2, Locatiecode=["x", "y"])
+    gdf.columns = [column.lower() for column in gdf.columns]
+    schema = {
+        "id": np.dtype(object), "aantal": np.dtype("int64"), "gemeten": np.dtype(bool),
+        "waarde": np.dtype("float64"), "datum": np.dtype("datetime64[ns]"), "opmerking": np.dtype(object),
+        "code": pd.CategoricalDtype(["a"]), "monprog.naam": np.dtype(object),
+    }
+
+    aligned = publicatie.align_to_schema(gdf, schema)
+
+    assert list(aligned.columns) == [*schema, "geometry"]
+    assert aligned[["aantal", "gemeten", "waarde"]].dtypes.tolist() == [np.dtype("float64")] * 3
+    assert aligned[["aantal", "gemeten", "waarde", "datum"]].isna().all().all()
+    assert aligned["datum"].dtype == "datetime64[ns]"
+    assert aligned[["opmerking", "code"]].map(lambda value: value is None).all().all()
+    assert aligned["id"].tolist() == ["a_0", "a_1"]
+
+
+def put(publicatie, key, body):
+    publicatie.s3.put_object(Bucket=BUCKET, Key=key, Body=body)
+    return publicatie.s3.head_object(Bucket=BUCKET, Key=key)["ETag"]
+
+
+def test_list_geopackages_reads_every_page(publicatie):
+    for i in range(1005):
+        put(publicatie, f"{FOLDER}/bundle_{i:04d}.gpkg", b"g")
+    put(publicatie, f"{FOLDER}/bundle_0000.gpkg.etag", b"e")
+    put(publicatie, f"{FOLDER}_productie/bundle.gpkg", b"g")
+
+    objects = publicatie.list_geopackages(BUCKET, FOLDER)
+
+    assert sorted(objects) == [f"{FOLDER}/bundle_{i:04d}.gpkg" for i in range(1005)]
+    assert {obj["Size"] for obj in objects.values()} == {1}
+
+
+@pytest.fixture
+def downloads(publicatie, monkeypatch):
+    """Keys passed to s3.download_file."""
+    keys = []
+    download_file = publicatie.s3.download_file
+    monkeypatch.setattr(publicatie.s3, "download_file", lambda bucket, key, path: (
+        keys.append(key), download_file(bucket, key, path)
+    ))
+    return keys
+
+
+def test_download_geopackages_uses_copy_of_same_etag(publicatie, tmp_path, downloads):
+    put(publicatie, f"{FOLDER}/a.gpkg", b"aaaa")
+    put(publicatie, f"{FOLDER}/b.gpkg", b"bbbb")
+    target = tmp_path / "bundles"
+
+    paths = publicatie.download_geopackages(BUCKET, publicatie.list_geopackages(BUCKET, FOLDER).values(), str(target))
+    assert sorted(paths) == [str(target / "a.gpkg"), str(target / "b.gpkg")]
+    assert sorted(downloads) == [f"{FOLDER}/a.gpkg", f"{FOLDER}/b.gpkg"]
+
+    # Same size, other content: only the changed object is downloaded again
+    etag = put(publicatie, f"{FOLDER}/a.gpkg", b"cccc")
+    downloads.clear()
+    paths = publicatie.download_geopackages(BUCKET, publicatie.list_geopackages(BUCKET, FOLDER).values(), str(target))
+
+    assert len(list(paths)) == 2 and downloads == [f"{FOLDER}/a.gpkg"]
+    assert (target / "a.gpkg").read_bytes() == b"cccc" and (target / "a.gpkg.etag").read_text() == etag
+
+
+def test_failed_download_cancels_queued_downloads(publicatie, tmp_path, downloads, monkeypatch):
+    for name in "abcdef":
+        put(publicatie, f"{FOLDER}/{name}.gpkg", name.encode())
+    download_file = publicatie.s3.download_file
+
+    def download(bucket, key, path):
+        if key.endswith("a.gpkg"):
+            raise RuntimeError("connection reset")
+        time.sleep(0.05)
+        download_file(bucket, key, path)
+
+    monkeypatch.setattr(publicatie.s3, "download_file", download)
+    objects = publicatie.list_geopackages(BUCKET, FOLDER).values()
+
+    with pytest.raises(RuntimeError, match="connection reset"):
+        list(publicatie.download_geopackages(BUCKET, objects, str(tmp_path), max_workers=1))
+    # The download of b may have started before the failure of a; c to f were cancelled
+    assert downloads in ([], [f"{FOLDER}/b.gpkg"])
+    # No ETag is recorded for the failed download, so the next run fetches it
+    assert not (tmp_path / "a.gpkg.etag").exists()
@@ -0,0 +1,130 @@
+"""Tests for the tier 0 quick check."""
+
+from functools import partial
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from krm_validator.config import ValidationConfig
+from krm_validator.handler import process_data_bundle
+from krm_validator.processor import DataBundleProcessor
+from krm_validator.report import ValidationSection
+from krm_validator.s3_functions import STATUS_BUCKET
+from krm_validator.validator import KRMValidator
+
+from conftest import make_config
+from synthetic import bundle_name, generate_bundle, write_bundle_zip
+
+BUCKET = "krm-validatie-data-dev"
+ROWS = 240
+QUICK_SECTIONS = [
+    ValidationSection.COLUMN_CHECK.value,
+    ValidationSection.VALUE_CHECK.value,
+    ValidationSection.OTHER_CHECK.value,
+]
+
+
+bucket_config = partial(make_config, bucket_name=BUCKET)
+
+
+def test_quick_check_matches_full_validation(tmp_path, ref_data):
+    config = bucket_config(tmp_path)
+    df = generate_bundle("timeseries", ROWS, fault_rate=0.1, seed=11)
+    df.columns = df.columns.str.lower().str.strip()
+    df["limietsymbool"] = df["limietsymbool"].astype(object)
+    df.loc[df.index[:3], "limietsymbool"] = "="
+    df.loc[df.index[3:5], "namespace"] = "NL81"
+    package_name = bundle_name("timeseries", ROWS, 0.1)
+
+    validator = KRMValidator(config, ref_data)
+    quick = validator.quick_check(df, package_name).to_dataframe()
+    assert validator.report.is_valid
+
+    full = validator.validate(DataBundleProcessor(config).to_geodataframe(df), package_name).to_dataframe()
+    expected = full[full["section"].isin(QUICK_SECTIONS)].reset_index(drop=True)
+
+    assert set(quick["section"]) == {ValidationSection.VALUE_CHECK.value, ValidationSection.OTHER_CHECK.value}
+    assert quick.sort_values(list(quick.columns)).reset_index(drop=True).equals(
+        expected.sort_values(list(expected.columns)).reset_index(drop=True)
+    )
+
+
+def test_config_rejects_unknown_quick_check_mode():
+    with pytest.raises(ValueError, match="quick_check"):
+        ValidationConfig(quick_check="sometimes")
+
+
+@pytest.fixture
+def s3(tmp_path):
+    with mock_aws():
+        s3 = boto3.client("s3")
+        for bucket in (BUCKET, STATUS_BUCKET):
+            s3.create_bucket(Bucket=bucket, CreateBucketConfiguration={"LocationConstraint": "eu-west-1"})
+        yield s3
+
+
+def upload_bundle(s3, tmp_path, fault_rate, akkoord=False):
+    zip_path = write_bundle_zip(
+        "timeseries", ROWS, tmp_path / "input", fault_rate=fault_rate, seed=5, akkoord=akkoord
+    )
+    key = f"input/{zip_path.name}"
+    s3.upload_file(str(zip_path), BUCKET, key)
+    return key, zip_path.stem.replace("+", " ")
+
+
+def report_keys(s3):
+    return {obj["Key"] for obj in s3.list_objects_v2(Bucket=BUCKET, Prefix="rapportages/").get("Contents", [])}
+
+
+@pytest.mark.parametrize("quick_check_rows", [0, 100])
+def test_gate_skips_full_validation_of_failing_bundle(tmp_path, s3, quick_check_rows):
+    key, name = upload_bundle(s3, tmp_path, fault_rate=0.2)
+    config = bucket_config(tmp_path, quick_check="gate", quick_check_rows=quick_check_rows)
+
+    result = process_data_bundle(config, BUCKET, key)
+
+    assert result["quick_check_only"] and not result["bundle_valid"]
+    assert set(result["failures_by_section"]) <= set(QUICK_SECTIONS)
+    assert report_keys(s3) == {
+        f"rapportages/{report}.{extension}"
+        for report in (f"snelle_controle_{name}", name) for extension in ("csv", "parquet")
+    }
+
+
+def test_always_runs_full_validation(tmp_path, s3):
+    key, name = upload_bundle(s3, tmp_path, fault_rate=0.2)
+    config = bucket_config(tmp_path, quick_check="always")
+
+    result = process_data_bundle(config, BUCKET, key)
+
+    assert "quick_check_only" not in result
+    assert ValidationSection.RULE_CHECK.value in result["failures_by_section"]
+    assert f"rapportages/validatielijst_per_locatie_met_aantal_{name}.csv" in report_keys(s3)
+
+
+def test_gate_runs_full_validation_with_akkoord(tmp_path, s3):
+    key, _ = upload_bundle(s3, tmp_path, fault_rate=0.2, akkoord=True)
+    config = bucket_config(tmp_path, quick_check="gate")
+
+    result = process_data_bundle(config, BUCKET, key)
+
+    assert "quick_check_only" not in result
+    assert result["has_akkoord"]
+
+
+def test_quick_check_and_full_read_download_bundle_once(tmp_path, s3, monkeypatch):
+    key, _ = upload_bundle(s3, tmp_path, fault_rate=0.2)
+    config = bucket_config(tmp_path, quick_check="always", quick_check_rows=100)
+    downloads = []
+    download_zip = DataBundleProcessor.download_zip
+
+    def counted(self, bucket_name, zip_file_key, zip_file):
+        downloads.append(zip_file_key)
+        download_zip(self, bucket_name, zip_file_key, zip_file)
+
+    monkeypatch.setattr(DataBundleProcessor, "download_zip", counted)
+    result = process_data_bundle(config, BUCKET, key)
+
+    assert downloads == [key]
+    assert ValidationSection.RULE_CHECK.value in result["failures_by_section"]
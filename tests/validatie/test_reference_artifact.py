@@ -0,0 +1,103 @@
+"""Tests for the compiled reference data artifact."""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from krm_validator import reference_artifact
+from krm_validator.config import ValidationConfig
+from krm_validator.reference_artifact import build_artifact, source_hash
+from krm_validator.reference_data import ReferenceDataLoader
+
+DATA_DIR = Path(__file__).parents[2] / "data"
+SOURCE = ValidationConfig().github_base_url
+
+
+@pytest.fixture(scope="module")
+def artifact_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp("reference_artifact")
+    build_artifact(DATA_DIR, path, SOURCE)
+    return path
+
+
+def test_manifest(artifact_dir):
+    loader = ReferenceDataLoader(
+        ValidationConfig(reference_artifact_dir=artifact_dir, reference_data_hash=source_hash(DATA_DIR))
+    )
+    manifest = loader.artifact.manifest
+    assert manifest["source"] == SOURCE
+    assert manifest["source_hash"] == source_hash(DATA_DIR)
+    assert manifest["projected_crs"] == "EPSG:32631"
+
+
+def test_artifact_matches_source(artifact_dir):
+    source = ReferenceDataLoader(ValidationConfig(reference_data_dir=DATA_DIR))
+    compiled = ReferenceDataLoader(
+        ValidationConfig(reference_data_dir=DATA_DIR, reference_artifact_dir=artifact_dir)
+    )
+    assert compiled.artifact is not None
+
+    for name in ["validatielijst", "group", "column_definition"]:
+        pd.testing.assert_frame_equal(getattr(compiled, name), getattr(source, name))
+    pd.testing.assert_frame_equal(
+        compiled.location_gdf.drop(columns="geometry"), source.location_gdf.drop(columns="geometry")
+    )
+    assert compiled.location_gdf.crs == source.location_gdf.crs
+    assert (compiled.location_gdf.geometry.to_wkb() == source.location_gdf.geometry.to_wkb()).all()
+
+    projected = compiled.projected_location_gdf
+    assert projected.crs == "EPSG:32631"
+    assert projected.geometry.geom_equals_exact(
+        source.location_gdf.to_crs("EPSG:32631").geometry, tolerance=1e-6
+    ).all()
+
+
+def test_hash_mismatch_falls_back(artifact_dir):
+    loader = ReferenceDataLoader(
+        ValidationConfig(reference_artifact_dir=artifact_dir, reference_data_hash="0" * 64)
+    )
+    assert loader.artifact is None
+
+
+def test_unpinned_artifact_falls_back(artifact_dir):
+    loader = ReferenceDataLoader(ValidationConfig(reference_artifact_dir=artifact_dir, reference_data_hash=None))
+    assert loader.artifact is None
+
+
+def test_clear_cache_checks_artifact_again(artifact_dir, tmp_path):
+    config = ValidationConfig(reference_artifact_dir=artifact_dir, reference_data_hash=source_hash(DATA_DIR))
+    loader = ReferenceDataLoader(config)
+    assert loader.artifact is not None
+
+    config.reference_artifact_dir = tmp_path
+    assert loader.artifact is not None
+    loader.clear_cache()
+    assert loader.artifact is None
+
+
+def test_build_fails_on_other_pinned_hash(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["reference_artifact", "--print-hash", str(DATA_DIR)])
+    reference_artifact.main()
+    assert capsys.readouterr().out.strip() == source_hash(DATA_DIR)
+
+    monkeypatch.setattr(sys, "argv", [
+        "reference_artifact", str(DATA_DIR), str(tmp_path / "artifact"), "--expect-hash", "0" * 64
+    ])
+    with pytest.raises(SystemExit):
+        reference_artifact.main()
+    assert "not the pinned" in capsys.readouterr().err
+    assert not (tmp_path / "artifact").exists()
+
+
+def test_other_source_falls_back(artifact_dir):
+    loader = ReferenceDataLoader(ValidationConfig(
+        reference_artifact_dir=artifact_dir, github_base_url="https://example.org/data"
+    ))
+    assert loader.artifact is None
+
+
+def test_missing_artifact(tmp_path):
+    loader = ReferenceDataLoader(ValidationConfig(reference_artifact_dir=tmp_path))
+    assert loader.artifact is None
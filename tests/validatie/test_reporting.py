@@ -0,0 +1,132 @@
+"""Unit tests for the count report (tellingen)."""
+
+import pandas as pd
+
+from krm_validator.config import ValidationConfig
+from krm_validator.counts import COUNT_TABLE_COLUMNS, CountAggregator
+from krm_validator.report import ValidationSection
+from krm_validator.reporting import CountReportGenerator
+from krm_validator.validator import KRMValidator
+
+
+class FakeReferenceData:
+    """Reference data with a fixed set of exploded validation rules."""
+
+    def __init__(self, rules: pd.DataFrame):
+        self.rules = rules
+
+    def get_validation_rules_exploded(self, package_name):
+        return self.rules
+
+
+def _rules():
+    # Rule 2 covers two locations, so it is exploded into two rows with the same index
+    return pd.DataFrame(
+        {
+            'databundelcode': ['bundel', 'bundel', 'bundel'],
+            'groep': ['g1', 'g1', 'g2'],
+            'locatiecode': ['LOC1', 'LOC2', 'LOC1'],
+            'aantal': [2, 2, 1],
+            'limiet': ['<=', '<=', '='],
+            'group_by': ['meetwaarde.lokaalid'] * 3,
+        },
+        index=[2, 2, 3],
+    )
+
+
+def _data():
+    gdf = pd.DataFrame({
+        'meetwaarde.lokaalid': ['NL80_1', 'NL80_2', 'NL80_3', 'NL80_4'],
+        'monster.lokaalid': ['NL80_m1', 'NL80_m1', 'NL80_m2', 'NL80_m3'],
+        'meetobject.lokaalid': ['NL80_LOC1', 'NL80_LOC1', 'NL80_LOC1', 'NL80_LOC1'],
+    })
+    rules = pd.DataFrame({
+        'databundelcode': 'bundel',
+        'record_id': ['1', '2', '3', '4'],
+        'uitvalreden': 0,
+        'validatieregel': [2.0, 2.0, 2.0, None],
+    })
+    return gdf, rules
+
+
+class TestCountReportGenerator:
+    """Tests for CountReportGenerator."""
+
+    def test_generate_counts_per_location_and_rule(self):
+        gdf, rules = _data()
+        generator = CountReportGenerator(ValidationConfig(), FakeReferenceData(_rules()))
+
+        report = generator.generate(gdf, rules, 'bundel')
+
+        assert list(report.columns) == [
+            'databundelcode', 'record_id', 'locatiecode_aantal', 'aantaldat',
+            'limiet', 'aantalval', 'uitvalreden', 'recordnrs', 'validatieregel'
+        ]
+        # One row per (rule, data location, rule location); the record without rule is skipped
+        assert len(report) == 2
+        assert report['aantaldat'].tolist() == [3, 3]
+        assert report['uitvalreden'].tolist() == ["aantal monsters groter dan verwacht"] * 2
+        assert report['record_id'].tolist() == ['1', '1']
+
+    def test_generate_merges_exploded_rule_records(self):
+        gdf, rules = _data()
+        generator = CountReportGenerator(ValidationConfig(), FakeReferenceData(_rules()))
+
+        report = generator.generate(gdf, rules, 'bundel')
+
+        assert "'locatiecode': 'LOC1;LOC2'" in report['validatieregel'].iloc[0]
+        assert "'aantal': 2" in report['validatieregel'].iloc[0]
+
+    def test_generate_within_limit(self):
+        gdf, rules = _data()
+        rules['validatieregel'] = [3.0, None, None, None]
+        generator = CountReportGenerator(ValidationConfig(), FakeReferenceData(_rules()))
+
+        report = generator.generate(gdf, rules, 'bundel')
+
+        assert report['uitvalreden'].tolist() == [""]
+
+    def test_generate_without_rules(self):
+        gdf, rules = _data()
+        rules['validatieregel'] = None
+        generator = CountReportGenerator(ValidationConfig(), FakeReferenceData(_rules()))
+
+        assert generator.generate(gdf, rules, 'bundel').empty
+
+
+class TestCountAggregator:
+    """Tests for the count table shared by the count check and the count report."""
+
+    def test_aggregate(self):
+        gdf, rules = _data()
+
+        table = CountAggregator(ValidationConfig(), FakeReferenceData(_rules())).aggregate(gdf, rules, 'bundel')
+
+        assert list(table.columns) == COUNT_TABLE_COLUMNS
+        assert table['validatieregel'].tolist() == [2, 2]
+        assert table['locatiecode'].tolist() == ['LOC1', 'LOC1']
+        assert table['aantaldat'].tolist() == [3, 3]
+
+    def test_aggregate_without_rules(self):
+        gdf, rules = _data()
+        rules['validatieregel'] = None
+
+        table = CountAggregator(ValidationConfig(), FakeReferenceData(_rules())).aggregate(gdf, rules, 'bundel')
+
+        assert table.empty
+        assert list(table.columns) == COUNT_TABLE_COLUMNS
+
+    def test_count_check_and_report_share_table(self):
+        gdf, rules = _data()
+        ref_data = FakeReferenceData(_rules())
+        validator = KRMValidator(ValidationConfig(), ref_data)
+
+        validator._check_counts(gdf, 'bundel', rules)
+        report = CountReportGenerator(ValidationConfig(), ref_data).generate(
+            gdf, rules, 'bundel', validator.count_table
+        )
+
+        failures = validator.report.to_dataframe()
+        assert (failures['section'] == ValidationSection.COUNT_CHECK.value).all()
+        assert failures['uitvalreden'].tolist() == report['uitvalreden'].tolist()
+        assert failures['informatie'].iloc[0] == "aantal datarecords: 3. aantal verwacht: <= 2"
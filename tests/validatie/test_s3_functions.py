@@ -6,6 +6,9 @@ import boto3
 import pandas as pd
 from botocore.exceptions import ClientError
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from moto import mock_aws
 from infra.functions.validatie.s3_functions import *
 
 # Mock the boto3 client and its send_message method
@@ -306,74 +309,85 @@ sample_df = pd.DataFrame({
     'krmcriterium': ['test_criterion']
 })
 
-# Mock the boto3 client and its methods
-@patch('boto3.client')
-def test_report_databundle_update_existing(mock_boto3_client):
-    # Setup the mock
-    mock_s3_client = MagicMock()
-    mock_boto3_client.return_value = mock_s3_client
+STATUS_BUCKET = "krm-validatie-data-prod"
 
-    # Sample CSV data for testing
-    sample_csv_data = "databundelcode;krmcriterium;last_updated;status\npackage1;criterion1;2023-01-01 00:00:00;state1"
 
-    # Mock the response from get_object
-    mock_response = {
-        'Body': MagicMock()
-    }
-    mock_response['Body'].read.return_value = sample_csv_data.encode('utf-8')
-    mock_s3_client.get_object.return_value = mock_response
+@pytest.fixture
+def status_bucket(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "eu-west-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        s3 = boto3.client('s3')
+        s3.create_bucket(Bucket=STATUS_BUCKET, CreateBucketConfiguration={'LocationConstraint': 'eu-west-1'})
+        yield s3
 
-    # Test parameters
-    package_name = "package1"
-    state = "new_state"
 
-    # Call the function
-    report_databundle(sample_df, package_name, state)
+def _read_status(s3, package_name):
+    return json.loads(s3.get_object(Bucket=STATUS_BUCKET, Key=status_key(package_name))['Body'].read())
 
-    # Check if get_object was called with the correct parameters
-    mock_s3_client.get_object.assert_called_once_with(Bucket="krm-validatie-data-dev", Key='rapportages/akkoorddata.csv')
 
-    # Check if put_object was called to update the CSV
-    mock_s3_client.put_object.assert_called_once()
+def test_report_databundle_new(status_bucket):
+    report_databundle(sample_df, "package2", "new_state")
 
-    # Check if the updated CSV contains the new state
-    _, kwargs = mock_s3_client.put_object.call_args
-    updated_csv = kwargs['Body']
-    assert "new_state" in updated_csv
+    status = _read_status(status_bucket, "package2")
+    assert status['databundelcode'] == "package2"
+    assert status['krmcriterium'] == "test_criterion"
+    assert status['status'] == "new_state"
 
-@patch('boto3.client')
-def test_report_databundle_append_new(mock_boto3_client):
-    # Setup the mock
-    mock_s3_client = MagicMock()
-    mock_boto3_client.return_value = mock_s3_client
+    # Only the status object of the bundle is written, akkoorddata.csv is left to compaction
+    keys = [obj['Key'] for obj in status_bucket.list_objects_v2(Bucket=STATUS_BUCKET)['Contents']]
+    assert keys == [status_key("package2")]
 
-    # Sample CSV data for testing
-    sample_csv_data = "databundelcode;krmcriterium;last_updated;status\npackage1;criterion1;2023-01-01 00:00:00;state1"
 
-    # Mock the response from get_object
-    mock_response = {
-        'Body': MagicMock()
-    }
-    mock_response['Body'].read.return_value = sample_csv_data.encode('utf-8')
-    mock_s3_client.get_object.return_value = mock_response
+def test_report_databundle_update_existing(status_bucket):
+    report_databundle(sample_df, "package1", "state1")
+    report_databundle(sample_df, "package1", "new_state")
 
-    # Test parameters
-    package_name = "package2"
-    state = "new_state"
+    assert _read_status(status_bucket, "package1")['status'] == "new_state"
+
+
+def test_report_databundle_skips_older_update(status_bucket):
+    newer = {'databundelcode': "package1", 'krmcriterium': "criterion1", 'last_updated': "2999-01-01 00:00:00",
+             'status': "newer_state", 'updated_at': "2999-01-01T00:00:00.000000"}
+    status_bucket.put_object(Bucket=STATUS_BUCKET, Key=status_key("package1"), Body=json.dumps(newer))
+
+    assert report_databundle(sample_df, "package1", "older_state") is None
+    assert _read_status(status_bucket, "package1")['status'] == "newer_state"
+
+
+def test_report_databundle_concurrent_updates(status_bucket):
+    bundles = [f"package{i}" for i in range(10)]
+    updates = [(bundle, f"state{n}") for n in range(8) for bundle in bundles]
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        recorded = list(executor.map(lambda update: report_databundle(sample_df, *update), updates))
+
+    # Every bundle ends with the most recent of its recorded updates, none is lost
+    for bundle in bundles:
+        latest = max((row for row in recorded if row and row['databundelcode'] == bundle),
+                     key=lambda row: row['updated_at'])
+        assert _read_status(status_bucket, bundle)['updated_at'] == latest['updated_at']
+
+    val = compact_databundle_status()
+    assert sorted(val['databundelcode']) == sorted(bundles)
 
-    # Call the function
-    report_databundle(sample_df, package_name, state)
 
-    # Check if get_object was called with the correct parameters
-    mock_s3_client.get_object.assert_called_once_with(Bucket="krm-validatie-data-prod", Key='rapportages/akkoorddata.csv')
+def test_compact_databundle_status(status_bucket):
+    legacy = "databundelcode;krmcriterium;last_updated;status\npackage1;criterion1;2023-01-01 00:00:00;state1\n" \
+             "package3;criterion3;2023-01-01 00:00:00;state3"
+    status_bucket.put_object(Bucket=STATUS_BUCKET, Key=AKKOORDDATA_KEY, Body=legacy)
+    report_databundle(sample_df, "package1", "new_state")
+    report_databundle(sample_df, "package2", "new_state")
 
-    # Check if put_object was called to update the CSV
-    mock_s3_client.put_object.assert_called_once()
+    compact_databundle_status()
 
-    # Check if the updated CSV contains the new package
-    _, kwargs = mock_s3_client.put_object.call_args
-    updated_csv = kwargs['Body']
-    assert "package2" in updated_csv
+    csv_data = status_bucket.get_object(Bucket=STATUS_BUCKET, Key=AKKOORDDATA_KEY)['Body'].read().decode('utf-8')
+    val = pd.read_csv(StringIO(csv_data), sep=';').set_index('databundelcode')
+    assert list(val.columns) == ['krmcriterium', 'last_updated', 'status']
+    assert sorted(val.index) == ["package1", "package2", "package3"]
+    assert val.loc["package1", 'status'] == "new_state"
+    assert val.loc["package3", 'status'] == "state3"
 
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
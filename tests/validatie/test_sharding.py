@@ -0,0 +1,55 @@
+"""Tests for location-sharded validation."""
+
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from krm_validator.config import ValidationConfig
+from krm_validator.processor import DataBundleProcessor
+from krm_validator.reference_data import ReferenceDataLoader
+from krm_validator.sharding import ShardedKRMValidator, location_shards
+from krm_validator.validator import KRMValidator
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "benchmarks"))
+from synthetic import DATA_DIR, bundle_name, generate_bundle  # noqa: E402
+
+
+def test_location_shards_keep_locations_together():
+    locations = pd.Series(["A"] * 50 + ["B"] * 30 + ["C"] * 20 + ["D"] * 20 + [np.nan] * 5)
+    shards = location_shards(locations.sample(frac=1, random_state=1).reset_index(drop=True), 2)
+
+    positions = np.concatenate(shards)
+    assert sorted(positions) == list(range(len(locations)))
+    assert all((np.diff(shard) > 0).all() for shard in shards)
+    assert sorted(len(shard) for shard in shards) == [55, 70]
+
+
+def test_location_shards_more_shards_than_locations():
+    shards = location_shards(pd.Series(["A", "A", "B"]), 8)
+    assert [list(shard) for shard in shards] == [[0, 1], [2]]
+
+
+@pytest.mark.parametrize("profile", ["timeseries", "multicriterion"])
+def test_sharded_validation_matches_single_process(profile):
+    os.environ.setdefault("AWS_DEFAULT_REGION", "eu-west-1")
+    config = ValidationConfig(reference_data_dir=DATA_DIR)
+    ref_data = ReferenceDataLoader(config)
+
+    df = generate_bundle(profile, 240, fault_rate=0.05, seed=7)
+    df.columns = df.columns.str.lower().str.strip()
+    gdf = DataBundleProcessor(config).to_geodataframe(df)
+    package_name = bundle_name(profile, 240, 0.05)
+
+    single = KRMValidator(config, ref_data)
+    expected = single.validate(gdf, package_name).to_dataframe()
+    sharded = ShardedKRMValidator(config, ref_data, workers=2, min_rows=0)
+    result = sharded.validate(gdf, package_name).to_dataframe()
+
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(result, expected)
+    pd.testing.assert_frame_equal(sharded.rules, single.rules)
+    pd.testing.assert_frame_equal(sharded.count_table, single.count_table)
@@ -0,0 +1,216 @@
+"""Tests for the streamed validation of long bundles in begindatum windows."""
+
+import io
+import os
+import sys
+import zipfile
+from dataclasses import replace
+from pathlib import Path
+
+import boto3
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from moto import mock_aws
+
+from krm_validator.checkpoint import checkpoint_key, load_checkpoint, save_checkpoint
+from krm_validator.config import ValidationConfig
+from krm_validator.handler import process_data_bundle
+from krm_validator.processor import DataBundleProcessor
+from krm_validator.reference_data import ReferenceDataLoader
+from krm_validator.report import ValidationSection
+from krm_validator.s3_functions import STATUS_BUCKET
+from krm_validator.streaming import StreamingKRMValidator, time_windows
+from krm_validator.validator import KRMValidator
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "benchmarks"))
+from synthetic import DATA_DIR, bundle_name, generate_bundle, write_bundle_zip  # noqa: E402
+
+BUCKET = "krm-validatie-data-dev"
+ROWS = 240
+
+
+class InVerzameling:
+    """Validator mixin that puts every record in a verzameling, so the verzameling check runs."""
+
+    def _rule_records(self, *args):
+        return [{**record, 'betreftverzameling': 1} for record in super()._rule_records(*args)]
+
+
+class BatchValidator(InVerzameling, KRMValidator):
+    pass
+
+
+class StreamingValidator(InVerzameling, StreamingKRMValidator):
+    pass
+
+
+@pytest.fixture(scope="module")
+def config():
+    os.environ.setdefault("AWS_DEFAULT_REGION", "eu-west-1")
+    return ValidationConfig(
+        reference_data_dir=DATA_DIR, record_chunk_rows=50, stream_window="M", stream_chunk_rows=50
+    )
+
+
+@pytest.fixture(scope="module")
+def ref_data(config):
+    ref_data = ReferenceDataLoader(config)
+    # Every group requires all its parameters plus one that no record has
+    group = ref_data.group
+    extra = group.dropna(subset=['groep']).drop_duplicates('groep').assign(parameter='ONTBREEKT')
+    ref_data._group = pd.concat([group, extra], ignore_index=True).assign(elke_param_verplicht='ja')
+    return ref_data
+
+
+def bundle(profile, fault_rate=0.1):
+    """CSV content with the record ids of a few records repeated in another month."""
+    df = generate_bundle(profile, ROWS, fault_rate=fault_rate, seed=7)
+    df.columns = df.columns.str.lower().str.strip()
+    month = df['begindatum'].str[:7]
+    for position in (0, 50, 100):
+        other = np.flatnonzero(month != month[position])[-1]
+        df.loc[position, 'meetwaarde.lokaalid'] = df.loc[other, 'meetwaarde.lokaalid']
+    return DataBundleProcessor.categorize_codes(df), bundle_name(profile, ROWS, fault_rate)
+
+
+def write_zip(df, path):
+    """Bundle ZIP with df as its CSV."""
+    with zipfile.ZipFile(path, "w") as z, z.open(f"{path.stem}.csv", "w") as raw:
+        with io.TextIOWrapper(raw, encoding="cp1252", newline="") as text:
+            df.to_csv(text, sep=";", index=False)
+    return path
+
+
+def test_time_windows():
+    begindatum = pd.Series(['2024-03-02', '2023-12-31', None, '2024-03-30', 'geen datum', '2024-01-15'])
+
+    windows = time_windows(begindatum, 'M')
+
+    assert [list(window) for window in windows] == [[1], [5], [0, 3], [2, 4]]
+    assert [list(window) for window in time_windows(begindatum.astype('category'), 'Y')] == [[1], [0, 3, 5], [2, 4]]
+    assert time_windows(begindatum.iloc[:0], 'M') == []
+
+
+def test_spilled_bundle_reads_like_the_csv(config, tmp_path):
+    df = pd.DataFrame({
+        "begindatum": ["2024-02-01", "2024-01-05", None, "2024-01-20", "2023-12-31", "2024-02-10"],
+        # Integers in one chunk, floats in another
+        "numeriekewaarde": [1, 2, 3, 4.5, 5, 6],
+        # Missing in all but one chunk
+        "limietsymbool": [None, None, "<", None, None, None],
+        # Numbers in one chunk, text in another
+        "monster.lokaalid": [1, 2, 3, "NL80_4", 5, 6],
+    })
+    zip_path = write_zip(df, tmp_path / "bundle.zip")
+    processor = DataBundleProcessor(replace(config, stream_chunk_rows=2, categorical_codes=False))
+    expected, _ = processor.read_zip(zip_path)
+
+    bundle = processor.spill_zip(zip_path)
+    windows = [bundle.window(number, raw=True) for number in range(bundle.window_count)]
+
+    assert len(bundle) == 6 and bundle.chunk_count == 3
+    assert [list(window.index) for window in windows] == [[4], [1, 3], [0, 5], [2]]
+    pd.testing.assert_frame_equal(pd.concat(windows).sort_index(), expected)
+    pd.testing.assert_frame_equal(pd.concat(bundle.iter_chunks()), expected)
+    assert list(bundle.records_of("monster.lokaalid", pd.Series(["4", "5"])).index) == [3, 4]
+    assert processor.spill_zip(zip_path, min_rows=7) is None
+
+
+@pytest.mark.parametrize("profile, window", [
+    ("biotaxon", "M"), ("timeseries", "M"), ("timeseries", "D"), ("multicriterion", "M"),
+])
+def test_streamed_validation_matches_batch(config, ref_data, profile, window):
+    df, package_name = bundle(profile)
+    processor = DataBundleProcessor(config)
+
+    batch = BatchValidator(config, ref_data)
+    expected = batch.validate(processor.to_geodataframe(df), package_name).to_dataframe()
+    streaming = StreamingValidator(config, ref_data, window=window)
+    result = streaming.validate(processor.normalize(df), package_name).to_dataframe()
+
+    assert ValidationSection.PARAMETER_AGGREGATE.value in set(expected['section'])
+    assert streaming.complete and streaming.rules is None
+    pd.testing.assert_frame_equal(result, expected)
+    pd.testing.assert_frame_equal(streaming.count_table, batch.count_table)
+
+
+@pytest.mark.parametrize("profile", ["biotaxon", "timeseries", "multicriterion"])
+def test_spilled_validation_matches_batch(config, ref_data, tmp_path, profile):
+    df, package_name = bundle(profile)
+    zip_path = write_zip(df, tmp_path / "bundle.zip")
+    processor = DataBundleProcessor(config)
+    csv_content, _ = processor.read_zip(zip_path)
+
+    batch = BatchValidator(config, ref_data)
+    expected = batch.validate(processor.to_geodataframe(csv_content), package_name).to_dataframe()
+    spilled = processor.spill_zip(zip_path)
+    streaming = StreamingValidator(config, ref_data)
+    result = streaming.validate(spilled, package_name).to_dataframe()
+
+    assert spilled.chunk_count > 1 and spilled.window_count > 1
+    pd.testing.assert_frame_equal(result, expected)
+    pd.testing.assert_frame_equal(streaming.count_table, batch.count_table)
+    quick = KRMValidator(config, ref_data).quick_check(csv_content, package_name)
+    assert streaming.quick_check(spilled, package_name).results == quick.results
+
+
+def test_interrupted_streamed_validation_resumes_to_same_report(config, ref_data):
+    df, package_name = bundle("multicriterion")
+    frame = DataBundleProcessor(config).normalize(df)
+
+    batch = BatchValidator(config, ref_data)
+    expected = batch.validate(DataBundleProcessor(config).to_geodataframe(df), package_name).to_dataframe()
+
+    validator = StreamingValidator(config, ref_data, window='M')
+    runs = 0
+    key = checkpoint_key(config.checkpoint_prefix, package_name)
+    with mock_aws():
+        boto3.client("s3").create_bucket(
+            Bucket=BUCKET, CreateBucketConfiguration={"LocationConstraint": "eu-west-1"}
+        )
+        while not validator.complete:
+            # Stop after every third check, continuing in a new validator from a checkpoint
+            checks = iter(range(3))
+            validator.validate(frame, package_name, should_stop=lambda: next(checks, None) is None)
+            save_checkpoint(BUCKET, key, validator.checkpoint_state())
+            validator = StreamingValidator(config, ref_data, window='M')
+            validator.restore_state(load_checkpoint(BUCKET, config.checkpoint_prefix, key))
+            runs += 1
+
+    assert runs > len(time_windows(frame['begindatum'], 'M')) // 3
+    pd.testing.assert_frame_equal(validator.report.to_dataframe(), expected)
+    pd.testing.assert_frame_equal(validator.count_table, batch.count_table)
+
+
+@pytest.mark.parametrize("profile", ["timeseries", "multicriterion"])
+def test_handler_streams_large_bundles(tmp_path, profile):
+    os.environ.setdefault("AWS_DEFAULT_REGION", "eu-west-1")
+    with mock_aws():
+        s3 = boto3.client("s3")
+        for bucket in (BUCKET, STATUS_BUCKET):
+            s3.create_bucket(Bucket=bucket, CreateBucketConfiguration={"LocationConstraint": "eu-west-1"})
+        # With an akkoord file, so the bundle is exported
+        zip_path = write_bundle_zip(profile, ROWS, tmp_path / "input", fault_rate=0.05, seed=5, akkoord=True)
+        key = f"input/{zip_path.name}"
+        s3.upload_file(str(zip_path), BUCKET, key)
+        report_key = f"rapportages/{zip_path.stem.replace('+', ' ')}.csv"
+
+        results, reports = [], []
+        for name, stream_window in (("batch", ""), ("streamed", "M")):
+            (tmp_path / name).mkdir()
+            config = ValidationConfig(
+                is_local=True, local_folder=tmp_path / name, bucket_name=BUCKET, reference_data_dir=DATA_DIR,
+                quick_check="off", idempotency_prefix=f"work/leases-{name}/",
+                stream_window=stream_window, stream_min_rows=0, stream_chunk_rows=50
+            )
+            results.append(process_data_bundle(config, BUCKET, key))
+            reports.append(s3.get_object(Bucket=BUCKET, Key=report_key)["Body"].read())
+
+    assert results[0]["validation_failures"] > 0
+    assert results[1] == results[0]
+    assert reports[1] == reports[0]
+    geopackages = [gpd.read_file(tmp_path / name / f"{zip_path.stem}.gpkg") for name in ("batch", "streamed")]
+    assert len(geopackages[0]) >= ROWS
+    pd.testing.assert_frame_equal(geopackages[1], geopackages[0])
@@ -5,7 +5,7 @@ import pandas as pd
 import pytest
 
 from krm_validator.config import ValidationConfig
-from krm_validator.report import ValidationReport, ValidationResult, ValidationSection
+from krm_validator.report import ValidationReport, ValidationResult, ValidationSection, informatie_pattern
 from krm_validator.validator import KRMValidator
 
 
@@ -85,6 +85,37 @@ class TestValidationReport:
         df = pd.read_csv(filepath)
         assert len(df) == 1
         assert "Section" in df.columns
+    
+    def test_informatie_pattern(self):
+        assert informatie_pattern('Namespace "NL81" ongelijk aan "NL80"') == 'Namespace "..." ongelijk aan "..."'
+        assert informatie_pattern("04-03-2024 valt buiten bereik") == "# valt buiten bereik"
+    
+    def test_to_csv_caps_failure_groups(self, tmp_path):
+        report = ValidationReport()
+        for i in range(5):
+            report.add(ValidationSection.COLUMN_VALUE, "b", f"NL80_r{i}", "ongeldige code", f"Methode 'X{i}' niet in: {{nan}}")
+        report.add(ValidationSection.RULE_CHECK, "b", "s", "geen validatieregel", "geen regel")
+        
+        filepath = tmp_path / "report.csv"
+        report.to_csv(filepath, max_rows_per_group=2)
+        
+        df = pd.read_csv(filepath)
+        assert list(df["Record ID"]) == ["r0", "r1", "s", "r2 r3 r4"]
+        assert df.iloc[3]["Informatie"] == "nog 3 records met: Methode '...' niet in: {nan}"
+        assert report.failure_count == 6
+        assert report.failures_by_section()[ValidationSection.COLUMN_VALUE] == 5
+    
+    def test_to_parquet_keeps_all_failures(self, tmp_path):
+        report = ValidationReport()
+        for i in range(5):
+            report.add(ValidationSection.GEO_CONTROL, "b", f"r{i}", "e", "i")
+        
+        filepath = tmp_path / "report.parquet"
+        report.to_parquet(filepath)
+        pd.testing.assert_frame_equal(pd.read_parquet(filepath), report.to_dataframe())
+        
+        ValidationReport().to_parquet(filepath)
+        assert len(pd.read_parquet(filepath)) == 0
 
 
 class TestKRMValidatorHelpers:
@@ -134,6 +165,27 @@ class TestKRMValidatorHelpers:
         result = KRMValidator._get_parameter_value(row)
         assert pd.isna(result)
 
+    def test_get_parameter_value_code_and_taxon(self):
+        row = pd.Series({
+            'biotaxon.naam': 'Gadus morhua',
+            'parameter.code': 'CD'
+        })
+        result = KRMValidator._get_parameter_value(row)
+        assert pd.isna(result)
+
+    def test_parameter_columns(self):
+        df = pd.DataFrame({
+            'parameter.code': [np.nan, 'CD', np.nan, 'Hg'],
+            'biotaxon.naam': [np.nan, np.nan, 'Gadus Morhua', 'Gadus morhua'],
+        })
+        result = KRMValidator._parameter_columns(df)
+
+        assert result['parameter'].dtype == 'category'
+        assert result['parameter_key'].dtype == 'category'
+        assert pd.isna(result['parameter'].iloc[0])
+        assert result['parameter'].tolist()[1:] == ['CD', 'Gadus Morhua', 'Hg / Gadus morhua']
+        assert result['parameter_key'].tolist()[1:] == ['cd', 'gadus morhua', 'hg / gadus morhua']
+
 
 class TestValidationSection:
     """Tests for ValidationSection enum."""
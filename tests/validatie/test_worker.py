@@ -0,0 +1,98 @@
+"""Tests for the queue worker."""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from krm_validator.config import ValidationConfig
+from krm_validator.idempotency import acquire_lease, job_id, object_version
+from krm_validator.s3_functions import STATUS_BUCKET
+from krm_validator.worker import QueueWorker, parse_jobs
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "benchmarks"))
+from synthetic import DATA_DIR, write_bundle_zip  # noqa: E402
+
+BUCKET = "krm-validatie-data-dev"
+ROWS = 120
+
+
+def s3_event(bucket, key, event_name="ObjectCreated:Put"):
+    return json.dumps({"Records": [{"eventName": event_name, "s3": {"bucket": {"name": bucket}, "object": {"key": key}}}]})
+
+
+def test_parse_jobs():
+    assert parse_jobs(s3_event("b", "input/WMR+bundel.zip")) == [("b", "input/WMR bundel.zip")]
+    assert parse_jobs(s3_event("b", "input/x.zip", "ObjectRemoved:Delete")) == []
+    assert parse_jobs(json.dumps({"bucket": "b", "key": "input/x.zip"})) == [("b", "input/x.zip")]
+    assert parse_jobs(json.dumps({"Service": "Amazon S3", "Event": "s3:TestEvent"})) == []
+
+
+@pytest.fixture
+def aws(tmp_path):
+    os.environ.setdefault("AWS_DEFAULT_REGION", "eu-west-1")
+    with mock_aws():
+        s3 = boto3.client("s3")
+        for bucket in (BUCKET, STATUS_BUCKET):
+            s3.create_bucket(Bucket=bucket, CreateBucketConfiguration={"LocationConstraint": "eu-west-1"})
+        sqs = boto3.client("sqs")
+        queue_url = sqs.create_queue(QueueName="krm-validatie-jobs")["QueueUrl"]
+        yield s3, sqs, queue_url
+
+
+def test_worker_acknowledges_processed_jobs_only(tmp_path, aws):
+    s3, sqs, queue_url = aws
+    keys = []
+    for profile in ("biotaxon", "timeseries"):
+        zip_path = write_bundle_zip(profile, ROWS, tmp_path / "input", seed=3)
+        keys.append(f"input/{zip_path.name}")
+        s3.upload_file(str(zip_path), BUCKET, keys[-1])
+
+    sqs.send_message(QueueUrl=queue_url, MessageBody=s3_event(BUCKET, keys[0].replace(" ", "+")))
+    sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps({"bucket": BUCKET, "key": keys[1]}))
+    sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps({"Event": "s3:TestEvent"}))
+    sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps({"bucket": BUCKET, "key": "input/missing.zip"}))
+
+    config = ValidationConfig(is_local=True, local_folder=tmp_path, bucket_name=BUCKET, reference_data_dir=DATA_DIR)
+    worker = QueueWorker(config, queue_url, concurrency=1, wait_seconds=0, visibility_timeout=60)
+    worker.run(idle_exit=True)
+
+    assert (worker.processed, worker.failed) == (2, 1)
+    reports = {obj["Key"] for obj in s3.list_objects_v2(Bucket=BUCKET, Prefix="rapportages/")["Contents"]}
+    for key in keys:
+        assert f"rapportages/{Path(key).stem.replace('+', ' ')}.csv" in reports
+
+    # Only the failed job is left, invisible until its visibility timeout expires
+    attributes = sqs.get_queue_attributes(QueueUrl=queue_url, AttributeNames=["All"])["Attributes"]
+    assert attributes["ApproximateNumberOfMessages"] == "0"
+    assert attributes["ApproximateNumberOfMessagesNotVisible"] == "1"
+
+
+def test_worker_leaves_job_of_running_lease_on_queue(tmp_path, aws):
+    s3, sqs, queue_url = aws
+    zip_path = write_bundle_zip("timeseries", ROWS, tmp_path / "input", seed=3)
+    key = f"input/{zip_path.name}"
+    s3.upload_file(str(zip_path), BUCKET, key)
+
+    config = ValidationConfig(
+        is_local=True, local_folder=tmp_path, bucket_name=BUCKET, reference_data_dir=DATA_DIR, idempotency_wait_s=0
+    )
+    # Another invocation is still validating this bundle version
+    acquire_lease(BUCKET, config.idempotency_prefix, job_id(BUCKET, key, object_version(BUCKET, key)), 600, 0)
+    sqs.send_message(QueueUrl=queue_url, MessageBody=json.dumps({"bucket": BUCKET, "key": key}))
+
+    worker = QueueWorker(config, queue_url, concurrency=1, wait_seconds=0, visibility_timeout=60)
+    worker.run(idle_exit=True)
+
+    assert (worker.processed, worker.failed) == (0, 1)
+    attributes = sqs.get_queue_attributes(QueueUrl=queue_url, AttributeNames=["All"])["Attributes"]
+    assert attributes["ApproximateNumberOfMessagesNotVisible"] == "1"
+
+
+def test_worker_requires_queue_url():
+    with pytest.raises(ValueError, match="KRM_WORKER_QUEUE_URL"):
+        QueueWorker(ValidationConfig(worker_queue_url=""))